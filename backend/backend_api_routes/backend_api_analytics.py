@@ -2,8 +2,8 @@
 Backend API routes for analytics functionality
 Handles analytics summary, holdings data, and dividend management
 """
-from fastapi import APIRouter, HTTPException, Depends, Query, Request, Header
-from typing import Dict, Any, List, Union
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Header, Response
+from typing import Dict, Any, List, Optional, Union
 import logging
 from datetime import datetime, date, timedelta
 from decimal import Decimal
@@ -12,11 +12,14 @@ import time
 from debug_logger import DebugLogger
 from supa_api.supa_api_auth import require_authenticated_user
 from services.dividend_service import dividend_service
+from services.position_history import PositionHistory
 from services.portfolio_calculator import portfolio_calculator
 from services.portfolio_metrics_manager import portfolio_metrics_manager
 from utils.auth_helpers import extract_user_credentials
 from models.response_models import APIResponse
 from utils.response_factory import ResponseFactory
+from utils import fast_json
+from utils.http_cache import content_etag, etag_headers, etag_matches, not_modified
 from utils.error_handlers import (
     ServiceUnavailableError, InvalidInputError, DataNotFoundError,
     handle_database_error, handle_external_api_error, async_error_handler
@@ -30,13 +33,16 @@ analytics_router = APIRouter()
 @analytics_router.get("/summary")
 @DebugLogger.log_api_call(api_name="BACKEND_API", sender="FRONTEND", receiver="BACKEND", operation="ANALYTICS_SUMMARY")
 async def backend_api_analytics_summary(
+    http_response: Response,
     user_data: Dict[str, Any] = Depends(require_authenticated_user),
-    x_api_version: str = Header(default="v1", alias="X-API-Version")
+    x_api_version: str = Header(default="v1", alias="X-API-Version"),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match")
 ) -> Union[Dict[str, Any], APIResponse[Dict[str, Any]]]:
     """
     Get analytics summary with KPI cards data
     Returns portfolio value, profit, IRR, passive income, and cash balance
     OPTIMIZED: Uses cached portfolio calculation to reduce redundant database calls
+    Honors If-None-Match with 304 when the summary figures are unchanged
     """
     # Extract and validate user credentials
     user_id, user_token = extract_user_credentials(user_data)
@@ -104,12 +110,9 @@ async def backend_api_analytics_summary(
             # Fallback to lightweight summary
             dividend_summary = await _get_lightweight_dividend_summary(user_id)
         
-        # Calculate IRR using performance data if available
-        irr_percent = 0.0
-        # For now, always use the simple IRR calculation
-        # TODO: Add XIRR to PortfolioPerformance model in future
-        irr_data = await _calculate_simple_irr(user_id, user_token)
-        irr_percent = float(irr_data.get("irr_percent", 0))
+        # IRR comes from the range returns cached with the metrics snapshot,
+        # sliced from the same valuation as its time series
+        irr_percent = _irr_percent_from_ranges(metrics.range_returns)
         
         # Calculate total profit including dividends
         total_dividends = dividend_summary.get("ytd_received", Decimal('0'))  # This year's dividends
@@ -129,12 +132,19 @@ async def backend_api_analytics_summary(
                 "total_pending": float(dividend_summary.get("total_pending", Decimal('0'))),
                 "confirmed_count": dividend_summary.get("confirmed_count", 0),
                 "pending_count": dividend_summary.get("pending_count", 0)
-            }
+            },
+            "returns_by_range": metrics.range_returns
         }
         
         # Calculate total computation time
         computation_time_ms = int((time.time() - start_time) * 1000)
         
+        # Conditional GET on the summary figures (metadata timings excluded)
+        etag = content_etag(fast_json.dumps(summary), "analytics_summary", x_api_version)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        http_response.headers.update(etag_headers(etag))
+        
         # Return v2 format if requested
         if x_api_version == "v2":
             return ResponseFactory.success(
@@ -613,6 +623,7 @@ async def backend_api_sync_all_dividends(
             }
         
         unique_symbols = list(set(txn['symbol'] for txn in user_transactions))
+        positions = PositionHistory(user_transactions)
         logger.info(f"[backend_api_analytics.py] Syncing dividends for {len(unique_symbols)} symbols: {unique_symbols}")
         
         # Sync and assign dividends for each symbol
@@ -626,7 +637,8 @@ async def backend_api_sync_all_dividends(
                     user_id=user_id,
                     symbol=symbol,
                     user_token=user_token,
-                    from_date=None  # Check all dividends
+                    from_date=None,  # Check all dividends
+                    positions=positions
                 )
                 if sync_result.get("success"):
                     total_synced += sync_result.get("dividends_synced", 0)
@@ -874,31 +886,6 @@ async def backend_api_edit_dividend(
 
 # Helper functions
 
-async def _get_portfolio_summary(user_id: str, user_token: str) -> Dict[str, Any]:
-    """Get basic portfolio summary data - OPTIMIZED to use existing portfolio service"""
-    try:
-        # Use the optimized portfolio calculator instead of duplicating logic
-        portfolio_result = await portfolio_calculator.calculate_portfolio_time_series(user_id, user_token, "1D")
-        
-        if not portfolio_result[0] or len(portfolio_result[0]) == 0:
-            return {"total_value": 0, "total_gain_loss": 0, "total_gain_loss_percent": 0, "total_invested": 0}
-        
-        # Get the latest value from the series - keep as Decimal
-        latest_value_decimal = Decimal(str(portfolio_result[0][-1][1]))  # Last [date, value] pair
-        
-        # Simple approximation of total invested (could be enhanced)
-        # For now, just return current value as we're optimizing for speed
-        return {
-            "total_value": float(latest_value_decimal),
-            "total_gain_loss": 0,  # Skip complex calculation for summary
-            "total_gain_loss_percent": 0,  # Skip complex calculation for summary
-            "total_invested": float(latest_value_decimal)  # Simplified
-        }
-        
-    except Exception as e:
-        logger.error(f"Failed to get portfolio summary: {e}")
-        return {"total_value": 0, "total_gain_loss": 0, "total_gain_loss_percent": 0, "total_invested": 0}
-
 async def _get_detailed_holdings(user_id: str, user_token: str, include_sold: bool) -> List[Dict[str, Any]]:
     """Get detailed holdings data for analytics table - Using PortfolioMetricsManager"""
     logger.info(f"[backend_api_analytics.py::_get_detailed_holdings] Getting detailed holdings for user {user_id}")
@@ -1090,45 +1077,16 @@ async def _get_lightweight_dividend_summary(user_id: str) -> Dict[str, Any]:
             "pending_count": 0
         }
 
-async def _calculate_simple_irr(user_id: str, user_token: str) -> Dict[str, Any]:
-    """Calculate simple IRR approximation"""
-    # This is a simplified IRR calculation
-    # In production, you'd want a more sophisticated IRR calculation
-    
-    try:
-        # Get portfolio performance for the last year
-        portfolio_data = await portfolio_calculator.calculate_portfolio_time_series(user_id, user_token, "1Y")
-        
-        if not portfolio_data[0]:  # No data
-            return {"irr_percent": 0}
-        
-        series_data = portfolio_data[0]
-        if len(series_data) < 2:
-            return {"irr_percent": 0}
-        
-        # Simple annualized return calculation
-        start_value = series_data[0][1]  # First value
-        end_value = series_data[-1][1]   # Last value
-        
-        if start_value <= 0:
-            return {"irr_percent": 0}
-        
-        # Convert to Decimal for precise calculation
-        start_val_decimal = Decimal(str(start_value))
-        end_val_decimal = Decimal(str(end_value))
-        
-        total_return = (end_val_decimal - start_val_decimal) / start_val_decimal
-        days = len(series_data)
-        
-        # Simple annualized return calculation - keep Decimal precision until final step
-        from decimal import Decimal
-        annualized_return = float(((Decimal('1') + total_return) ** (Decimal('365') / Decimal(str(days)))) - Decimal('1'))
-        
-        return {"irr_percent": annualized_return * 100}
-        
-    except Exception as e:
-        logger.error(f"Failed to calculate IRR: {e}")
-        return {"irr_percent": 0}
+def _irr_percent_from_ranges(range_returns: Dict[str, Dict[str, Any]]) -> float:
+    """
+    Money-weighted (Modified Dietz) return over the trailing year, from the
+    metrics snapshot's range returns.
+
+    Over a one-year window this is already a yearly rate. A portfolio younger
+    than a year gets its return since inception, not an extrapolated rate.
+    """
+    rate = ((range_returns or {}).get("1Y") or {}).get("modified_dietz")
+    return float(rate) * 100 if rate is not None else 0.0
 
 
 @analytics_router.post("/dividends/add-manual")
@@ -13,7 +13,7 @@ from typing import Any, Dict, List, Tuple, Optional, cast
 from fastapi import APIRouter, Depends, HTTPException, Query, Header
 
 from debug_logger import DebugLogger, LoggingConfig
-from supa_api.supa_api_auth import require_authenticated_user
+from supa_api.supa_api_auth import require_admin_user, require_authenticated_user
 from supa_api.supa_api_transactions import supa_api_get_transaction_summary
 from services.price_manager import price_manager
 from services.portfolio_calculator import portfolio_calculator
@@ -22,6 +22,9 @@ from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 from utils.response_factory import ResponseFactory
 from models.response_models import APIResponse
 from utils.task_utils import create_safe_background_task 
+from utils.loop_watchdog import loop_watchdog
+from utils.request_profiler import request_profiler
+from utils.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
@@ -95,6 +98,137 @@ async def get_logging_status(current_user: dict = Depends(require_authenticated_
         "info_logging_enabled": LoggingConfig.is_info_enabled()
     }
 
+@dashboard_router.post("/debug/toggle-tracing")
+async def toggle_tracing(
+    sample_rate: Optional[float] = Query(None, ge=0.0, le=1.0, description="Fraction of traces kept in the span buffer"),
+    current_user: dict = Depends(require_admin_user)
+) -> Dict[str, Any]:
+    """
+    Toggle request tracing on/off at runtime
+    Process-wide, so admins only
+    """
+    tracer.configure(enabled=not tracer.enabled, sample_rate=sample_rate)
+    return {
+        "success": True,
+        "tracing_enabled": tracer.enabled,
+        "sample_rate": tracer.sample_rate,
+        "message": f"Tracing {'enabled' if tracer.enabled else 'disabled'}"
+    }
+
+@dashboard_router.get("/debug/traces")
+async def get_traces(
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of recent spans"),
+    name: Optional[str] = Query(None, description="Only spans with this operation name"),
+    current_user: dict = Depends(require_admin_user)
+) -> Dict[str, Any]:
+    """
+    Per-operation latency histograms and the most recent sampled spans
+    Spans carry every user's ids, so admins only
+    """
+    return {
+        "tracing_enabled": tracer.enabled,
+        "sample_rate": tracer.sample_rate,
+        "histograms": tracer.get_histograms(),
+        "spans": tracer.get_recent_spans(limit=limit, name=name)
+    }
+
+@dashboard_router.post("/debug/toggle-profiling")
+async def toggle_profiling(
+    enabled: Optional[bool] = Query(None, description="Turn profiling on or off; omit to only change the rates"),
+    sample_rate: Optional[float] = Query(None, ge=0.0, le=1.0, description="Fraction of requests profiled without an X-Profile header"),
+    code_profile_sample_rate: Optional[float] = Query(None, ge=0.0, le=1.0, description="Fraction of profiled requests that also get a cProfile report"),
+    current_user: dict = Depends(require_admin_user)
+) -> Dict[str, Any]:
+    """
+    Set per-request profiling on/off and its sample rates at runtime
+    Process-wide (cProfile can run on every user's requests), so admins only
+    """
+    request_profiler.configure(
+        enabled=enabled,
+        sample_rate=sample_rate,
+        code_profile_sample_rate=code_profile_sample_rate
+    )
+    return {
+        "success": True,
+        "profiling_enabled": request_profiler.enabled,
+        "sample_rate": request_profiler.sample_rate,
+        "code_profile_sample_rate": request_profiler.code_profile_sample_rate,
+        "message": f"Profiling {'enabled' if request_profiler.enabled else 'disabled'}"
+    }
+
+@dashboard_router.get("/debug/profiles")
+async def get_profiles(
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of recent profiles"),
+    current_user: dict = Depends(require_authenticated_user)
+) -> Dict[str, Any]:
+    """
+    Stage and call breakdown of the current user's recently profiled requests
+    """
+    return {
+        "profiling_enabled": request_profiler.enabled,
+        "profiles": request_profiler.get_recent(limit=limit, user_id=current_user.get("id"))
+    }
+
+@dashboard_router.get("/debug/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    current_user: dict = Depends(require_authenticated_user)
+) -> Dict[str, Any]:
+    """
+    One profiled request in full: timeline of stages and any code profile
+    """
+    profile = request_profiler.get(profile_id, user_id=current_user.get("id"))
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+@dashboard_router.get("/debug/event-loop")
+async def get_event_loop_report(
+    limit: int = Query(20, ge=1, le=200, description="Maximum number of call sites"),
+    current_user: dict = Depends(require_admin_user)
+) -> Dict[str, Any]:
+    """
+    Call sites that blocked the event loop, worst first, and the latest stalls
+    """
+    return loop_watchdog.get_report(limit=limit)
+
+@dashboard_router.get("/debug/locks")
+async def get_lock_stats(
+    current_user: dict = Depends(require_admin_user)
+) -> Dict[str, Any]:
+    """
+    Distributed lock acquisitions, contention and wait-time distribution.
+    Admin only: held lock names carry user ids and holders carry host:pid.
+    """
+    from utils.distributed_lock import lease_locks
+    return lease_locks.get_stats()
+
+@dashboard_router.get("/debug/invalidation")
+async def get_invalidation_stats(
+    current_user: dict = Depends(require_admin_user)
+) -> Dict[str, Any]:
+    """
+    Cross-worker invalidation bus counters, delivery lag and dependency index size
+    """
+    from services.invalidation_bus import invalidation_bus
+    return {
+        "bus": invalidation_bus.get_stats(),
+        "dependency_index": invalidation_bus.index.get_stats()
+    }
+
+@dashboard_router.get("/debug/startup")
+async def get_startup_status(
+    current_user: dict = Depends(require_admin_user)
+) -> Dict[str, Any]:
+    """
+    Background startup jobs (leader, per-step progress) and readiness timings
+    """
+    from services.startup_jobs import readiness, startup_jobs
+    return {
+        "jobs": startup_jobs.get_status(),
+        "readiness": readiness.get_status()
+    }
+
 @dashboard_router.post("/debug/reset-circuit-breaker")
 async def reset_circuit_breaker(
     service: Optional[str] = Query(None, description="Service name (alpha_vantage, dividend_api) or None for all"),
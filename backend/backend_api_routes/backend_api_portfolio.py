@@ -7,15 +7,18 @@ from fastapi.responses import Response
 from typing import Dict, Any, List, Optional, Union
 import logging
 import gzip
-import json
 import sys
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal, InvalidOperation
 
 from debug_logger import DebugLogger
 from supa_api.supa_api_auth import require_authenticated_user
 from utils.auth_helpers import extract_user_credentials
 from utils.response_factory import ResponseFactory
+from utils import fast_json
+from utils.fast_json import columnar_series, compile_row_encoder
+from utils.http_cache import content_etag, etag_headers, etag_matches, make_etag, not_modified
+from utils.tracing import tracer
 from models.response_models import APIResponse, ErrorResponse
 from utils.error_handlers import (
     ServiceUnavailableError, 
@@ -35,7 +38,7 @@ from supa_api.supa_api_portfolio import supa_api_calculate_portfolio
 from services.dividend_service import dividend_service
 from services.price_manager import price_manager
 from services.portfolio_calculator import portfolio_calculator
-from services.portfolio_metrics_manager import portfolio_metrics_manager
+from services.portfolio_metrics_manager import portfolio_metrics_manager, PortfolioHolding, TimeSeriesDataPoint
 from services.user_performance_manager import user_performance_manager
 
 # Import centralized validation models
@@ -46,35 +49,52 @@ logger = logging.getLogger(__name__)
 # Create router
 portfolio_router = APIRouter()
 
+# Precompiled row encoders for the /complete payload
+_COMPLETE_HOLDING_ENCODER = compile_row_encoder(
+    PortfolioHolding,
+    (
+        "symbol", "quantity", "avg_cost", "total_cost", "current_price", "current_value",
+        "gain_loss", "gain_loss_percent", "allocation_percent", "dividends_received",
+        "price_date", "currency",
+    ),
+    decimal_as="float",
+)
+_TIME_SERIES_ENCODER = compile_row_encoder(TimeSeriesDataPoint, ("date", "value"), decimal_as="float")
+
 @portfolio_router.get("/portfolio")
 @DebugLogger.log_api_call(api_name="BACKEND_API", sender="FRONTEND", receiver="BACKEND", operation="GET_PORTFOLIO")
 async def backend_api_get_portfolio(
+    http_response: Response,
     user: Dict[str, Any] = Depends(require_authenticated_user),
     force_refresh: bool = Query(False, description="Force refresh cache"),
-    api_version: Optional[str] = Header(None, alias="X-API-Version")
+    api_version: Optional[str] = Header(None, alias="X-API-Version"),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match")
 ) -> Union[Dict[str, Any], APIResponse[Dict[str, Any]]]:
     """Get user's current portfolio holdings calculated from transactions"""
-    # Comprehensive logging for incoming request
-    logger.info(f"[backend_api_portfolio.py::backend_api_get_portfolio] === GET PORTFOLIO REQUEST START ===")
-    logger.info(f"[backend_api_portfolio.py::backend_api_get_portfolio] User email: {user.get('email', 'unknown')}")
-    logger.info(f"[backend_api_portfolio.py::backend_api_get_portfolio] User ID: {user.get('id', 'unknown')}")
-    logger.info(f"[backend_api_portfolio.py::backend_api_get_portfolio] Force refresh: {force_refresh}")
-    logger.info(f"[backend_api_portfolio.py::backend_api_get_portfolio] Auth headers present: {bool(user.get('access_token'))}")
+    span = tracer.current_span()
     
     try:
         # Use PortfolioMetricsManager for optimized portfolio data
         user_id, user_token = extract_user_credentials(user)
-        logger.info(f"[backend_api_portfolio.py::backend_api_get_portfolio] Extracted user_id: {user_id}")
-        logger.info(f"[backend_api_portfolio.py::backend_api_get_portfolio] Token length: {len(user_token) if user_token else 0}")
+        span.set_attributes(user_id=user_id, force_refresh=force_refresh)
         metrics = await portfolio_metrics_manager.get_portfolio_metrics(
             user_id=user_id,
             user_token=user_token,
             metric_type="portfolio",
             force_refresh=force_refresh
         )
-        logger.info(f"[backend_api_portfolio.py::backend_api_get_portfolio] Metrics retrieved, cache status: {metrics.cache_status}")
-        logger.info(f"[backend_api_portfolio.py::backend_api_get_portfolio] Holdings count: {len(metrics.holdings)}")
-        logger.info(f"[backend_api_portfolio.py::backend_api_get_portfolio] Computation time: {metrics.computation_time_ms}ms")
+        span.set_attributes(
+            cache_status=metrics.cache_status,
+            holdings=len(metrics.holdings),
+            computation_time_ms=metrics.computation_time_ms
+        )
+        
+        # Conditional GET: skip building the payload when the client is current
+        etag = make_etag(portfolio_metrics_manager.get_content_hash(metrics), "portfolio", api_version)
+        if etag_matches(if_none_match, etag):
+            span.set_attribute("not_modified", True)
+            return not_modified(etag)
+        http_response.headers.update(etag_headers(etag))
         
         # Convert holdings to expected format with Decimal safety
         holdings_list = []
@@ -170,7 +190,6 @@ async def backend_api_get_portfolio(
                     "computation_time_ms": metrics.computation_time_ms
                 }
             )
-            logger.info(f"[backend_api_portfolio.py::backend_api_get_portfolio] Returning v2 format response")
             return response
         else:
             # Backward compatible format
@@ -180,12 +199,8 @@ async def backend_api_get_portfolio(
                 "cache_status": metrics.cache_status,
                 "computation_time_ms": metrics.computation_time_ms
             }
-            logger.info(f"[backend_api_portfolio.py::backend_api_get_portfolio] Returning v1 format response")
             return response_data
         
-        logger.info(f"[backend_api_portfolio.py::backend_api_get_portfolio] Response data structure: {list(portfolio_data.keys())}")
-        logger.info(f"[backend_api_portfolio.py::backend_api_get_portfolio] === GET PORTFOLIO REQUEST END (SUCCESS) ===")
-        
     except HTTPException:
         raise  # Re-raise HTTP exceptions as-is
     except Exception as e:
@@ -197,7 +212,6 @@ async def backend_api_get_portfolio(
             error=e,
             user_id=user_id if 'user_id' in locals() else 'unknown'
         )
-        logger.info(f"[backend_api_portfolio.py::backend_api_get_portfolio] === GET PORTFOLIO REQUEST END (ERROR) ===")
         
         if "supabase" in str(e).lower() or "postgrest" in str(e).lower():
             raise handle_database_error(e, "portfolio retrieval", user_id if 'user_id' in locals() else None)
@@ -660,21 +674,21 @@ async def backend_api_delete_transaction(
 @portfolio_router.get("/allocation")
 @DebugLogger.log_api_call(api_name="BACKEND_API", sender="FRONTEND", receiver="BACKEND", operation="GET_ALLOCATION")
 async def backend_api_get_allocation(
+    http_response: Response,
     user: Dict[str, Any] = Depends(require_authenticated_user),
     force_refresh: bool = Query(False, description="Force refresh cache"),
-    api_version: Optional[str] = Header(None, alias="X-API-Version")
+    api_version: Optional[str] = Header(None, alias="X-API-Version"),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match")
 ) -> Union[Dict[str, Any], APIResponse[Dict[str, Any]]]:
     """
     Unified allocation API endpoint for both dashboard and analytics pages
     Returns comprehensive portfolio allocation data with all calculations
     """
-    logger.info(f"[backend_api_portfolio.py::backend_api_get_allocation] === GET ALLOCATION REQUEST START ===")
-    logger.info(f"[backend_api_portfolio.py::backend_api_get_allocation] User email: {user.get('email', 'unknown')}")
-    logger.info(f"[backend_api_portfolio.py::backend_api_get_allocation] Force refresh: {force_refresh}")
+    span = tracer.current_span()
     
     try:
         user_id, user_token = extract_user_credentials(user)
-        logger.info(f"[backend_api_portfolio.py::backend_api_get_allocation] Extracted user_id: {user_id}")
+        span.set_attributes(user_id=user_id, force_refresh=force_refresh)
         
         # Use PortfolioMetricsManager for optimized allocation data
         metrics = await portfolio_metrics_manager.get_portfolio_metrics(
@@ -683,8 +697,14 @@ async def backend_api_get_allocation(
             metric_type="allocation",
             force_refresh=force_refresh
         )
-        logger.info(f"[backend_api_portfolio.py::backend_api_get_allocation] Metrics retrieved, cache status: {metrics.cache_status}")
-        logger.info(f"[backend_api_portfolio.py::backend_api_get_allocation] Holdings count: {len(metrics.holdings)}")
+        span.set_attributes(cache_status=metrics.cache_status, holdings=len(metrics.holdings))
+        
+        # Conditional GET: skip building the payload when the client is current
+        etag = make_etag(portfolio_metrics_manager.get_content_hash(metrics), "allocation", api_version)
+        if etag_matches(if_none_match, etag):
+            span.set_attribute("not_modified", True)
+            return not_modified(etag)
+        http_response.headers.update(etag_headers(etag))
         
         # Convert allocations to expected format
         allocations = []
@@ -866,8 +886,7 @@ async def backend_api_get_allocation(
             }
         }
         
-        logger.info(f"[backend_api_portfolio.py::backend_api_get_allocation] Allocations count: {len(allocations)}")
-        logger.info(f"[backend_api_portfolio.py::backend_api_get_allocation] Total portfolio value: ${allocation_data['summary']['total_value']:.2f}")
+        span.set_attribute("allocations", len(allocations))
         
         # Check API version for response format
         if api_version == "v2":
@@ -879,7 +898,6 @@ async def backend_api_get_allocation(
                     "computation_time_ms": metrics.computation_time_ms
                 }
             )
-            logger.info(f"[backend_api_portfolio.py::backend_api_get_allocation] Returning v2 format response")
             return response
         else:
             # Backward compatible format
@@ -887,11 +905,8 @@ async def backend_api_get_allocation(
                 "success": True,
                 "data": allocation_data
             }
-            logger.info(f"[backend_api_portfolio.py::backend_api_get_allocation] Returning v1 format response")
             return response_data
         
-        logger.info(f"[backend_api_portfolio.py::backend_api_get_allocation] === GET ALLOCATION REQUEST END (SUCCESS) ===")
-        
     except HTTPException:
         raise  # Re-raise HTTP exceptions as-is
     except Exception as e:
@@ -905,7 +920,6 @@ async def backend_api_get_allocation(
         )
         # According to architecture, we should not have fallbacks that bypass PortfolioMetricsManager
         logger.error(f"[backend_api_portfolio] Failed to get allocation data: {str(e)}")
-        logger.info(f"[backend_api_portfolio.py::backend_api_get_allocation] === GET ALLOCATION REQUEST END (ERROR) ===")
         
         if "supabase" in str(e).lower() or "postgrest" in str(e).lower():
             raise handle_database_error(e, "allocation data retrieval", user_id if 'user_id' in locals() else None)
@@ -915,13 +929,172 @@ async def backend_api_get_allocation(
                 f"Failed to retrieve portfolio allocation data: {str(e)}"
             )
 
+def _build_complete_response_data(
+    complete_data: Any,
+    include_historical: bool,
+    time_series_format: str,
+    since: Optional[date] = None
+) -> Dict[str, Any]:
+    """
+    Transform CompletePortfolioData into the /complete response payload.
+    
+    The result depends only on the snapshot and the request options, so its
+    encoding can be reused for as long as the snapshot is unchanged.
+    """
+    # Convert portfolio metrics to API format with Decimal safety
+    portfolio_metrics = complete_data.portfolio_metrics
+    
+    # Validate that portfolio metrics exist
+    if not portfolio_metrics:
+        raise ValueError("Portfolio metrics data is missing from complete data")
+    
+    # Validate that portfolio metrics have the required structure
+    if not hasattr(portfolio_metrics, 'holdings') or not hasattr(portfolio_metrics, 'performance'):
+        raise ValueError("Portfolio metrics data structure is incomplete")
+    
+    # Holdings data with complete financial information (Decimal -> float per schema)
+    holdings_list = _COMPLETE_HOLDING_ENCODER.encode_many(portfolio_metrics.holdings)
+    
+    # Portfolio summary
+    performance = portfolio_metrics.performance
+    total_value_decimal = performance.total_value
+    total_cost_decimal = performance.total_cost
+    total_gain_loss_decimal = performance.total_gain_loss
+    
+    # Calculate top gainers and losers (3 each, mutually exclusive)
+    top_gainers = []
+    top_losers = []
+    
+    if holdings_list:
+        # Filter holdings by gain/loss and sort
+        holdings_with_gains = [h for h in holdings_list if h["gain_loss_percent"] > 0]
+        holdings_with_losses = [h for h in holdings_list if h["gain_loss_percent"] < 0]
+        
+        # Sort gainers by percentage (descending) and take top 3
+        holdings_with_gains.sort(key=lambda x: x["gain_loss_percent"], reverse=True)
+        top_gainers = [
+            {
+                "name": f"Stock {holding['symbol']}",
+                "ticker": holding["symbol"],
+                "value": holding["current_value"],
+                "changePercent": holding["gain_loss_percent"],
+                "changeValue": holding["gain_loss"]
+            }
+            for holding in holdings_with_gains[:3]
+        ]
+        
+        # Sort losers by percentage (ascending - most negative first) and take top 3
+        holdings_with_losses.sort(key=lambda x: x["gain_loss_percent"])
+        top_losers = [
+            {
+                "name": f"Stock {holding['symbol']}",
+                "ticker": holding["symbol"],
+                "value": holding["current_value"],
+                "changePercent": holding["gain_loss_percent"],
+                "changeValue": holding["gain_loss"]
+            }
+            for holding in holdings_with_losses[:3]
+        ]
+    
+    logger.info(f"[backend_api_portfolio.py::_build_complete_response_data] Calculated {len(top_gainers)} gainers and {len(top_losers)} losers")
+    
+    # Construct complete API response data
+    complete_response_data = {
+        # Core portfolio data
+        "portfolio_data": {
+            "holdings": holdings_list,
+            "total_value": float(total_value_decimal),
+            "total_cost": float(total_cost_decimal),
+            "total_gain_loss": float(total_gain_loss_decimal),
+            "total_gain_loss_percent": portfolio_metrics.performance.total_gain_loss_percent,
+            "base_currency": getattr(portfolio_metrics.performance, 'base_currency', 'USD')
+        },
+        
+        # Performance metrics
+        "performance_data": {
+            "daily_change": float(getattr(portfolio_metrics.performance, 'daily_change', Decimal('0'))),
+            "daily_change_percent": getattr(portfolio_metrics.performance, 'daily_change_percent', 0.0),
+            "ytd_return": float(getattr(portfolio_metrics.performance, 'ytd_return', Decimal('0'))),
+            "ytd_return_percent": getattr(portfolio_metrics.performance, 'ytd_return_percent', 0.0),
+            "total_return_percent": portfolio_metrics.performance.total_gain_loss_percent,
+            "volatility": float(getattr(portfolio_metrics.performance, 'volatility', Decimal('0')) or Decimal('0')),
+            "sharpe_ratio": float(getattr(portfolio_metrics.performance, 'sharpe_ratio', Decimal('0')) or Decimal('0')),
+            "max_drawdown": float(getattr(portfolio_metrics.performance, 'max_drawdown', Decimal('0')) or Decimal('0'))
+        },
+        
+        # Allocation breakdown (reuse existing allocation logic)
+        "allocation_data": {
+            "by_symbol": [
+                {
+                    "symbol": holding["symbol"],
+                    "allocation_percent": holding["allocation_percent"],
+                    "current_value": holding["current_value"]
+                }
+                for holding in holdings_list
+            ],
+            "diversification_score": complete_data.market_analysis.get("portfolio_diversification", {}).get("diversification_score", 0.0),
+            "concentration_risk": complete_data.market_analysis.get("portfolio_diversification", {}).get("concentration_risk", "unknown"),
+            "number_of_positions": len(holdings_list)
+        },
+        
+        # Dividend summary
+        "dividend_data": {
+            "recent_dividends": complete_data.detailed_dividends[:10],  # Last 10 dividends
+            "total_received_ytd": sum(
+                float(div.get("amount", 0)) for div in complete_data.detailed_dividends
+                if div.get("ex_date") and div["ex_date"].startswith(str(datetime.utcnow().year))
+            ),
+            "total_received_all_time": sum(
+                float(div.get("amount", 0)) for div in complete_data.detailed_dividends
+            ),
+            "dividend_count": len(complete_data.detailed_dividends)
+        },
+        
+        # Transaction summary
+        "transactions_summary": {
+            "total_transactions": getattr(complete_data.portfolio_metrics, 'transaction_count', 0),
+            "last_transaction_date": getattr(complete_data.portfolio_metrics, 'last_transaction_date', None),
+            "realized_gains": float(getattr(complete_data.portfolio_metrics.performance, 'realized_gains', Decimal('0')))
+        },
+        
+        # Market analysis
+        "market_analysis": complete_data.market_analysis,
+        
+        # Currency conversions
+        "currency_conversions": {
+            currency_pair: float(rate) for currency_pair, rate in complete_data.currency_conversions.items()
+        },
+        
+        # Top gainers and losers (3 each, mutually exclusive)
+        "top_gainers": top_gainers,
+        "top_losers": top_losers
+    }
+    
+    if include_historical:
+        time_series = portfolio_metrics.time_series or []
+        # Cursor for the next delta request is the last date the client will have
+        cursor = time_series[-1].date if time_series else since
+        complete_response_data["time_series_cursor"] = cursor.isoformat() if cursor else None
+        if since is not None:
+            # Delta request: only points appended after the client's cursor
+            time_series = [point for point in time_series if point.date > since]
+        if time_series_format == "columnar":
+            complete_response_data["time_series"] = columnar_series(time_series)
+        else:
+            complete_response_data["time_series"] = _TIME_SERIES_ENCODER.encode_many(time_series)
+    
+    return complete_response_data
+
 @portfolio_router.get("/complete", response_model=None)
 @DebugLogger.log_api_call(api_name="BACKEND_API", sender="FRONTEND", receiver="BACKEND", operation="GET_COMPLETE_PORTFOLIO")
 async def backend_api_get_complete_portfolio(
     user: Dict[str, Any] = Depends(require_authenticated_user),
     force_refresh: bool = Query(False, description="Force refresh all cached data"),
     include_historical: bool = Query(True, description="Include historical time series data"),
-    api_version: Optional[str] = Header(None, alias="X-API-Version")
+    time_series_format: str = Query("rows", pattern="^(rows|columnar)$", description="Time series layout: 'rows' of points or 'columnar' parallel date/value arrays"),
+    since: Optional[date] = Query(None, description="Only return time series points after this date (cursor from a previous response)"),
+    api_version: Optional[str] = Header(None, alias="X-API-Version"),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match")
 ) -> Union[Dict[str, Any], APIResponse[Dict[str, Any]], Response]:
     """
     CROWN JEWEL ENDPOINT: Get complete consolidated portfolio data in a single response.
@@ -942,7 +1115,10 @@ async def backend_api_get_complete_portfolio(
         user: Authenticated user from dependency injection
         force_refresh: Skip all caches and generate fresh data
         include_historical: Include time series data for charts (default: True)
+        time_series_format: "rows" (list of points) or "columnar" (dates/values arrays)
+        since: Time series cursor; only points dated after it are returned
         api_version: API version for response format compatibility
+        if_none_match: ETag from a previous response; answered with 304 if unchanged
     
     Returns:
         Comprehensive portfolio data structure with performance metadata
@@ -953,21 +1129,19 @@ async def backend_api_get_complete_portfolio(
     # Request timing and metadata tracking
     request_start_time = datetime.utcnow()
     
-    logger.info(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] === COMPLETE PORTFOLIO REQUEST START ===")
-    logger.info(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] User email: {user.get('email', 'unknown')}")
-    logger.info(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] User ID: {user.get('id', 'unknown')}")
-    logger.info(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] Force refresh: {force_refresh}")
-    logger.info(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] Include historical: {include_historical}")
-    logger.info(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] API version: {api_version}")
+    span = tracer.current_span()
     
     try:
         # Step 1: Extract and validate user credentials
         user_id, user_token = extract_user_credentials(user)
-        logger.info(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] Extracted user_id: {user_id}")
-        logger.info(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] Token present: {bool(user_token)}")
+        span.set_attributes(
+            user_id=user_id,
+            force_refresh=force_refresh,
+            include_historical=include_historical,
+            api_version=api_version or "v1"
+        )
         
         # Step 2: Generate complete portfolio data using UserPerformanceManager
-        logger.info(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] Generating complete portfolio data...")
         generation_start = datetime.utcnow()
         
         try:
@@ -976,7 +1150,6 @@ async def backend_api_get_complete_portfolio(
                 user_token=user_token,
                 force_refresh=force_refresh
             )
-            logger.info(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] Complete data generated successfully")
         except Exception as gen_error:
             logger.error(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] Error generating complete data: {gen_error}")
             logger.error(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] Stack trace:", exc_info=True)
@@ -986,231 +1159,65 @@ async def backend_api_get_complete_portfolio(
             )
         
         generation_time_ms = int((datetime.utcnow() - generation_start).total_seconds() * 1000)
-        logger.info(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] Data generation completed in {generation_time_ms}ms")
         
         # Step 3: Transform data for API response with comprehensive error handling
-        logger.info(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] Transforming data for API response...")
         transform_start = datetime.utcnow()
         
-        try:
-            # Convert portfolio metrics to API format with Decimal safety
-            portfolio_metrics = complete_data.portfolio_metrics
-            
-            # Validate that portfolio metrics exist
-            if not portfolio_metrics:
-                raise ValueError("Portfolio metrics data is missing from complete data")
-            
-            # Validate that portfolio metrics have the required structure
-            if not hasattr(portfolio_metrics, 'holdings') or not hasattr(portfolio_metrics, 'performance'):
-                raise ValueError("Portfolio metrics data structure is incomplete")
-            
-            # Holdings data with complete financial information
-            holdings_list = []
-            for holding in portfolio_metrics.holdings:
-                try:
-                    # Ensure all financial data is Decimal and properly converted
-                    quantity_decimal = holding.quantity if isinstance(holding.quantity, Decimal) else Decimal(str(holding.quantity))
-                    avg_cost_decimal = holding.avg_cost if isinstance(holding.avg_cost, Decimal) else Decimal(str(holding.avg_cost))
-                    total_cost_decimal = holding.total_cost if isinstance(holding.total_cost, Decimal) else Decimal(str(holding.total_cost))
-                    current_price_decimal = holding.current_price if isinstance(holding.current_price, Decimal) else Decimal(str(holding.current_price))
-                    current_value_decimal = holding.current_value if isinstance(holding.current_value, Decimal) else Decimal(str(holding.current_value))
-                    gain_loss_decimal = holding.gain_loss if isinstance(holding.gain_loss, Decimal) else Decimal(str(holding.gain_loss))
-                    
-                    # Handle optional dividend data
-                    dividends_received_decimal = Decimal('0')
-                    if hasattr(holding, 'dividends_received') and holding.dividends_received is not None:
-                        try:
-                            dividends_received_decimal = holding.dividends_received if isinstance(holding.dividends_received, Decimal) else Decimal(str(holding.dividends_received))
-                        except (InvalidOperation, TypeError, ValueError) as e:
-                            logger.warning(f"Invalid dividends_received for {holding.symbol}: {e}")
-                            dividends_received_decimal = Decimal('0')
-                    
-                    # Convert to float for JSON serialization
-                    holdings_list.append({
-                        "symbol": holding.symbol,
-                        "quantity": float(quantity_decimal),
-                        "avg_cost": float(avg_cost_decimal),
-                        "total_cost": float(total_cost_decimal),
-                        "current_price": float(current_price_decimal),
-                        "current_value": float(current_value_decimal),
-                        "gain_loss": float(gain_loss_decimal),
-                        "gain_loss_percent": holding.gain_loss_percent,
-                        "allocation_percent": holding.allocation_percent,
-                        "dividends_received": float(dividends_received_decimal),
-                        "price_date": holding.price_date,
-                        "currency": getattr(holding, 'currency', 'USD')
-                    })
-                    
-                except (InvalidOperation, TypeError, ValueError) as e:
-                    logger.error(f"Error processing holding {holding.symbol}: {e}")
-                    # Add holding with safe fallback values
-                    holdings_list.append({
-                        "symbol": holding.symbol,
-                        "quantity": 0.0,
-                        "avg_cost": 0.0,
-                        "total_cost": 0.0,
-                        "current_price": 0.0,
-                        "current_value": 0.0,
-                        "gain_loss": 0.0,
-                        "gain_loss_percent": 0.0,
-                        "allocation_percent": 0.0,
-                        "dividends_received": 0.0,
-                        "price_date": holding.price_date,
-                        "currency": "USD"
-                    })
-            
-            # Portfolio summary with Decimal safety
+        payload_variant = (include_historical, time_series_format, since, datetime.utcnow().year)
+        
+        # Conditional GET: an unchanged snapshot means an unchanged payload
+        etag = make_etag(complete_data.snapshot_hash, payload_variant, api_version) if complete_data.snapshot_hash else None
+        if etag and etag_matches(if_none_match, etag):
+            span.set_attribute("not_modified", True)
+            return not_modified(etag)
+        
+        payload_bytes = user_performance_manager.get_encoded_payload(complete_data, payload_variant)
+        
+        if payload_bytes is not None:
+            span.set_attribute("encoded_payload_reused", True)
+        else:
             try:
-                total_value_decimal = portfolio_metrics.performance.total_value if isinstance(portfolio_metrics.performance.total_value, Decimal) else Decimal(str(portfolio_metrics.performance.total_value))
-                total_cost_decimal = portfolio_metrics.performance.total_cost if isinstance(portfolio_metrics.performance.total_cost, Decimal) else Decimal(str(portfolio_metrics.performance.total_cost))
-                total_gain_loss_decimal = portfolio_metrics.performance.total_gain_loss if isinstance(portfolio_metrics.performance.total_gain_loss, Decimal) else Decimal(str(portfolio_metrics.performance.total_gain_loss))
-            except (InvalidOperation, TypeError, ValueError) as e:
-                logger.error(f"Error converting portfolio summary: {e}")
-                total_value_decimal = Decimal('0')
-                total_cost_decimal = Decimal('0')
-                total_gain_loss_decimal = Decimal('0')
-            
-            # Calculate top gainers and losers (3 each, mutually exclusive)
-            top_gainers = []
-            top_losers = []
-            
-            if holdings_list:
-                # Filter holdings by gain/loss and sort
-                holdings_with_gains = [h for h in holdings_list if h["gain_loss_percent"] > 0]
-                holdings_with_losses = [h for h in holdings_list if h["gain_loss_percent"] < 0]
-                
-                # Sort gainers by percentage (descending) and take top 3
-                holdings_with_gains.sort(key=lambda x: x["gain_loss_percent"], reverse=True)
-                top_gainers = [
-                    {
-                        "name": f"Stock {holding['symbol']}",
-                        "ticker": holding["symbol"],
-                        "value": holding["current_value"],
-                        "changePercent": holding["gain_loss_percent"],
-                        "changeValue": holding["gain_loss"]
-                    }
-                    for holding in holdings_with_gains[:3]
-                ]
-                
-                # Sort losers by percentage (ascending - most negative first) and take top 3
-                holdings_with_losses.sort(key=lambda x: x["gain_loss_percent"])
-                top_losers = [
-                    {
-                        "name": f"Stock {holding['symbol']}",
-                        "ticker": holding["symbol"],
-                        "value": holding["current_value"],
-                        "changePercent": holding["gain_loss_percent"],
-                        "changeValue": holding["gain_loss"]
-                    }
-                    for holding in holdings_with_losses[:3]
-                ]
-            
-            logger.info(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] Calculated {len(top_gainers)} gainers and {len(top_losers)} losers")
-            
-            # Construct complete API response data
-            complete_response_data = {
-                # Core portfolio data
-                "portfolio_data": {
-                    "holdings": holdings_list,
-                    "total_value": float(total_value_decimal),
-                    "total_cost": float(total_cost_decimal),
-                    "total_gain_loss": float(total_gain_loss_decimal),
-                    "total_gain_loss_percent": portfolio_metrics.performance.total_gain_loss_percent,
-                    "base_currency": getattr(portfolio_metrics.performance, 'base_currency', 'USD')
-                },
-                
-                # Performance metrics
-                "performance_data": {
-                    "daily_change": float(getattr(portfolio_metrics.performance, 'daily_change', Decimal('0'))),
-                    "daily_change_percent": getattr(portfolio_metrics.performance, 'daily_change_percent', 0.0),
-                    "ytd_return": float(getattr(portfolio_metrics.performance, 'ytd_return', Decimal('0'))),
-                    "ytd_return_percent": getattr(portfolio_metrics.performance, 'ytd_return_percent', 0.0),
-                    "total_return_percent": portfolio_metrics.performance.total_gain_loss_percent,
-                    "volatility": float(getattr(portfolio_metrics.performance, 'volatility', Decimal('0')) or Decimal('0')),
-                    "sharpe_ratio": float(getattr(portfolio_metrics.performance, 'sharpe_ratio', Decimal('0')) or Decimal('0')),
-                    "max_drawdown": float(getattr(portfolio_metrics.performance, 'max_drawdown', Decimal('0')) or Decimal('0'))
-                },
-                
-                # Allocation breakdown (reuse existing allocation logic)
-                "allocation_data": {
-                    "by_symbol": [
-                        {
-                            "symbol": holding["symbol"],
-                            "allocation_percent": holding["allocation_percent"],
-                            "current_value": holding["current_value"]
-                        }
-                        for holding in holdings_list
-                    ],
-                    "diversification_score": complete_data.market_analysis.get("portfolio_diversification", {}).get("diversification_score", 0.0),
-                    "concentration_risk": complete_data.market_analysis.get("portfolio_diversification", {}).get("concentration_risk", "unknown"),
-                    "number_of_positions": len(holdings_list)
-                },
-                
-                # Dividend summary
-                "dividend_data": {
-                    "recent_dividends": complete_data.detailed_dividends[:10],  # Last 10 dividends
-                    "total_received_ytd": sum(
-                        float(div.get("amount", 0)) for div in complete_data.detailed_dividends
-                        if div.get("ex_date") and div["ex_date"].startswith(str(datetime.utcnow().year))
-                    ),
-                    "total_received_all_time": sum(
-                        float(div.get("amount", 0)) for div in complete_data.detailed_dividends
-                    ),
-                    "dividend_count": len(complete_data.detailed_dividends)
-                },
-                
-                # Transaction summary
-                "transactions_summary": {
-                    "total_transactions": getattr(complete_data.portfolio_metrics, 'transaction_count', 0),
-                    "last_transaction_date": getattr(complete_data.portfolio_metrics, 'last_transaction_date', None),
-                    "realized_gains": float(getattr(complete_data.portfolio_metrics.performance, 'realized_gains', Decimal('0')))
-                },
-                
-                # Market analysis
-                "market_analysis": complete_data.market_analysis,
+                complete_response_data = _build_complete_response_data(complete_data, include_historical, time_series_format, since)
                 
-                # Currency conversions
-                "currency_conversions": {
-                    currency_pair: float(rate) for currency_pair, rate in complete_data.currency_conversions.items()
-                },
+                # Validate response structure before returning
+                required_fields = ['portfolio_data', 'performance_data', 'allocation_data', 'dividend_data', 'market_analysis', 'currency_conversions', 'transactions_summary']
+                missing_fields = [field for field in required_fields if field not in complete_response_data]
+                if missing_fields:
+                    logger.error(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] Missing required fields in response: {missing_fields}")
+                    raise ServiceUnavailableError(
+                        "Response Structure Error",
+                        f"Incomplete response data structure: missing {missing_fields}"
+                    )
                 
-                # Top gainers and losers (3 each, mutually exclusive)
-                "top_gainers": top_gainers,
-                "top_losers": top_losers
-            }
-            
-            transform_time_ms = int((datetime.utcnow() - transform_start).total_seconds() * 1000)
-            logger.info(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] Data transformation completed in {transform_time_ms}ms")
-            
-            # Validate response structure before returning
-            required_fields = ['portfolio_data', 'performance_data', 'allocation_data', 'dividend_data', 'market_analysis', 'currency_conversions', 'transactions_summary']
-            missing_fields = [field for field in required_fields if field not in complete_response_data]
-            if missing_fields:
-                logger.error(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] Missing required fields in response: {missing_fields}")
+            except Exception as e:
+                logger.error(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] Error transforming data: {e}")
                 raise ServiceUnavailableError(
-                    "Response Structure Error",
-                    f"Incomplete response data structure: missing {missing_fields}"
+                    "Data Transformation",
+                    f"Failed to transform complete portfolio data: {str(e)}"
                 )
             
-            logger.info(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] Response structure validation passed")
-            
-        except Exception as e:
-            logger.error(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] Error transforming data: {e}")
-            raise ServiceUnavailableError(
-                "Data Transformation",
-                f"Failed to transform complete portfolio data: {str(e)}"
-            )
+            # Encode the payload once; its size is reported in the metadata and the
+            # same bytes are spliced into the final response envelope below
+            payload_bytes = fast_json.dumps(complete_response_data, decimal_as="float")
+            user_performance_manager.put_encoded_payload(complete_data, payload_variant, payload_bytes)
+        
+        if etag is None:
+            # Snapshot was not stored (cache write failed); fall back to hashing the payload
+            etag = content_etag(payload_bytes, payload_variant, api_version)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+        
+        transform_time_ms = int((datetime.utcnow() - transform_start).total_seconds() * 1000)
         
         # Step 4: Calculate total processing time and payload size
         total_processing_time_ms = int((datetime.utcnow() - request_start_time).total_seconds() * 1000)
-        
-        # Calculate payload size for monitoring
-        response_json = json.dumps(complete_response_data, default=str)
-        payload_size_bytes = len(response_json.encode('utf-8'))
+        payload_size_bytes = len(payload_bytes)
         payload_size_kb = round(payload_size_bytes / 1024, 2)
-        
-        logger.info(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] Total processing time: {total_processing_time_ms}ms")
-        logger.info(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] Payload size: {payload_size_kb}KB ({payload_size_bytes} bytes)")
+        span.set_attributes(
+            generation_time_ms=generation_time_ms,
+            transform_time_ms=transform_time_ms,
+            payload_size_bytes=payload_size_bytes
+        )
         
         # Step 5: Add comprehensive metadata
         metadata = {
@@ -1231,36 +1238,43 @@ async def backend_api_get_complete_portfolio(
             }
         }
         
-        # Step 6: Handle response compression for large payloads
-        use_compression = payload_size_bytes > 50000  # Compress if >50KB
+        # Step 6: Wrap the encoded payload in the requested response format
+        if api_version == "v2":
+            envelope = ResponseFactory.success(
+                data=None,
+                message="Complete portfolio data retrieved successfully",
+                metadata=metadata
+            )
+            body = b"".join((
+                b'{"success":true,"data":',
+                payload_bytes,
+                b',"error":null,"message":',
+                fast_json.dumps(envelope.message),
+                b',"metadata":',
+                fast_json.dumps(envelope.metadata, decimal_as="float"),
+                b"}"
+            ))
+        else:
+            # Backward compatible format - payload keys at top level plus metadata
+            body = b"".join((
+                b'{"success":true,',
+                payload_bytes[1:-1],
+                b',"metadata":',
+                fast_json.dumps(metadata, decimal_as="float"),
+                b"}"
+            ))
+        
+        response_headers = {
+            "X-Processing-Time-Ms": str(total_processing_time_ms),
+            "X-Cache-Hit": str(metadata["cache_hit"]).lower(),
+            **etag_headers(etag)
+        }
         
-        if use_compression:
-            logger.info(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] Compressing response (size: {payload_size_kb}KB)")
-            
-            # Check API version for response format
-            if api_version == "v2":
-                response_data = ResponseFactory.success(
-                    data=complete_response_data,
-                    message="Complete portfolio data retrieved successfully",
-                    metadata=metadata
-                )
-            else:
-                # Backward compatible format - properly merge metadata
-                response_data = {
-                    "success": True,
-                    **complete_response_data,
-                    "metadata": {
-                        **complete_response_data.get("metadata", {}),
-                        **metadata
-                    }
-                }
-            
-            # Compress response
-            compressed_json = gzip.compress(json.dumps(response_data, default=str).encode('utf-8'))
-            compressed_size_kb = round(len(compressed_json) / 1024, 2)
+        # Step 7: Compress large payloads
+        if payload_size_bytes > 50000:  # Compress if >50KB
+            compressed_json = gzip.compress(body)
             compression_ratio = round((1 - len(compressed_json) / payload_size_bytes) * 100, 1)
-            
-            logger.info(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] Compressed to {compressed_size_kb}KB ({compression_ratio}% reduction)")
+            span.set_attribute("compressed_size_bytes", len(compressed_json))
             
             return Response(
                 content=compressed_json,
@@ -1270,38 +1284,11 @@ async def backend_api_get_complete_portfolio(
                     "X-Original-Size": str(payload_size_bytes),
                     "X-Compressed-Size": str(len(compressed_json)),
                     "X-Compression-Ratio": f"{compression_ratio}%",
-                    "X-Processing-Time-Ms": str(total_processing_time_ms),
-                    "X-Cache-Hit": str(metadata["cache_hit"]).lower()
+                    **response_headers
                 }
             )
-        else:
-            # Step 7: Return uncompressed response
-            logger.info(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] Returning uncompressed response")
-            
-            # Check API version for response format
-            if api_version == "v2":
-                response = ResponseFactory.success(
-                    data=complete_response_data,
-                    message="Complete portfolio data retrieved successfully",
-                    metadata=metadata
-                )
-                logger.info(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] Returning v2 format response")
-                return response
-            else:
-                # Backward compatible format - properly merge metadata
-                response_data = {
-                    "success": True,
-                    **complete_response_data,
-                    "metadata": {
-                        **complete_response_data.get("metadata", {}),
-                        **metadata
-                    }
-                }
-                logger.info(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] Returning v1 format response")
-                return response_data
         
-        logger.info(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] Holdings: {len(holdings_list)}, Dividends: {len(complete_data.detailed_dividends)}")
-        logger.info(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] === COMPLETE PORTFOLIO REQUEST END (SUCCESS) ===")
+        return Response(content=body, media_type="application/json", headers=response_headers)
         
     except HTTPException:
         raise  # Re-raise HTTP exceptions as-is
@@ -1325,7 +1312,6 @@ async def backend_api_get_complete_portfolio(
             }
         )
         
-        logger.info(f"[backend_api_portfolio.py::backend_api_get_complete_portfolio] === COMPLETE PORTFOLIO REQUEST END (ERROR) ===")
         
         # Determine error type and provide appropriate response
         if "supabase" in str(e).lower() or "postgrest" in str(e).lower():
@@ -1383,7 +1369,8 @@ async def backend_api_get_historical_performance(
             "portfolio_performance": performance_data["portfolio_performance"],
             "benchmark_performance": performance_data["benchmark_performance"],
             "metadata": performance_data["metadata"],
-            "performance_metrics": performance_data["performance_metrics"]
+            "performance_metrics": performance_data["performance_metrics"],
+            "returns_by_range": performance_data.get("returns_by_range", {})
         }
         
     except Exception as e:
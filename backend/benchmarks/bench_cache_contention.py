@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Cache Contention Benchmark
+
+Runs 1k concurrent tasks against ThreadSafeCacheManager with a read-heavy
+get/set mix over a shared keyspace, then measures invalidation of one user's
+entries through the tag index against a full key scan.
+
+Usage:
+    python benchmarks/bench_cache_contention.py [--tasks N] [--ops N] [--keys N] [--shards N]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from services.cache_manager import ThreadSafeCacheManager
+
+logging.disable(logging.CRITICAL)
+
+PAYLOAD = {"holdings": [{"symbol": f"SYM{i}", "quantity": "10", "value": "1234.56"} for i in range(20)]}
+
+
+async def run_contention(tasks: int, ops: int, keys: int, shards: int, read_ratio: float) -> dict:
+    cache = ThreadSafeCacheManager(max_entries=keys // 2, num_shards=shards)
+    key_names = [f"user_{i % 200}:portfolio:{i}" for i in range(keys)]
+    for key in key_names[: keys // 2]:
+        await cache.set(key, PAYLOAD)
+
+    async def worker(seed: int) -> None:
+        rng = random.Random(seed)
+        for _ in range(ops):
+            key = key_names[rng.randrange(keys)]
+            if rng.random() < read_ratio:
+                await cache.get(key)
+            else:
+                await cache.set(key, PAYLOAD)
+            if rng.random() < 0.05:
+                await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(tasks)))
+    elapsed = time.perf_counter() - started
+    total_ops = tasks * ops
+
+    metrics = cache.get_metrics()
+    return {
+        "tasks": tasks,
+        "ops": total_ops,
+        "ops_per_sec": round(total_ops / elapsed),
+        "mean_op_us": round(elapsed / total_ops * 1e6, 3),
+        "entries": metrics["total_entries"],
+        "approximate_mb": round(metrics["approximate_bytes"] / 1024 / 1024, 2),
+        "evictions": metrics["evictions"],
+        "hit_rate_percent": metrics["hit_rate_percent"],
+    }
+
+
+async def run_invalidation(keys: int, shards: int) -> dict:
+    cache = ThreadSafeCacheManager(max_entries=keys, num_shards=shards)
+    for i in range(keys):
+        await cache.set(f"user_{i % 200}:portfolio:{i}", i)
+
+    started = time.perf_counter()
+    by_tag = await cache.invalidate(user_id="7")
+    tag_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    by_scan = await cache.invalidate(pattern="user_8:")
+    scan_ms = (time.perf_counter() - started) * 1000
+
+    return {
+        "entries": keys,
+        "tag_index": {"removed": by_tag, "ms": round(tag_ms, 3)},
+        "key_scan": {"removed": by_scan, "ms": round(scan_ms, 3)},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark cache contention and invalidation")
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--ops", type=int, default=200)
+    parser.add_argument("--keys", type=int, default=20_000)
+    parser.add_argument("--shards", type=int, default=16)
+    parser.add_argument("--read-ratio", type=float, default=0.9)
+    args = parser.parse_args()
+
+    results = {
+        "contention": asyncio.run(run_contention(args.tasks, args.ops, args.keys, args.shards, args.read_ratio)),
+        "invalidation": asyncio.run(run_invalidation(args.keys, args.shards)),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
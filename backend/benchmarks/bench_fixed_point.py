@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Fixed-Point Money Kernel Benchmark
+
+Compares the Decimal helpers in utils.financial_math with the integer
+kernel in utils.fixed_point: scalar multiply/divide/percent throughput, and
+a days x symbols portfolio-value series (Decimal loop vs int64 row sums).
+
+Usage:
+    python benchmarks/bench_fixed_point.py [--ops N] [--days N] [--symbols N]
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+from decimal import ROUND_HALF_UP, Decimal
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.financial_math import safe_divide, safe_gain_loss_percent, safe_multiply
+from utils.fixed_point import (
+    MONEY_SCALE,
+    NUMPY_AVAILABLE,
+    PRICE_SCALE,
+    QUANTITY_SCALE,
+    from_fixed,
+    fx_div,
+    fx_gain_loss_percent,
+    fx_mul,
+    fx_weighted_sum_rows,
+    to_fixed,
+)
+
+logging.disable(logging.CRITICAL)
+
+
+def _timed(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def run_scalar(ops: int) -> dict:
+    rng = random.Random(1)
+    pairs = [(f"{rng.randrange(10 ** 5)}.{rng.randrange(100):02d}", f"{rng.randrange(1, 900)}.{rng.randrange(10 ** 4):04d}")
+             for _ in range(ops)]
+    fixed_pairs = [(to_fixed(a), to_fixed(b)) for a, b in pairs]
+    decimal_pairs = [(Decimal(a), Decimal(b)) for a, b in pairs]
+
+    def decimal_ops():
+        for a, b in decimal_pairs:
+            safe_multiply(a, b)
+            safe_divide(a, b)
+            safe_gain_loss_percent(a, b)
+
+    def fixed_ops():
+        for a, b in fixed_pairs:
+            fx_mul(a, b)
+            fx_div(a, b)
+            fx_gain_loss_percent(a, b)
+
+    decimal_s, fixed_s = _timed(decimal_ops), _timed(fixed_ops)
+    return {
+        "ops": ops * 3,
+        "decimal_ops_per_sec": round(ops * 3 / decimal_s),
+        "fixed_ops_per_sec": round(ops * 3 / fixed_s),
+        "speedup": round(decimal_s / fixed_s, 2),
+    }
+
+
+def run_series(days: int, symbols: int) -> dict:
+    rng = random.Random(2)
+    quantities = [[f"{rng.randrange(500)}.{rng.randrange(100):02d}" for _ in range(symbols)] for _ in range(days)]
+    prices = [[f"{rng.randrange(1, 900)}.{rng.randrange(100):02d}" for _ in range(symbols)] for _ in range(days)]
+    decimal_q = [[Decimal(q) for q in row] for row in quantities]
+    decimal_p = [[Decimal(p) for p in row] for row in prices]
+    fixed_q = [[to_fixed(q, QUANTITY_SCALE) for q in row] for row in quantities]
+    fixed_p = [[to_fixed(p, PRICE_SCALE) for p in row] for row in prices]
+    six_places = Decimal("0.000001")
+
+    results = {}
+
+    def decimal_series():
+        results["decimal"] = [
+            sum((q * p for q, p in zip(q_row, p_row)), Decimal("0")).quantize(six_places, rounding=ROUND_HALF_UP)
+            for q_row, p_row in zip(decimal_q, decimal_p)
+        ]
+
+    def fixed_series():
+        totals = fx_weighted_sum_rows(fixed_q, fixed_p, QUANTITY_SCALE, PRICE_SCALE, MONEY_SCALE)
+        results["fixed"] = [from_fixed(t, MONEY_SCALE) for t in totals]
+
+    decimal_s, fixed_s = _timed(decimal_series), _timed(fixed_series)
+    return {
+        "days": days,
+        "symbols": symbols,
+        "numpy": NUMPY_AVAILABLE,
+        "decimal_ms": round(decimal_s * 1000, 3),
+        "fixed_ms": round(fixed_s * 1000, 3),
+        "speedup": round(decimal_s / fixed_s, 2),
+        "identical": results["decimal"] == results["fixed"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark fixed-point vs Decimal money math")
+    parser.add_argument("--ops", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=1260)
+    parser.add_argument("--symbols", type=int, default=40)
+    args = parser.parse_args()
+
+    results = {
+        "scalar": run_scalar(args.ops),
+        "series": run_series(args.days, args.symbols),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
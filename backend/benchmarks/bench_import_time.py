@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Import Time Benchmark
+
+Imports each target in a fresh interpreter with ``python -X importtime`` and
+reports the median wall time, the slowest modules by cumulative time, and
+which service singletons were built during import (there should be none).
+
+Usage:
+    python benchmarks/bench_import_time.py [--runs N] [--top N] [--target MODULE ...]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..')
+
+DEFAULT_TARGETS = [
+    "main",
+    "vantage_api.vantage_api_quotes",  # what scripts/seed_historical_data.py pulls in
+]
+
+PROBE = """
+import time
+start = time.perf_counter()
+import {target}
+elapsed_ms = (time.perf_counter() - start) * 1000
+from utils.service_registry import service_registry
+print(elapsed_ms)
+print("built:" + ",".join(service_registry.get_stats()["built"]))
+"""
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """(module, self_us, cumulative_us) rows from -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|", 1).split("|"))
+        rows.append({"module": name, "self_us": int(self_us), "cumulative_us": int(cumulative_us)})
+    return rows
+
+
+def profile_target(target: str, runs: int, top: int) -> Dict[str, Any]:
+    timings = []
+    rows: List[Dict[str, Any]] = []
+    built = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", PROBE.format(target=target)],
+            cwd=BACKEND_DIR, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            return {"error": result.stderr[-1000:]}
+        lines = result.stdout.strip().splitlines()
+        timings.append(float(lines[-2]))
+        built = [name for name in lines[-1][len("built:"):].split(",") if name]
+        rows = parse_importtime(result.stderr)
+
+    modules = {row["module"] for row in rows}
+    slowest = sorted(rows, key=lambda row: row["cumulative_us"], reverse=True)[:top]
+    return {
+        "median_ms": round(statistics.median(timings), 1),
+        "min_ms": round(min(timings), 1),
+        "modules": len(modules),
+        "services_built_on_import": built,
+        "heavy_modules": sorted(name for name in ("fastapi", "aiohttp", "apscheduler", "supabase") if name in modules),
+        "slowest": [{"module": row["module"], "cumulative_ms": round(row["cumulative_us"] / 1000, 1)} for row in slowest],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark module import time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--target", action="append", help="Module to import (repeatable)")
+    args = parser.parse_args()
+
+    results = {target: profile_target(target, args.runs, args.top) for target in (args.target or DEFAULT_TARGETS)}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
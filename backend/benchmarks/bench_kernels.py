@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Calculation Kernel Micro-Benchmarks
+
+Times the CPU kernels behind the portfolio endpoints over parameterized
+ledger and price-history sizes:
+
+- XIRRCalculator.calculate_xirr
+- PortfolioCalculator._process_transactions_with_realized_gains
+- PortfolioCalculator.calculate_portfolio_time_series (prices injected)
+- IndexSimulationService._calculate_daily_values
+- calculate_relevance_score / levenshtein_distance
+- DecimalSafeJSONEncoder
+
+Each case is calibrated so one round takes at least --min-time, then timed
+for --max-time (and at least --min-rounds rounds); stats are per call.
+Ledgers and prices come from the load-test synthetic data, so the inputs
+are deterministic.
+
+"run" prints the results and can save them as the baseline; "compare" runs
+the suite (or loads --current) and exits 1 when any case is more than
+--threshold slower than the baseline (by --stat, min by default).
+
+Usage:
+    python benchmarks/bench_kernels.py run [--filter TEXT] [--quick] [--save-baseline] [--output FILE]
+    python benchmarks/bench_kernels.py compare [--baseline FILE] [--current FILE] [--threshold 0.15] [--stat min]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.loadtest.synthetic import SYMBOLS, SyntheticUser, price_rows
+from services.index_sim_service import IndexSimulationService
+from services.portfolio_calculator import PortfolioCalculator, XIRRCalculator
+from services.price_manager import price_manager
+from utils.decimal_json_encoder import DecimalSafeJSONEncoder
+from vantage_api.vantage_api_search import calculate_relevance_score, levenshtein_distance
+
+logging.disable(logging.CRITICAL)
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'baselines', 'kernels.json')
+
+# (group, name, params, setup) where setup() returns the zero-argument callable to time
+Case = Tuple[str, str, Dict[str, Any], Callable[[], Callable[[], Any]]]
+
+
+# ============================================================================
+# Timing
+# ============================================================================
+
+def _time_round(function: Callable[[], Any], iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return time.perf_counter() - started
+
+
+def measure(function: Callable[[], Any], min_time: float, max_time: float, min_rounds: int) -> Dict[str, Any]:
+    """
+    Per-call timing stats for a callable.
+
+    Args:
+        function: Zero-argument callable
+        min_time: Minimum seconds per round (sets iterations per round)
+        max_time: Seconds to keep adding rounds for
+        min_rounds: Rounds to take even past max_time
+
+    Returns:
+        min/max/mean/median/stddev seconds per call, rounds, iterations and ops
+    """
+    function()  # warm-up
+    iterations = 1
+    while True:
+        elapsed = _time_round(function, iterations)
+        if elapsed >= min_time:
+            break
+        iterations *= max(2, min(10, int(min_time / max(elapsed, 1e-9))))
+
+    samples = [elapsed / iterations]
+    deadline = time.perf_counter() + max_time
+    while len(samples) < min_rounds or time.perf_counter() < deadline:
+        samples.append(_time_round(function, iterations) / iterations)
+
+    median = statistics.median(samples)
+    return {
+        "min": min(samples),
+        "max": max(samples),
+        "mean": statistics.mean(samples),
+        "median": median,
+        "stddev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "rounds": len(samples),
+        "iterations": iterations,
+        "ops": 1 / median if median else None,
+    }
+
+
+def run_sync(loop: asyncio.AbstractEventLoop, factory: Callable[[], Any]) -> Callable[[], Any]:
+    """Callable that runs a coroutine factory to completion on loop"""
+    return lambda: loop.run_until_complete(factory())
+
+
+# ============================================================================
+# Inputs
+# ============================================================================
+
+def ledger(size: int) -> List[Dict[str, Any]]:
+    return SyntheticUser(size, size, date.today()).transactions
+
+
+def cash_flows(count: int) -> Tuple[List[Decimal], List[date]]:
+    rng = random.Random(count)
+    start = date.today() - timedelta(days=5 * 365)
+    dates = sorted(start + timedelta(days=rng.randrange(5 * 365)) for _ in range(count - 1))
+    flows = [Decimal(-rng.randint(100, 5000)) for _ in dates]
+    return flows + [-sum(flows) * Decimal("1.4")], dates + [date.today()]
+
+
+def chart_prices(transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    symbols = sorted({t["symbol"] for t in transactions})
+    return {"success": True, "data": {
+        symbol: [{"date": row["date"], "close": row["close"]} for row in price_rows(symbol, date.today())]
+        for symbol in symbols
+    }}
+
+
+def holdings_payload(count: int) -> Dict[str, Any]:
+    rng = random.Random(count)
+    return {
+        "holdings": [{
+            "symbol": SYMBOLS[i % len(SYMBOLS)],
+            "quantity": Decimal(rng.randint(1, 10_000)) / 100,
+            "avg_cost": Decimal(str(round(rng.uniform(10, 500), 4))),
+            "current_price": Decimal(str(round(rng.uniform(10, 500), 4))),
+            "current_value": Decimal(str(round(rng.uniform(100, 50_000), 2))),
+            "gain_loss_percent": round(rng.uniform(-50, 150), 2),
+            "dates": {"first": "2021-01-04", "last": "2024-06-03"},
+        } for i in range(count)],
+        "total_value": Decimal("123456.78"),
+    }
+
+
+def search_candidates(count: int) -> List[Tuple[str, str]]:
+    rng = random.Random(count)
+    words = ["Apple", "Micro", "Global", "Energy", "Capital", "Systems", "Holdings", "Pharma", "Bank", "Motors"]
+    return [
+        (f"{SYMBOLS[i % len(SYMBOLS)]}{'' if i < len(SYMBOLS) else i}", f"{rng.choice(words)} {rng.choice(words)} Inc")
+        for i in range(count)
+    ]
+
+
+# ============================================================================
+# Cases
+# ============================================================================
+
+def cases(loop: asyncio.AbstractEventLoop, quick: bool) -> Iterator[Case]:
+    ledger_sizes = [10, 100] if quick else [10, 100, 1000]
+
+    for count in ([10, 100] if quick else [10, 100, 1000]):
+        def setup(count: int = count) -> Callable[[], Any]:
+            flows, dates = cash_flows(count)
+            return lambda: XIRRCalculator.calculate_xirr(flows, dates)
+        yield "xirr", "calculate_xirr", {"cash_flows": count}, setup
+
+    for size in ledger_sizes:
+        def setup(size: int = size) -> Callable[[], Any]:
+            transactions = ledger(size)
+            return lambda: PortfolioCalculator._process_transactions_with_realized_gains(transactions)
+        yield "realized_gains", "_process_transactions_with_realized_gains", {"transactions": size}, setup
+
+    for size in ledger_sizes:
+        for range_key in (["1Y"] if quick else ["1Y", "MAX"]):
+            def setup(size: int = size, range_key: str = range_key) -> Callable[[], Any]:
+                transactions = ledger(size)
+                prices = chart_prices(transactions)
+
+                async def inject(**kwargs: Any) -> Dict[str, Any]:
+                    return prices
+
+                price_manager.get_portfolio_prices_for_charts = inject
+                return run_sync(loop, lambda: PortfolioCalculator.calculate_portfolio_time_series(
+                    "bench-user", "bench-token", range_key=range_key, transactions=transactions
+                ))
+            yield "time_series", "calculate_portfolio_time_series", {"transactions": size, "range": range_key}, setup
+
+    for days in ([365] if quick else [365, 1825, 3650]):
+        for positions in [10, 100]:
+            def setup(days: int = days, positions: int = positions) -> Callable[[], Any]:
+                rng = random.Random(days + positions)
+                start = date.today() - timedelta(days=days)
+                share_positions = {
+                    start + timedelta(days=rng.randrange(days)): Decimal(rng.randint(1, 10_000)) / 1000
+                    for _ in range(positions)
+                }
+                benchmark_prices = {
+                    start + timedelta(days=i): Decimal(str(round(400 + i * 0.05, 4)))
+                    for i in range(days + 1) if (start + timedelta(days=i)).weekday() < 5
+                }
+                return run_sync(loop, lambda: IndexSimulationService._calculate_daily_values(
+                    start, date.today(), share_positions, benchmark_prices
+                ))
+            yield "index_sim", "_calculate_daily_values", {"days": days, "positions": positions}, setup
+
+    for count in ([100] if quick else [100, 1000]):
+        def setup(count: int = count) -> Callable[[], Any]:
+            candidates = search_candidates(count)
+            return lambda: [calculate_relevance_score(s, n, "APPLE", "apple") for s, n in candidates]
+        yield "search", "calculate_relevance_score", {"candidates": count}, setup
+
+    for length in [8, 32]:
+        def setup(length: int = length) -> Callable[[], Any]:
+            rng = random.Random(length)
+            left = "".join(rng.choice("abcdefghij") for _ in range(length))
+            right = "".join(rng.choice("abcdefghij") for _ in range(length))
+            return lambda: levenshtein_distance(left, right)
+        yield "search", "levenshtein_distance", {"length": length}, setup
+
+    for count in ([10, 100] if quick else [10, 100, 1000]):
+        def setup(count: int = count) -> Callable[[], Any]:
+            payload = holdings_payload(count)
+            return lambda: json.dumps(payload, cls=DecimalSafeJSONEncoder)
+        yield "serialization", "DecimalSafeJSONEncoder", {"holdings": count}, setup
+
+
+def case_id(name: str, params: Dict[str, Any]) -> str:
+    """pytest-style id, e.g. calculate_xirr[cash_flows=100]"""
+    return f"{name}[{','.join(f'{k}={v}' for k, v in params.items())}]"
+
+
+def run_suite(args: argparse.Namespace) -> Dict[str, Any]:
+    loop = asyncio.new_event_loop()
+    original = price_manager.get_portfolio_prices_for_charts
+    results = []
+    try:
+        for group, name, params, setup in cases(loop, args.quick):
+            identifier = case_id(name, params)
+            if args.filter and args.filter not in identifier:
+                continue
+            stats = measure(setup(), args.min_time, args.max_time, args.min_rounds)
+            results.append({"group": group, "name": identifier, "params": params, "stats": stats})
+            print(f"{identifier:<70} median {stats['median'] * 1e6:12.1f} us  ({stats['rounds']} rounds)", file=sys.stderr)
+    finally:
+        price_manager.get_portfolio_prices_for_charts = original
+        loop.close()
+
+    return {
+        "datetime": datetime.now(timezone.utc).isoformat(),
+        "machine_info": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "system": platform.system(),
+            "cpu_count": os.cpu_count(),
+        },
+        "settings": {"min_time": args.min_time, "max_time": args.max_time, "min_rounds": args.min_rounds, "quick": args.quick},
+        "benchmarks": results,
+    }
+
+
+# ============================================================================
+# Comparison
+# ============================================================================
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float, stat: str = "min") -> Dict[str, Any]:
+    """
+    Per-case comparison of one timing statistic between two runs.
+
+    Args:
+        baseline: Saved run
+        current: New run
+        threshold: Relative slowdown (0.15 = 15%) that counts as a regression
+        stat: Statistic to compare; min is the least sensitive to noisy neighbours
+
+    Returns:
+        Per-case ratios, the regressions and improvements, and cases only in one run
+    """
+    before = {entry["name"]: entry["stats"] for entry in baseline["benchmarks"]}
+    after = {entry["name"]: entry["stats"] for entry in current["benchmarks"]}
+    rows, regressions, improvements = [], [], []
+    for name in sorted(before.keys() & after.keys()):
+        ratio = after[name][stat] / before[name][stat] if before[name][stat] else None
+        row = {
+            "name": name,
+            f"baseline_{stat}_us": round(before[name][stat] * 1e6, 2),
+            f"current_{stat}_us": round(after[name][stat] * 1e6, 2),
+            "ratio": round(ratio, 3) if ratio is not None else None,
+        }
+        rows.append(row)
+        if ratio is not None and ratio > 1 + threshold:
+            regressions.append(row)
+        elif ratio is not None and ratio < 1 - threshold:
+            improvements.append(row)
+
+    machine_mismatch = {
+        key: [baseline.get("machine_info", {}).get(key), value]
+        for key, value in current.get("machine_info", {}).items()
+        if baseline.get("machine_info", {}).get(key) != value
+    }
+    return {
+        "stat": stat,
+        "threshold": threshold,
+        "compared": rows,
+        "regressions": regressions,
+        "improvements": improvements,
+        "missing_from_current": sorted(before.keys() - after.keys()),
+        "new_in_current": sorted(after.keys() - before.keys()),
+        "machine_mismatch": machine_mismatch,
+    }
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(result: Dict[str, Any], path: str) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+        f.write("\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Calculation kernel micro-benchmarks with baseline comparison")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_run_options(sub: argparse.ArgumentParser) -> None:
+        sub.add_argument("--filter", help="Only run cases whose id contains this text")
+        sub.add_argument("--quick", action="store_true", help="Smaller parameter grid")
+        sub.add_argument("--min-time", type=float, default=0.005, help="Minimum seconds per round")
+        sub.add_argument("--max-time", type=float, default=0.5, help="Seconds of rounds per case")
+        sub.add_argument("--min-rounds", type=int, default=5)
+
+    run_parser = subparsers.add_parser("run", help="Run the suite and print JSON")
+    add_run_options(run_parser)
+    run_parser.add_argument("--output", help="Also write the results to this file")
+    run_parser.add_argument("--save-baseline", action="store_true", help=f"Write the results to {os.path.relpath(BASELINE_FILE)}")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare a run against the baseline")
+    add_run_options(compare_parser)
+    compare_parser.add_argument("--baseline", default=BASELINE_FILE)
+    compare_parser.add_argument("--current", help="Saved run to compare instead of running the suite")
+    compare_parser.add_argument("--threshold", type=float, default=0.15, help="Slowdown that fails (0.15 = 15%%)")
+    compare_parser.add_argument("--stat", choices=["min", "median", "mean"], default="min")
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        result = run_suite(args)
+        if args.output:
+            save(result, args.output)
+        if args.save_baseline:
+            save(result, BASELINE_FILE)
+        print(json.dumps(result, indent=2))
+        return
+
+    baseline = load(args.baseline)
+    current = load(args.current) if args.current else run_suite(args)
+    report = compare(baseline, current, args.threshold, args.stat)
+    print(json.dumps(report, indent=2))
+    if report["machine_mismatch"]:
+        print(f"Warning: baseline was recorded on a different machine: {report['machine_mismatch']}", file=sys.stderr)
+    if report["regressions"]:
+        print(f"{len(report['regressions'])} regression(s) over {args.threshold:.0%}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Offline Load Test
+
+Runs the FastAPI app in-process against local stand-ins for Supabase
+(PostgREST, RPCs, auth) and Alpha Vantage (see benchmarks/loadtest), seeded
+with synthetic users whose ledgers range from a few trades to thousands.
+Every user requests /api/complete, /api/portfolio, /api/allocation and
+/api/analytics/summary in each round, with a fixed number of requests in
+flight.
+
+Per endpoint it records p50/p95/p99 latency (overall and for each user's
+first, cold request), throughput and error count. A separate pass with
+tracemalloc measures peak and retained allocations per endpoint. Results
+are written to metrics/load_test_current.json and appended to
+metrics/load_test_history.json (last 100 runs), like the quality monitor.
+
+Usage:
+    python benchmarks/bench_load.py [--ledger-sizes 10,100,1000] [--users-per-size N]
+                                    [--rounds N] [--concurrency N]
+                                    [--supabase-latency-ms MS] [--vantage-latency-ms MS]
+                                    [--vantage-per-minute N] [--vantage-per-day N]
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.loadtest.fake_alpha_vantage import FakeAlphaVantage
+from benchmarks.loadtest.fake_postgrest import FakePostgrest
+from benchmarks.loadtest.synthetic import SyntheticUser, generate_users, make_token, seed_backend
+
+ENDPOINTS = ["/api/complete", "/api/portfolio", "/api/allocation", "/api/analytics/summary"]
+METRICS_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'metrics')
+HISTORY_LIMIT = 100
+
+
+def percentiles(samples: List[float]) -> Dict[str, Optional[float]]:
+    if not samples:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99), "max_ms": round(ordered[-1] * 1000, 2)}
+
+
+def start_backends(args: argparse.Namespace) -> Tuple[FakePostgrest, FakeAlphaVantage, List[SyntheticUser], Dict[str, int]]:
+    """Start both fakes, seed them and point the app's config at them"""
+    end = date.today()
+    supabase = FakePostgrest(latency_ms=args.supabase_latency_ms)
+    vantage = FakeAlphaVantage(
+        latency_ms=args.vantage_latency_ms,
+        calls_per_minute=args.vantage_per_minute,
+        calls_per_day=args.vantage_per_day,
+        end=end,
+    )
+    users = generate_users(args.ledger_sizes, args.users_per_size, end)
+    seeded = seed_backend(supabase, users, end)
+
+    # supabase-py only accepts JWT-shaped keys
+    service_key = make_token("service", "service@example.com")
+    os.environ.update({
+        "SUPA_API_URL": supabase.start(),
+        "SUPA_API_ANON_KEY": service_key,
+        "SUPA_API_SERVICE_KEY": service_key,
+        "SUPA_DB_URL": "",
+        "VANTAGE_API_KEY": "loadtest",
+        "VANTAGE_API_BASE_URL": vantage.start(),
+        "INVALIDATION_BUS": "local",
+        "LOG_LEVEL": "ERROR",
+    })
+    return supabase, vantage, users, seeded
+
+
+async def run_load(app: Any, users: List[SyntheticUser], args: argparse.Namespace) -> Dict[str, Any]:
+    """Drive every endpoint for every user for args.rounds rounds"""
+    import httpx
+
+    latencies: Dict[str, List[float]] = {endpoint: [] for endpoint in ENDPOINTS}
+    cold: Dict[str, List[float]] = {endpoint: [] for endpoint in ENDPOINTS}
+    errors: Dict[str, Dict[str, int]] = {endpoint: {} for endpoint in ENDPOINTS}
+    by_ledger: Dict[str, Dict[int, List[float]]] = {endpoint: {} for endpoint in ENDPOINTS}
+
+    jobs = [(round_no, user, endpoint) for round_no in range(args.rounds) for user in users for endpoint in ENDPOINTS]
+    # Round order stays intact so the first round is each user's cold request
+    rng = random.Random(args.seed)
+    for round_no in range(args.rounds):
+        start, stop = round_no * len(users) * len(ENDPOINTS), (round_no + 1) * len(users) * len(ENDPOINTS)
+        jobs[start:stop] = rng.sample(jobs[start:stop], stop - start)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=300) as client:
+
+        async def one(round_no: int, user: SyntheticUser, endpoint: str) -> None:
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(endpoint, headers={"Authorization": f"Bearer {user.token}"})
+                    status = str(response.status_code)
+                except Exception as e:
+                    status = type(e).__name__
+                elapsed = time.perf_counter() - started
+            if status != "200":
+                errors[endpoint][status] = errors[endpoint].get(status, 0) + 1
+                return
+            latencies[endpoint].append(elapsed)
+            by_ledger[endpoint].setdefault(user.ledger_size, []).append(elapsed)
+            if round_no == 0:
+                cold[endpoint].append(elapsed)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(*job) for job in jobs))
+        duration = time.perf_counter() - started
+
+    results: Dict[str, Any] = {"duration_seconds": round(duration, 3), "requests": len(jobs),
+                               "requests_per_sec": round(len(jobs) / duration, 2), "endpoints": {}}
+    for endpoint in ENDPOINTS:
+        results["endpoints"][endpoint] = {
+            "ok": len(latencies[endpoint]),
+            "errors": errors[endpoint],
+            "throughput_per_sec": round(len(latencies[endpoint]) / duration, 2),
+            "mean_ms": round(statistics.mean(latencies[endpoint]) * 1000, 2) if latencies[endpoint] else None,
+            **percentiles(latencies[endpoint]),
+            "cold": percentiles(cold[endpoint]),
+            "by_ledger_size": {str(size): percentiles(samples) for size, samples in sorted(by_ledger[endpoint].items())},
+        }
+    return results
+
+
+async def measure_allocations(app: Any, users: List[SyntheticUser]) -> Dict[str, Any]:
+    """Peak and retained traced allocations per request, one request at a time"""
+    import httpx
+
+    results: Dict[str, Any] = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=300) as client:
+        for endpoint in ENDPOINTS:
+            peaks, retained = [], []
+            for user in users:
+                gc.collect()
+                tracemalloc.start()
+                before = tracemalloc.get_traced_memory()[0]
+                await client.get(endpoint, headers={"Authorization": f"Bearer {user.token}"})
+                current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                peaks.append(peak - before)
+                retained.append(current - before)
+            results[endpoint] = {
+                "peak_kb_mean": round(statistics.mean(peaks) / 1024, 1),
+                "peak_kb_max": round(max(peaks) / 1024, 1),
+                "retained_kb_mean": round(statistics.mean(retained) / 1024, 1),
+            }
+    return results
+
+
+def write_metrics(result: Dict[str, Any], metrics_dir: str) -> str:
+    """Write the current run and append it to the history"""
+    os.makedirs(metrics_dir, exist_ok=True)
+    current_file = os.path.join(metrics_dir, "load_test_current.json")
+    with open(current_file, "w") as f:
+        json.dump(result, f, indent=2)
+
+    history_file = os.path.join(metrics_dir, "load_test_history.json")
+    history: List[Dict[str, Any]] = []
+    if os.path.exists(history_file):
+        try:
+            with open(history_file) as f:
+                history = json.load(f)
+        except (OSError, ValueError):
+            history = []
+    history.append(result)
+    with open(history_file, "w") as f:
+        json.dump(history[-HISTORY_LIMIT:], f, indent=2)
+    return current_file
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    supabase, vantage, users, seeded = start_backends(args)
+    logging.disable(logging.CRITICAL)
+
+    # Config is read at import time, so the app is imported after the env is set
+    from main import app
+    from utils.service_registry import service_registry
+
+    # Lifespan without the scheduler and startup reconciliation jobs
+    await service_registry.start()
+    try:
+        load = await run_load(app, users, args)
+        allocations = await measure_allocations(app, users[:: max(1, len(users) // 6)]) if args.allocations else {}
+    finally:
+        await service_registry.close()
+        supabase.stop()
+        vantage.stop()
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "benchmark": "load_test",
+        "config": {
+            "ledger_sizes": args.ledger_sizes,
+            "users": len(users),
+            "rounds": args.rounds,
+            "concurrency": args.concurrency,
+            "supabase_latency_ms": args.supabase_latency_ms,
+            "vantage_latency_ms": args.vantage_latency_ms,
+            "vantage_per_minute": args.vantage_per_minute,
+            "vantage_per_day": args.vantage_per_day,
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "seeded_rows": seeded,
+        **load,
+        "allocations": allocations,
+        "supabase": supabase.get_stats(),
+        "alpha_vantage": vantage.get_stats(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline load test against local Supabase and Alpha Vantage fakes")
+    parser.add_argument("--ledger-sizes", type=lambda s: [int(x) for x in s.split(",")], default=[10, 100, 1000],
+                        help="Transactions per synthetic user, one tier per size")
+    parser.add_argument("--users-per-size", type=int, default=3)
+    parser.add_argument("--rounds", type=int, default=5, help="Requests per user per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight")
+    parser.add_argument("--supabase-latency-ms", type=float, default=2.0)
+    parser.add_argument("--vantage-latency-ms", type=float, default=50.0)
+    parser.add_argument("--vantage-per-minute", type=int, default=None)
+    parser.add_argument("--vantage-per-day", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-allocations", dest="allocations", action="store_false",
+                        help="Skip the tracemalloc pass")
+    parser.add_argument("--metrics-dir", default=METRICS_DIR)
+    parser.add_argument("--no-write", dest="write", action="store_false", help="Print results only")
+    args = parser.parse_args()
+
+    result = asyncio.run(main_async(args))
+    if args.write:
+        result["written_to"] = os.path.relpath(write_metrics(result, args.metrics_dir))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Multi-Worker Benchmark
+
+Runs 1, 2, 4 and 8 worker processes, each with its own L1 cache
+(ThreadSafeCacheManager), CacheDependencyIndex and InvalidationBus, like
+uvicorn workers in multi-worker mode. Workers are connected through a relay
+process-side stand-in for the Postgres channel: every message a worker sends
+is fanned out to every worker, including the sender.
+
+Each worker serves portfolio reads for random users with a fixed request
+concurrency. A miss costs a CPU-bound calculation plus simulated database
+I/O. A small share of requests are transaction edits (invalidate_user).
+Worker 0 stands in for the lease holder of the price refresh and publishes a
+price update for a few symbols at a fixed interval. The benchmark reports
+throughput, scaling efficiency against one worker, hit rate and
+cross-worker delivery lag.
+
+Scaling is bounded by the CPU cores available; the core count is reported.
+
+Usage:
+    python benchmarks/bench_multi_worker.py [--workers 1,2,4,8] [--duration S] [--concurrency N]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from typing import Any, Dict, List
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from services.cache_dependency_index import CacheDependencyIndex, price_dependency, transactions_dependency
+from services.cache_manager import ThreadSafeCacheManager
+from services.invalidation_bus import InvalidationBus
+
+logging.disable(logging.CRITICAL)
+
+
+class QueueTransport:
+    """Bus transport over multiprocessing queues (outbound shared, one inbound per worker)"""
+
+    def __init__(self, outbound: Any, inbound: Any) -> None:
+        self.outbound = outbound
+        self.inbound = inbound
+        self._reader: Any = None
+        self._running = False
+
+    async def start(self, on_message: Any) -> None:
+        loop = asyncio.get_running_loop()
+        self._running = True
+
+        def read() -> None:
+            while self._running:
+                try:
+                    payload = self.inbound.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                loop.call_soon_threadsafe(on_message, payload)
+
+        self._reader = threading.Thread(target=read, daemon=True)
+        self._reader.start()
+
+    async def send(self, payload: str) -> None:
+        self.outbound.put(payload)
+
+    async def stop(self) -> None:
+        self._running = False
+
+
+def _relay(outbound: Any, inbounds: List[Any]) -> None:
+    """Fan every message out to every worker until a None sentinel arrives"""
+    while True:
+        payload = outbound.get()
+        if payload is None:
+            return
+        for inbound in inbounds:
+            inbound.put(payload)
+
+
+def _calculate(user: int, symbols: List[int], compute_iterations: int) -> Dict[str, Any]:
+    """CPU-bound stand-in for a portfolio calculation"""
+    value = 0.0
+    for i in range(compute_iterations):
+        value += (user * 31 + i) % 97 * 1.0001
+    return {"user": user, "symbols": symbols, "value": value}
+
+
+async def _worker_main(worker_id: int, config: Dict[str, Any], transport: QueueTransport, start_at: float) -> Dict[str, Any]:
+    rng = random.Random(worker_id)
+    cache = ThreadSafeCacheManager(max_entries=config["users"] * 2)
+    index = CacheDependencyIndex()
+
+    async def drop(entries: List[Any]) -> int:
+        return await cache.invalidate_keys([key for _, _, key in entries])
+
+    index.register_invalidator("metrics", drop)
+    bus = InvalidationBus(transport, worker_id=f"worker-{worker_id}", dependency_index=index)
+    await bus.start()
+
+    holdings = {
+        user: random.Random(user).sample(range(config["symbols"]), config["holdings"])
+        for user in range(config["users"])
+    }
+    counters = {"requests": 0, "hits": 0, "misses": 0, "edits": 0, "price_updates": 0}
+
+    await asyncio.sleep(max(start_at - time.time(), 0))
+    deadline = time.monotonic() + config["duration"]
+
+    async def serve() -> None:
+        while time.monotonic() < deadline:
+            user = rng.randrange(config["users"])
+            key = f"portfolio:{user}"
+            if rng.random() < config["write_ratio"]:
+                await asyncio.sleep(config["io_ms"] / 1000)  # the transaction write
+                await bus.invalidate_user(str(user))
+                counters["edits"] += 1
+                continue
+
+            cached = await cache.get(key)
+            if cached is None:
+                counters["misses"] += 1
+                await asyncio.sleep(config["io_ms"] / 1000)  # transactions and prices
+                metrics = _calculate(user, holdings[user], config["compute_iterations"])
+                await cache.set(key, metrics)
+                index.register(
+                    "metrics", str(user), key,
+                    [transactions_dependency(str(user))] + [price_dependency(f"SYM{s}") for s in holdings[user]],
+                )
+            else:
+                counters["hits"] += 1
+            counters["requests"] += 1
+            await asyncio.sleep(0)
+
+    async def refresh_prices() -> None:
+        while time.monotonic() < deadline:
+            await asyncio.sleep(config["price_interval"])
+            symbols = rng.sample(range(config["symbols"]), config["symbols_per_update"])
+            await bus.invalidate_dependencies("price_update", [price_dependency(f"SYM{s}") for s in symbols])
+            counters["price_updates"] += 1
+
+    tasks = [serve() for _ in range(config["concurrency"])]
+    if worker_id == 0:
+        tasks.append(refresh_prices())
+    started = time.perf_counter()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    await asyncio.sleep(0.2)  # let in-flight invalidations arrive
+    await bus.wait_idle()
+    stats = bus.get_stats()
+    await bus.stop()
+    return {**counters, "elapsed": elapsed, "bus": stats}
+
+
+def _worker_process(worker_id: int, config: Dict[str, Any], outbound: Any, inbound: Any, start_at: float, results: Any) -> None:
+    transport = QueueTransport(outbound, inbound)
+    results.put(asyncio.run(_worker_main(worker_id, config, transport, start_at)))
+
+
+def run_workers(count: int, config: Dict[str, Any]) -> Dict[str, Any]:
+    context = multiprocessing.get_context("spawn")
+    outbound = context.Queue()
+    inbounds = [context.Queue() for _ in range(count)]
+    results = context.Queue()
+    relay = threading.Thread(target=_relay, args=(outbound, inbounds), daemon=True)
+    relay.start()
+
+    start_at = time.time() + 1.5 + 0.2 * count  # after every process has imported
+    processes = [
+        context.Process(target=_worker_process, args=(i, config, outbound, inbounds[i], start_at, results))
+        for i in range(count)
+    ]
+    for process in processes:
+        process.start()
+    workers = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    outbound.put(None)
+    relay.join()
+
+    requests = sum(w["requests"] for w in workers)
+    elapsed = max(w["elapsed"] for w in workers)
+    lag = [w["bus"]["delivery_lag_ms"] for w in workers if w["bus"]["delivery_lag_ms"]["count"]]
+    return {
+        "workers": count,
+        "requests": requests,
+        "requests_per_sec": round(requests / elapsed),
+        "hit_rate": round(sum(w["hits"] for w in workers) / max(requests, 1), 3),
+        "edits": sum(w["edits"] for w in workers),
+        "price_updates": sum(w["price_updates"] for w in workers),
+        "messages_applied_remotely": sum(w["bus"]["received"] - w["bus"]["skipped_own"] for w in workers),
+        "delivery_lag_p50_ms": max((l["p50_ms"] for l in lag), default=None),
+        "delivery_lag_p99_ms": max((l["p99_ms"] for l in lag), default=None),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark throughput with N shared-nothing workers")
+    parser.add_argument("--workers", default="1,2,4,8", help="Comma-separated worker counts")
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds of load per run")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent requests per worker")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--holdings", type=int, default=10)
+    parser.add_argument("--io-ms", type=float, default=5.0, help="Simulated database time per miss")
+    parser.add_argument("--compute-iterations", type=int, default=20000, help="CPU work per miss")
+    parser.add_argument("--write-ratio", type=float, default=0.01, help="Share of requests that edit transactions")
+    parser.add_argument("--price-interval", type=float, default=0.25, help="Seconds between price updates")
+    parser.add_argument("--symbols-per-update", type=int, default=5)
+    args = parser.parse_args()
+
+    config = {
+        "duration": args.duration,
+        "concurrency": args.concurrency,
+        "users": args.users,
+        "symbols": args.symbols,
+        "holdings": args.holdings,
+        "io_ms": args.io_ms,
+        "compute_iterations": args.compute_iterations,
+        "write_ratio": args.write_ratio,
+        "price_interval": args.price_interval,
+        "symbols_per_update": args.symbols_per_update,
+    }
+    runs = [run_workers(int(count), config) for count in args.workers.split(",")]
+    baseline = runs[0]["requests_per_sec"] / runs[0]["workers"]
+    for run in runs:
+        run["scaling_efficiency"] = round(run["requests_per_sec"] / (baseline * run["workers"]), 2)
+    print(json.dumps({"cpu_count": os.cpu_count(), "config": config, "runs": runs}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+/api/complete Serialization Benchmark
+
+Measures encode time and payload size of a synthetic large portfolio using
+the previous stdlib path (jsonable_encoder + DecimalSafeJSONEncoder, payload
+encoded twice) against the single-pass fast_json path, and compares row vs
+columnar time series layouts.
+
+Usage:
+    python benchmarks/bench_serialization.py [--holdings N] [--points N] [--iterations N]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Callable, Dict
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi.encoders import jsonable_encoder
+
+from services.portfolio_metrics_manager import PortfolioHolding, TimeSeriesDataPoint
+from utils import fast_json
+from utils.decimal_json_encoder import DecimalSafeJSONEncoder
+from utils.fast_json import columnar_series, compile_row_encoder
+
+logging.disable(logging.CRITICAL)
+
+HOLDING_FIELDS = (
+    "symbol", "quantity", "avg_cost", "total_cost", "current_price", "current_value",
+    "gain_loss", "gain_loss_percent", "allocation_percent", "dividends_received",
+    "price_date", "currency",
+)
+
+
+def build_fixture(holdings: int, points: int):
+    now = datetime.now(timezone.utc)
+    holding_models = [
+        PortfolioHolding(
+            symbol=f"SYM{i}",
+            quantity=Decimal("12.345678"),
+            avg_cost=Decimal("101.2345"),
+            total_cost=Decimal("1249.78"),
+            current_price=Decimal("120.55"),
+            current_value=Decimal("1488.23"),
+            gain_loss=Decimal("238.45"),
+            gain_loss_percent=19.08,
+            allocation_percent=round(100 / holdings, 4),
+            dividends_received=Decimal("12.40"),
+            price_date=now,
+        )
+        for i in range(holdings)
+    ]
+    start = date.today() - timedelta(days=points)
+    series = [
+        TimeSeriesDataPoint(date=start + timedelta(days=i), value=Decimal("100000.00") + i)
+        for i in range(points)
+    ]
+    dividends = [
+        {"symbol": f"SYM{i % holdings}", "amount": Decimal("1.23"), "ex_date": f"{2020 + i % 5}-03-15"}
+        for i in range(holdings * 4)
+    ]
+    return holding_models, series, dividends
+
+
+def legacy_encode(holdings, series, dividends) -> bytes:
+    """Previous route behaviour: build dicts, size with json.dumps, then render."""
+    payload = {
+        "holdings": [
+            {name: (float(v) if isinstance(v, Decimal) else v) for name, v in ((f, getattr(h, f)) for f in HOLDING_FIELDS)}
+            for h in holdings
+        ],
+        "time_series": [{"date": p.date, "value": float(p.value)} for p in series],
+        "recent_dividends": dividends,
+    }
+    json.dumps(payload, default=str).encode("utf-8")  # payload size measurement
+    return json.dumps(jsonable_encoder(payload), cls=DecimalSafeJSONEncoder, ensure_ascii=False).encode("utf-8")
+
+
+def fast_encode(holdings, series, dividends, columnar: bool = False) -> bytes:
+    holding_encoder = compile_row_encoder(PortfolioHolding, HOLDING_FIELDS)
+    series_encoder = compile_row_encoder(TimeSeriesDataPoint, ("date", "value"))
+    payload = {
+        "holdings": holding_encoder.encode_many(holdings),
+        "time_series": columnar_series(series) if columnar else series_encoder.encode_many(series),
+        "recent_dividends": dividends,
+    }
+    return fast_json.dumps(payload, decimal_as="float")
+
+
+def measure(fn: Callable[[], bytes], iterations: int) -> Dict[str, Any]:
+    fn()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        body = fn()
+    elapsed_ms = (time.perf_counter() - started) * 1000 / iterations
+    return {"encode_ms": round(elapsed_ms, 3), "payload_bytes": len(body)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark /api/complete serialization")
+    parser.add_argument("--holdings", type=int, default=500)
+    parser.add_argument("--points", type=int, default=1825)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    holdings, series, dividends = build_fixture(args.holdings, args.points)
+    results = {
+        "legacy_stdlib": measure(lambda: legacy_encode(holdings, series, dividends), args.iterations),
+        "fast_rows": measure(lambda: fast_encode(holdings, series, dividends), args.iterations),
+        "fast_columnar": measure(lambda: fast_encode(holdings, series, dividends, columnar=True), args.iterations),
+    }
+    print(json.dumps({"holdings": args.holdings, "points": args.points, "orjson": fast_json.ORJSON_AVAILABLE, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Tracing Overhead Benchmark
+
+Measures the per-call overhead DebugLogger.log_api_call adds to an async
+route handler, with tracing disabled and enabled, against the undecorated
+function. Also reports the cost of the previous banner/serialization
+decorator for comparison.
+
+Usage:
+    python benchmarks/bench_tracing.py [--calls N] [--sample-rate R]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from functools import wraps
+
+# Add backend directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from debug_logger import DebugLogger
+from utils.tracing import tracer
+
+logging.disable(logging.CRITICAL)
+
+logger = logging.getLogger("bench_tracing")
+
+ARGS = ({"id": "user-1", "email": "user@example.com", "access_token": "x" * 200},)
+
+
+def legacy_log_api_call(api_name: str, sender: str, receiver: str, operation: str = ""):
+    """Previous decorator: formats a banner and serializes args on every call."""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            start_time = time.time()
+            logger.info(f"""
+========== API CALL START ==========
+FILE: {func.__module__}
+FUNCTION: {func.__name__}
+API: {api_name}
+OPERATION: {operation}
+SENDER: {sender}
+RECEIVER: {receiver}
+ARGS: {DebugLogger._safe_serialize(args)}
+====================================""")
+            result = await func(*args, **kwargs)
+            time.time() - start_time
+            return result
+        return wrapper
+    return decorator
+
+
+async def handler(user, force_refresh=False):
+    return user
+
+
+traced_handler = DebugLogger.log_api_call(api_name="BENCH", sender="FRONTEND", receiver="BACKEND", operation="GET")(handler)
+legacy_handler = legacy_log_api_call(api_name="BENCH", sender="FRONTEND", receiver="BACKEND", operation="GET")(handler)
+
+
+async def time_calls(fn, calls: int) -> float:
+    """Mean nanoseconds per awaited call."""
+    for _ in range(1000):
+        await fn(*ARGS, force_refresh=True)
+    started = time.perf_counter_ns()
+    for _ in range(calls):
+        await fn(*ARGS, force_refresh=True)
+    return (time.perf_counter_ns() - started) / calls
+
+
+async def run(calls: int, sample_rate: float) -> dict:
+    baseline_ns = await time_calls(handler, calls)
+
+    tracer.configure(enabled=False)
+    disabled_ns = await time_calls(traced_handler, calls)
+
+    tracer.configure(enabled=True, sample_rate=sample_rate)
+    enabled_ns = await time_calls(traced_handler, calls)
+    tracer.configure(enabled=False)
+
+    legacy_ns = await time_calls(legacy_handler, calls)
+
+    def overhead_us(total_ns: float) -> float:
+        return round((total_ns - baseline_ns) / 1000, 3)
+
+    return {
+        "calls": calls,
+        "baseline_call_us": round(baseline_ns / 1000, 3),
+        "overhead_us": {
+            "tracing_disabled": overhead_us(disabled_ns),
+            "tracing_enabled": overhead_us(enabled_ns),
+            "legacy_banner": overhead_us(legacy_ns),
+        },
+        "histogram": tracer.get_histograms().get("BENCH.GET", {}).get("count"),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark tracing decorator overhead")
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--sample-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.calls, args.sample_rate))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+"""
+Offline load-test harness
+
+Local stand-ins for the external services the backend talks to, so the API
+can be load tested without network access or quota:
+
+- fake_postgrest: Supabase PostgREST tables, RPCs and /auth/v1/user
+- fake_alpha_vantage: Alpha Vantage with configurable latency and quota
+- synthetic: users of varying ledger size with prices and dividends
+
+Both fakes are real HTTP servers on 127.0.0.1, so the supabase and aiohttp
+clients run unmodified. bench_load.py points SUPA_API_URL and
+VANTAGE_API_BASE_URL at them before importing the app.
+"""
@@ -0,0 +1,172 @@
+"""
+Fake Alpha Vantage: the query endpoint with configurable latency and quota
+
+Serves GLOBAL_QUOTE, TIME_SERIES_DAILY_ADJUSTED, DIVIDENDS, OVERVIEW,
+SYMBOL_SEARCH and FX_DAILY from the synthetic price model. Calls beyond the
+per-minute or daily quota get the same "Note" payload the real API sends.
+"""
+
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import date, timedelta
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from benchmarks.loadtest.server import Response, StubServer, json_response
+from benchmarks.loadtest.synthetic import INDEX_SYMBOLS, SYMBOLS, dividend_schedule, price_history
+
+RATE_LIMIT_NOTE = (
+    "Thank you for using Alpha Vantage! Our standard API rate limit is 25 requests per day. "
+    "Please subscribe to any of the premium plans to instantly remove all daily rate limits."
+)
+
+
+class FakeAlphaVantage:
+    """
+    Args:
+        latency_ms: Added to every call
+        calls_per_minute: Quota per rolling minute (None for unlimited)
+        calls_per_day: Quota for the whole run (None for unlimited)
+        end: Last trading day of the price model
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        calls_per_minute: Optional[int] = None,
+        calls_per_day: Optional[int] = None,
+        end: Optional[date] = None,
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.calls_per_minute = calls_per_minute
+        self.calls_per_day = calls_per_day
+        self.end = end or date.today()
+        self._recent: Deque[float] = deque()
+        self._lock = threading.Lock()
+        self._server: Optional[StubServer] = None
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.throttled = 0
+
+    def start(self) -> str:
+        """Start serving; returns the URL to use as VANTAGE_API_BASE_URL"""
+        self._server = StubServer(self.handle).start()
+        return f"{self._server.url}/query"
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.stop()
+
+    def _admit(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and now - self._recent[0] > 60:
+                self._recent.popleft()
+            if self.calls_per_minute is not None and len(self._recent) >= self.calls_per_minute:
+                return False
+            if self.calls_per_day is not None and sum(self.calls.values()) >= self.calls_per_day:
+                return False
+            self._recent.append(now)
+            return True
+
+    def handle(self, method: str, path: str, query: List[Tuple[str, str]], headers: Dict[str, str], body: bytes) -> Response:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        params = dict(query)
+        function = params.get("function", "")
+        if not self._admit():
+            self.throttled += 1
+            return json_response(200, {"Note": RATE_LIMIT_NOTE})
+        self.calls[function] += 1
+
+        symbol = params.get("symbol", "").upper()
+        if function == "GLOBAL_QUOTE":
+            return json_response(200, self._quote(symbol))
+        if function == "TIME_SERIES_DAILY_ADJUSTED":
+            return json_response(200, self._daily(symbol, params.get("outputsize", "compact")))
+        if function == "DIVIDENDS":
+            return json_response(200, {"symbol": symbol, "data": list(reversed(dividend_schedule(symbol, self.end)))})
+        if function == "OVERVIEW":
+            return json_response(200, self._overview(symbol))
+        if function == "SYMBOL_SEARCH":
+            return json_response(200, self._search(params.get("keywords", "")))
+        if function == "FX_DAILY":
+            return json_response(200, self._fx(params.get("from_symbol", "USD"), params.get("to_symbol", "USD")))
+        return json_response(200, {"Error Message": f"Invalid API call: {function}"})
+
+    # ========================================================================
+    # Payloads
+    # ========================================================================
+
+    def _history(self, symbol: str) -> Tuple[Tuple[date, float], ...]:
+        if symbol not in SYMBOLS and symbol not in INDEX_SYMBOLS:
+            return ()
+        return price_history(symbol, self.end)
+
+    def _quote(self, symbol: str) -> Dict[str, Any]:
+        history = self._history(symbol)
+        if len(history) < 2:
+            return {"Global Quote": {}}
+        (_, previous), (day, close) = history[-2], history[-1]
+        change = close - previous
+        return {"Global Quote": {
+            "01. symbol": symbol,
+            "02. open": f"{previous:.4f}",
+            "03. high": f"{max(previous, close) * 1.005:.4f}",
+            "04. low": f"{min(previous, close) * 0.995:.4f}",
+            "05. price": f"{close:.4f}",
+            "06. volume": "1000000",
+            "07. latest trading day": day.isoformat(),
+            "08. previous close": f"{previous:.4f}",
+            "09. change": f"{change:.4f}",
+            "10. change percent": f"{change / previous * 100:.4f}%",
+        }}
+
+    def _daily(self, symbol: str, output_size: str) -> Dict[str, Any]:
+        history = self._history(symbol)
+        if not history:
+            return {"Error Message": f"Invalid API call. Unknown symbol {symbol}"}
+        if output_size != "full":
+            history = history[-100:]
+        series = {
+            day.isoformat(): {
+                "1. open": f"{close:.4f}", "2. high": f"{close * 1.005:.4f}", "3. low": f"{close * 0.995:.4f}",
+                "4. close": f"{close:.4f}", "5. adjusted close": f"{close:.4f}", "6. volume": "1000000",
+                "7. dividend amount": "0.0000", "8. split coefficient": "1.0",
+            }
+            for day, close in reversed(history)
+        }
+        return {"Meta Data": {"2. Symbol": symbol, "3. Last Refreshed": history[-1][0].isoformat()}, "Time Series (Daily)": series}
+
+    def _overview(self, symbol: str) -> Dict[str, Any]:
+        history = self._history(symbol)
+        if not history:
+            return {}
+        closes = [close for _, close in history[-252:]]
+        dividends = dividend_schedule(symbol, self.end)
+        return {
+            "Symbol": symbol, "Name": f"{symbol} Inc.", "Exchange": "NASDAQ", "Currency": "USD",
+            "Country": "USA", "Sector": "TECHNOLOGY", "Industry": "SOFTWARE", "MarketCapitalization": "100000000000",
+            "PERatio": "25.0", "EPS": "5.0", "Beta": "1.1", "52WeekHigh": f"{max(closes):.2f}", "52WeekLow": f"{min(closes):.2f}",
+            "DividendPerShare": f"{sum(float(d['amount']) for d in dividends[-4:]):.2f}" if dividends else "None",
+            "DividendYield": "0.01" if dividends else "0",
+        }
+
+    def _search(self, keywords: str) -> Dict[str, Any]:
+        matches = [s for s in SYMBOLS + INDEX_SYMBOLS if s.startswith(keywords.upper())][:10]
+        return {"bestMatches": [
+            {"1. symbol": s, "2. name": f"{s} Inc.", "3. type": "Equity", "4. region": "United States",
+             "8. currency": "USD", "9. matchScore": "1.0000"}
+            for s in matches
+        ]}
+
+    def _fx(self, from_symbol: str, to_symbol: str) -> Dict[str, Any]:
+        rate = 1.0 if from_symbol == to_symbol else 1.5
+        days = [self.end - timedelta(days=i) for i in range(100)]
+        return {"Time Series FX (Daily)": {
+            day.isoformat(): {"1. open": str(rate), "2. high": str(rate), "3. low": str(rate), "4. close": str(rate)}
+            for day in days if day.weekday() < 5
+        }}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Calls by function and how many were throttled"""
+        return {"calls": dict(self.calls), "total_calls": sum(self.calls.values()), "throttled": self.throttled}
@@ -0,0 +1,458 @@
+"""
+Fake Supabase backend: PostgREST tables and RPCs plus /auth/v1/user
+
+Implements the subset of PostgREST the services use: select with column
+lists, eq/neq/gt/gte/lt/lte/in/is/like/ilike filters (and not.), order,
+limit/offset, single-object responses, insert, upsert (on_conflict or the
+table's key), update and delete with return=representation, and
+count=exact. Rows live in memory; tables are created on first write.
+
+RPCs mirror the SQL functions in supabase/migrations (lease locks, cache
+access stats, snapshot section and price cache cleanup).
+"""
+
+import base64
+import fnmatch
+import itertools
+import json
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.loadtest.server import Response, StubServer, json_response
+
+# Conflict target of upserts without on_conflict (primary or unique key)
+TABLE_KEYS: Dict[str, Tuple[str, ...]] = {
+    "api_cache": ("cache_key",),
+    "circuit_breaker_state": ("service_name",),
+    "company_financials": ("symbol", "data_type"),
+    "forex_rates": ("from_currency", "to_currency", "date"),
+    "historical_prices": ("symbol", "date"),
+    "lock_leases": ("lock_name",),
+    "market_info_cache": ("symbol",),
+    "portfolio_caches": ("user_id", "cache_key"),
+    "portfolio_snapshot_sections": ("content_hash",),
+    "previous_day_price_cache": ("symbol",),
+    "price_quote_cache": ("symbol", "cache_key"),
+    "price_request_cache": ("request_key",),
+    "price_update_log": ("symbol",),
+    "stock_symbols": ("symbol",),
+    "user_currency_cache": ("user_id",),
+    "user_performance": ("user_id",),
+    "user_profiles": ("user_id",),
+}
+
+# Equality-filter index per large table, so per-symbol and per-user reads
+# don't scan every seeded row
+INDEXED_COLUMNS: Dict[str, str] = {
+    "historical_prices": "symbol",
+    "transactions": "user_id",
+    "user_dividends": "symbol",
+}
+
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+Row = Dict[str, Any]
+Rpc = Callable[["FakePostgrest", Dict[str, Any]], Any]
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _coerce(stored: Any, raw: str) -> Any:
+    """Filter value in the type of the stored column value"""
+    if isinstance(stored, bool):
+        return raw.lower() == "true"
+    if isinstance(stored, (int, float)):
+        try:
+            return float(raw)
+        except ValueError:
+            return raw
+    return raw
+
+
+def _comparable(stored: Any) -> Any:
+    if isinstance(stored, bool):
+        return stored
+    if isinstance(stored, (int, float)):
+        return float(stored)
+    return stored if isinstance(stored, str) else json.dumps(stored, sort_keys=True)
+
+
+def _in_values(raw: str) -> List[str]:
+    inner = raw[1:-1] if raw.startswith("(") and raw.endswith(")") else raw
+    return [value.strip().strip('"') for value in inner.split(",")] if inner else []
+
+
+def _matches(row: Row, column: str, expression: str) -> bool:
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    operator, _, raw = expression.partition(".")
+    stored = row.get(column)
+
+    if operator == "is":
+        result = stored is None if raw == "null" else stored is (raw == "true")
+    elif stored is None:
+        result = False
+    elif operator == "in":
+        result = any(_comparable(stored) == _coerce(stored, value) for value in _in_values(raw))
+    elif operator in ("like", "ilike"):
+        pattern = raw.replace("%", "*")
+        text = str(stored)
+        result = fnmatch.fnmatchcase(text.lower(), pattern.lower()) if operator == "ilike" else fnmatch.fnmatchcase(text, pattern)
+    else:
+        left, right = _comparable(stored), _coerce(stored, raw)
+        try:
+            result = {
+                "eq": left == right,
+                "neq": left != right,
+                "gt": left > right,
+                "gte": left >= right,
+                "lt": left < right,
+                "lte": left <= right,
+            }[operator]
+        except (KeyError, TypeError):
+            raise ValueError(f"Unsupported filter {column}={expression}")
+    return not result if negate else result
+
+
+def _order(rows: List[Row], order: str) -> List[Row]:
+    for term in reversed(order.split(",")):
+        parts = term.split(".")
+        column, descending = parts[0], len(parts) > 1 and parts[1] == "desc"
+        nulls_first = "nullsfirst" in parts or (descending and "nullslast" not in parts)
+        present = [row for row in rows if row.get(column) is not None]
+        missing = [row for row in rows if row.get(column) is None]
+        present.sort(key=lambda row: _comparable(row[column]), reverse=descending)
+        rows = missing + present if nulls_first else present + missing
+    return rows
+
+
+def _project(row: Row, columns: List[str]) -> Row:
+    if not columns or "*" in columns:
+        return dict(row)
+    return {column: row.get(column) for column in columns}
+
+
+class FakePostgrest:
+    """
+    In-memory tables and RPCs behind a PostgREST-shaped HTTP API.
+
+    Args:
+        latency_ms: Added to every request (network and query time)
+    """
+
+    def __init__(self, latency_ms: float = 0.0) -> None:
+        self.latency_ms = latency_ms
+        self.tables: Dict[str, List[Row]] = defaultdict(list)
+        self.rpcs: Dict[str, Rpc] = dict(DEFAULT_RPCS)
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        self._sequence = itertools.count(1)
+        self._indexes: Dict[str, Dict[Any, List[Row]]] = {}
+        self._server: Optional[StubServer] = None
+        self.requests: Dict[str, int] = defaultdict(int)
+        self.rows_returned = 0
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    # ========================================================================
+    # Seeding
+    # ========================================================================
+
+    def seed(self, table: str, rows: List[Row]) -> None:
+        """Append rows without upsert checks (bulk loading)"""
+        with self._lock:
+            for row in rows:
+                self.tables[table].append(self._with_defaults(table, dict(row)))
+            self._indexes.pop(table, None)
+
+    def add_user(self, user_id: str, email: str) -> None:
+        """Make a user known to /auth/v1/user"""
+        self.users[user_id] = {"id": user_id, "email": email}
+
+    def _with_defaults(self, table: str, row: Row) -> Row:
+        if "id" not in row and TABLE_KEYS.get(table, ("id",)) == ("id",):
+            row["id"] = next(self._sequence) if table == "historical_prices" else str(uuid.uuid4())
+        row.setdefault("created_at", _now_iso())
+        return row
+
+    # ========================================================================
+    # HTTP
+    # ========================================================================
+
+    def start(self) -> str:
+        """Start serving; returns the base URL to use as SUPA_API_URL"""
+        self._server = StubServer(self.handle).start()
+        return self._server.url
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.stop()
+
+    def handle(self, method: str, path: str, query: List[Tuple[str, str]], headers: Dict[str, str], body: bytes) -> Response:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        if path.startswith("/auth/v1/user"):
+            return self._auth_user(headers)
+        if path.startswith("/rest/v1/rpc/"):
+            name = path[len("/rest/v1/rpc/"):]
+            self.requests[f"rpc:{name}"] += 1
+            return self._rpc(name, json.loads(body or b"{}"))
+        if not path.startswith("/rest/v1/"):
+            return json_response(404, {"message": f"No route {path}"})
+
+        table = path[len("/rest/v1/"):]
+        self.requests[f"{method}:{table}"] += 1
+        prefer = headers.get("prefer", "")
+        params = {key: value for key, value in query if key in RESERVED_PARAMS}
+        filters = [(key, value) for key, value in query if key not in RESERVED_PARAMS]
+        try:
+            with self._lock:
+                if method in ("GET", "HEAD"):
+                    rows = self._select(table, filters, params)
+                elif method == "POST":
+                    self._indexes.pop(table, None)
+                    rows = self._insert(table, json.loads(body or b"[]"), prefer, params.get("on_conflict"))
+                elif method == "PATCH":
+                    self._indexes.pop(table, None)
+                    rows = self._update(table, filters, json.loads(body or b"{}"))
+                elif method == "DELETE":
+                    self._indexes.pop(table, None)
+                    rows = self._delete(table, filters)
+                else:
+                    return json_response(405, {"message": f"{method} not supported"})
+        except _Conflict as e:
+            self.errors[table] += 1
+            return json_response(409, {"code": "23505", "message": str(e), "details": None, "hint": None})
+        except ValueError as e:
+            self.errors[table] += 1
+            return json_response(400, {"code": "PGRST100", "message": str(e), "details": None, "hint": None})
+
+        total = len(rows)
+        if method in ("GET", "HEAD"):
+            offset, limit = int(params.get("offset", 0)), params.get("limit")
+            rows = rows[offset: offset + int(limit) if limit is not None else None]
+        columns = [c for c in params.get("select", "*").split(",") if c]
+        rows = [_project(row, columns) for row in rows]
+        self.rows_returned += len(rows)
+
+        response_headers = {}
+        if "count=exact" in prefer:
+            response_headers["Content-Range"] = f"0-{max(len(rows) - 1, 0)}/{total}"
+        if method != "GET" and "return=representation" not in prefer:
+            return 201 if method == "POST" else 204, response_headers, b""
+        if headers.get("accept") == "application/vnd.pgrst.object+json":
+            if len(rows) != 1:
+                return json_response(406, {
+                    "code": "PGRST116",
+                    "details": f"The result contains {len(rows)} rows",
+                    "hint": None,
+                    "message": "JSON object requested, multiple (or no) rows returned",
+                })
+            return json_response(200, rows[0], response_headers)
+        return json_response(201 if method == "POST" else 200, rows, response_headers)
+
+    # ========================================================================
+    # Table Operations
+    # ========================================================================
+
+    def _candidates(self, table: str, filters: List[Tuple[str, str]]) -> List[Row]:
+        column = INDEXED_COLUMNS.get(table)
+        expression = next((e for c, e in filters if c == column and e.startswith(("eq.", "in."))), None)
+        if expression is None:
+            return self.tables.get(table, [])
+        index = self._indexes.get(table)
+        if index is None:
+            index = defaultdict(list)
+            for row in self.tables.get(table, []):
+                index[row.get(column)].append(row)
+            self._indexes[table] = index
+        operator, _, raw = expression.partition(".")
+        values = [raw] if operator == "eq" else _in_values(raw)
+        return [row for value in values for row in index.get(value, [])]
+
+    def _filtered(self, table: str, filters: List[Tuple[str, str]]) -> List[Row]:
+        return [row for row in self._candidates(table, filters) if all(_matches(row, c, e) for c, e in filters)]
+
+    def _select(self, table: str, filters: List[Tuple[str, str]], params: Dict[str, str]) -> List[Row]:
+        rows = self._filtered(table, filters)
+        if params.get("order"):
+            rows = _order(rows, params["order"])
+        return rows
+
+    def _insert(self, table: str, payload: Any, prefer: str, on_conflict: Optional[str]) -> List[Row]:
+        records = payload if isinstance(payload, list) else [payload]
+        upsert = "resolution=" in prefer
+        ignore = "resolution=ignore-duplicates" in prefer
+        keys = tuple(on_conflict.split(",")) if on_conflict else TABLE_KEYS.get(table, ("id",))
+        existing = {tuple(row.get(k) for k in keys): row for row in self.tables[table]}
+
+        written = []
+        for record in records:
+            key = tuple(record.get(k) for k in keys)
+            current = existing.get(key) if None not in key else None
+            if current is not None:
+                if not upsert:
+                    raise _Conflict(f'duplicate key value violates unique constraint "{table}_pkey"')
+                if not ignore:
+                    current.update(record)
+                    current["updated_at"] = _now_iso()
+                    written.append(current)
+                continue
+            row = self._with_defaults(table, dict(record))
+            self.tables[table].append(row)
+            existing[tuple(row.get(k) for k in keys)] = row
+            written.append(row)
+        return written
+
+    def _update(self, table: str, filters: List[Tuple[str, str]], values: Row) -> List[Row]:
+        rows = self._filtered(table, filters)
+        for row in rows:
+            row.update(values)
+        return rows
+
+    def _delete(self, table: str, filters: List[Tuple[str, str]]) -> List[Row]:
+        rows = self._filtered(table, filters)
+        if rows:
+            doomed = {id(row) for row in rows}
+            self.tables[table] = [row for row in self.tables[table] if id(row) not in doomed]
+        return rows
+
+    # ========================================================================
+    # RPC and Auth
+    # ========================================================================
+
+    def _rpc(self, name: str, args: Dict[str, Any]) -> Response:
+        function = self.rpcs.get(name)
+        if function is None:
+            self.errors[f"rpc:{name}"] += 1
+            return json_response(404, {
+                "code": "PGRST202", "details": None, "hint": None,
+                "message": f"Could not find the function public.{name} in the schema cache",
+            })
+        with self._lock:
+            return json_response(200, function(self, args))
+
+    def _auth_user(self, headers: Dict[str, str]) -> Response:
+        token = headers.get("authorization", "").removeprefix("Bearer ").strip()
+        try:
+            claims = json.loads(base64.urlsafe_b64decode(token.split(".")[1] + "=="))
+        except Exception:
+            return json_response(401, {"code": 401, "msg": "invalid JWT"})
+        user = self.users.get(claims.get("sub", ""))
+        if user is None:
+            return json_response(401, {"code": 401, "msg": "User not found"})
+        created = "2024-01-01T00:00:00+00:00"
+        return json_response(200, {
+            **user, "aud": "authenticated", "role": "authenticated",
+            "app_metadata": {"provider": "email"}, "user_metadata": {},
+            "created_at": created, "updated_at": created,
+        })
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Request counts by method:table, rows returned and error counts"""
+        return {
+            "requests": dict(sorted(self.requests.items(), key=lambda item: -item[1])),
+            "total_requests": sum(self.requests.values()),
+            "rows_returned": self.rows_returned,
+            "errors": dict(self.errors),
+            "table_sizes": {table: len(rows) for table, rows in sorted(self.tables.items())},
+        }
+
+
+class _Conflict(Exception):
+    pass
+
+
+# ============================================================================
+# RPCs (see supabase/migrations)
+# ============================================================================
+
+_tokens = itertools.count(1)
+
+
+def _lease(store: FakePostgrest, name: str) -> Optional[Row]:
+    for row in store.tables["lock_leases"]:
+        if row["lock_name"] == name:
+            return row
+    return None
+
+
+def _acquire_lease_lock(store: FakePostgrest, args: Dict[str, Any]) -> List[Row]:
+    now, ttl = time.time(), args.get("p_ttl_seconds", 300)
+    lease = _lease(store, args["p_lock_name"])
+    if lease is not None and lease["expires"] > now:
+        return [{"fencing_token": None, "expires_in_seconds": lease["expires"] - now}]
+    token = next(_tokens)
+    if lease is None:
+        store.tables["lock_leases"].append({"lock_name": args["p_lock_name"]})
+        lease = store.tables["lock_leases"][-1]
+    lease.update(holder=args["p_holder"], fencing_token=token, expires=now + ttl)
+    return [{"fencing_token": token, "expires_in_seconds": float(ttl)}]
+
+
+def _renew_lease_lock(store: FakePostgrest, args: Dict[str, Any]) -> bool:
+    lease = _lease(store, args["p_lock_name"])
+    if lease is None or (lease["holder"], lease["fencing_token"]) != (args["p_holder"], args["p_fencing_token"]):
+        return False
+    if lease["expires"] <= time.time():
+        return False
+    lease["expires"] = time.time() + args.get("p_ttl_seconds", 300)
+    return True
+
+
+def _release_lease_lock(store: FakePostgrest, args: Dict[str, Any]) -> bool:
+    lease = _lease(store, args["p_lock_name"])
+    if lease is None or (lease["holder"], lease["fencing_token"]) != (args["p_holder"], args["p_fencing_token"]):
+        return False
+    store.tables["lock_leases"].remove(lease)
+    return True
+
+
+def _check_lease_lock(store: FakePostgrest, args: Dict[str, Any]) -> Optional[float]:
+    lease = _lease(store, args["p_lock_name"])
+    if lease is None or lease["expires"] <= time.time():
+        return None
+    return lease["expires"] - time.time()
+
+
+def _flush_cache_access_stats(store: FakePostgrest, args: Dict[str, Any]) -> int:
+    counter = "access_count" if args["p_table"] == "user_performance" else "hit_count"
+    updated = 0
+    for entry in args.get("p_entries") or []:
+        for row in store.tables[args["p_table"]]:
+            if row.get("user_id") == entry["user_id"] and entry.get("cache_key") in (None, row.get("cache_key")):
+                row[counter] = (row.get(counter) or 0) + entry["hits"]
+                row["last_accessed"] = entry.get("last_accessed")
+                updated += 1
+    return updated
+
+
+def _cleanup_orphaned_snapshot_sections(store: FakePostgrest, args: Dict[str, Any]) -> int:
+    referenced = json.dumps([row.get("sections") for row in store.tables["user_performance"]], default=str)
+    sections = store.tables["portfolio_snapshot_sections"]
+    kept = [row for row in sections if row["content_hash"] in referenced]
+    store.tables["portfolio_snapshot_sections"] = kept
+    return len(sections) - len(kept)
+
+
+def _cleanup_expired_price_caches(store: FakePostgrest, args: Dict[str, Any]) -> None:
+    now = _now_iso()
+    for table in ("price_quote_cache", "price_request_cache", "previous_day_price_cache", "market_info_cache"):
+        store.tables[table] = [row for row in store.tables[table] if (row.get("expires_at") or now) >= now]
+
+
+DEFAULT_RPCS: Dict[str, Rpc] = {
+    "acquire_lease_lock": _acquire_lease_lock,
+    "renew_lease_lock": _renew_lease_lock,
+    "release_lease_lock": _release_lease_lock,
+    "check_lease_lock": _check_lease_lock,
+    "flush_cache_access_stats": _flush_cache_access_stats,
+    "cleanup_orphaned_snapshot_sections": _cleanup_orphaned_snapshot_sections,
+    "cleanup_expired_price_caches": _cleanup_expired_price_caches,
+}
@@ -0,0 +1,80 @@
+"""
+Threaded HTTP server on 127.0.0.1 for the service fakes
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+# (status, headers, body) returned by a fake for one request
+Response = Tuple[int, Dict[str, str], bytes]
+# handler(method, path, query pairs, headers, body bytes)
+Handler = Callable[[str, str, List[Tuple[str, str]], Dict[str, str], bytes], Response]
+
+
+def json_response(status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    return status, {"Content-Type": "application/json", **(headers or {})}, json.dumps(payload, default=str).encode()
+
+
+class StubServer:
+    """
+    Serves a handler function over HTTP/1.1 keep-alive, one thread per connection.
+
+    Args:
+        handler: Called for every request; returns (status, headers, body)
+    """
+
+    def __init__(self, handler: Handler) -> None:
+        self.handler = handler
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        assert self._server is not None
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubServer":
+        handler = self.handler
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _dispatch(self) -> None:
+                split = urlsplit(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                headers = {key.lower(): value for key, value in self.headers.items()}
+                try:
+                    status, response_headers, payload = handler(
+                        self.command, split.path, parse_qsl(split.query, keep_blank_values=True), headers, body
+                    )
+                except Exception as e:
+                    status, response_headers, payload = json_response(500, {"message": f"{type(e).__name__}: {e}"})
+                self.send_response(status)
+                for key, value in response_headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(payload)
+
+            do_GET = do_POST = do_PATCH = do_DELETE = do_HEAD = do_PUT = _dispatch
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), RequestHandler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,225 @@
+"""
+Synthetic market data and users for load tests
+
+Prices are a seeded random walk per symbol, so the seeded historical_prices
+rows and the fake Alpha Vantage responses agree. Users come in ledger-size
+tiers (a handful of trades up to thousands) with BUY/SELL histories priced
+at the day's close and dividends assigned from their holdings.
+"""
+
+import base64
+import json
+import random
+import uuid
+import zlib
+from datetime import date, timedelta
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+SYMBOLS = [
+    "AAPL", "MSFT", "GOOGL", "AMZN", "NVDA", "META", "TSLA", "BRK.B", "JPM", "V",
+    "UNH", "XOM", "JNJ", "WMT", "MA", "PG", "HD", "CVX", "MRK", "ABBV",
+    "KO", "PEP", "AVGO", "COST", "LLY", "MCD", "TMO", "CSCO", "ACN", "ABT",
+    "DHR", "NKE", "ADBE", "CRM", "TXN", "NEE", "PM", "ORCL", "LIN", "INTC",
+    "AMD", "QCOM", "HON", "IBM", "CAT", "GS", "SBUX", "BA", "MMM", "DIS",
+]
+INDEX_SYMBOLS = ["SPY", "QQQ"]
+
+HISTORY_YEARS = 6
+
+
+def _rng(*parts: Any) -> random.Random:
+    return random.Random(zlib.crc32(":".join(str(p) for p in parts).encode()))
+
+
+def trading_days(start: date, end: date) -> List[date]:
+    """Weekdays from start to end inclusive (holidays are ignored)"""
+    days = []
+    current = start
+    while current <= end:
+        if current.weekday() < 5:
+            days.append(current)
+        current += timedelta(days=1)
+    return days
+
+
+@lru_cache(maxsize=None)
+def price_history(symbol: str, end: date) -> Tuple[Tuple[date, float], ...]:
+    """Daily closes for HISTORY_YEARS up to end"""
+    rng = _rng("prices", symbol)
+    price = rng.uniform(20, 400)
+    drift, volatility = rng.uniform(-0.0001, 0.0008), rng.uniform(0.008, 0.03)
+    history = []
+    for day in trading_days(end - timedelta(days=365 * HISTORY_YEARS), end):
+        price = max(price * (1 + rng.gauss(drift, volatility)), 1.0)
+        history.append((day, round(price, 4)))
+    return tuple(history)
+
+
+def price_rows(symbol: str, end: date) -> List[Dict[str, Any]]:
+    """historical_prices rows for a symbol"""
+    rows = []
+    previous = None
+    for day, close in price_history(symbol, end):
+        open_price = previous or close
+        rows.append({
+            "symbol": symbol,
+            "date": day.isoformat(),
+            "open": open_price,
+            "high": round(max(open_price, close) * 1.005, 4),
+            "low": round(min(open_price, close) * 0.995, 4),
+            "close": close,
+            "adjusted_close": close,
+            "volume": 1_000_000 + zlib.crc32(f"{symbol}{day}".encode()) % 9_000_000,
+            "dividend_amount": 0,
+            "split_coefficient": 1,
+        })
+        previous = close
+    return rows
+
+
+def dividend_schedule(symbol: str, end: date) -> List[Dict[str, Any]]:
+    """Quarterly dividends for about half the symbols (Alpha Vantage DIVIDENDS shape)"""
+    rng = _rng("dividends", symbol)
+    if symbol in INDEX_SYMBOLS or rng.random() < 0.5:
+        return []
+    amount = round(rng.uniform(0.1, 1.5), 4)
+    ex_date = end - timedelta(days=365 * HISTORY_YEARS) + timedelta(days=rng.randrange(90))
+    schedule = []
+    while ex_date <= end:
+        schedule.append({
+            "ex_dividend_date": ex_date.isoformat(),
+            "declaration_date": (ex_date - timedelta(days=14)).isoformat(),
+            "record_date": (ex_date + timedelta(days=1)).isoformat(),
+            "payment_date": (ex_date + timedelta(days=21)).isoformat(),
+            "amount": str(amount),
+        })
+        ex_date += timedelta(days=91)
+    return schedule
+
+
+def make_token(user_id: str, email: str) -> str:
+    """Unsigned JWT the fake /auth/v1/user accepts"""
+    def encode(payload: Dict[str, Any]) -> str:
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+    return f"{encode({'alg': 'HS256', 'typ': 'JWT'})}.{encode({'sub': user_id, 'email': email, 'role': 'authenticated'})}.signature"
+
+
+class SyntheticUser:
+    """A user with a generated ledger"""
+
+    def __init__(self, index: int, ledger_size: int, end: date) -> None:
+        self.id = str(uuid.UUID(int=_rng("user", index).getrandbits(128)))
+        self.email = f"loadtest-{index}@example.com"
+        self.ledger_size = ledger_size
+        self.token = make_token(self.id, self.email)
+        self.transactions = self._ledger(index, end)
+
+    def _ledger(self, index: int, end: date) -> List[Dict[str, Any]]:
+        rng = _rng("ledger", index)
+        universe = rng.sample(SYMBOLS, min(len(SYMBOLS), max(3, self.ledger_size // 20)))
+        closes = {symbol: dict(price_history(symbol, end)) for symbol in universe}
+        days = sorted(rng.sample(sorted(closes[universe[0]]), min(self.ledger_size, len(closes[universe[0]]))))
+        held: Dict[str, Decimal] = {}
+        transactions = []
+        for day in days:
+            symbol = rng.choice(universe)
+            quantity = Decimal(rng.randint(1, 50))
+            transaction_type = "BUY"
+            if held.get(symbol, 0) > 5 and rng.random() < 0.25:
+                transaction_type = "SELL"
+                quantity = min(quantity, held[symbol])
+            held[symbol] = held.get(symbol, Decimal(0)) + (quantity if transaction_type == "BUY" else -quantity)
+            transactions.append({
+                "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                "user_id": self.id,
+                "transaction_type": transaction_type,
+                "symbol": symbol,
+                "quantity": str(quantity),
+                "price": str(round(Decimal(str(closes[symbol][day])), 4)),
+                "date": day.isoformat(),
+                "currency": "USD",
+                "commission": "0",
+                "amount_invested": str(round(quantity * Decimal(str(closes[symbol][day])), 2)),
+                "market_region": "United States",
+                "market_open": "09:30:00",
+                "market_close": "16:00:00",
+                "market_timezone": "UTC-05",
+                "market_currency": "USD",
+                "exchange_rate": "1",
+            })
+        return transactions
+
+    def holdings_on(self, day: date) -> Dict[str, Decimal]:
+        held: Dict[str, Decimal] = {}
+        for transaction in self.transactions:
+            if transaction["date"] >= day.isoformat():
+                break
+            sign = 1 if transaction["transaction_type"] == "BUY" else -1
+            held[transaction["symbol"]] = held.get(transaction["symbol"], Decimal(0)) + sign * Decimal(transaction["quantity"])
+        return held
+
+    def dividend_rows(self, end: date) -> List[Dict[str, Any]]:
+        """user_dividends rows for dividends paid while holding"""
+        rows = []
+        for symbol in sorted({t["symbol"] for t in self.transactions}):
+            for dividend in dividend_schedule(symbol, end):
+                ex_date = date.fromisoformat(dividend["ex_dividend_date"])
+                shares = self.holdings_on(ex_date).get(symbol, Decimal(0))
+                if shares <= 0:
+                    continue
+                amount = Decimal(dividend["amount"])
+                rows.append({
+                    "symbol": symbol,
+                    "user_id": self.id,
+                    "ex_date": dividend["ex_dividend_date"],
+                    "pay_date": dividend["payment_date"],
+                    "declaration_date": dividend["declaration_date"],
+                    "record_date": dividend["record_date"],
+                    "amount": str(amount),
+                    "currency": "USD",
+                    "shares_held_at_ex_date": str(shares),
+                    "current_holdings": str(shares),
+                    "total_amount": str(round(amount * shares, 2)),
+                    "confirmed": True,
+                    "status": "confirmed",
+                    "dividend_type": "cash",
+                    "source": "alpha_vantage",
+                    "rejected": False,
+                })
+        return rows
+
+
+def generate_users(ledger_sizes: List[int], users_per_size: int, end: date) -> List[SyntheticUser]:
+    """users_per_size users for every ledger size"""
+    users = []
+    for size in ledger_sizes:
+        for _ in range(users_per_size):
+            users.append(SyntheticUser(len(users), size, end))
+    return users
+
+
+def seed_backend(store: Any, users: List[SyntheticUser], end: date) -> Dict[str, int]:
+    """
+    Load users, ledgers, dividends, prices and symbols into a FakePostgrest.
+
+    Returns:
+        Rows seeded per table
+    """
+    symbols = sorted({t["symbol"] for user in users for t in user.transactions} | set(INDEX_SYMBOLS))
+    for symbol in symbols:
+        store.seed("historical_prices", price_rows(symbol, end))
+    store.seed("stock_symbols", [
+        {"symbol": symbol, "name": f"{symbol} Inc.", "exchange": "NASDAQ", "type": "Equity", "currency": "USD", "country": "United States"}
+        for symbol in SYMBOLS + INDEX_SYMBOLS
+    ])
+    for user in users:
+        store.add_user(user.id, user.email)
+        store.seed("transactions", user.transactions)
+        store.seed("user_dividends", user.dividend_rows(end))
+        store.seed("user_profiles", [{
+            "user_id": user.id, "first_name": "Load", "last_name": "Test",
+            "country": "US", "base_currency": "USD",
+        }])
+    return {table: len(rows) for table, rows in store.tables.items()}
@@ -13,6 +13,8 @@ load_dotenv()
 SUPA_API_URL = os.getenv("SUPA_API_URL", "")
 SUPA_API_ANON_KEY = os.getenv("SUPA_API_ANON_KEY", "")
 SUPA_API_SERVICE_KEY = os.getenv("SUPA_API_SERVICE_KEY", "")
+# Direct Postgres connection, used only to LISTEN for lock releases (optional)
+SUPA_DB_URL = os.getenv("SUPA_DB_URL", "")
 
 VANTAGE_API_KEY = os.getenv("VANTAGE_API_KEY", "")
 VANTAGE_API_BASE_URL = os.getenv("VANTAGE_API_BASE_URL", "https://www.alphavantage.co/query")
@@ -50,6 +52,22 @@ if BACKEND_API_DEBUG:
 # Cache Settings
 CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "3600"))  # 1 hour default
 
+# In-memory cache budget (entries and approximate bytes across all shards)
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+CACHE_SHARDS = int(os.getenv("CACHE_SHARDS", "16"))
+CACHE_EVICTION_POLICY = os.getenv("CACHE_EVICTION_POLICY", "lru").lower()  # "lru" or "lfu"
+
+# Snapshot section compression: "gzip" (default) or "zstd". Every worker sharing
+# the database must be able to read the chosen codec, so zstd is opt-in.
+SNAPSHOT_CODEC = os.getenv("SNAPSHOT_CODEC", "gzip").lower()
+
+# Multi-worker deployment: each worker keeps its own in-memory caches and
+# broadcasts invalidations ("postgres" LISTEN/NOTIFY, or "local" for one process)
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))  # also read by uvicorn for --workers
+MULTI_WORKER = WEB_CONCURRENCY > 1 or os.getenv("MULTI_WORKER", "false").lower() == "true"
+INVALIDATION_BUS = os.getenv("INVALIDATION_BUS", "postgres" if MULTI_WORKER else "local").lower()
+
 # Logging
 LOG_LEVEL = os.getenv("LOG_LEVEL", "WARNING")
 LOG_FORMAT = "[%(asctime)s] [%(name)s] [%(levelname)s] %(message)s"
@@ -60,6 +78,31 @@ RATE_LIMIT_PER_MINUTE = int(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
 # Debug logging control
 DEBUG_INFO_LOGGING = os.getenv('DEBUG_INFO_LOGGING', 'false').lower() == 'true'
 
+# Tracing (spans, latency histograms); off by default
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+TRACING_SAMPLE_RATE = float(os.getenv("TRACING_SAMPLE_RATE", "0.1"))
+TRACING_BUFFER_SIZE = int(os.getenv("TRACING_BUFFER_SIZE", "512"))
+
+# Users allowed to change process-wide debug settings (tracing, profiling) and read
+# every user's traces; comma-separated Supabase user ids. Users whose app_metadata
+# role is "admin" are admins too.
+ADMIN_USER_IDS = frozenset(uid.strip() for uid in os.getenv("ADMIN_USER_IDS", "").split(",") if uid.strip())
+
+# Per-request profiling; off by default, requests opt in with an X-Profile header
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0.0"))  # profile requests without the header too
+PROFILING_CPROFILE_SAMPLE_RATE = float(os.getenv("PROFILING_CPROFILE_SAMPLE_RATE", "0.0"))
+PROFILING_BUFFER_SIZE = int(os.getenv("PROFILING_BUFFER_SIZE", "50"))
+
+# Prometheus-style /metrics endpoint; on by default, cheap enough for production
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_AUTH_TOKEN = os.getenv("METRICS_AUTH_TOKEN", "")  # if set, scrapes must send it as a bearer token
+METRICS_LOOP_LAG_INTERVAL = float(os.getenv("METRICS_LOOP_LAG_INTERVAL", "0.5"))  # seconds; 0 disables the probe
+
+# Event loop watchdog: stalls longer than the threshold are attributed to a call site
+LOOP_WATCHDOG_ENABLED = os.getenv("LOOP_WATCHDOG_ENABLED", "true").lower() == "true"
+LOOP_WATCHDOG_THRESHOLD_MS = float(os.getenv("LOOP_WATCHDOG_THRESHOLD_MS", "100"))
+
 # Validate required environment variables
 required_vars = [
     "SUPA_API_URL",
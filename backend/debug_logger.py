@@ -1,7 +1,8 @@
 """
 Extensive debug logging system for the backend
-Logs file, function, API, sender/receiver, and data
+Traces file, function, API and sender/receiver of every API call
 """
+import asyncio
 import logging
 import json
 import traceback
@@ -10,6 +11,8 @@ from typing import Any, Dict, Optional, Callable
 import time
 from datetime import datetime
 from config import DEBUG_INFO_LOGGING
+from utils.tracing import tracer
+from utils.request_profiler import request_profiler
 
 # Configure logging
 logging.basicConfig(
@@ -78,194 +81,124 @@ class DebugLogger:
     
     @staticmethod
     def log_api_call(api_name: str, sender: str, receiver: str, operation: str = "") -> Callable[[Callable], Callable]:
-        """Decorator for logging API calls with extensive details"""
+        """
+        Decorator tracing API calls.
+
+        Everything static (names, span attributes) is resolved once at
+        decoration time. With tracing off a call costs a flag check and a
+        timer read; arguments are never serialized. Failures are always
+        logged with their traceback.
+        """
         def decorator(func) -> Callable:
+            file_name = func.__module__
+            function_name = func.__name__
+            span_name = f"{api_name}.{operation or function_name}"
+            attributes = {
+                "api": api_name,
+                "operation": operation,
+                "sender": sender,
+                "receiver": receiver,
+                "function": f"{file_name}.{function_name}",
+            }
+
             @wraps(func)
             async def async_wrapper(*args, **kwargs) -> Any:
-                start_time = time.time()
-                file_name = func.__module__
-                function_name = func.__name__
-                
-                # Log the start of the API call
-                logger.info(f"""
-========== API CALL START ==========
-FILE: {file_name}
-FUNCTION: {function_name}
-API: {api_name}
-OPERATION: {operation}
-SENDER: {sender}
-RECEIVER: {receiver}
-ARGS: {DebugLogger._safe_serialize(args)}
-
-====================================""")
+                start_time = time.perf_counter()
+                if not tracer.enabled:
+                    try:
+                        return await func(*args, **kwargs)
+                    except Exception as e:
+                        DebugLogger._log_call_error(file_name, function_name, api_name, start_time, e)
+                        raise
 
-#KWARGS: {DebugLogger._safe_serialize(kwargs)}
-                
+                span, token = tracer.start_span(span_name, attributes)
                 try:
-                    # Execute the function
                     result = await func(*args, **kwargs)
-                    
-                    # Calculate execution time
-                    execution_time = time.time() - start_time
-                    
-                    # Log successful completion
-                    # logger.info(f"""
-# ========== API CALL SUCCESS ==========
-# FILE: {file_name}
-# FUNCTION: {function_name}
-# API: {api_name}
-# EXECUTION_TIME: {execution_time:.3f}s
-# RESULT_TYPE: {type(result).__name__}
-# RESULT_PREVIEW: {DebugLogger._safe_serialize(result)[:500]}...
-# ======================================""")
-                    
-                    return result
-                    
-                except Exception as e:
-                    # Calculate execution time
-                    execution_time = time.time() - start_time
-                    
-                    # Log the error with full traceback
-                    logger.error(f"""
-========== API CALL ERROR ==========
-FILE: {file_name}
-FUNCTION: {function_name}
-API: {api_name}
-EXECUTION_TIME: {execution_time:.3f}s
-ERROR_TYPE: {type(e).__name__}
-ERROR_MESSAGE: {str(e)}
-TRACEBACK:
-{traceback.format_exc()}
-====================================""")
+                except BaseException as e:
+                    tracer.end_span(span, token, e)
+                    if isinstance(e, Exception):
+                        DebugLogger._log_call_error(file_name, function_name, api_name, start_time, e)
                     raise
-                    
+                tracer.end_span(span, token)
+                return result
+
             @wraps(func)
             def sync_wrapper(*args, **kwargs) -> Any:
-                start_time = time.time()
-                file_name = func.__module__
-                function_name = func.__name__
-                
-                # Log the start of the API call
-                logger.info(f"""
-========== API CALL START ==========
-FILE: {file_name}
-FUNCTION: {function_name}
-API: {api_name}
-OPERATION: {operation}
-SENDER: {sender}
-RECEIVER: {receiver}
-ARGS: {DebugLogger._safe_serialize(args)}
-KWARGS: {DebugLogger._safe_serialize(kwargs)}
-====================================""")
-                
+                start_time = time.perf_counter()
+                if not tracer.enabled:
+                    try:
+                        return func(*args, **kwargs)
+                    except Exception as e:
+                        DebugLogger._log_call_error(file_name, function_name, api_name, start_time, e)
+                        raise
+
+                span, token = tracer.start_span(span_name, attributes)
                 try:
-                    # Execute the function
                     result = func(*args, **kwargs)
-                    
-                    # Calculate execution time
-                    execution_time = time.time() - start_time
-                    
-                    # Log successful completion
-                    # logger.info(f"""
-# ========== API CALL SUCCESS ==========
-# FILE: {file_name}
-# FUNCTION: {function_name}
-# API: {api_name}
-# EXECUTION_TIME: {execution_time:.3f}s
-# RESULT_TYPE: {type(result).__name__}
-# RESULT_PREVIEW: {DebugLogger._safe_serialize(result)[:500]}...
-# ======================================""")
-                    
-                    return result
-                    
-                except Exception as e:
-                    # Calculate execution time
-                    execution_time = time.time() - start_time
-                    
-                    # Log the error with full traceback
-                    logger.error(f"""
+                except BaseException as e:
+                    tracer.end_span(span, token, e)
+                    if isinstance(e, Exception):
+                        DebugLogger._log_call_error(file_name, function_name, api_name, start_time, e)
+                    raise
+                tracer.end_span(span, token)
+                return result
+
+            # Return appropriate wrapper based on function type; profiled
+            # requests also get a stage per call
+            if asyncio.iscoroutinefunction(func):
+                return request_profiler.profiled(span_name)(async_wrapper)
+            else:
+                return request_profiler.profiled(span_name)(sync_wrapper)
+
+        return decorator
+
+    @staticmethod
+    def _log_call_error(file_name: str, function_name: str, api_name: str, start_time: float, error: Exception) -> None:
+        """Log a failed API call with its full traceback"""
+        execution_time = time.perf_counter() - start_time
+        logger.error(f"""
 ========== API CALL ERROR ==========
 FILE: {file_name}
 FUNCTION: {function_name}
 API: {api_name}
 EXECUTION_TIME: {execution_time:.3f}s
-ERROR_TYPE: {type(e).__name__}
-ERROR_MESSAGE: {str(e)}
+ERROR_TYPE: {type(error).__name__}
+ERROR_MESSAGE: {str(error)}
 TRACEBACK:
 {traceback.format_exc()}
 ====================================""")
-                    raise
-            
-            # Return appropriate wrapper based on function type
-            if asyncio is not None and asyncio.iscoroutinefunction(func):
-                return async_wrapper
-            else:
-                return sync_wrapper
-                
-        return decorator
-    
+
     @staticmethod
     def log_database_query(query_type: str, table: str) -> Callable[[Callable], Callable]:
-        """Log database operations"""
+        """Trace database operations (span per query, row count attribute)"""
         def decorator(func) -> Callable:
+            span_name = f"db.{query_type}.{table}"
+
             @wraps(func)
             async def wrapper(*args, **kwargs) -> Any:
-                file_name = func.__module__
-                function_name = func.__name__
-                
-                logger.info(f"""
-========== DATABASE QUERY ==========
-FILE: {file_name}
-FUNCTION: {function_name}
-QUERY_TYPE: {query_type}
-TABLE: {table}
-ARGS: {DebugLogger._safe_serialize(args)}
-====================================""")
-                
-                result = await func(*args, **kwargs)
-                
-                logger.info(f"""
-========== DATABASE RESULT ==========
-FILE: {file_name}
-FUNCTION: {function_name}
-ROWS_AFFECTED: {len(result) if isinstance(result, list) else 1}
-=====================================""")
-                
-                return result
+                with tracer.span(span_name, query_type=query_type, table=table) as span:
+                    result = await func(*args, **kwargs)
+                    span.set_attribute("rows", len(result) if isinstance(result, list) else 1)
+                    return result
             return wrapper
         return decorator
-    
+
     @staticmethod
     def log_cache_operation(operation: str) -> Callable[[Callable], Callable]:
-        """Log cache operations"""
+        """Trace cache operations (span per call, hit/miss attribute for GET)"""
         def decorator(func) -> Callable:
+            span_name = f"cache.{operation}"
+
             @wraps(func)
             async def wrapper(*args, **kwargs) -> Any:
-                file_name = func.__module__
-                function_name = func.__name__
-                
-                logger.info(f"""
-========== CACHE OPERATION ==========
-FILE: {file_name}
-FUNCTION: {function_name}
-OPERATION: {operation}
-KEY: {args[0] if args else 'N/A'}
-=====================================""")
-                
-                result = await func(*args, **kwargs)
-                cache_hit = result is not None if operation == "GET" else None
-                
-                logger.info(f"""
-========== CACHE RESULT ==========
-FILE: {file_name}
-FUNCTION: {function_name}
-CACHE_HIT: {cache_hit}
-==================================""")
-                
-                return result
+                with tracer.span(span_name, operation=operation) as span:
+                    result = await func(*args, **kwargs)
+                    if operation == "GET":
+                        span.set_attribute("cache_hit", result is not None)
+                    return result
             return wrapper
         return decorator
-    
+
     @staticmethod
     def _safe_serialize(obj: Any) -> str:
         """Safely serialize objects for logging"""
@@ -315,9 +248,3 @@ TRACEBACK:
                 logger_instance.info(message)
             else:
                 logging.info(message)
-
-# Import asyncio only if needed
-try:
-    import asyncio
-except ImportError:
-    asyncio = None 
\ No newline at end of file
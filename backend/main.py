@@ -2,18 +2,31 @@
 Main FastAPI application entry point
 Simplified architecture with clear route organization
 """
+# Imported first: readiness timings are measured from here
+from services.startup_jobs import readiness, startup_jobs
 from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 import uvicorn
 import logging
 from contextlib import asynccontextmanager
 from typing import Dict, Any, AsyncGenerator
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
 from services.dividend_service import dividend_service
+from services.symbol_search_index import symbol_search_index
+from utils.service_registry import service_registry
+from utils.request_profiler import PROFILE_HEADER, PROFILE_ID_HEADER, instrument_httpx, request_profiler
+from utils.metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    begin_request_metrics,
+    finish_request_metrics,
+    metrics,
+    route_template,
+    timed_job,
+)
 from debug_logger import DebugLogger
 import asyncio
+import hmac
+import time
 
 # Import configuration
 from config import (
@@ -21,7 +34,8 @@ from config import (
     BACKEND_API_HOST, 
     BACKEND_API_DEBUG,
     ALLOWED_ORIGINS,
-    LOG_LEVEL
+    LOG_LEVEL,
+    METRICS_AUTH_TOKEN
 )
 
 # Import debug logger (already imported above)
@@ -40,14 +54,16 @@ from backend_api_routes.backend_api_forex import forex_router
 from middleware.error_handler import register_exception_handlers
 
 # Import decimal-safe JSON encoder
-from utils.decimal_json_encoder import DecimalSafeJSONEncoder
+from utils import fast_json
 from fastapi.encoders import jsonable_encoder
-import json
 
 # Configure logging
 logging.basicConfig(level=getattr(logging, LOG_LEVEL))
 logger = logging.getLogger(__name__)
 
+# Probes and scrapes; they do not count as the first request served
+PROBE_PATHS = frozenset({"/health/ready", "/metrics"})
+
 # Suppress noisy httpx logs
 logging.getLogger("httpx").setLevel(logging.WARNING)
 logging.getLogger("httpcore").setLevel(logging.WARNING)
@@ -61,41 +77,57 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     """Startup and shutdown events"""
     # Startup
     
-    DebugLogger.info_if_enabled("[main.py::lifespan] Startup: Initiating immediate dividend sync for all users", logger)
+    # Run the init hooks of registered services: symbol search index loading
+    # (typeahead falls back to the DB until ready), circuit breaker sharing,
+    # cache hit accounting flushes, lock release notifications and the event
+    # loop lag probe and blocking watchdog (/api/debug/event-loop)
+    await service_registry.start()
     
-    # Step 1: Sync global dividends from Alpha Vantage
-    sync_result = await dividend_service.background_dividend_sync_all_users()
-    if sync_result.get("success"):
-        # logger.info(f"[main.py::lifespan] Successfully synced {sync_result.get('total_assigned', 0)} global dividends")
-        pass
-    else:
-        logger.warning(f"[main.py::lifespan] Dividend sync had issues: {sync_result.get('error', 'Unknown error')}")
+    # Supabase round trips per request are counted at the httpx transport
+    if metrics.enabled:
+        instrument_httpx()
     
-    # Step 2: Assign dividends to all users based on their holdings
-    # This ensures users get dividends even if they were already in the global table
-    # logger.info("[main.py::lifespan] Starting dividend assignment to users...")
-    assignment_result = await dividend_service.assign_dividends_to_users_simple()
-    if assignment_result.get("success"):
-        # logger.info(f"[main.py::lifespan] Successfully assigned {assignment_result.get('total_assigned', 0)} dividends to users")
-        pass
-    else:
-        logger.warning(f"[main.py::lifespan] Dividend assignment had issues: {assignment_result.get('error', 'Unknown error')}")
+    # Dividend reconciliation runs in the background on one worker (leader lease);
+    # progress is at /api/debug/startup
+    startup_jobs.register("dividend_reconciliation", [
+        # Step 1: Sync global dividends from Alpha Vantage
+        ("sync_global_dividends", dividend_service.background_dividend_sync_all_users),
+        # Step 2: Assign dividends to all users based on their holdings
+        # This ensures users get dividends even if they were already in the global table
+        ("assign_dividends", dividend_service.assign_dividends_to_users_simple),
+    ])
+    await startup_jobs.start()
+    DebugLogger.info_if_enabled("[main.py::lifespan] Startup dividend reconciliation scheduled in the background", logger)
     
-    DebugLogger.info_if_enabled("[main.py::lifespan] Startup sync and assignment completed", logger)
+    # Typeahead falls back to the database, so a cold index only delays readiness briefly
+    readiness.add_check("symbol_search_index", symbol_search_index.is_ready, grace_seconds=30)
+    
+    # Imported here so importing main (tests, tooling) does not load apscheduler
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
+    from apscheduler.triggers.cron import CronTrigger
     
     loop = asyncio.get_running_loop()
     scheduler = AsyncIOScheduler(event_loop=loop)
+    
+    async def daily_dividend_sync() -> Any:
+        with timed_job("daily_dividend_sync"):
+            return await dividend_service.background_dividend_sync_all_users()
+    
     scheduler.add_job(
-        dividend_service.background_dividend_sync_all_users,
+        daily_dividend_sync,
         CronTrigger(hour=2, minute=0),
         id='daily_dividend_sync'
     )
     scheduler.start()
     DebugLogger.info_if_enabled("[main.py::lifespan] Scheduler started with event loop", logger)
     
+    readiness.mark_routes_ready()
+    
     yield
     
     scheduler.shutdown()
+    await startup_jobs.stop()
+    await service_registry.close()
     DebugLogger.info_if_enabled("[main.py::lifespan] Scheduler shutdown", logger)
     
     # Shutdown
@@ -109,7 +141,8 @@ API: BACKEND
 # Custom JSON Response class for Decimal handling
 class DecimalSafeJSONResponse(JSONResponse):
     def render(self, content: Any) -> bytes:
-        return json.dumps(content, cls=DecimalSafeJSONEncoder, ensure_ascii=False).encode('utf-8')
+        with request_profiler.stage("serialize"):
+            return fast_json.dumps(content)
 
 # Create FastAPI app
 app = FastAPI(
@@ -130,6 +163,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", PROFILE_ID_HEADER],
 )
 
 # Note: Global exception handling is now managed by middleware.error_handler.register_exception_handlers()
@@ -145,6 +179,23 @@ async def root() -> Dict[str, Any]:
         "version": "2.0.0"
     }
 
+@app.get("/health/ready")
+async def ready() -> JSONResponse:
+    """Readiness probe: 200 once routes and caches are warm, 503 before"""
+    status = readiness.get_status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(request: Request) -> Response:
+    """Prometheus scrape endpoint; protected by METRICS_AUTH_TOKEN when it is set"""
+    if not metrics.enabled:
+        return JSONResponse({"detail": "Not Found"}, status_code=404)
+    if METRICS_AUTH_TOKEN:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(supplied.encode(), METRICS_AUTH_TOKEN.encode()):
+            return JSONResponse({"detail": "Invalid metrics token"}, status_code=401)
+    return PlainTextResponse(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
 # Register routers with clear prefixes
 app.include_router(auth_router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(research_router, prefix="/api", tags=["Research"])
@@ -159,11 +210,50 @@ app.include_router(forex_router, prefix="/api", tags=["Forex"])
 @app.middleware("http")
 async def log_requests(request: Request, call_next) -> Response:
     """Log all incoming requests"""
+    if request.url.path not in PROBE_PATHS:
+        readiness.record_request()
     #DebugLogger.info_if_enabled(f"[main.py::log_requests] Incoming request: {request.method} {request.url.path}", logger)
     response = await call_next(request)
    # DebugLogger.info_if_enabled(f"[main.py::log_requests] Outgoing response: {response.status_code} {request.url.path}", logger)
     return response
 
+@app.middleware("http")
+async def profile_requests(request: Request, call_next) -> Response:
+    """Profile opted-in requests; the breakdown goes in the Server-Timing header"""
+    profile_request, code_profiler = request_profiler.should_profile(request.headers.get(PROFILE_HEADER))
+    if not profile_request:
+        return await call_next(request)
+
+    profile, token = request_profiler.begin(request.method, request.url.path, code_profiler)
+    response = None
+    try:
+        response = await request_profiler.run(profile, lambda: call_next(request))
+    finally:
+        request_profiler.finish(profile, token, response.status_code if response is not None else 500)
+    response.headers["Server-Timing"] = profile.server_timing()
+    response.headers[PROFILE_ID_HEADER] = profile.id
+    return response
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next) -> Response:
+    """Latency and Supabase round trips per route template"""
+    if not metrics.enabled:
+        return await call_next(request)
+
+    started = time.perf_counter()
+    counter, token = begin_request_metrics()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # The router records the matched route in the shared scope
+        finish_request_metrics(
+            counter, token, request.method, route_template(request.scope),
+            status_code, time.perf_counter() - started
+        )
+
 if __name__ == "__main__":
     # Run the application
     logger.info(f"[main.py::__main__] Starting server on {BACKEND_API_HOST}:{BACKEND_API_PORT}")
@@ -0,0 +1,236 @@
+"""
+Cache Access Stats - Buffered hit/miss accounting for database-backed caches
+
+Cache reads used to bump ``access_count`` / ``hit_count`` with an UPDATE per
+hit, turning every read into a write round trip on a hot row. Hits are now
+counted in memory, coalesced per cache entry and written by a background task
+in one bulk statement per table, every ``flush_interval`` seconds or as soon
+as ``max_pending`` events have accumulated. Live counters are served from
+memory.
+
+After a failed flush the writer backs off exponentially (up to
+``max_backoff`` seconds) instead of retrying on every hit, and stops adding
+new entries once ``max_entries`` are buffered: hits on buffered entries are
+still aggregated, hits on new ones are dropped and counted.
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from supa_api.supa_api_user_performance import supa_api_flush_cache_access_stats
+from utils.metrics import MetricFamily, cache_families, metrics, timed_job
+from utils.service_registry import service_registry
+
+logger = logging.getLogger(__name__)
+
+# (table, user_id, cache_key) -> [hits, last access epoch]
+_PendingKey = Tuple[str, str, Optional[str]]
+
+
+class CacheAccessStatsWriter:
+    """
+    In-memory access counters with periodic bulk flushes.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = 10.0,
+        max_pending: int = 500,
+        max_entries: int = 10000,
+        max_backoff: float = 300.0
+    ) -> None:
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_entries = max_entries
+        self.max_backoff = max_backoff
+        self._consecutive_failures = 0
+        self._pending: Dict[_PendingKey, List[Any]] = {}
+        self._pending_events = 0
+        self._hits: Dict[str, int] = defaultdict(int)
+        self._misses: Dict[str, int] = defaultdict(int)
+        self._stats = {
+            "flushes": 0,
+            "flush_failures": 0,
+            "rows_written": 0,
+            "events_flushed": 0,
+            "events_dropped": 0,
+            "last_flush_at": None,
+        }
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    # ========================================================================
+    # Recording
+    # ========================================================================
+
+    def record_hit(self, table: str, user_id: str, cache_key: Optional[str] = None) -> None:
+        """
+        Count a cache hit.
+
+        Args:
+            table: Cache table the entry lives in
+            user_id: Owner of the cache entry
+            cache_key: Entry key, or None for all of the user's entries
+        """
+        self._hits[table] += 1
+        key = (table, user_id, cache_key)
+        entry = self._pending.get(key)
+        if entry is None:
+            if len(self._pending) >= self.max_entries:
+                self._stats["events_dropped"] += 1
+                return
+            self._pending[key] = [1, time.time()]
+        else:
+            entry[0] += 1
+            entry[1] = time.time()
+        self._pending_events += 1
+        # While backing off, requeued events must not trigger an early flush
+        if self._pending_events >= self.max_pending and not self._consecutive_failures:
+            self._wake.set()
+
+    def record_miss(self, table: str) -> None:
+        """Count a cache miss (memory only; misses have no row to update)"""
+        self._misses[table] += 1
+
+    # ========================================================================
+    # Flushing
+    # ========================================================================
+
+    async def flush(self) -> int:
+        """
+        Write all buffered hits, one bulk statement per table.
+
+        Returns:
+            Number of cache rows updated
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+            events, self._pending_events = self._pending_events, 0
+
+            by_table: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+            for (table, user_id, cache_key), (hits, last_accessed) in pending.items():
+                by_table[table].append({
+                    "user_id": user_id,
+                    "cache_key": cache_key,
+                    "hits": hits,
+                    "last_accessed": datetime.fromtimestamp(last_accessed, tz=timezone.utc).isoformat(),
+                })
+
+            rows_written = 0
+            failed: Dict[_PendingKey, List[Any]] = {}
+            dropped = 0
+            for table, entries in by_table.items():
+                try:
+                    rows_written += await supa_api_flush_cache_access_stats(table, entries)
+                except Exception as e:
+                    self._stats["flush_failures"] += 1
+                    logger.warning(f"[CacheAccessStatsWriter] Flush to {table} failed, keeping {len(entries)} entries: {e}")
+                    failed.update({k: v for k, v in pending.items() if k[0] == table})
+
+            # Requeue failed entries, merging with hits recorded during the flush
+            for key, (hits, last_accessed) in failed.items():
+                entry = self._pending.get(key)
+                if entry is None:
+                    if len(self._pending) >= self.max_entries:
+                        dropped += hits
+                        continue
+                    self._pending[key] = [hits, last_accessed]
+                else:
+                    entry[0] += hits
+                    entry[1] = max(entry[1], last_accessed)
+                self._pending_events += hits
+
+            self._consecutive_failures = self._consecutive_failures + 1 if failed else 0
+            self._stats["flushes"] += 1
+            self._stats["rows_written"] += rows_written
+            self._stats["events_flushed"] += events - sum(hits for hits, _ in failed.values())
+            self._stats["events_dropped"] += dropped
+            self._stats["last_flush_at"] = datetime.now(timezone.utc).isoformat()
+            return rows_written
+
+    def _retry_delay(self) -> float:
+        """Exponential backoff after consecutive failed flushes"""
+        return min(self.flush_interval * 2 ** self._consecutive_failures, self.max_backoff)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            if self._consecutive_failures:
+                await asyncio.sleep(self._retry_delay())
+            else:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wake.clear()
+            try:
+                with timed_job("cache_access_stats_flush"):
+                    await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[CacheAccessStatsWriter] Background flush failed: {e}")
+
+    async def start(self) -> None:
+        """Start the background flush task"""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop(), name="cache_access_stats_flush")
+
+    async def stop(self) -> None:
+        """Stop the background task and flush whatever is still buffered"""
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        self._flush_task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.warning(f"[CacheAccessStatsWriter] Final flush failed: {e}")
+
+    # ========================================================================
+    # Live Counters
+    # ========================================================================
+
+    def collect_metrics(self) -> List[MetricFamily]:
+        """Hit/miss counters per cache table, reported at /metrics scrape time"""
+        families: List[MetricFamily] = []
+        for table in sorted(set(self._hits) | set(self._misses)):
+            families.extend(cache_families(f"db.{table}", hits=self._hits[table], misses=self._misses[table]))
+        return families
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters per table and flush statistics (no database access)"""
+        tables = {}
+        for table in sorted(set(self._hits) | set(self._misses)):
+            hits, misses = self._hits[table], self._misses[table]
+            tables[table] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+            }
+        return {
+            **self._stats,
+            "tables": tables,
+            "pending_entries": len(self._pending),
+            "pending_events": self._pending_events,
+            "consecutive_failures": self._consecutive_failures,
+        }
+
+
+# Module-level instance; the flush task runs from app startup to shutdown
+cache_access_stats = service_registry.register(
+    "cache_access_stats", CacheAccessStatsWriter,
+    init=lambda writer: writer.start(), close=lambda writer: writer.stop()
+)
+metrics.register_collector(
+    lambda: cache_access_stats.collect_metrics() if service_registry.is_built("cache_access_stats") else []
+)
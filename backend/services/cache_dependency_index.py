@@ -0,0 +1,225 @@
+"""
+Cache Dependency Index - Reverse index from data dependencies to cache entries
+
+Cached portfolio results record what they were computed from (the user's
+transactions and dividends, and the price of every held symbol; see
+``PortfolioMetricsManager._extract_dependencies``). This index maps each
+dependency back to the cache entries that used it, so a data change only
+invalidates the entries that actually depend on it. For example, a price
+ingest for 300 symbols drops just the snapshots that hold one of them
+instead of every user's cache.
+
+Caches plug in through per-namespace invalidators. The index itself holds no
+cached data and imports no services. Entries registered with a TTL are pruned
+once it passes, so the index never outgrows the live contents of the caches.
+"""
+
+import heapq
+import logging
+import time
+from collections import defaultdict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# (namespace, user_id, cache_key)
+CacheEntry = Tuple[str, str, str]
+Invalidator = Callable[[List[CacheEntry]], Awaitable[int]]
+
+
+def price_dependency(symbol: str) -> str:
+    """Dependency key for a symbol's prices"""
+    return f"prices:{symbol.upper()}"
+
+
+def transactions_dependency(user_id: str) -> str:
+    """Dependency key for a user's transactions"""
+    return f"transactions:{user_id}"
+
+
+def dividends_dependency(user_id: str) -> str:
+    """Dependency key for a user's dividends"""
+    return f"dividends:{user_id}"
+
+
+def dependency_key(dependency: Union[str, Dict[str, Any]]) -> str:
+    """
+    Normalize a dependency to its index key.
+
+    Accepts keys as produced by the helpers above, or the dicts written by
+    ``_extract_dependencies`` (``{"type": "prices", "symbol": "AAPL"}``).
+    """
+    if isinstance(dependency, str):
+        return dependency
+    dep_type = dependency.get("type")
+    if dep_type == "prices":
+        return price_dependency(dependency["symbol"])
+    if dep_type == "transactions":
+        return transactions_dependency(dependency["user_id"])
+    if dep_type == "dividends":
+        return dividends_dependency(dependency["user_id"])
+    raise ValueError(f"Unknown cache dependency: {dependency}")
+
+
+class CacheDependencyIndex:
+    """
+    In-process reverse index with targeted, reported invalidation.
+    """
+
+    def __init__(self, history_size: int = 50) -> None:
+        self._entries_by_dependency: Dict[str, Set[CacheEntry]] = defaultdict(set)
+        self._dependencies_by_entry: Dict[CacheEntry, FrozenSet[str]] = {}
+        # Monotonic expiry per entry, plus a heap of (expires_at, entry) to prune in order
+        self._expires_at: Dict[CacheEntry, float] = {}
+        self._expiry_heap: List[Tuple[float, CacheEntry]] = []
+        self._pruned = 0
+        self._invalidators: Dict[str, Invalidator] = {}
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=history_size)
+
+    def register_invalidator(self, namespace: str, invalidator: Invalidator) -> None:
+        """
+        Set the coroutine that drops entries of a namespace.
+
+        Args:
+            namespace: Cache namespace ("metrics", "complete", ...)
+            invalidator: Receives the matched entries, returns how many were removed
+        """
+        self._invalidators[namespace] = invalidator
+
+    # ========================================================================
+    # Index Maintenance
+    # ========================================================================
+
+    def register(
+        self,
+        namespace: str,
+        user_id: str,
+        cache_key: str,
+        dependencies: Iterable[Union[str, Dict[str, Any]]],
+        ttl_seconds: Optional[float] = None,
+    ) -> None:
+        """
+        Record the dependencies of a freshly written cache entry (replacing older ones).
+
+        Args:
+            ttl_seconds: Lifetime of the cache entry. Once it passes the entry is
+                pruned; without one it stays until forgotten or invalidated.
+        """
+        self.prune_expired()
+        entry = (namespace, user_id, cache_key)
+        keys = frozenset(dependency_key(dep) for dep in dependencies)
+        self.forget(entry)
+        self._dependencies_by_entry[entry] = keys
+        for key in keys:
+            self._entries_by_dependency[key].add(entry)
+        if ttl_seconds is not None:
+            expires_at = time.monotonic() + ttl_seconds
+            self._expires_at[entry] = expires_at
+            heapq.heappush(self._expiry_heap, (expires_at, entry))
+
+    def forget(self, entry: CacheEntry) -> None:
+        """Remove an entry from the index"""
+        self._expires_at.pop(entry, None)
+        for key in self._dependencies_by_entry.pop(entry, ()):
+            entries = self._entries_by_dependency.get(key)
+            if entries is not None:
+                entries.discard(entry)
+                if not entries:
+                    del self._entries_by_dependency[key]
+
+    def prune_expired(self) -> int:
+        """Forget entries whose cache TTL has passed; returns how many were removed"""
+        now = time.monotonic()
+        heap = self._expiry_heap
+        pruned = 0
+        while heap and heap[0][0] <= now:
+            expires_at, entry = heapq.heappop(heap)
+            # Skip heap items left behind by re-registration or forget()
+            if self._expires_at.get(entry) == expires_at:
+                self.forget(entry)
+                pruned += 1
+        # Drop stale heap items once they dominate, so re-registrations can't grow it
+        if len(heap) > 2 * len(self._expires_at) + 64:
+            self._expiry_heap = [(expires_at, entry) for entry, expires_at in self._expires_at.items()]
+            heapq.heapify(self._expiry_heap)
+        self._pruned += pruned
+        return pruned
+
+    def lookup(self, dependencies: Iterable[Union[str, Dict[str, Any]]]) -> Set[CacheEntry]:
+        """Entries that depend on any of the given dependencies"""
+        matched: Set[CacheEntry] = set()
+        for dependency in dependencies:
+            matched |= self._entries_by_dependency.get(dependency_key(dependency), set())
+        return matched
+
+    # ========================================================================
+    # Invalidation
+    # ========================================================================
+
+    async def invalidate(self, event: str, dependencies: Iterable[Union[str, Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Invalidate every cache entry that depends on the changed data.
+
+        Args:
+            event: Name of the data change (e.g. "price_update")
+            dependencies: Changed dependencies
+
+        Returns:
+            Report with matched entries, affected users and per-namespace counts
+        """
+        started = time.perf_counter()
+        self.prune_expired()
+        dependency_keys = {dependency_key(dep) for dep in dependencies}
+        matched = self.lookup(dependency_keys)
+
+        by_namespace: Dict[str, List[CacheEntry]] = defaultdict(list)
+        for entry in matched:
+            by_namespace[entry[0]].append(entry)
+
+        invalidated: Dict[str, int] = {}
+        errors: Dict[str, str] = {}
+        for namespace, entries in by_namespace.items():
+            invalidator = self._invalidators.get(namespace)
+            if invalidator is None:
+                errors[namespace] = "no invalidator registered"
+                continue
+            try:
+                invalidated[namespace] = await invalidator(entries)
+            except Exception as e:
+                logger.error(f"[CacheDependencyIndex] {namespace} invalidation for {event} failed: {e}")
+                errors[namespace] = str(e)
+                continue
+            for entry in entries:
+                self.forget(entry)
+
+        report = {
+            "event": event,
+            "dependencies": len(dependency_keys),
+            "matched_entries": len(matched),
+            "users_affected": len({entry[1] for entry in matched}),
+            "invalidated": invalidated,
+            "errors": errors,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+        self._events.append(report)
+        if matched:
+            logger.info(
+                f"[CacheDependencyIndex] {event}: {len(dependency_keys)} dependencies -> "
+                f"{len(matched)} entries for {report['users_affected']} users {invalidated}"
+            )
+        return report
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Index size and recent invalidation events"""
+        self.prune_expired()
+        return {
+            "indexed_entries": len(self._dependencies_by_entry),
+            "indexed_dependencies": len(self._entries_by_dependency),
+            "expired_pruned": self._pruned,
+            "namespaces": sorted(self._invalidators),
+            "recent_events": list(self._events),
+        }
+
+
+# Module-level instance
+cache_dependency_index = CacheDependencyIndex()
@@ -1,79 +1,176 @@
 """
 Thread-safe cache manager for portfolio metrics without Redis dependency.
-Handles concurrent access, TTL management, and proper cleanup.
+Handles concurrent access, TTL management, bounded memory and proper cleanup.
 """
 import asyncio
+import itertools
+import sys
 import threading
-from typing import Any, Dict, Optional, Set, List
-from datetime import datetime, timedelta
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 import logging
-import weakref
-import gc
-from collections import defaultdict
+
+from utils.metrics import MetricFamily, cache_families, metrics, timed_job
 
 logger = logging.getLogger(__name__)
 
+EVICTION_POLICIES = ("lru", "lfu")
+
+# Containers are sized from a sample of this many items
+_SIZE_SAMPLE = 8
+_SIZE_MAX_DEPTH = 3
+_SCALARS = (str, bytes, int, float, bool, type(None))
+
+
+def user_tag(user_id: str) -> str:
+    """Tag carried by every entry of a user."""
+    return f"user:{user_id}"
+
+
+def symbol_tag(symbol: str) -> str:
+    """Tag for entries derived from a symbol's data."""
+    return f"symbol:{symbol.upper()}"
+
+
+def _approximate_size(value: Any, depth: int = 0) -> int:
+    """
+    Approximate deep size of a cached value in bytes.
+
+    Containers are extrapolated from their first few items, so sizing a large
+    portfolio payload costs the same as sizing a small one.
+    """
+    size = sys.getsizeof(value)
+    if depth >= _SIZE_MAX_DEPTH or isinstance(value, _SCALARS):
+        return size
+
+    if isinstance(value, dict):
+        count = len(value)
+        if count:
+            sample = list(itertools.islice(value.items(), _SIZE_SAMPLE))
+            sampled = sum(sys.getsizeof(k) + _approximate_size(v, depth + 1) for k, v in sample)
+            size += sampled * count // len(sample)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        count = len(value)
+        if count:
+            sample = list(itertools.islice(value, _SIZE_SAMPLE))
+            sampled = sum(_approximate_size(item, depth + 1) for item in sample)
+            size += sampled * count // len(sample)
+    elif hasattr(value, "__dict__"):
+        size += _approximate_size(vars(value), depth + 1)
+    return size
+
+
+class _CacheEntry:
+    """Cached value with its bookkeeping."""
+
+    __slots__ = ("value", "expires_at", "size", "tags", "hits")
+
+    def __init__(self, value: Any, expires_at: float, size: int, tags: Tuple[str, ...]):
+        self.value = value
+        self.expires_at = expires_at  # time.monotonic()
+        self.size = size
+        self.tags = tags
+        self.hits = 0
+
+
+class _Shard:
+    """One slice of the keyspace, kept in LRU order."""
+
+    __slots__ = ("entries", "lock", "bytes")
+
+    def __init__(self) -> None:
+        self.entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.bytes = 0
+
 
 class ThreadSafeCacheManager:
     """
     Thread-safe in-memory cache manager with TTL support.
-    
+
     Features:
-    - Thread-safe operations using asyncio locks
+    - Keyspace split into shards, each guarded by its own lock
+    - Lock-free reads of unexpired entries
     - TTL (Time To Live) support for automatic expiration
-    - Memory management and cleanup
-    - Pattern-based invalidation
+    - LRU or LFU eviction under an entry count and approximate byte budget
+    - Tag index for invalidation by user or symbol without scanning keys
     - User-specific cache isolation
     - Metrics and monitoring
+
+    Writers hold a shard lock only for in-memory bookkeeping (never across an
+    await), so a single hot key or a bulk invalidation never blocks the rest
+    of the cache.
     """
-    
-    def __init__(self, default_ttl_seconds: int = 300, cleanup_interval_seconds: int = 60):
+
+    def __init__(
+        self,
+        default_ttl_seconds: int = 300,
+        cleanup_interval_seconds: int = 60,
+        max_entries: int = 10_000,
+        max_bytes: int = 256 * 1024 * 1024,
+        num_shards: int = 16,
+        eviction_policy: str = "lru",
+        eviction_samples: int = 8
+    ):
         """
         Initialize the cache manager.
-        
+
         Args:
             default_ttl_seconds: Default TTL for cache entries (5 minutes)
             cleanup_interval_seconds: How often to run cleanup (1 minute)
+            max_entries: Entry budget across all shards
+            max_bytes: Approximate memory budget across all shards
+            num_shards: Number of independently locked shards
+            eviction_policy: "lru" or "lfu"
+            eviction_samples: Oldest entries compared when picking an LFU victim
         """
-        self._cache: Dict[str, Any] = {}
-        self._expiry_times: Dict[str, datetime] = {}
-        self._access_times: Dict[str, datetime] = {}
-        self._locks: Dict[str, asyncio.Lock] = {}
-        self._lock_creation_lock = threading.Lock()
+        if eviction_policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {eviction_policy}")
+
+        self._shards = [_Shard() for _ in range(max(1, num_shards))]
+        self._tag_index: Dict[str, Set[str]] = {}
+        self._tag_lock = threading.Lock()
         self._cleanup_task: Optional[asyncio.Task[None]] = None
         self._default_ttl = default_ttl_seconds
         self._cleanup_interval = cleanup_interval_seconds
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._shard_max_entries = max(1, max_entries // len(self._shards))
+        self._shard_max_bytes = max(1, max_bytes // len(self._shards))
+        self._eviction_policy = eviction_policy
+        self._eviction_samples = max(1, eviction_samples)
         self._running = False
-        
+
         # Metrics
         self._metrics = {
             "cache_hits": 0,
             "cache_misses": 0,
             "cache_sets": 0,
             "cache_invalidations": 0,
+            "evictions": 0,
             "cleanup_runs": 0,
             "entries_cleaned": 0
         }
-        
-        logger.info(f"ThreadSafeCacheManager initialized with TTL={default_ttl_seconds}s, cleanup={cleanup_interval_seconds}s")
-    
-    def _get_lock(self, key: str) -> asyncio.Lock:
-        """Get or create a lock for a specific cache key."""
-        with self._lock_creation_lock:
-            if key not in self._locks:
-                self._locks[key] = asyncio.Lock()
-            return self._locks[key]
-    
+
+        logger.info(
+            f"ThreadSafeCacheManager initialized with TTL={default_ttl_seconds}s, cleanup={cleanup_interval_seconds}s, "
+            f"shards={len(self._shards)}, max_entries={max_entries}, max_bytes={max_bytes}, policy={eviction_policy}"
+        )
+
+    def _shard_for(self, key: str) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
     async def start(self) -> None:
         """Start the cache manager and background cleanup task."""
         if self._running:
             logger.warning("Cache manager already running")
             return
-        
+
         self._running = True
         self._cleanup_task = asyncio.create_task(self._background_cleanup())
         logger.info("Cache manager started with background cleanup")
-    
+
     async def stop(self) -> None:
         """Stop the cache manager and cleanup task."""
         self._running = False
@@ -83,215 +180,306 @@ class ThreadSafeCacheManager:
                 await self._cleanup_task
             except asyncio.CancelledError:
                 pass
-        
+
         await self.clear_all()
         logger.info("Cache manager stopped and cleared")
-    
+
     async def get(self, key: str) -> Optional[Any]:
         """
-        Thread-safe cache get with expiry check.
-        
+        Cache get with expiry check.
+
         Args:
             key: Cache key
-            
+
         Returns:
             Cached value or None if not found/expired
         """
-        lock = self._get_lock(key)
-        async with lock:
-            current_time = datetime.utcnow()
-            
-            # Check if key exists
-            if key not in self._cache:
-                self._metrics["cache_misses"] += 1
-                return None
-            
-            # Check if expired
-            if key in self._expiry_times and current_time >= self._expiry_times[key]:
-                await self._remove_key_unsafe(key)
-                self._metrics["cache_misses"] += 1
-                logger.debug(f"Cache key '{key}' expired and removed")
-                return None
-            
-            # Update access time
-            self._access_times[key] = current_time
-            self._metrics["cache_hits"] += 1
-            
-            value = self._cache[key]
-            logger.debug(f"Cache hit for key '{key}'")
-            return value
-    
-    async def set(self, key: str, value: Any, ttl_seconds: Optional[int] = None) -> None:
+        shard = self._shard_for(key)
+        entry = shard.entries.get(key)
+
+        if entry is None:
+            self._metrics["cache_misses"] += 1
+            return None
+
+        if time.monotonic() >= entry.expires_at:
+            self._remove(key, expected=entry)
+            self._metrics["cache_misses"] += 1
+            logger.debug(f"Cache key '{key}' expired and removed")
+            return None
+
+        # Lock-free hit: move_to_end is atomic under the GIL, the hit count is approximate
+        entry.hits += 1
+        try:
+            shard.entries.move_to_end(key)
+        except KeyError:
+            pass  # Removed concurrently; the value we hold is still consistent
+        self._metrics["cache_hits"] += 1
+        return entry.value
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl_seconds: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None
+    ) -> None:
         """
-        Thread-safe cache set with TTL.
-        
+        Cache set with TTL, evicting entries if the shard is over budget.
+
         Args:
             key: Cache key
             value: Value to cache
             ttl_seconds: TTL in seconds (uses default if None)
+            tags: Extra tags to index the entry under (user keys are tagged automatically)
         """
-        lock = self._get_lock(key)
-        async with lock:
-            current_time = datetime.utcnow()
-            ttl = ttl_seconds if ttl_seconds is not None else self._default_ttl
-            
-            self._cache[key] = value
-            self._expiry_times[key] = current_time + timedelta(seconds=ttl)
-            self._access_times[key] = current_time
-            self._metrics["cache_sets"] += 1
-            
-            logger.debug(f"Cache set for key '{key}' with TTL={ttl}s")
-    
+        ttl = ttl_seconds if ttl_seconds is not None else self._default_ttl
+        entry_tags = self._implicit_tags(key)
+        if tags:
+            entry_tags = tuple(dict.fromkeys(entry_tags + tuple(tags)))
+        entry = _CacheEntry(value, time.monotonic() + ttl, _approximate_size(value), entry_tags)
+
+        shard = self._shard_for(key)
+        with shard.lock:
+            previous = shard.entries.pop(key, None)
+            if previous is not None:
+                shard.bytes -= previous.size
+            shard.entries[key] = entry
+            shard.bytes += entry.size
+            evicted = self._evict_unsafe(shard)
+
+        if previous is not None and previous.tags != entry.tags:
+            self._untag(key, previous.tags)
+        self._tag(key, entry.tags)
+        for evicted_key, evicted_entry in evicted:
+            self._untag(evicted_key, evicted_entry.tags)
+
+        self._metrics["cache_sets"] += 1
+        self._metrics["evictions"] += len(evicted)
+        logger.debug(f"Cache set for key '{key}' with TTL={ttl}s")
+
     async def invalidate(self, pattern: Optional[str] = None, user_id: Optional[str] = None) -> int:
         """
-        Thread-safe cache invalidation with pattern matching.
-        
+        Cache invalidation by user and/or key substring.
+
         Args:
-            pattern: Pattern to match in key names
-            user_id: User ID to match in key names
-            
+            pattern: Pattern to match in key names (scans the keyspace)
+            user_id: User whose entries to drop (tag lookup, no scan)
+
         Returns:
             Number of keys invalidated
         """
-        keys_to_remove = []
-        
-        # Collect keys to remove (don't modify dict while iterating)
-        for key in list(self._cache.keys()):
-            should_remove = False
-            
-            if pattern and pattern in key:
-                should_remove = True
-            elif user_id and f"user_{user_id}" in key:
-                should_remove = True
-            elif pattern is None and user_id is None:
-                should_remove = True
-                
-            if should_remove:
-                keys_to_remove.append(key)
-        
-        # Remove keys with proper locking
-        removed_count = 0
-        for key in keys_to_remove:
-            lock = self._get_lock(key)
-            async with lock:
-                if key in self._cache:  # Double-check in case it was removed by another task
-                    await self._remove_key_unsafe(key)
-                    removed_count += 1
-        
+        if pattern is None and user_id is None:
+            return self._clear()
+
+        keys: Set[str] = set()
+        if user_id:
+            with self._tag_lock:
+                keys.update(self._tag_index.get(user_tag(user_id), ()))
+        if pattern:
+            for shard in self._shards:
+                keys.update(key for key in list(shard.entries) if pattern in key)
+
+        removed_count = sum(1 for key in keys if self._remove(key))
         self._metrics["cache_invalidations"] += removed_count
         logger.info(f"Cache invalidation removed {removed_count} keys (pattern='{pattern}', user_id='{user_id}')")
         return removed_count
-    
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """
+        Remove every entry carrying any of the tags.
+
+        Args:
+            tags: Tags such as user_tag(user_id) or symbol_tag(symbol)
+
+        Returns:
+            Number of keys invalidated
+        """
+        keys: Set[str] = set()
+        with self._tag_lock:
+            for tag in tags:
+                keys.update(self._tag_index.get(tag, ()))
+
+        removed_count = sum(1 for key in keys if self._remove(key))
+        self._metrics["cache_invalidations"] += removed_count
+        return removed_count
+
+    async def invalidate_keys(self, keys: List[str]) -> int:
+        """
+        Remove exact cache keys (no scan over the whole cache).
+
+        Args:
+            keys: Cache keys to remove
+
+        Returns:
+            Number of keys invalidated
+        """
+        removed_count = sum(1 for key in keys if self._remove(key))
+        self._metrics["cache_invalidations"] += removed_count
+        return removed_count
+
     async def clear_all(self) -> int:
         """Clear all cache entries."""
         return await self.invalidate()
-    
-    async def _remove_key_unsafe(self, key: str) -> None:
-        """Remove key from all data structures (assumes lock is held)."""
-        self._cache.pop(key, None)
-        self._expiry_times.pop(key, None)
-        self._access_times.pop(key, None)
-        # Note: Don't remove locks as they might be in use
-    
+
+    # ========================================================================
+    # Internal Bookkeeping
+    # ========================================================================
+
+    @staticmethod
+    def _implicit_tags(key: str) -> Tuple[str, ...]:
+        """Tag "user_<id>:..." keys with their user."""
+        if key.startswith("user_"):
+            separator = key.find(":")
+            if separator > 5:
+                return (user_tag(key[5:separator]),)
+        return ()
+
+    def _remove(self, key: str, expected: Optional[_CacheEntry] = None) -> bool:
+        """Remove a key; with expected, only if it still maps to that entry."""
+        shard = self._shard_for(key)
+        with shard.lock:
+            entry = shard.entries.get(key)
+            if entry is None or (expected is not None and entry is not expected):
+                return False
+            del shard.entries[key]
+            shard.bytes -= entry.size
+        self._untag(key, entry.tags)
+        return True
+
+    def _clear(self) -> int:
+        removed_count = 0
+        for shard in self._shards:
+            with shard.lock:
+                removed_count += len(shard.entries)
+                shard.entries.clear()
+                shard.bytes = 0
+        with self._tag_lock:
+            self._tag_index.clear()
+        self._metrics["cache_invalidations"] += removed_count
+        logger.info(f"Cache cleared, removed {removed_count} keys")
+        return removed_count
+
+    def _evict_unsafe(self, shard: _Shard) -> List[Tuple[str, _CacheEntry]]:
+        """Evict until the shard is within budget (assumes shard lock is held)."""
+        evicted = []
+        entries = shard.entries
+        while entries and (len(entries) > self._shard_max_entries or shard.bytes > self._shard_max_bytes):
+            if self._eviction_policy == "lfu":
+                candidates = itertools.islice(entries.items(), self._eviction_samples)
+                victim_key = min(candidates, key=lambda item: item[1].hits)[0]
+            else:
+                victim_key = next(iter(entries))
+            victim = entries.pop(victim_key)
+            shard.bytes -= victim.size
+            evicted.append((victim_key, victim))
+        return evicted
+
+    def _tag(self, key: str, tags: Tuple[str, ...]) -> None:
+        if not tags:
+            return
+        with self._tag_lock:
+            for tag in tags:
+                self._tag_index.setdefault(tag, set()).add(key)
+
+    def _untag(self, key: str, tags: Tuple[str, ...]) -> None:
+        if not tags:
+            return
+        with self._tag_lock:
+            for tag in tags:
+                keys = self._tag_index.get(tag)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._tag_index[tag]
+
     async def _background_cleanup(self) -> None:
         """Background task to clean up expired entries."""
         logger.info("Background cache cleanup task started")
-        
+
         while self._running:
             try:
                 await asyncio.sleep(self._cleanup_interval)
-                
+
                 if not self._running:
                     break
-                
-                cleaned_count = await self._cleanup_expired_entries()
+
+                with timed_job("cache_cleanup"):
+                    cleaned_count = await self._cleanup_expired_entries()
                 self._metrics["cleanup_runs"] += 1
                 self._metrics["entries_cleaned"] += cleaned_count
-                
+
                 if cleaned_count > 0:
                     logger.info(f"Cleaned up {cleaned_count} expired cache entries")
-                
-                # Force garbage collection if we have many locks
-                if len(self._locks) > 1000:
-                    await self._cleanup_unused_locks()
-                
+
             except asyncio.CancelledError:
                 logger.info("Cache cleanup task cancelled")
                 break
             except Exception as e:
                 logger.error(f"Error in cache cleanup: {e}")
                 # Continue running even if cleanup fails
-    
+
     async def _cleanup_expired_entries(self) -> int:
-        """Clean up expired cache entries."""
-        current_time = datetime.utcnow()
-        expired_keys = []
-        
-        # Find expired keys
-        for key, expiry_time in self._expiry_times.items():
-            if current_time >= expiry_time:
-                expired_keys.append(key)
-        
-        # Remove expired keys
+        """Clean up expired cache entries, one shard at a time."""
         removed_count = 0
-        for key in expired_keys:
-            lock = self._get_lock(key)
-            async with lock:
-                if key in self._cache:  # Double-check in case it was removed
-                    await self._remove_key_unsafe(key)
-                    removed_count += 1
-        
+        for shard in self._shards:
+            current_time = time.monotonic()
+            with shard.lock:
+                expired = [(key, entry) for key, entry in shard.entries.items() if current_time >= entry.expires_at]
+                for key, entry in expired:
+                    del shard.entries[key]
+                    shard.bytes -= entry.size
+            for key, entry in expired:
+                self._untag(key, entry.tags)
+            removed_count += len(expired)
+            # Let requests run between shards
+            await asyncio.sleep(0)
+
         return removed_count
-    
-    async def _cleanup_unused_locks(self) -> None:
-        """Clean up locks for keys that no longer exist."""
-        with self._lock_creation_lock:
-            # Find locks for non-existent keys
-            unused_lock_keys = [key for key in self._locks.keys() if key not in self._cache]
-            
-            # Remove unused locks
-            for key in unused_lock_keys:
-                self._locks.pop(key, None)
-            
-            if unused_lock_keys:
-                logger.debug(f"Cleaned up {len(unused_lock_keys)} unused locks")
-            
-            # Force garbage collection
-            gc.collect()
-    
+
     def get_metrics(self) -> Dict[str, Any]:
         """Get cache metrics."""
         total_requests = self._metrics["cache_hits"] + self._metrics["cache_misses"]
         hit_rate = (self._metrics["cache_hits"] / total_requests * 100) if total_requests > 0 else 0
-        
+
         return {
             **self._metrics,
-            "total_entries": len(self._cache),
-            "total_locks": len(self._locks),
+            "total_entries": sum(len(shard.entries) for shard in self._shards),
+            "approximate_bytes": sum(shard.bytes for shard in self._shards),
+            "max_entries": self._max_entries,
+            "max_bytes": self._max_bytes,
+            "shards": len(self._shards),
+            "eviction_policy": self._eviction_policy,
+            "tags": len(self._tag_index),
             "hit_rate_percent": round(hit_rate, 2),
             "running": self._running
         }
-    
+
     def get_cache_info(self) -> Dict[str, Any]:
         """Get detailed cache information for debugging."""
-        current_time = datetime.utcnow()
-        
+        current_time = time.monotonic()
+
         # Analyze TTL distribution
         ttl_info = []
-        for key, expiry_time in self._expiry_times.items():
-            ttl_remaining = (expiry_time - current_time).total_seconds()
-            ttl_info.append({
-                "key": key,
-                "ttl_remaining_seconds": max(0, ttl_remaining),
-                "expired": ttl_remaining <= 0
-            })
-        
+        for shard in self._shards:
+            for key, entry in list(shard.entries.items()):
+                ttl_remaining = entry.expires_at - current_time
+                ttl_info.append({
+                    "key": key,
+                    "ttl_remaining_seconds": max(0, ttl_remaining),
+                    "expired": ttl_remaining <= 0,
+                    "approximate_bytes": entry.size,
+                    "hits": entry.hits
+                })
+                if len(ttl_info) >= 10:
+                    break
+            if len(ttl_info) >= 10:
+                break
+
         return {
-            "total_entries": len(self._cache),
-            "total_locks": len(self._locks),
-            "entries_with_ttl": len(self._expiry_times),
+            "total_entries": sum(len(shard.entries) for shard in self._shards),
+            "entries_per_shard": [len(shard.entries) for shard in self._shards],
             "metrics": self.get_metrics(),
-            "ttl_info": ttl_info[:10]  # Only show first 10 for debugging
+            "ttl_info": ttl_info  # Only show first 10 for debugging
         }
 
 
@@ -299,33 +487,44 @@ class UserCacheManager:
     """
     User-specific cache manager that provides isolation between users.
     """
-    
+
     def __init__(self, global_cache: ThreadSafeCacheManager):
         self.global_cache = global_cache
-    
+
     def _user_key(self, user_id: str, key: str) -> str:
         """Generate user-specific cache key."""
         return f"user_{user_id}:{key}"
-    
+
     async def get_user_cache(self, user_id: str, key: str) -> Optional[Any]:
         """Get value from user-specific cache."""
         user_key = self._user_key(user_id, key)
         return await self.global_cache.get(user_key)
-    
-    async def set_user_cache(self, user_id: str, key: str, value: Any, ttl_seconds: Optional[int] = None) -> None:
+
+    async def set_user_cache(
+        self,
+        user_id: str,
+        key: str,
+        value: Any,
+        ttl_seconds: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None
+    ) -> None:
         """Set value in user-specific cache."""
         user_key = self._user_key(user_id, key)
-        await self.global_cache.set(user_key, value, ttl_seconds)
-    
+        await self.global_cache.set(user_key, value, ttl_seconds, tags)
+
     async def invalidate_user_cache(self, user_id: str, key_pattern: Optional[str] = None) -> int:
         """Invalidate user-specific cache entries."""
         if key_pattern:
             pattern = f"user_{user_id}:{key_pattern}"
         else:
             pattern = None
-        
+
         return await self.global_cache.invalidate(pattern=pattern, user_id=user_id)
 
+    async def invalidate_user_keys(self, user_id: str, keys: List[str]) -> int:
+        """Invalidate exact user-specific cache entries."""
+        return await self.global_cache.invalidate_keys([self._user_key(user_id, key) for key in keys])
+
 
 # Global cache instance
 _global_cache: Optional[ThreadSafeCacheManager] = None
@@ -335,32 +534,56 @@ _user_cache: Optional[UserCacheManager] = None
 async def get_cache_manager() -> ThreadSafeCacheManager:
     """Get or create the global cache manager instance."""
     global _global_cache
-    
+
     if _global_cache is None:
-        _global_cache = ThreadSafeCacheManager()
+        from config import CACHE_EVICTION_POLICY, CACHE_MAX_BYTES, CACHE_MAX_ENTRIES, CACHE_SHARDS
+        _global_cache = ThreadSafeCacheManager(
+            max_entries=CACHE_MAX_ENTRIES,
+            max_bytes=CACHE_MAX_BYTES,
+            num_shards=CACHE_SHARDS,
+            eviction_policy=CACHE_EVICTION_POLICY
+        )
         await _global_cache.start()
-    
+
     return _global_cache
 
 
+def _collect_cache_metrics() -> List[MetricFamily]:
+    """Report the global cache's counters at scrape time"""
+    if _global_cache is None:
+        return []
+    counters = _global_cache._metrics
+    return cache_families(
+        "memory",
+        hits=counters["cache_hits"],
+        misses=counters["cache_misses"],
+        evictions=counters["evictions"],
+        invalidations=counters["cache_invalidations"],
+        entries=sum(len(shard.entries) for shard in _global_cache._shards),
+    )
+
+
+metrics.register_collector(_collect_cache_metrics)
+
+
 async def get_user_cache_manager() -> UserCacheManager:
     """Get or create the user cache manager instance."""
     global _user_cache, _global_cache
-    
+
     if _user_cache is None:
         global_cache = await get_cache_manager()
         _user_cache = UserCacheManager(global_cache)
-    
+
     return _user_cache
 
 
 async def shutdown_cache() -> None:
     """Shutdown all cache managers."""
     global _global_cache, _user_cache
-    
+
     if _global_cache:
         await _global_cache.stop()
         _global_cache = None
-    
+
     _user_cache = None
-    logger.info("All cache managers shut down")
\ No newline at end of file
+    logger.info("All cache managers shut down")
@@ -0,0 +1,343 @@
+"""
+Circuit Breaker - Local-first breakers with background state sharing
+
+Each breaker keeps its state in process memory: a sliding window of
+success/failure counts decides when to trip, and after the recovery timeout a
+limited number of half-open probes decide whether to close again. Checking a
+closed breaker is a plain attribute read.
+
+State is shared with other workers through ``circuit_breaker_state``, but only
+by a periodic background sync: local transitions are pushed in one batched
+upsert and transitions made by other workers are pulled and applied. No
+request ever waits on the database to ask whether a breaker is closed.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from supa_api.supa_api_circuit_breaker import supa_api_get_circuit_states, supa_api_save_circuit_states
+from utils.service_registry import service_registry
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[float]:
+    """Parse a Supabase timestamp into epoch seconds"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def _format_timestamp(epoch: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat() if epoch else None
+
+
+class CircuitBreaker:
+    """
+    Sliding-window circuit breaker for one service.
+
+    Trips when, within ``window_seconds``, at least ``failure_threshold``
+    calls failed and they make up ``failure_rate_threshold`` of all recorded
+    calls. Stays open for ``recovery_timeout`` seconds, then lets up to
+    ``half_open_max_calls`` probes through: a probe success closes the
+    breaker, a probe failure re-opens it. A probe that records neither
+    (cancelled, or a caller returning early) frees its slot after
+    ``probe_timeout`` seconds, so the breaker cannot stay half-open forever.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 60,
+        failure_rate_threshold: float = 0.5,
+        window_seconds: float = 60,
+        window_buckets: int = 6,
+        half_open_max_calls: int = 1,
+        probe_timeout: float = 30,
+        on_transition: Optional[Any] = None,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.failure_rate_threshold = failure_rate_threshold
+        self.half_open_max_calls = half_open_max_calls
+        self.probe_timeout = probe_timeout
+        self._bucket_width = window_seconds / window_buckets
+        self._bucket_ids = [-1] * window_buckets
+        self._failures = [0] * window_buckets
+        self._successes = [0] * window_buckets
+        self._on_transition = on_transition
+        self._lock = threading.Lock()
+
+        # Read without the lock on the hot path; written only under it
+        self.state = CLOSED
+        self._opened_at = 0.0           # monotonic
+        self._probe_leases: List[float] = []   # monotonic expiry of each half-open probe
+        self.last_failure_at: Optional[float] = None   # wall clock
+        self.last_success_at: Optional[float] = None   # wall clock
+        self.changed_at = 0.0                          # wall clock of last transition
+
+    # ========================================================================
+    # Hot Path
+    # ========================================================================
+
+    def allow_request(self) -> bool:
+        """Return True if a call to the service may proceed"""
+        if self.state == CLOSED:
+            return True
+        return self._allow_when_tripped()
+
+    def record_success(self) -> None:
+        """Record a successful call"""
+        self._successes[self._current_slot()] += 1
+        self.last_success_at = time.time()
+        if self.state != CLOSED:
+            with self._lock:
+                if self.state == HALF_OPEN:
+                    self._clear_window()
+                    self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        """Record a failed call and trip the breaker if the window says so"""
+        self._failures[self._current_slot()] += 1
+        self.last_failure_at = time.time()
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._trip()
+            elif self.state == CLOSED:
+                failures, total = self._window_totals()
+                if failures >= self.failure_threshold and failures >= total * self.failure_rate_threshold:
+                    self._trip()
+
+    # ========================================================================
+    # Transitions
+    # ========================================================================
+
+    def _allow_when_tripped(self) -> bool:
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.recovery_timeout:
+                    return False
+                self._probe_leases.clear()
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                now = time.monotonic()
+                self._probe_leases = [expiry for expiry in self._probe_leases if expiry > now]
+                if len(self._probe_leases) >= self.half_open_max_calls:
+                    return False
+                self._probe_leases.append(now + self.probe_timeout)
+            return True
+
+    def _trip(self) -> None:
+        self._opened_at = time.monotonic()
+        self._transition(OPEN)
+        logger.warning(f"[CircuitBreaker] {self.name} OPEN for {self.recovery_timeout}s")
+
+    def _transition(self, state: str, notify: bool = True) -> None:
+        if state == self.state:
+            return
+        self.state = state
+        self.changed_at = time.time()
+        if notify and self._on_transition is not None:
+            self._on_transition(self.name)
+
+    def reset(self, notify: bool = True) -> None:
+        """Close the breaker and forget recorded calls"""
+        with self._lock:
+            self._clear_window()
+            self._probe_leases.clear()
+            self._transition(CLOSED, notify)
+            self.changed_at = time.time()
+
+    def apply_remote(self, row: Dict[str, Any]) -> bool:
+        """
+        Adopt a transition another worker made after our last one.
+
+        Returns:
+            True if local state changed
+        """
+        remote_state = row.get("circuit_state")
+        updated_at = _parse_timestamp(row.get("updated_at"))
+        if remote_state not in (OPEN, CLOSED) or updated_at is None or updated_at <= self.changed_at:
+            return False
+
+        with self._lock:
+            if remote_state == OPEN and self.state == CLOSED:
+                failed_at = _parse_timestamp(row.get("last_failure_time")) or updated_at
+                elapsed = time.time() - failed_at
+                if elapsed >= self.recovery_timeout:
+                    return False
+                self._opened_at = time.monotonic() - max(elapsed, 0.0)
+                self._transition(OPEN, notify=False)
+            elif remote_state == CLOSED and self.state != CLOSED:
+                self._clear_window()
+                self._probe_leases.clear()
+                self._transition(CLOSED, notify=False)
+            else:
+                return False
+            self.changed_at = updated_at
+        logger.info(f"[CircuitBreaker] {self.name} {remote_state} (shared state from another worker)")
+        return True
+
+    # ========================================================================
+    # Sliding Window
+    # ========================================================================
+
+    def _current_slot(self) -> int:
+        bucket_id = int(time.monotonic() / self._bucket_width)
+        slot = bucket_id % len(self._bucket_ids)
+        if self._bucket_ids[slot] != bucket_id:
+            self._bucket_ids[slot] = bucket_id
+            self._failures[slot] = 0
+            self._successes[slot] = 0
+        return slot
+
+    def _window_totals(self) -> Tuple[int, int]:
+        current = int(time.monotonic() / self._bucket_width)
+        size = len(self._bucket_ids)
+        failures = successes = 0
+        for slot, bucket_id in enumerate(self._bucket_ids):
+            if current - bucket_id < size:
+                failures += self._failures[slot]
+                successes += self._successes[slot]
+        return failures, failures + successes
+
+    def _clear_window(self) -> None:
+        for slot in range(len(self._bucket_ids)):
+            self._bucket_ids[slot] = -1
+            self._failures[slot] = 0
+            self._successes[slot] = 0
+
+    def to_row(self) -> Dict[str, Any]:
+        """Shared-state row for circuit_breaker_state"""
+        failures, _ = self._window_totals()
+        return {
+            "service_name": self.name,
+            "failure_count": failures,
+            # Half-open is local to the probing worker; others keep treating it as open
+            "circuit_state": CLOSED if self.state == CLOSED else OPEN,
+            "last_failure_time": _format_timestamp(self.last_failure_at),
+            "last_success_time": _format_timestamp(self.last_success_at),
+            "updated_at": _format_timestamp(self.changed_at),
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        failures, total = self._window_totals()
+        return {
+            "state": self.state,
+            "window_failures": failures,
+            "window_calls": total,
+            "failure_threshold": self.failure_threshold,
+            "recovery_timeout": self.recovery_timeout,
+        }
+
+
+class CircuitBreakerRegistry:
+    """
+    Owns all breakers in the process and syncs their state in the background.
+    """
+
+    def __init__(self, sync_interval: float = 5.0) -> None:
+        self.sync_interval = sync_interval
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._dirty: Set[str] = set()
+        self._sync_task: Optional[asyncio.Task] = None
+
+    def get(self, name: str, **config: Any) -> CircuitBreaker:
+        """Return the breaker for a service, creating it with config on first use"""
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = self._breakers.setdefault(
+                name, CircuitBreaker(name, on_transition=self._dirty.add, **config)
+            )
+        return breaker
+
+    def reset(self, name: Optional[str] = None) -> None:
+        """Reset one breaker or all of them"""
+        if name is None:
+            targets = list(self._breakers.values())
+        else:
+            targets = [self._breakers[name]] if name in self._breakers else []
+        for breaker in targets:
+            breaker.reset()
+            self._dirty.add(breaker.name)
+
+    # ========================================================================
+    # Background Sync
+    # ========================================================================
+
+    async def sync(self) -> Dict[str, int]:
+        """
+        Push local transitions and pull transitions from other workers.
+
+        One upsert and one select per call, regardless of traffic.
+        """
+        dirty, self._dirty = self._dirty, set()
+        rows = [self._breakers[name].to_row() for name in dirty if name in self._breakers]
+        try:
+            if rows:
+                await asyncio.to_thread(supa_api_save_circuit_states, rows)
+            remote = await asyncio.to_thread(supa_api_get_circuit_states, list(self._breakers))
+        except Exception:
+            # Retry the push on the next round
+            self._dirty |= dirty
+            raise
+
+        applied = sum(
+            1 for name, row in remote.items()
+            if name in self._breakers and name not in self._dirty and self._breakers[name].apply_remote(row)
+        )
+        return {"pushed": len(rows), "applied": applied}
+
+    async def _sync_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[CircuitBreakerRegistry] State sync failed: {e}")
+
+    async def start(self) -> None:
+        """Start the periodic background sync"""
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.create_task(self._sync_loop(), name="circuit_breaker_sync")
+
+    async def stop(self) -> None:
+        """Stop the background sync and push any pending transitions"""
+        if self._sync_task and not self._sync_task.done():
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+        self._sync_task = None
+        if self._dirty:
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.warning(f"[CircuitBreakerRegistry] Final state sync failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-breaker state"""
+        return {name: breaker.get_stats() for name, breaker in sorted(self._breakers.items())}
+
+
+# Module-level instance; state is shared with other workers from app startup to shutdown
+circuit_breakers = service_registry.register(
+    "circuit_breakers", CircuitBreakerRegistry,
+    init=lambda registry: registry.start(), close=lambda registry: registry.stop()
+)
@@ -7,22 +7,29 @@ import logging
 from datetime import datetime, date, timedelta
 from typing import Dict, Any, List, Optional
 from decimal import Decimal, InvalidOperation
-import threading
 import time
 
 from debug_logger import DebugLogger
 from supa_api.supa_api_client import get_supa_service_client
 from vantage_api.vantage_api_client import get_vantage_client
 from utils.decimal_json_encoder import convert_decimals_to_float
-from utils.distributed_lock import DividendSyncLocks, distributed_lock, DistributedLockError
+from utils.distributed_lock import DistributedLock, DividendSyncLocks, distributed_lock, DistributedLockError, LeaseLostError
+from services.cache_dependency_index import dividends_dependency
+from services.invalidation_bus import invalidation_bus
+from services.position_history import PositionHistory
+from utils.service_registry import service_registry
 try:
-    from .feature_flag_service import is_feature_enabled
+    from .feature_flag_service import is_feature_enabled, get_feature_flags
 except ImportError:
     # Fallback for Docker builds - disable feature flags
     def is_feature_enabled(flag_name: str, user_id: str = None) -> bool:
         """Fallback feature flag function that always returns True"""
         return True
 
+    def get_feature_flags(user_id: str = None, flag_names=None):
+        """Fallback - no snapshot, helpers use is_feature_enabled"""
+        return None
+
 logger = logging.getLogger(__name__)
 
 class DividendService:
@@ -32,23 +39,21 @@ class DividendService:
         self.supa_client = get_supa_service_client()
         self.vantage_client = get_vantage_client()
         
-        # DEPRECATED: Race condition protection (replaced with distributed locks)
-        # TODO: Remove these in-memory locks once all methods are updated to use distributed locks
-        self._sync_lock = threading.RLock()  # DEPRECATED - use distributed_lock instead
+        # Sync exclusion across workers is handled by lease locks (DividendSyncLocks)
         self._last_global_sync = 0
-        self._user_sync_locks = {}  # DEPRECATED - use DividendSyncLocks instead
-        self._global_sync_in_progress = False  # DEPRECATED - use DividendSyncLocks instead
         
         logger.info(f"[DividendService] Initialized with service client: {type(self.supa_client)}")
     
     # 🛡️ BULLETPROOF DECIMAL UTILITIES for Financial Precision
-    def _safe_decimal_conversion(self, value: Any, user_id: Optional[str] = None) -> Decimal:
+    def _safe_decimal_conversion(self, value: Any, user_id: Optional[str] = None, flags: Any = None) -> Decimal:
         """
         Convert any value to Decimal with feature flag controlled precision.
         
         Args:
             value: Value to convert (str, int, float, Decimal)
             user_id: User ID for feature flag evaluation
+            flags: Optional FeatureFlagSnapshot from get_feature_flags(), used
+                instead of evaluating the flag when converting in a loop
             
         Returns:
             Decimal value with proper precision
@@ -61,7 +66,11 @@ class DividendService:
                 return Decimal('0')
             
             # Feature flag controlled conversion
-            if is_feature_enabled("decimal_migration", user_id):
+            decimal_migration = (
+                flags.is_enabled("decimal_migration") if flags is not None
+                else is_feature_enabled("decimal_migration", user_id)
+            )
+            if decimal_migration:
                 # Precise conversion - maintain original precision
                 if isinstance(value, Decimal):
                     return value
@@ -118,42 +127,9 @@ class DividendService:
             return Decimal('0')
     
     def _can_start_global_sync(self) -> bool:
-        """Check if global sync can start (no user syncs in progress, not rate limited)"""
-        with self._sync_lock:
-            # Don't start if already in progress
-            if self._global_sync_in_progress:
-                return False
-            
-            # Rate limiting: don't sync more than once every 10 minutes
-            current_time = time.time()
-            if current_time - self._last_global_sync < 600:  # 10 minutes
-                return False
-            
-            # Don't start if any user syncs are in progress
-            if any(self._user_sync_locks.values()):
-                return False
-            
-            return True
-    
-    def _acquire_user_sync_lock(self, user_id: str) -> bool:
-        """Try to acquire sync lock for a specific user"""
-        with self._sync_lock:
-            # Don't allow user sync if global sync is in progress
-            if self._global_sync_in_progress:
-                return False
-            
-            # Don't allow if this user is already syncing
-            if self._user_sync_locks.get(user_id, False):
-                return False
-            
-            # Acquire the lock
-            self._user_sync_locks[user_id] = True
-            return True
-    
-    def _release_user_sync_lock(self, user_id: str) -> None:
-        """Release sync lock for a specific user"""
-        with self._sync_lock:
-            self._user_sync_locks[user_id] = False
+        """Rate limit global syncs; a running sync is excluded by the global sync lease"""
+        # Don't sync more than once every 10 minutes
+        return time.time() - self._last_global_sync >= 600
     
     def _validate_dividend_data(self, dividend: Dict[str, Any], symbol: str) -> Dict[str, Any]:
         """Validate dividend data and return validation result"""
@@ -297,7 +273,14 @@ class DividendService:
         }
     
     @DebugLogger.log_api_call(api_name="DIVIDEND_SERVICE", sender="BACKEND", receiver="DATABASE", operation="SYNC_DIVIDENDS")
-    async def sync_dividends_for_symbol(self, user_id: str, symbol: str, user_token: str, from_date: Optional[date] = None) -> Dict[str, Any]:
+    async def sync_dividends_for_symbol(
+        self,
+        user_id: str,
+        symbol: str,
+        user_token: str,
+        from_date: Optional[date] = None,
+        positions: Optional[PositionHistory] = None
+    ) -> Dict[str, Any]:
         """
         Sync dividends for a specific symbol from Alpha Vantage and calculate user ownership
         
@@ -306,14 +289,19 @@ class DividendService:
             symbol: Stock ticker symbol
             user_token: User's JWT token for authentication
             from_date: Start date for dividend sync (defaults to user's first transaction)
+            positions: The user's PositionHistory when the caller already built one
             
         Returns:
             Dict with sync results
         """
         try:
+            # One transaction fetch answers the first date and every ex-date below
+            if positions is None:
+                positions = await self._get_position_history(user_id, user_token)
+            
             # Get user's first transaction date for this symbol if no from_date provided
             if not from_date:
-                first_transaction_date = await self._get_first_transaction_date(user_id, symbol, user_token)
+                first_transaction_date = await self._get_first_transaction_date(user_id, symbol, user_token, positions)
                 if first_transaction_date:
                     from_date = first_transaction_date
                 else:
@@ -357,9 +345,7 @@ class DividendService:
             
             for dividend in filtered_dividends:
                 # Calculate shares held at ex-date
-                shares_at_ex_date = await self._calculate_shares_owned_at_date(
-                    user_id, symbol, dividend['ex_date'], user_token
-                )
+                shares_at_ex_date = positions.shares_at(symbol, dividend['ex_date'])
                 
                 if shares_at_ex_date > 0:
                     # Create user-specific dividend record
@@ -652,7 +638,12 @@ class DividendService:
             logger.error(f"Dividend data that caused error: {data if 'data' in locals() else dividend_data}")
             return False
     
-    async def _upsert_global_dividend_fixed(self, symbol: str, dividend_data: Dict[str, Any]) -> bool:
+    async def _upsert_global_dividend_fixed(
+        self,
+        symbol: str,
+        dividend_data: Dict[str, Any],
+        lock: Optional[DistributedLock] = None
+    ) -> bool:
         """
         FIXED: Idempotent upsert with proper validation and duplicate prevention
         
@@ -661,6 +652,13 @@ class DividendService:
         2. Proper duplicate checking with unique constraints
         3. Consistent data format
         4. Cleaner code structure
+        
+        When called under a sync lock, the lease is checked before the write
+        and its fencing token is stored with the row (migration 014 rejects
+        tokens that no longer hold a lease).
+        
+        Raises:
+            LeaseLostError: If the sync lock was lost; the caller must stop writing
         """
         try:
             # Validate required fields
@@ -674,7 +672,7 @@ class DividendService:
             
             # Validate and convert amount
             try:
-                per_share_amount = self._safe_decimal_conversion(dividend_data['amount'], user_id)
+                per_share_amount = self._safe_decimal_conversion(dividend_data['amount'])
                 if per_share_amount <= 0:
                     logger.warning(f"Skipping dividend for {symbol}: non-positive amount {per_share_amount}")
                     return False
@@ -730,6 +728,10 @@ class DividendService:
             # Convert Decimal objects to float for Supabase compatibility
             clean_insert_data = convert_decimals_to_float(insert_data)
             
+            if lock is not None:
+                lock.ensure_held()
+                clean_insert_data['sync_fencing_token'] = lock.fencing_token
+            
             # Insert with error handling
             result = self.supa_client.table('user_dividends') \
                 .insert(clean_insert_data) \
@@ -742,6 +744,8 @@ class DividendService:
                 logger.error(f"Failed to insert dividend for {symbol}: no data returned")
                 return False
             
+        except LeaseLostError:
+            raise
         except Exception as e:
             logger.error(f"Failed to upsert global dividend for {symbol}: {e}")
             return False
@@ -822,6 +826,8 @@ class DividendService:
             
             logger.info(f"[DIVIDEND_DEBUG] After filtering rejected: {len(filtered_dividends)} dividends remain")
             
+            positions = PositionHistory(all_transactions)
+            
             # Simple processing - data is already user-specific with correct amounts
             enriched_dividends = []
             for dividend in filtered_dividends:
@@ -831,9 +837,7 @@ class DividendService:
                 is_confirmed = (dividend['symbol'], dividend['pay_date']) in confirmed_dividends_set
                 
                 # Calculate current holdings for display
-                current_holdings = self._calculate_current_holdings_from_transactions(
-                    all_transactions, dividend['symbol']
-                )
+                current_holdings = positions.current_shares(dividend['symbol'])
                 
                 # Ensure id is explicitly included and converted to string
                 dividend_id = dividend.get('id')
@@ -1423,13 +1427,14 @@ class DividendService:
             ]
             
             # Calculate totals with Decimal precision
-            total_received = sum(self._safe_decimal_conversion(div['amount'], user_id) for div in confirmed_dividends)
-            total_pending = sum(self._safe_decimal_conversion(div['amount'], user_id) for div in pending_dividends)
+            flags = get_feature_flags(user_id, ["decimal_migration"])
+            total_received = sum(self._safe_decimal_conversion(div['amount'], user_id, flags) for div in confirmed_dividends)
+            total_pending = sum(self._safe_decimal_conversion(div['amount'], user_id, flags) for div in pending_dividends)
             
             # Calculate YTD dividends
             current_year = datetime.now().year
             ytd_dividends = sum(
-                self._safe_decimal_conversion(div['amount'], user_id) for div in confirmed_dividends
+                self._safe_decimal_conversion(div['amount'], user_id, flags) for div in confirmed_dividends
                 if datetime.strptime(div['pay_date'], '%Y-%m-%d').year == current_year
             )
             
@@ -1461,66 +1466,44 @@ class DividendService:
                 "summary": {}
             }
 
-    async def _get_first_transaction_date(self, user_id: str, symbol: str, user_token: str) -> Optional[date]:
+    async def _get_position_history(self, user_id: str, user_token: str) -> PositionHistory:
+        """Fetch the user's transactions once and index their positions over time"""
+        # Import here to avoid circular imports
+        from supa_api.supa_api_transactions import supa_api_get_user_transactions
+        
+        transactions = await supa_api_get_user_transactions(user_id, limit=1000, user_token=user_token)
+        return PositionHistory(transactions or [])
+    
+    async def _get_first_transaction_date(
+        self,
+        user_id: str,
+        symbol: str,
+        user_token: str,
+        positions: Optional[PositionHistory] = None
+    ) -> Optional[date]:
         """Get the date of user's first transaction for a symbol"""
         try:
-            # Import here to avoid circular imports
-            from supa_api.supa_api_transactions import supa_api_get_user_transactions
-            
-            # Get all transactions for this symbol
-            transactions = await supa_api_get_user_transactions(user_id, limit=1000, user_token=user_token)
-            
-            if not transactions:
-                return None
-            
-            # Filter by symbol and find the earliest date
-            symbol_transactions = [t for t in transactions if t['symbol'] == symbol]
-            if not symbol_transactions:
-                return None
-                
-            # Sort by date and get the first one
-            symbol_transactions.sort(key=lambda x: x['date'])
-            return datetime.strptime(symbol_transactions[0]['date'], '%Y-%m-%d').date()
+            if positions is None:
+                positions = await self._get_position_history(user_id, user_token)
+            return positions.first_date(symbol)
             
         except Exception as e:
             logger.error(f"Failed to get first transaction date: {e}")
             return None
     
-    async def _calculate_shares_owned_at_date(self, user_id, symbol: str, target_date: str, user_token: str) -> Decimal:
+    async def _calculate_shares_owned_at_date(
+        self,
+        user_id,
+        symbol: str,
+        target_date: str,
+        user_token: str,
+        positions: Optional[PositionHistory] = None
+    ) -> Decimal:
         """Calculate how many shares user owned at a specific date"""
         try:
-            # Import here to avoid circular imports
-            from supa_api.supa_api_transactions import supa_api_get_user_transactions
-            
-            # Get all transactions for this symbol up to the target date
-            target_date_obj = datetime.strptime(target_date, '%Y-%m-%d').date()
-            
-            # Get all transactions using the authenticated API
-            all_transactions = await supa_api_get_user_transactions(user_id, limit=1000, user_token=user_token)
-            
-            if not all_transactions:
-                return Decimal('0')
-            
-            # Filter transactions for this symbol up to the target date
-            relevant_transactions = [
-                t for t in all_transactions 
-                if t['symbol'] == symbol and 
-                datetime.strptime(t['date'], '%Y-%m-%d').date() <= target_date_obj
-            ]
-            
-            if not relevant_transactions:
-                return Decimal('0')
-            
-            # Calculate running total of shares
-            total_shares = Decimal('0')
-            for transaction in relevant_transactions:
-                if transaction['transaction_type'] in ['BUY', 'Buy']:
-                    total_shares += Decimal(str(transaction['quantity']))
-                elif transaction['transaction_type'] in ['SELL', 'Sell']:
-                    total_shares -= Decimal(str(transaction['quantity']))
-                # Note: DIVIDEND transactions don't affect share count
-            
-            return max(Decimal('0'), total_shares)  # Can't have negative shares
+            if positions is None:
+                positions = await self._get_position_history(user_id, user_token)
+            return positions.shares_at(symbol, target_date)
             
         except Exception as e:
             logger.error(f"Failed to calculate shares owned at date: {e}")
@@ -1534,7 +1517,7 @@ class DividendService:
         user_lock_name = f"dividend_sync_user_{user_id}"
         
         try:
-            async with distributed_lock(user_lock_name, timeout_seconds=300, max_wait_seconds=5):
+            async with distributed_lock(user_lock_name, timeout_seconds=300, max_wait_seconds=5) as lock:
                 logger.info(f"[DividendService] Acquired distributed lock for user {user_id} dividend sync")
                 
                 # Check if global sync is running (using distributed lock check)
@@ -1548,7 +1531,7 @@ class DividendService:
                 logger.info(f"[DividendService] Starting protected user sync for {user_id}")
                 
                 # Use the existing sync logic but with distributed protection
-                return await self._sync_dividends_for_all_holdings_impl(user_id, user_token)
+                return await self._sync_dividends_for_all_holdings_impl(user_id, user_token, lock)
                 
         except DistributedLockError as e:
             logger.warning(f"[DividendService] Could not acquire user sync lock for {user_id}: {e}")
@@ -1565,8 +1548,13 @@ class DividendService:
                 "code": "SYNC_ERROR"
             }
     
-    async def _sync_dividends_for_all_holdings_impl(self, user_id: str, user_token: str) -> Dict[str, Any]:
-        """Implementation of user dividend sync (extracted from original method)"""
+    async def _sync_dividends_for_all_holdings_impl(
+        self,
+        user_id: str,
+        user_token: str,
+        lock: Optional[DistributedLock] = None
+    ) -> Dict[str, Any]:
+        """Implementation of user dividend sync (extracted from original method); writes are fenced by lock"""
         try:
             logger.info(f"[DividendService] Starting efficient dividend sync for user {user_id}")
             
@@ -1586,6 +1574,7 @@ class DividendService:
             
             # STEP 2: Build holdings and first transaction dates from the transaction data
             holdings_info = self._analyze_transactions(all_transactions)
+            positions = PositionHistory(all_transactions)
             
             if not holdings_info:
                 return {
@@ -1632,7 +1621,7 @@ class DividendService:
                     
                     # Using the improved fixed version for better validation and consistency
                     inserted = await self._upsert_global_dividend_fixed(
-                        symbol=symbol, dividend_data=dividend
+                        symbol=symbol, dividend_data=dividend, lock=lock
                     )
                     
                     if inserted:
@@ -1643,9 +1632,7 @@ class DividendService:
                         logger.error(f"[DIVIDEND_INSERT_DEBUG] Dividend data that failed: {dividend}")
                     
                     # Optional: Calculate shares for logging (but don't filter by it)
-                    shares_owned = self._calculate_shares_at_date(
-                        all_transactions, symbol, dividend['ex_date']
-                    )
+                    shares_owned = positions.shares_at(symbol, dividend['ex_date'])
                     logger.info(f"[DividendService] Note: Users held {shares_owned} shares of {symbol} on {dividend['ex_date']}")
                 
                 total_synced += symbol_synced
@@ -1692,9 +1679,9 @@ class DividendService:
         
         # Use distributed locking to prevent race conditions across multiple server instances
         try:
-            async with distributed_lock("dividend_sync_global", timeout_seconds=600, max_wait_seconds=5):
+            async with distributed_lock("dividend_sync_global", timeout_seconds=600, max_wait_seconds=5) as lock:
                 logger.info("[DividendService] Acquired distributed lock for global dividend sync")
-                return await self._background_dividend_sync_all_users_impl()
+                return await self._background_dividend_sync_all_users_impl(lock)
                 
         except DistributedLockError as e:
             logger.warning(f"[DividendService] Could not acquire global sync lock: {e}")
@@ -1711,8 +1698,8 @@ class DividendService:
                 "code": "SYNC_ERROR"
             }
     
-    async def _background_dividend_sync_all_users_impl(self) -> Dict[str, Any]:
-        """Implementation of global background sync - OPTIMIZED with smart filtering"""
+    async def _background_dividend_sync_all_users_impl(self, lock: Optional[DistributedLock] = None) -> Dict[str, Any]:
+        """Implementation of global background sync - OPTIMIZED with smart filtering; writes are fenced by lock"""
         try:
             # OPTIMIZATION: Check if any dividend data was recently added (within last 6 hours)
             six_hours_ago = (datetime.now() - timedelta(hours=6)).isoformat()
@@ -1763,7 +1750,7 @@ class DividendService:
                         # Insert dividend into global table (for ALL dividends, not user-specific)
                         # Using the improved fixed version for better validation and consistency
                         inserted = await self._upsert_global_dividend_fixed(
-                            symbol=symbol, dividend_data=dividend
+                            symbol=symbol, dividend_data=dividend, lock=lock
                         )
                         
                         if inserted:
@@ -1781,6 +1768,8 @@ class DividendService:
                         "dividends_inserted": symbol_inserted
                     })
                     
+                except LeaseLostError:
+                    raise
                 except Exception as e:
                    # DebugLogger.log_error(file_name="dividend_service.py", function_name="background_dividend_sync_all_users", error=e, symbol=symbol, additional_info=f"Failed to sync symbol {symbol}")
                     sync_results.append({
@@ -1954,25 +1943,8 @@ class DividendService:
     async def _get_current_holdings(self, user_id: str, symbol: str, user_token: str) -> float:
         """Get user's current holdings for a symbol"""
         try:
-            from supa_api.supa_api_transactions import supa_api_get_user_transactions
-            
-            all_transactions = await supa_api_get_user_transactions(user_id, limit=1000, user_token=user_token)
-            
-            if not all_transactions:
-                return Decimal('0')
-            
-            # Filter by symbol and calculate current holdings
-            symbol_transactions = [txn for txn in all_transactions if txn['symbol'] == symbol]
-            
-            total_shares = Decimal('0')
-            for txn in symbol_transactions:
-                if txn['transaction_type'] in ['BUY', 'Buy']:
-                    total_shares += self._safe_decimal_conversion(txn['quantity'], user_id)
-                elif txn['transaction_type'] in ['SELL', 'Sell']:
-                    total_shares -= self._safe_decimal_conversion(txn['quantity'], user_id)
-                # DIVIDEND transactions don't affect share count
-            
-            return max(Decimal('0'), total_shares)
+            positions = await self._get_position_history(user_id, user_token)
+            return positions.current_shares(symbol)
             
         except Exception as e:
             logger.error(f"Failed to get current holdings for {symbol}: {e}")
@@ -2005,51 +1977,6 @@ class DividendService:
             logger.error(f"Failed to check dividend confirmation status: {e}")
             return False
     
-    def _calculate_current_holdings_from_transactions(self, transactions: List[Dict[str, Any]], symbol: str) -> float:
-        """Calculate current holdings from pre-loaded transactions"""
-        try:
-            symbol_transactions = [txn for txn in transactions if txn['symbol'] == symbol]
-            
-            total_shares = Decimal('0')
-            for txn in symbol_transactions:
-                if txn['transaction_type'] in ['BUY', 'Buy']:
-                    total_shares += self._safe_decimal_conversion(txn['quantity'], user_id)
-                elif txn['transaction_type'] in ['SELL', 'Sell']:
-                    total_shares -= self._safe_decimal_conversion(txn['quantity'], user_id)
-                # DIVIDEND transactions don't affect share count
-            
-            return max(Decimal('0'), total_shares)
-            
-        except Exception as e:
-            logger.error(f"Failed to calculate current holdings for {symbol}: {e}")
-            return Decimal('0')
-
-    def _calculate_shares_at_date(self, transactions: List[Dict[str, Any]], symbol: str, target_date: str) -> float:
-        """Calculate shares held at a specific date from pre-loaded transactions"""
-        try:
-            target_date_obj = datetime.strptime(target_date, '%Y-%m-%d').date()
-            
-            # Filter transactions for this symbol that occurred on or before the target date
-            symbol_transactions = [
-                txn for txn in transactions 
-                if txn['symbol'] == symbol and 
-                datetime.strptime(str(txn['date']), '%Y-%m-%d').date() <= target_date_obj
-            ]
-            
-            total_shares = Decimal('0')
-            for txn in symbol_transactions:
-                if txn['transaction_type'] in ['BUY', 'Buy']:
-                    total_shares += self._safe_decimal_conversion(txn['quantity'], user_id)
-                elif txn['transaction_type'] in ['SELL', 'Sell']:
-                    total_shares -= self._safe_decimal_conversion(txn['quantity'], user_id)
-                # DIVIDEND transactions don't affect share count
-            
-            return max(Decimal('0'), total_shares)
-            
-        except Exception as e:
-            logger.error(f"Failed to calculate shares at date {target_date} for {symbol}: {e}")
-            return Decimal('0')
-
     def _get_company_name(self, symbol: str) -> str:
         """Utility to get company name from a hardcoded list."""
         companies: Dict[str, str] = {
@@ -2083,8 +2010,10 @@ class DividendService:
             
             for user_id in users:
                 try:
-                    # Get user's holdings with date ranges
-                    holdings = await self._get_user_holdings_with_date_ranges(user_id)
+                    # Get user's holdings with date ranges; one transaction query per user
+                    transactions = self._fetch_user_transactions(user_id)
+                    holdings = await self._get_user_holdings_with_date_ranges(user_id, transactions)
+                    positions = PositionHistory(transactions)
                     logger.info(f"[SIMPLE_DIVIDEND_ASSIGNMENT] User {user_id}: {len(holdings)} holdings")
                     
                     user_assigned = 0
@@ -2102,7 +2031,7 @@ class DividendService:
                         
                         for dividend in dividends:
                             # Calculate shares owned at ex_date
-                            shares_at_ex_date = await self._calculate_shares_at_date_simple(user_id, symbol, dividend['ex_date'])
+                            shares_at_ex_date = positions.shares_at(symbol, dividend['ex_date'])
                             
                             if shares_at_ex_date > 0:
                                 # Create user-specific dividend record
@@ -2132,11 +2061,18 @@ class DividendService:
             
             #logger.info(f"[SIMPLE_DIVIDEND_ASSIGNMENT] ✅ COMPLETED: {total_assigned} dividends assigned to {len(users)} users")
             
+            # Only the users who received new dividends need fresh portfolio caches (in every worker)
+            cache_invalidation = await invalidation_bus.invalidate_dependencies("dividend_assignment", [
+                dividends_dependency(result["user_id"])
+                for result in assignment_results if result.get("dividends_assigned")
+            ])
+            
             return {
                 "success": True,
                 "total_users": len(users),
                 "total_assigned": total_assigned,
                 "assignment_results": assignment_results,
+                "cache_invalidation": cache_invalidation,
                 "message": f"Simple dividend assignment completed: {total_assigned} dividends assigned"
             }
             
@@ -2165,17 +2101,26 @@ class DividendService:
             logger.error(f"Error getting users with transactions: {e}")
             return []
     
-    async def _get_user_holdings_with_date_ranges(self, user_id: str) -> List[Dict[str, Any]]:
+    def _fetch_user_transactions(self, user_id: str) -> List[Dict[str, Any]]:
+        """All of a user's transactions, oldest first (service client)"""
+        result = self.supa_client.table('transactions') \
+            .select('*') \
+            .eq('user_id', user_id) \
+            .order('date') \
+            .execute()
+        return result.data or []
+    
+    async def _get_user_holdings_with_date_ranges(
+        self,
+        user_id: str,
+        transactions: Optional[List[Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
         """Get user's holdings with the date ranges they owned each symbol"""
         try:
             # Get all transactions for user
-            result = self.supa_client.table('transactions') \
-                .select('*') \
-                .eq('user_id', user_id) \
-                .order('date') \
-                .execute()
+            if transactions is None:
+                transactions = self._fetch_user_transactions(user_id)
             
-            transactions = result.data
             if not transactions:
                 return []
             
@@ -2241,38 +2186,6 @@ class DividendService:
             logger.error(f"Error getting global dividends for {symbol}: {e}")
             return []
     
-    async def _calculate_shares_at_date_simple(self, user_id: str, symbol: str, target_date: str) -> Decimal:
-        """Calculate shares owned by user at a specific date (simplified version)"""
-        try:
-            target_date_obj = datetime.strptime(target_date, '%Y-%m-%d').date()
-            
-            # Get all transactions for this user and symbol up to the target date
-            result = self.supa_client.table('transactions') \
-                .select('*') \
-                .eq('user_id', user_id) \
-                .eq('symbol', symbol) \
-                .lte('date', target_date) \
-                .order('date') \
-                .execute()
-            
-            transactions = result.data
-            if not transactions:
-                return Decimal('0')
-            
-            total_shares = Decimal('0')
-            for txn in transactions:
-                if txn['transaction_type'].upper() in ['BUY', 'PURCHASE']:
-                    total_shares += Decimal(str(txn['quantity']))
-                elif txn['transaction_type'].upper() in ['SELL', 'SALE']:
-                    total_shares -= Decimal(str(txn['quantity']))
-            
-            #logger.info(f"[SIMPLE_DIVIDEND_ASSIGNMENT] User {user_id} owned {total_shares} shares of {symbol} on {target_date}")
-            return max(Decimal('0'), total_shares)
-            
-        except Exception as e:
-            logger.error(f"Error calculating shares for {user_id} {symbol} at {target_date}: {e}")
-            return Decimal('0')
-    
     async def _create_user_dividend_record(self, user_id: str, dividend: Dict[str, Any], shares_held: float, total_amount: float) -> bool:
         """Create a user-specific dividend record"""
         try:
@@ -2441,5 +2354,5 @@ class DividendService:
                 "error": str(e)
             }
 
-# Create singleton instance
-dividend_service = DividendService()
\ No newline at end of file
+# Singleton instance, created on first use
+dividend_service = service_registry.register("dividend_service", DividendService)
\ No newline at end of file
@@ -7,9 +7,10 @@ validation, and bulletproof safety controls for the Portfolio Tracker.
 
 import hashlib
 import logging
-from decimal import Decimal
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Set, Tuple, Union, Any
+import time
+from datetime import datetime
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Set, Tuple, Union, Any
 from pydantic import ValidationError
 
 try:
@@ -54,6 +55,8 @@ except ImportError:
         RolloutStrategy = Dict[str, Any]
         PORTFOLIO_TRACKER_FEATURE_FLAGS = {}
 
+from utils.service_registry import service_registry
+
 try:
     from ..utils.auth_helpers import extract_user_credentials
 except ImportError:
@@ -64,18 +67,52 @@ except ImportError:
         def extract_user_credentials(user_data) -> Dict[str, str]:
             return {"user_id": "anonymous", "email": ""}
 
-try:
-    from ..utils.exceptions import ValidationError as CustomValidationError
-except ImportError:
-    try:
-        from utils.exceptions import ValidationError as CustomValidationError
-    except ImportError:
-        # Use standard ValidationError as fallback
-        from pydantic import ValidationError as CustomValidationError
+# utils.exceptions has no ValidationError, so this always resolved to pydantic's;
+# importing it directly skips loading FastAPI through utils.exceptions
+from pydantic import ValidationError as CustomValidationError
 
 logger = logging.getLogger(__name__)
 
 
+class FlagDecision(NamedTuple):
+    """Outcome of a compiled flag for one user"""
+    is_enabled: bool
+    reason: str
+    rollout_strategy: RolloutStrategy
+
+
+class FeatureFlagSnapshot:
+    """
+    Frozen flag decisions for one user at one config version.
+
+    Evaluate once per request with get_feature_flags() and pass it down, so
+    per-value helpers pay a dict lookup instead of a flag evaluation.
+    """
+
+    __slots__ = ("user_id", "version", "_decisions")
+
+    def __init__(self, user_id: Optional[str], version: int, decisions: Dict[str, bool]) -> None:
+        self.user_id = user_id
+        self.version = version
+        self._decisions: Mapping[str, bool] = MappingProxyType(dict(decisions))
+
+    def is_enabled(self, flag_name: str) -> bool:
+        """Decision for a flag; unknown flags are disabled"""
+        return self._decisions.get(flag_name, False)
+
+    def __getitem__(self, flag_name: str) -> bool:
+        return self.is_enabled(flag_name)
+
+    def __contains__(self, flag_name: object) -> bool:
+        return flag_name in self._decisions
+
+    def to_dict(self) -> Dict[str, bool]:
+        return dict(self._decisions)
+
+    def __repr__(self) -> str:
+        return f"FeatureFlagSnapshot(user_id={self.user_id!r}, version={self.version}, flags={dict(self._decisions)!r})"
+
+
 class FeatureFlagService:
     """
     Bulletproof feature flag service with comprehensive safety controls,
@@ -86,9 +123,18 @@ class FeatureFlagService:
         """Initialize feature flag service with environment context"""
         self.environment = environment
         self._flags_cache: Dict[str, FeatureFlagConfig] = {}
-        self._cache_expiry: Optional[datetime] = None
+        self._refresh_at = 0.0
         self._cache_ttl_seconds = 300  # 5 minutes
         
+        # Flags compiled into decision closures, and decisions memoized per
+        # (flag, user). Both are replaced whenever the config version changes.
+        self._config_version = 0
+        self._compiled: Dict[str, Callable[[Optional[str]], FlagDecision]] = {}
+        self._decisions: Dict[Tuple[str, Optional[str]], FlagDecision] = {}
+        self._max_decisions = 50000
+        self._resolving: Set[Tuple[str, Optional[str]]] = set()
+        self._decision_stats = {"hits": 0, "misses": 0, "compilations": 0}
+        
         # Initialize with predefined flags
         self._initialize_default_flags()
         
@@ -101,7 +147,8 @@ class FeatureFlagService:
                 self._flags_cache[config.flag_name] = config
                 logger.debug(f"Initialized feature flag: {config.flag_name}")
             
-            self._cache_expiry = datetime.utcnow() + timedelta(seconds=self._cache_ttl_seconds)
+            self._compile_flags()
+            self._refresh_at = time.monotonic() + self._cache_ttl_seconds
             logger.info(f"Initialized {len(PORTFOLIO_TRACKER_FEATURE_FLAGS)} default feature flags")
             
         except Exception as e:
@@ -129,8 +176,9 @@ class FeatureFlagService:
             CustomValidationError: If flag evaluation fails
         """
         try:
-            evaluation = self.evaluate_flag(flag_name, user_id, context or {})
-            return evaluation.is_enabled
+            # Context does not influence the decision, only the audit detail
+            # returned by evaluate_flag, so the memoized path is enough here
+            return self._decide(flag_name, user_id).is_enabled
             
         except Exception as e:
             logger.error(f"Failed to check flag {flag_name}: {e}")
@@ -161,59 +209,19 @@ class FeatureFlagService:
             context = {}
             
         try:
-            # Get flag configuration
-            flag_config = self._get_flag_config(flag_name)
-            if not flag_config:
-                raise CustomValidationError(f"Feature flag '{flag_name}' not found")
-            
-            # Check kill switch first (overrides everything)
-            if flag_config.kill_switch:
-                return FeatureFlagEvaluation(
-                    flag_name=flag_name,
-                    is_enabled=False,
-                    reason="kill_switch_active",
-                    rollout_strategy=RolloutStrategy.ALL_USERS,
-                    evaluation_context=context
-                )
-            
-            # Check dependencies
-            dependency_check = self._check_dependencies(flag_config, user_id, context)
-            if not dependency_check[0]:
-                return FeatureFlagEvaluation(
-                    flag_name=flag_name,
-                    is_enabled=False,
-                    reason=f"dependency_not_met: {dependency_check[1]}",
-                    rollout_strategy=flag_config.rollout_strategy,
-                    evaluation_context=context
-                )
-            
-            # Check incompatibilities
-            incompatibility_check = self._check_incompatibilities(flag_config, user_id, context)
-            if not incompatibility_check[0]:
-                return FeatureFlagEvaluation(
-                    flag_name=flag_name,
-                    is_enabled=False,
-                    reason=f"incompatible_flag_enabled: {incompatibility_check[1]}",
-                    rollout_strategy=flag_config.rollout_strategy,
-                    evaluation_context=context
-                )
-            
-            # Check environment filter
-            if flag_config.environment_filter:
-                if self.environment not in flag_config.environment_filter:
-                    return FeatureFlagEvaluation(
-                        flag_name=flag_name,
-                        is_enabled=False,
-                        reason=f"environment_not_allowed: {self.environment}",
-                        rollout_strategy=flag_config.rollout_strategy,
-                        evaluation_context=context
-                    )
-            
-            # Main evaluation logic based on status and strategy
-            evaluation_result = self._evaluate_rollout_strategy(flag_config, user_id, context)
+            decision = self._decide(flag_name, user_id)
+            evaluation_result = FeatureFlagEvaluation(
+                flag_name=flag_name,
+                is_enabled=decision.is_enabled,
+                reason=decision.reason,
+                rollout_strategy=decision.rollout_strategy,
+                evaluation_context=context
+            )
             
             # Log evaluation for audit trail
-            self._log_evaluation(flag_config, evaluation_result, user_id, context)
+            flag_config = self._flags_cache.get(flag_name)
+            if flag_config is not None:
+                self._log_evaluation(flag_config, evaluation_result, user_id, context)
             
             return evaluation_result
             
@@ -228,6 +236,59 @@ class FeatureFlagService:
                 evaluation_context=context
             )
     
+    def evaluate_flags(
+        self,
+        user_id: Optional[str] = None,
+        flag_names: Optional[Iterable[str]] = None
+    ) -> FeatureFlagSnapshot:
+        """
+        Evaluate flags for a user into a frozen snapshot.
+        
+        Args:
+            user_id: Optional user ID for user-based rollouts
+            flag_names: Flags to include (defaults to every known flag)
+            
+        Returns:
+            FeatureFlagSnapshot; flags that fail to evaluate are disabled
+        """
+        version = self._config_version
+        names = list(self._compiled) if flag_names is None else list(flag_names)
+        decisions: Dict[str, bool] = {}
+        for flag_name in names:
+            try:
+                decisions[flag_name] = self._decide(flag_name, user_id).is_enabled
+            except Exception as e:
+                logger.error(f"Failed to evaluate flag {flag_name}: {e}")
+                decisions[flag_name] = False
+        return FeatureFlagSnapshot(user_id, version, decisions)
+    
+    def update_flag(self, config: FeatureFlagConfig) -> int:
+        """
+        Replace a flag configuration and recompile.
+        
+        Args:
+            config: New configuration for the flag
+            
+        Returns:
+            The new config version
+        """
+        self._flags_cache[config.flag_name] = config
+        return self._compile_flags()
+    
+    @property
+    def config_version(self) -> int:
+        """Incremented every time the flag configuration changes"""
+        return self._config_version
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Decision cache statistics"""
+        return {
+            "config_version": self._config_version,
+            "compiled_flags": len(self._compiled),
+            "cached_decisions": len(self._decisions),
+            **self._decision_stats
+        }
+    
     def evaluate_multiple_flags(
         self, 
         request: FeatureFlagRequest
@@ -304,8 +365,9 @@ class FeatureFlagService:
             flag_config.last_modified_by = request.disabled_by
             flag_config.last_modified_at = datetime.utcnow()
             
-            # Update cache
+            # Update cache and drop compiled decisions
             self._flags_cache[request.flag_name] = flag_config
+            self._compile_flags()
             
             # Log the emergency disable
             audit_log = FeatureFlagAuditLog(
@@ -338,7 +400,7 @@ class FeatureFlagService:
         """Get feature flag configuration from cache or storage"""
         try:
             # Check cache expiry
-            if self._cache_expiry and datetime.utcnow() > self._cache_expiry:
+            if time.monotonic() >= self._refresh_at:
                 self._refresh_cache()
             
             return self._flags_cache.get(flag_name)
@@ -347,102 +409,120 @@ class FeatureFlagService:
             logger.error(f"Failed to get flag config for {flag_name}: {e}")
             return None
     
-    def _evaluate_rollout_strategy(
-        self,
-        flag_config: FeatureFlagConfig,
-        user_id: Optional[str],
-        context: Dict[str, Union[str, int, bool]]
-    ) -> FeatureFlagEvaluation:
-        """Evaluate flag based on its rollout strategy"""
+    # ========================================================================
+    # Compiled evaluation
+    # ========================================================================
+    
+    def _compile_flags(self) -> int:
+        """Compile every flag into a decision closure and start a new config version"""
+        compiled = {
+            flag_name: self._compile_flag(config)
+            for flag_name, config in self._flags_cache.items()
+        }
+        # Swap rather than mutate so in-flight evaluations never mix versions
+        self._compiled = compiled
+        self._decisions = {}
+        self._config_version += 1
+        self._decision_stats["compilations"] += 1
+        logger.debug(f"[FeatureFlagService] Compiled {len(compiled)} flags (version {self._config_version})")
+        return self._config_version
+    
+    def _compile_flag(self, flag_config: FeatureFlagConfig) -> Callable[[Optional[str]], FlagDecision]:
+        """
+        Turn a flag configuration into a closure of user_id.
         
-        # Check if globally disabled
-        if flag_config.status == FeatureFlagStatus.DISABLED:
-            return FeatureFlagEvaluation(
-                flag_name=flag_config.flag_name,
-                is_enabled=False,
-                reason="flag_disabled",
-                rollout_strategy=flag_config.rollout_strategy,
-                evaluation_context=context
-            )
+        The checks run in the same order as before: kill switch, dependencies,
+        incompatibilities, environment, status, canary users, percentage.
+        Everything that does not depend on the user is decided here, once.
+        """
+        flag_name = flag_config.flag_name
+        strategy = flag_config.rollout_strategy
         
-        # Check if globally enabled
-        if flag_config.status == FeatureFlagStatus.ENABLED:
-            if flag_config.rollout_strategy == RolloutStrategy.ALL_USERS:
-                return FeatureFlagEvaluation(
-                    flag_name=flag_config.flag_name,
-                    is_enabled=True,
-                    reason="globally_enabled",
-                    rollout_strategy=flag_config.rollout_strategy,
-                    evaluation_context=context
-                )
+        if flag_config.kill_switch:
+            killed = FlagDecision(False, "kill_switch_active", RolloutStrategy.ALL_USERS)
+            return lambda user_id: killed
         
-        # Canary user check
-        if user_id and user_id in flag_config.canary_users:
-            return FeatureFlagEvaluation(
-                flag_name=flag_config.flag_name,
-                is_enabled=True,
-                reason="canary_user",
-                rollout_strategy=flag_config.rollout_strategy,
-                evaluation_context=context
-            )
+        depends_on = tuple(flag_config.depends_on)
+        incompatible_with = tuple(flag_config.incompatible_with)
         
-        # Percentage-based rollout
-        if flag_config.rollout_strategy == RolloutStrategy.PERCENTAGE_BASED:
-            if user_id:
-                user_hash = self._hash_user_id(user_id, flag_config.flag_name)
-                user_percentage = user_hash % Decimal('100')
-                
-                if user_percentage < Decimal(str(flag_config.enabled_percentage)):
-                    return FeatureFlagEvaluation(
-                        flag_name=flag_config.flag_name,
-                        is_enabled=True,
-                        reason=f"percentage_rollout: {user_percentage}% < {flag_config.enabled_percentage}%",
-                        rollout_strategy=flag_config.rollout_strategy,
-                        evaluation_context=context
+        static: Optional[FlagDecision] = None
+        if flag_config.environment_filter and self.environment not in flag_config.environment_filter:
+            static = FlagDecision(False, f"environment_not_allowed: {self.environment}", strategy)
+        elif flag_config.status == FeatureFlagStatus.DISABLED:
+            static = FlagDecision(False, "flag_disabled", strategy)
+        elif flag_config.status == FeatureFlagStatus.ENABLED and strategy == RolloutStrategy.ALL_USERS:
+            static = FlagDecision(True, "globally_enabled", strategy)
+        
+        canary_users = frozenset(flag_config.canary_users)
+        percentage = flag_config.enabled_percentage if strategy == RolloutStrategy.PERCENTAGE_BASED else None
+        canary = FlagDecision(True, "canary_user", strategy)
+        not_in_rollout = FlagDecision(False, "not_in_rollout", strategy)
+        hash_user_id = self._hash_user_id
+        
+        def rollout(user_id: Optional[str]) -> FlagDecision:
+            if user_id and user_id in canary_users:
+                return canary
+            if percentage is not None and user_id:
+                user_percentage = hash_user_id(user_id, flag_name) % 100
+                if user_percentage < percentage:
+                    return FlagDecision(
+                        True, f"percentage_rollout: {user_percentage}% < {percentage}%", strategy
                     )
+            return not_in_rollout
         
-        # Default to disabled
-        return FeatureFlagEvaluation(
-            flag_name=flag_config.flag_name,
-            is_enabled=False,
-            reason="not_in_rollout",
-            rollout_strategy=flag_config.rollout_strategy,
-            evaluation_context=context
-        )
-    
-    def _check_dependencies(
-        self,
-        flag_config: FeatureFlagConfig,
-        user_id: Optional[str],
-        context: Dict[str, Union[str, int, bool]]
-    ) -> Tuple[bool, str]:
-        """Check if all dependencies are satisfied"""
-        try:
-            for dependency in flag_config.depends_on:
-                if not self.is_enabled(dependency, user_id, context):
-                    return False, dependency
-            return True, ""
-            
-        except Exception as e:
-            logger.error(f"Dependency check failed: {e}")
-            return False, f"check_failed: {str(e)}"
+        if not depends_on and not incompatible_with:
+            if static is not None:
+                return lambda user_id: static
+            return rollout
+        
+        decide = self._decide
+        
+        def guarded(user_id: Optional[str]) -> FlagDecision:
+            for dependency in depends_on:
+                if not decide(dependency, user_id).is_enabled:
+                    return FlagDecision(False, f"dependency_not_met: {dependency}", strategy)
+            for incompatible_flag in incompatible_with:
+                if decide(incompatible_flag, user_id).is_enabled:
+                    return FlagDecision(False, f"incompatible_flag_enabled: {incompatible_flag}", strategy)
+            return static if static is not None else rollout(user_id)
+        
+        return guarded
     
-    def _check_incompatibilities(
-        self,
-        flag_config: FeatureFlagConfig,
-        user_id: Optional[str],
-        context: Dict[str, Union[str, int, bool]]
-    ) -> Tuple[bool, str]:
-        """Check if any incompatible flags are enabled"""
+    def _decide(self, flag_name: str, user_id: Optional[str]) -> FlagDecision:
+        """Memoized decision for (flag, user) under the current config version"""
+        if time.monotonic() >= self._refresh_at:
+            self._refresh_cache()
+        
+        decisions = self._decisions
+        key = (flag_name, user_id)
+        decision = decisions.get(key)
+        if decision is not None:
+            self._decision_stats["hits"] += 1
+            return decision
+        self._decision_stats["misses"] += 1
+        
+        compiled = self._compiled.get(flag_name)
+        if compiled is None:
+            return FlagDecision(
+                False, f"evaluation_error: Feature flag '{flag_name}' not found", RolloutStrategy.ALL_USERS
+            )
+        if key in self._resolving:
+            return FlagDecision(False, "evaluation_error: dependency cycle", RolloutStrategy.ALL_USERS)
+        
+        self._resolving.add(key)
         try:
-            for incompatible_flag in flag_config.incompatible_with:
-                if self.is_enabled(incompatible_flag, user_id, context):
-                    return False, incompatible_flag
-            return True, ""
-            
+            decision = compiled(user_id)
         except Exception as e:
-            logger.error(f"Incompatibility check failed: {e}")
-            return True, ""  # Allow execution if check fails
+            logger.error(f"Feature flag evaluation failed for {flag_name}: {e}")
+            # Fail closed, and do not remember the failure
+            return FlagDecision(False, f"evaluation_error: {str(e)}", RolloutStrategy.ALL_USERS)
+        finally:
+            self._resolving.discard(key)
+        
+        if len(decisions) >= self._max_decisions:
+            decisions.clear()
+        decisions[key] = decision
+        return decision
     
     def _hash_user_id(self, user_id: str, flag_name: str) -> int:
         """Generate consistent hash for user ID and flag combination"""
@@ -460,8 +540,10 @@ class FeatureFlagService:
         """Refresh feature flags cache from storage"""
         try:
             # TODO: Implement actual storage refresh from Supabase
+            # Once flags are loaded from storage, changed configs go through
+            # update_flag() so the compiled decisions are rebuilt
             logger.debug("Cache refresh not yet implemented - using in-memory defaults")
-            self._cache_expiry = datetime.utcnow() + timedelta(seconds=self._cache_ttl_seconds)
+            self._refresh_at = time.monotonic() + self._cache_ttl_seconds
             
         except Exception as e:
             logger.error(f"Cache refresh failed: {e}")
@@ -498,18 +580,30 @@ class FeatureFlagService:
             logger.error(f"Audit log write failed: {e}")
 
 
-# Global service instance
-_feature_flag_service: Optional[FeatureFlagService] = None
+# Global service instance, created on first use
+feature_flag_service = service_registry.register("feature_flags", FeatureFlagService)
 
 
 def get_feature_flag_service() -> FeatureFlagService:
     """Get global feature flag service instance"""
-    global _feature_flag_service
-    
-    if _feature_flag_service is None:
-        _feature_flag_service = FeatureFlagService()
+    return service_registry.get("feature_flags")
+
+
+def get_feature_flags(
+    user_id: Optional[str] = None,
+    flag_names: Optional[Iterable[str]] = None
+) -> FeatureFlagSnapshot:
+    """
+    Evaluate feature flags for a user once, to pass down through a request.
     
-    return _feature_flag_service
+    Args:
+        user_id: Optional user ID for context
+        flag_names: Flags to include (defaults to every known flag)
+        
+    Returns:
+        Frozen FeatureFlagSnapshot
+    """
+    return get_feature_flag_service().evaluate_flags(user_id, flag_names)
 
 
 def is_feature_enabled(
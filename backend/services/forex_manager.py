@@ -5,11 +5,13 @@ Handles exchange rate fetching, caching, and conversions with proper type safety
 
 from decimal import Decimal
 from datetime import date, timedelta, datetime
-import aiohttp
 from typing import Optional, Dict, Any
 from supabase import Client
 import logging
 
+from utils.metrics import record_alpha_vantage_call
+from utils.request_profiler import aiohttp_trace_configs, request_profiler
+
 logger = logging.getLogger(__name__)
 
 
@@ -28,6 +30,7 @@ class ForexManager:
         self.av_key: str = alpha_vantage_key
         self.cache: Dict[str, Decimal] = {}  # Simple memory cache
         
+    @request_profiler.profiled("fx.exchange_rate")
     async def get_exchange_rate(
         self, 
         from_currency: str, 
@@ -232,15 +235,18 @@ class ForexManager:
             'to_symbol': to_currency,
             'apikey': self.av_key
         }
+        import aiohttp  # Imported on use to keep module import light
         
         try:
-            async with aiohttp.ClientSession() as session:
+            async with aiohttp.ClientSession(trace_configs=aiohttp_trace_configs()) as session:
                 async with session.get(url, params=params, timeout=10) as response:
                     if response.status != 200:
                         logger.error(f"API request failed with status {response.status}")
+                        record_alpha_vantage_call(params['function'], None)
                         return False
                         
                     data: Dict[str, Any] = await response.json()
+                    record_alpha_vantage_call(params['function'], data)
                     
             # Check for API error messages
             if 'Error Message' in data:
@@ -283,6 +289,7 @@ class ForexManager:
             return False
         except aiohttp.ClientError as e:
             logger.error(f"Network error fetching forex data: {e}")
+            record_alpha_vantage_call(params['function'], None)
             return False
         except ValueError as e:
             logger.error(f"Error parsing forex data: {e}")
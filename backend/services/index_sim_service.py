@@ -13,6 +13,7 @@ import logging
 # simulation start date.  This avoids a circular dependency because
 # portfolio_calculator does not import this module.
 from services.portfolio_calculator import portfolio_calculator
+from services.returns_engine import ReturnsSeries
 
 from debug_logger import DebugLogger
 from supa_api.supa_api_jwt_helpers import (
@@ -656,13 +657,22 @@ class IndexSimulationUtils:
     @staticmethod
     def calculate_performance_metrics(
         portfolio_series: List[Tuple[date, Decimal]],
-        index_series: List[Tuple[date, Decimal]]
+        index_series: List[Tuple[date, Decimal]],
+        portfolio_flows: Optional[List[Tuple[date, Decimal]]] = None,
+        index_flows: Optional[List[Tuple[date, Decimal]]] = None
     ) -> Dict[str, Any]:
         """
         Calculate comparative performance metrics.
+
+        The *_return_pct fields compare raw start and end values, so cash the
+        user added counts as gain. When the cash flows are given, time-weighted
+        returns net of them are added as *_twr_pct (see services.returns_engine).
         Args:
             portfolio_series: Portfolio value time series
             index_series: Index value time series
+            portfolio_flows: Optional (date, amount) external flows into the portfolio
+            index_flows: Optional (date, amount) flows into the simulated index,
+                e.g. from _calculate_cash_flows
         Returns:
             Dictionary with performance metrics
         """
@@ -699,4 +709,20 @@ class IndexSimulationUtils:
             'absolute_outperformance': portfolio_end - index_end
         }
 
+        if portfolio_flows is not None or index_flows is not None:
+            portfolio_twr = ReturnsSeries.from_values(
+                [d for d, _ in portfolio_series], [v for _, v in portfolio_series], portfolio_flows or []
+            ).twr()
+            index_twr = ReturnsSeries.from_values(
+                [d for d, _ in index_series], [v for _, v in index_series], index_flows or []
+            ).twr()
+            portfolio_twr_pct = Decimal(str(portfolio_twr)) * 100 if portfolio_twr is not None else None
+            index_twr_pct = Decimal(str(index_twr)) * 100 if index_twr is not None else None
+            metrics['portfolio_twr_pct'] = portfolio_twr_pct
+            metrics['index_twr_pct'] = index_twr_pct
+            metrics['twr_outperformance_pct'] = (
+                portfolio_twr_pct - index_twr_pct
+                if portfolio_twr_pct is not None and index_twr_pct is not None else None
+            )
+
         return metrics
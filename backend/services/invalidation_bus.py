@@ -0,0 +1,419 @@
+"""
+Invalidation Bus - Cross-worker cache invalidation
+Every worker keeps its own in-memory (L1) caches; the bus tells the other
+workers when data behind those caches changes
+
+Caches are shared-nothing: each uvicorn worker or node has its own
+ThreadSafeCacheManager, dependency index, computation hub and engine
+state. A price ingest, dividend assignment or transaction edit is
+published once. It is applied to this worker's caches straight away and
+broadcast through a transport; every other worker applies the same
+message to its own caches.
+
+Transports:
+- PostgresTransport: LISTEN/NOTIFY on the Supabase database (multi-worker)
+- LocalTransport: in-process hub, the stand-in for tests and benchmarks
+- None: single worker, local handlers only
+
+Messages are JSON, tagged with the publishing worker. A worker skips its own
+messages when they come back from the transport.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Union
+
+from services.cache_dependency_index import (
+    CacheDependencyIndex,
+    cache_dependency_index,
+    dependency_key,
+    dividends_dependency,
+    transactions_dependency,
+)
+from utils.service_registry import service_registry
+from utils.tracing import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "cache_invalidation"
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_PAYLOAD_BYTES = 7900
+# Dependency keys per message, kept well under MAX_PAYLOAD_BYTES
+DEPENDENCY_BATCH_BYTES = 6000
+
+# Message kinds
+DEPENDENCIES = "dependencies"
+USER = "user"
+
+Handler = Callable[[Dict[str, Any]], Awaitable[Any]]
+MessageCallback = Callable[[str], None]
+
+
+# ============================================================================
+# Transports
+# ============================================================================
+
+class LocalBusHub:
+    """
+    In-process stand-in for the Postgres channel.
+
+    Every connected transport receives every message, including the sender,
+    like a LISTENing Postgres session does.
+    """
+
+    def __init__(self) -> None:
+        self._transports: List["LocalTransport"] = []
+
+    def connect(self) -> "LocalTransport":
+        """A new transport on this hub (one per simulated worker)"""
+        return LocalTransport(self)
+
+    def _broadcast(self, payload: str) -> None:
+        for transport in list(self._transports):
+            transport._deliver(payload)
+
+
+class LocalTransport:
+    """Transport connected to a LocalBusHub"""
+
+    def __init__(self, hub: LocalBusHub) -> None:
+        self._hub = hub
+        self._on_message: Optional[MessageCallback] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self, on_message: MessageCallback) -> None:
+        self._on_message = on_message
+        self._loop = asyncio.get_running_loop()
+        self._hub._transports.append(self)
+
+    async def send(self, payload: str) -> None:
+        if len(payload.encode()) > MAX_PAYLOAD_BYTES:
+            raise ValueError(f"Invalidation payload is {len(payload.encode())} bytes (max {MAX_PAYLOAD_BYTES})")
+        self._hub._broadcast(payload)
+
+    def _deliver(self, payload: str) -> None:
+        # Asynchronous, like a notification arriving on a LISTEN connection
+        if self._on_message is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._on_message, payload)
+
+    async def stop(self) -> None:
+        if self in self._hub._transports:
+            self._hub._transports.remove(self)
+        self._on_message = None
+
+
+class PostgresTransport:
+    """
+    LISTEN/NOTIFY transport on a dedicated asyncpg connection.
+
+    Args:
+        dsn: Postgres connection string (SUPA_DB_URL)
+        channel: Notification channel shared by all workers
+    """
+
+    def __init__(self, dsn: str, channel: str = INVALIDATION_CHANNEL) -> None:
+        self.dsn = dsn
+        self.channel = channel
+        self._connection: Any = None
+        self._on_message: Optional[MessageCallback] = None
+        self._send_lock = asyncio.Lock()
+
+    async def start(self, on_message: MessageCallback) -> None:
+        import asyncpg
+
+        self._on_message = on_message
+        self._connection = await asyncpg.connect(self.dsn)
+        await self._connection.add_listener(self.channel, self._on_notification)
+        logger.info(f"[PostgresTransport] Listening on '{self.channel}'")
+
+    def _on_notification(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        if self._on_message is not None:
+            self._on_message(payload)
+
+    async def send(self, payload: str) -> None:
+        if len(payload.encode()) > MAX_PAYLOAD_BYTES:
+            raise ValueError(f"Invalidation payload is {len(payload.encode())} bytes (max {MAX_PAYLOAD_BYTES})")
+        if self._connection is None or self._connection.is_closed():
+            raise ConnectionError("Invalidation LISTEN connection is not open")
+        # One connection runs one query at a time
+        async with self._send_lock:
+            await self._connection.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+
+    async def stop(self) -> None:
+        if self._connection is not None:
+            try:
+                await self._connection.remove_listener(self.channel, self._on_notification)
+                await self._connection.close()
+            except Exception as e:
+                logger.warning(f"[PostgresTransport] Error closing LISTEN connection: {e}")
+            self._connection = None
+        self._on_message = None
+
+
+# ============================================================================
+# Invalidation Bus
+# ============================================================================
+
+def _dependency_batches(keys: List[str], max_bytes: int = DEPENDENCY_BATCH_BYTES) -> List[List[str]]:
+    """Split dependency keys into batches whose JSON fits in one notification"""
+    batches: List[List[str]] = []
+    batch: List[str] = []
+    size = 0
+    for key in keys:
+        key_size = len(key.encode()) + 4  # quotes, comma and space
+        if batch and size + key_size > max_bytes:
+            batches.append(batch)
+            batch, size = [], 0
+        batch.append(key)
+        size += key_size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class InvalidationBus:
+    """
+    Publishes cache invalidations to this worker and every other worker.
+
+    Args:
+        transport: Broadcast transport; None keeps invalidations in this process
+        worker_id: Identity used to skip this worker's own messages
+        dependency_index: Index whose entries "dependencies" messages invalidate
+            (defaults to the module-level cache_dependency_index)
+    """
+
+    def __init__(
+        self,
+        transport: Any = None,
+        worker_id: Optional[str] = None,
+        dependency_index: Optional[CacheDependencyIndex] = None,
+    ) -> None:
+        self.transport = transport
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.index = dependency_index if dependency_index is not None else cache_dependency_index
+        self._handlers: Dict[str, Dict[str, Handler]] = defaultdict(dict)
+        self._queue: Optional[asyncio.Queue] = None
+        self._consumer: Optional[asyncio.Task] = None
+        self._connected = False
+        self._lag_ms = LatencyHistogram()
+        self._stats = {
+            "published": 0,
+            "sent": 0,
+            "send_errors": 0,
+            "received": 0,
+            "skipped_own": 0,
+            "applied": 0,
+            "handler_errors": 0,
+        }
+
+        self.subscribe(DEPENDENCIES, "dependency_index", self._apply_dependencies)
+        self.subscribe(USER, "dependency_index", self._apply_user)
+
+    @property
+    def connected(self) -> bool:
+        """True if invalidations reach other workers"""
+        return self._connected
+
+    def subscribe(self, kind: str, name: str, handler: Handler) -> None:
+        """
+        Run handler for every message of a kind, local or remote.
+
+        Args:
+            kind: Message kind ("dependencies", "user", ...)
+            name: Subscriber name; subscribing again under the same name replaces it
+            handler: Coroutine receiving the message payload
+        """
+        self._handlers[kind][name] = handler
+
+    # ========================================================================
+    # Lifecycle
+    # ========================================================================
+
+    async def start(self, transport: Any = None) -> None:
+        """Connect the transport and start applying messages from other workers"""
+        if transport is not None:
+            self.transport = transport
+        if self._connected:
+            return
+        if self.transport is None:
+            logger.info("[InvalidationBus] No transport; invalidations stay in this worker")
+            return
+
+        self._queue = asyncio.Queue()
+        self._consumer = asyncio.create_task(self._consume(), name="invalidation_bus")
+        try:
+            await self.transport.start(self._on_message)
+            self._connected = True
+            logger.info(f"[InvalidationBus] Worker {self.worker_id} connected ({type(self.transport).__name__})")
+        except Exception as e:
+            logger.error(f"[InvalidationBus] Transport unavailable, other workers will not see invalidations: {e}")
+            await self._stop_consumer()
+
+    async def stop(self) -> None:
+        """Disconnect the transport and stop the consumer"""
+        if self.transport is not None and self._connected:
+            await self.transport.stop()
+        self._connected = False
+        await self._stop_consumer()
+
+    async def _stop_consumer(self) -> None:
+        if self._consumer is not None:
+            self._consumer.cancel()
+            try:
+                await self._consumer
+            except asyncio.CancelledError:
+                pass
+            self._consumer = None
+        self._queue = None
+
+    async def wait_idle(self) -> None:
+        """Wait until every received message has been applied"""
+        # Let notifications scheduled on the loop reach the queue first
+        await asyncio.sleep(0)
+        if self._queue is not None:
+            await self._queue.join()
+
+    # ========================================================================
+    # Publishing
+    # ========================================================================
+
+    async def publish(self, kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Apply a message to this worker and broadcast it to the others.
+
+        Returns:
+            Local handler results by subscriber name
+        """
+        self._stats["published"] += 1
+        await self._broadcast(kind, payload)
+        return await self._apply(kind, payload)
+
+    async def _broadcast(self, kind: str, payload: Dict[str, Any]) -> None:
+        if not self._connected:
+            return
+        message = json.dumps({"origin": self.worker_id, "kind": kind, "sent_at": time.time(), "payload": payload})
+        try:
+            await self.transport.send(message)
+            self._stats["sent"] += 1
+        except Exception as e:
+            # This worker is still invalidated; the others fall back to their TTLs
+            self._stats["send_errors"] += 1
+            logger.error(f"[InvalidationBus] Broadcast of {kind} failed: {e}")
+
+    async def invalidate_dependencies(
+        self,
+        event: str,
+        dependencies: Iterable[Union[str, Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        """
+        Invalidate entries that depend on changed data, in every worker.
+
+        Large changes (a price ingest for hundreds of symbols) are broadcast
+        in several messages so each fits in one notification.
+
+        Returns:
+            This worker's CacheDependencyIndex report
+        """
+        keys = sorted({dependency_key(dep) for dep in dependencies})
+        self._stats["published"] += 1
+        for batch in _dependency_batches(keys):
+            await self._broadcast(DEPENDENCIES, {"event": event, "dependencies": batch})
+        results = await self._apply(DEPENDENCIES, {"event": event, "dependencies": keys})
+        return results["dependency_index"]
+
+    async def invalidate_user(self, user_id: str, event: str = "transactions_changed") -> Dict[str, Any]:
+        """
+        Drop everything cached for a user (transactions or dividends changed), in every worker.
+
+        Returns:
+            Local handler results by subscriber name
+        """
+        return await self.publish(USER, {"user_id": user_id, "event": event})
+
+    # ========================================================================
+    # Applying
+    # ========================================================================
+
+    def _on_message(self, message: str) -> None:
+        if self._queue is not None:
+            self._queue.put_nowait(message)
+
+    async def _consume(self) -> None:
+        assert self._queue is not None
+        while True:
+            message = await self._queue.get()
+            try:
+                await self._receive(message)
+            except Exception as e:
+                self._stats["handler_errors"] += 1
+                logger.error(f"[InvalidationBus] Could not apply message: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _receive(self, message: str) -> None:
+        decoded = json.loads(message)
+        self._stats["received"] += 1
+        if decoded.get("origin") == self.worker_id:
+            self._stats["skipped_own"] += 1
+            return
+        self._lag_ms.observe(max(time.time() - decoded.get("sent_at", time.time()), 0) * 1000)
+        await self._apply(decoded["kind"], decoded.get("payload") or {})
+
+    async def _apply(self, kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        results: Dict[str, Any] = {}
+        for name, handler in list(self._handlers.get(kind, {}).items()):
+            try:
+                results[name] = await handler(payload)
+            except Exception as e:
+                self._stats["handler_errors"] += 1
+                logger.error(f"[InvalidationBus] {kind} handler {name} failed: {e}")
+                results[name] = {"error": str(e)}
+        self._stats["applied"] += 1
+        return results
+
+    async def _apply_dependencies(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return await self.index.invalidate(payload.get("event", "remote"), payload.get("dependencies", []))
+
+    async def _apply_user(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        user_id = payload["user_id"]
+        return await self.index.invalidate(
+            payload.get("event", "transactions_changed"),
+            [transactions_dependency(user_id), dividends_dependency(user_id)],
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Message counters and cross-worker delivery lag"""
+        return {
+            **self._stats,
+            "worker_id": self.worker_id,
+            "transport": type(self.transport).__name__ if self.transport is not None else None,
+            "connected": self._connected,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "subscribers": {kind: sorted(handlers) for kind, handlers in self._handlers.items()},
+            "delivery_lag_ms": self._lag_ms.to_dict(),
+        }
+
+
+def _configured_transport() -> Any:
+    """Postgres LISTEN/NOTIFY in multi-worker mode; no transport for a single worker"""
+    from config import INVALIDATION_BUS, SUPA_DB_URL
+
+    if INVALIDATION_BUS == "postgres":
+        if SUPA_DB_URL:
+            return PostgresTransport(SUPA_DB_URL)
+        logger.error("[InvalidationBus] INVALIDATION_BUS=postgres needs SUPA_DB_URL; caches will not be shared")
+    return None
+
+
+# Module-level instance; connected from app startup to shutdown
+invalidation_bus = service_registry.register(
+    "invalidation_bus", InvalidationBus,
+    init=lambda bus: bus.start(_configured_transport()), close=lambda bus: bus.stop()
+)
@@ -14,6 +14,14 @@ from services.feature_flag_service import is_feature_enabled
 from supa_api.supa_api_transactions import supa_api_get_user_transactions
 from supa_api.supa_api_jwt_helpers import create_authenticated_client
 from utils.auth_helpers import validate_user_id
+from utils.fixed_point import (
+    MONEY_SCALE,
+    PRICE_SCALE,
+    QUANTITY_SCALE,
+    from_fixed,
+    fx_weighted_sum_rows,
+    to_fixed,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -734,40 +742,31 @@ class PortfolioCalculator:
                 logger.warning(f"[PortfolioCalculator] Failed to get price data: {price_response.get('error')}")
                 return [], {"no_data": True, "reason": "price_data_unavailable"}
             
-            # Build price lookup: {symbol: {date: price}}
-            price_lookup = defaultdict(dict)
+            # Build price history in fixed-point units: {symbol: {date: units}}
+            price_lookup: DefaultDict[str, Dict[date, int]] = defaultdict(dict)
             price_data = price_response['data']
             
             # price_data is a dict of {symbol: [price_records]}
             for symbol, price_records in price_data.items():
                 for price_record in price_records:
                     price_date = datetime.strptime(price_record['date'], '%Y-%m-%d').date()
-                    price_lookup[symbol][price_date] = Decimal(str(price_record['close']))
+                    price_lookup[symbol][price_date] = to_fixed(price_record['close'], PRICE_SCALE)
             
-            # Calculate portfolio value for each day
-            time_series = []
+            # Portfolio value per day = sum(quantity * price) over a days x symbols
+            # matrix, in integer fixed point; Decimal only for the returned values
             trading_days = PortfolioCalculator._get_trading_days(start_date, end_date, range_key)
+            columns = sorted(symbols)
+            quantity_rows = PortfolioCalculator._quantity_rows(relevant_txns, columns, trading_days)
+            price_rows = PortfolioCalculator._price_rows(price_lookup, columns, trading_days)
+            daily_values = fx_weighted_sum_rows(
+                quantity_rows, price_rows, QUANTITY_SCALE, PRICE_SCALE, MONEY_SCALE
+            )
             
-            for current_date in trading_days:
-                holdings = PortfolioCalculator._calculate_holdings_for_date(
-                    transactions=relevant_txns,
-                    target_date=current_date
-                )
-                
-                # Calculate portfolio value for this date
-                portfolio_value = Decimal('0')
-                
-                for symbol, quantity in holdings.items():
-                    if quantity > 0:
-                        # Get price for this date (with fallback)
-                        price = PortfolioCalculator._get_price_for_date(
-                            symbol, current_date, price_lookup[symbol]
-                        )
-                        if price:
-                            portfolio_value += quantity * price
-                
-                if portfolio_value > 0:
-                    time_series.append((current_date, portfolio_value))
+            time_series = [
+                (current_date, from_fixed(units, MONEY_SCALE))
+                for current_date, units in zip(trading_days, daily_values)
+                if units > 0
+            ]
             
             # Remove leading zeros
             while time_series and time_series[0][1] == 0:
@@ -787,66 +786,80 @@ class PortfolioCalculator:
             raise
     
     @staticmethod
-    def _calculate_holdings_for_date(
+    def _quantity_rows(
         transactions: List[Dict[str, Any]],
-        target_date: date
-    ) -> Dict[str, Decimal]:
+        symbols: List[str],
+        days: List[date]
+    ) -> List[List[int]]:
         """
-        Calculate holdings as of a specific date.
+        Quantities held at the end of each day, in fixed-point units.
         
         Args:
-            transactions: List of all transactions
-            target_date: Date to calculate holdings for
+            transactions: Transactions up to the last day
+            symbols: Column order
+            days: Ascending row dates
             
         Returns:
-            Dict mapping symbol to quantity held
+            One row per day, one column per symbol; zero or negative holdings are 0
         """
-        holdings: DefaultDict[str, Decimal] = defaultdict(lambda: Decimal('0'))
-        
+        column = {symbol: i for i, symbol in enumerate(symbols)}
+        ledger = []
         for txn in transactions:
-            txn_date = datetime.strptime(txn['date'], '%Y-%m-%d').date()
-            if txn_date > target_date:
-                continue
-            
-            symbol = txn['symbol']
-            quantity = Decimal(str(txn['quantity']))
-            
             if txn['transaction_type'] in ['Buy', 'BUY']:
-                holdings[symbol] += quantity
+                sign = 1
             elif txn['transaction_type'] in ['Sell', 'SELL']:
-                holdings[symbol] -= quantity
+                sign = -1
+            else:
+                continue
+            ledger.append((
+                datetime.strptime(txn['date'], '%Y-%m-%d').date(),
+                column[txn['symbol']],
+                sign * to_fixed(txn['quantity'], QUANTITY_SCALE)
+            ))
+        ledger.sort(key=lambda entry: entry[0])
         
-        # Remove symbols with zero or negative holdings
-        return {s: q for s, q in holdings.items() if q > 0}
+        held = [0] * len(symbols)
+        rows = []
+        applied = 0
+        for day in days:
+            while applied < len(ledger) and ledger[applied][0] <= day:
+                _, index, delta = ledger[applied]
+                held[index] += delta
+                applied += 1
+            rows.append([quantity if quantity > 0 else 0 for quantity in held])
+        return rows
     
     @staticmethod
-    def _get_price_for_date(
-        symbol: str,
-        target_date: date,
-        price_history: Dict[date, Decimal]
-    ) -> Optional[Decimal]:
+    def _price_rows(
+        price_lookup: Dict[str, Dict[date, int]],
+        symbols: List[str],
+        days: List[date]
+    ) -> List[List[int]]:
         """
-        Get price for a specific date with fallback to most recent available.
+        Price of each symbol on each day, falling back to the most recent
+        earlier price; 0 where there is none yet.
         
         Args:
-            symbol: Stock symbol
-            target_date: Date to get price for
-            price_history: Dict of date to price
+            price_lookup: {symbol: {date: price units}}
+            symbols: Column order
+            days: Ascending row dates
             
         Returns:
-            Price or None if not found
+            One row per day, one column per symbol
         """
-        # Direct lookup
-        if target_date in price_history:
-            return price_history[target_date]
-        
-        # Fallback to most recent price before target date
-        sorted_dates = sorted([d for d in price_history.keys() if d <= target_date], reverse=True)
-        
-        if sorted_dates:
-            return price_history[sorted_dates[0]]
-        
-        return None
+        columns = []
+        for symbol in symbols:
+            history = sorted(price_lookup.get(symbol, {}).items())
+            column = []
+            position = 0
+            last_price = 0
+            for day in days:
+                while position < len(history) and history[position][0] <= day:
+                    last_price = history[position][1]
+                    position += 1
+                column.append(last_price)
+            columns.append(column)
+        return [list(row) for row in zip(*columns)] if columns else [[] for _ in days]
     
     @staticmethod
     def _compute_date_range(range_key: str) -> Tuple[date, date]:
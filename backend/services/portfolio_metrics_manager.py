@@ -7,7 +7,6 @@ orchestrating calculations and managing a persistent cache of computed results.
 """
 
 import asyncio
-import threading
 import logging
 import hashlib
 import json
@@ -21,13 +20,21 @@ from pydantic import BaseModel, Field, validator
 from fastapi import HTTPException
 
 from services.portfolio_calculator import portfolio_calculator
+from services.returns_engine import returns_engine
 from services.price_manager import price_manager
 from services.dividend_service import DividendService
 from services.forex_manager import ForexManager
+from services.circuit_breaker import CircuitBreaker, circuit_breakers
+from services.cache_access_stats import cache_access_stats
+from services.cache_dependency_index import CacheEntry, cache_dependency_index
+from services.cache_manager import symbol_tag
+from services.invalidation_bus import USER, invalidation_bus
 from supa_api.supa_api_client import get_supa_service_client
 from supa_api.supa_api_jwt_helpers import create_authenticated_client
 from supa_api.supa_api_user_profile import get_user_base_currency
+from utils.service_registry import service_registry
 from debug_logger import DebugLogger
+from utils.request_profiler import request_profiler
 import os
 
 logger = logging.getLogger(__name__)
@@ -159,6 +166,8 @@ class PortfolioMetrics(BaseModel):
     holdings: List[PortfolioHolding]
     performance: PortfolioPerformance
     time_series: List[TimeSeriesDataPoint] = Field(default_factory=list)
+    # Per-range returns (7D ... MAX), sliced from the same valuation as time_series
+    range_returns: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
     
     # Market information
     market_status: MarketStatus
@@ -174,12 +183,22 @@ class PortfolioMetrics(BaseModel):
     computation_time_ms: Optional[int] = None
     data_completeness: Dict[str, bool] = Field(default_factory=dict)
     
+    # Hash of the portfolio content, memoized by PortfolioMetricsManager.get_content_hash
+    content_hash: Optional[str] = Field(default=None, exclude=True)
+    # Ledger the metrics were calculated from; never serialized, so metrics
+    # read back from a cache don't carry it
+    transactions: Optional[List[Dict[str, Any]]] = Field(default=None, exclude=True)
+    
     class Config:
         json_encoders = {
             datetime: lambda v: v.isoformat()
         }
 
 
+# Fields that describe how/when metrics were produced rather than their content
+_CONTENT_HASH_EXCLUDE = {"calculated_at", "cache_status", "computation_time_ms"}
+
+
 # ============================================================================
 # Cache Configuration
 # ============================================================================
@@ -229,13 +248,26 @@ class PortfolioMetricsManager:
         # Initialize thread-safe cache manager
         self._cache_manager = None
         self._user_cache_manager = None
-        self._calculation_locks: Dict[str, asyncio.Lock] = {}
-        self._lock_creation_lock = threading.Lock()
+        
+        # Computation hub: one in-flight calculation per user and inputs
+        self._inflight: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Tuple[asyncio.Task, int]] = {}
+        self._hub_stats = {"computations": 0, "coalesced": 0, "stale_discarded": 0}
+        # Bumped on every invalidation; a run stamped with an older value is not cached
+        self._generations: Dict[str, int] = {}
         
         # Initialize ForexManager with Alpha Vantage key
         alpha_vantage_key = os.getenv("ALPHA_VANTAGE_API_KEY", "")
         supabase_client = get_supa_service_client()
         self.forex_manager = ForexManager(supabase_client, alpha_vantage_key)
+        
+        # Circuit breaker configuration
+        self._max_failures = 3
+        self._recovery_timeout = 60  # seconds
+        
+        # Price/transaction/dividend changes drop only the entries that used them
+        cache_dependency_index.register_invalidator("metrics", self._invalidate_indexed_metrics)
+        # Cache invalidations for a user reach this worker from any worker
+        invalidation_bus.subscribe(USER, "metrics", self._drop_user_state)
     
     async def _get_cache_manager(self):
         """Get or initialize the thread-safe cache manager."""
@@ -251,13 +283,6 @@ class PortfolioMetricsManager:
             self._user_cache_manager = await get_user_cache_manager()
         return self._user_cache_manager
     
-    def _get_calculation_lock(self, user_id: str) -> asyncio.Lock:
-        """Get user-specific calculation lock to prevent duplicate work."""
-        with self._lock_creation_lock:
-            if user_id not in self._calculation_locks:
-                self._calculation_locks[user_id] = asyncio.Lock()
-            return self._calculation_locks[user_id]
-    
     async def _get_cached_metrics(self, user_id: str, metric_type: str, params: Dict[str, Any]) -> Optional[PortfolioMetrics]:
         """Get cached metrics using thread-safe cache."""
         try:
@@ -283,35 +308,42 @@ class PortfolioMetricsManager:
             
             # Serialize the PortfolioMetrics for caching
             serialized_data = metrics.dict()
-            await user_cache.set_user_cache(user_id, cache_key, serialized_data, ttl_seconds)
+            await user_cache.set_user_cache(
+                user_id, cache_key, serialized_data, ttl_seconds,
+                tags=[symbol_tag(holding.symbol) for holding in metrics.holdings]
+            )
+            cache_dependency_index.register(
+                "metrics", user_id, cache_key, self._extract_dependencies(metrics), ttl_seconds=ttl_seconds
+            )
             
             logger.debug(f"Cached portfolio metrics for user {user_id}, key {cache_key}")
             
         except Exception as e:
             logger.error(f"Error caching metrics for user {user_id}: {e}")
     
-    async def invalidate_user_cache(self, user_id: str, pattern: Optional[str] = None) -> int:
-        """Invalidate all cache entries for a specific user."""
-        try:
-            user_cache = await self._get_user_cache_manager()
-            invalidated_count = await user_cache.invalidate_user_cache(user_id, pattern)
-            
-            # Also clear the calculation lock for this user
-            with self._lock_creation_lock:
-                self._calculation_locks.pop(user_id, None)
-            
-            logger.info(f"Invalidated {invalidated_count} cache entries for user {user_id}")
-            return invalidated_count
-            
-        except Exception as e:
-            logger.error(f"Error invalidating cache for user {user_id}: {e}")
-            return 0
+    async def _invalidate_indexed_metrics(self, entries: List[CacheEntry]) -> int:
+        """Drop the memory-cached metrics the dependency index matched."""
+        user_cache = await self._get_user_cache_manager()
+        keys_by_user: Dict[str, List[str]] = {}
+        for _, user_id, cache_key in entries:
+            keys_by_user.setdefault(user_id, []).append(cache_key)
         
-        # Circuit breaker configuration
-        self._max_failures = 3
-        self._recovery_timeout = 60  # seconds
+        invalidated_count = 0
+        for user_id, keys in keys_by_user.items():
+            invalidated_count += await user_cache.invalidate_user_keys(user_id, keys)
+        return invalidated_count
+    
+    async def _drop_user_state(self, payload: Dict[str, Any]) -> int:
+        """Invalidation bus handler: forget everything this worker holds for a user."""
+        user_id = payload["user_id"]
+        
+        # Later requests must not join a calculation that predates the change
+        self._forget_inflight(user_id)
         
-        logger.info("[PortfolioMetricsManager] Initialized")
+        user_cache = await self._get_user_cache_manager()
+        invalidated_count = await user_cache.invalidate_user_cache(user_id)
+        logger.info(f"[PortfolioMetricsManager] Invalidated {invalidated_count} memory cache entries for user {user_id}")
+        return invalidated_count
     
     def _safe_decimal_to_float(self, value: Any) -> Decimal:
         """
@@ -338,6 +370,7 @@ class PortfolioMetricsManager:
     # Currency Conversion Methods
     # ========================================================================
     
+    @request_profiler.profiled("metrics.base_currency")
     async def get_user_base_currency(self, user_id: str) -> str:
         """
         Get user's base currency with caching
@@ -447,66 +480,166 @@ class PortfolioMetricsManager:
         Raises:
             HTTPException: On critical failures
         """
-        start_time = datetime.now()
         params = params or {}
         
-        # Use user-specific calculation lock to prevent duplicate work
-        calculation_lock = self._get_calculation_lock(user_id)
-        async with calculation_lock:
-            try:
-                # Check thread-safe cache first (unless force refresh)
-                if not force_refresh:
-                    cached_metrics = await self._get_cached_metrics(user_id, metric_type, params)
-                    if cached_metrics:
-                        logger.info(f"Portfolio metrics cache hit for user {user_id}, type {metric_type}")
-                        return cached_metrics
-                
-                # Double-check cache after acquiring lock (another thread might have calculated it)
-                if not force_refresh:
-                    cached_metrics = await self._get_cached_metrics(user_id, metric_type, params)
-                    if cached_metrics:
-                        logger.info(f"Portfolio metrics cache hit after lock for user {user_id}, type {metric_type}")
-                        cached_metrics.cache_status = MetricsCacheStatus.HIT
-                        return cached_metrics
+        try:
+            # Check thread-safe cache first (unless force refresh)
+            if not force_refresh:
+                cached_metrics = await self._get_cached_metrics(user_id, metric_type, params)
+                if cached_metrics:
+                    logger.info(f"Portfolio metrics cache hit for user {user_id}, type {metric_type}")
+                    return cached_metrics
             
-                # Step 2: Calculate fresh metrics
-                logger.info(f"[PortfolioMetricsManager] === CACHE MISS ===")
-                logger.info(f"[PortfolioMetricsManager] User ID: {user_id}")
-                logger.info(f"[PortfolioMetricsManager] Metric type: {metric_type}")
-                logger.info(f"[PortfolioMetricsManager] Force refresh: {force_refresh}")
-                logger.info(f"[PortfolioMetricsManager] Calculating fresh metrics...")
-                metrics = await self._calculate_metrics(user_id, user_token, metric_type, params)
-                
-                # Add computation time
-                computation_time = datetime.now() - start_time
-                metrics.computation_time_ms = int(Decimal(str(computation_time.total_seconds())) * Decimal('1000'))
-                logger.info(f"[PortfolioMetricsManager] Metrics calculation completed in {metrics.computation_time_ms}ms")
-                
-                # Step 3: Cache the results
+            # Step 2: Share one calculation between concurrent requests for this user
+            logger.info(f"[PortfolioMetricsManager] === CACHE MISS ===")
+            logger.info(f"[PortfolioMetricsManager] User ID: {user_id}")
+            logger.info(f"[PortfolioMetricsManager] Metric type: {metric_type}")
+            logger.info(f"[PortfolioMetricsManager] Force refresh: {force_refresh}")
+            shared_metrics, generation = await self._get_shared_metrics(
+                user_id, user_token, metric_type, params, force_refresh
+            )
+            metrics = self._project_metrics(shared_metrics, metric_type)
+            
+            # Step 3: Cache the results, unless the user's data was invalidated while they were calculated
+            if self._generations.get(user_id, 0) == generation:
                 logger.info(f"[PortfolioMetricsManager] Caching metrics for user {user_id}")
                 await self._set_cached_metrics(user_id, metric_type, params, metrics)
-                
-                return metrics
-                
-            except Exception as e:
-                logger.error(f"[PortfolioMetricsManager] === ERROR ===")
-                logger.error(f"[PortfolioMetricsManager] Error type: {type(e).__name__}")
-                logger.error(f"[PortfolioMetricsManager] Error message: {str(e)}")
-                logger.error(f"[PortfolioMetricsManager] Full stack trace:", exc_info=True)
-                # Try to return partial cached data on error
-                if not force_refresh:
-                    logger.info(f"[PortfolioMetricsManager] Attempting to retrieve stale cache data...")
-                    stale_metrics = await self._get_cached_metrics(user_id, metric_type, params)
-                    if stale_metrics:
-                        logger.info(f"[PortfolioMetricsManager] Returning stale cache data from {stale_metrics.calculated_at}")
-                        stale_metrics.cache_status = MetricsCacheStatus.STALE
-                        return stale_metrics
-                raise HTTPException(status_code=500, detail=f"Failed to get portfolio metrics: {str(e)}")
+            else:
+                self._hub_stats["stale_discarded"] += 1
+                logger.info(f"[PortfolioMetricsManager] Not caching metrics for user {user_id}: invalidated during calculation")
+            
+            return metrics
+            
+        except Exception as e:
+            logger.error(f"[PortfolioMetricsManager] === ERROR ===")
+            logger.error(f"[PortfolioMetricsManager] Error type: {type(e).__name__}")
+            logger.error(f"[PortfolioMetricsManager] Error message: {str(e)}")
+            logger.error(f"[PortfolioMetricsManager] Full stack trace:", exc_info=True)
+            # Try to return partial cached data on error
+            if not force_refresh:
+                logger.info(f"[PortfolioMetricsManager] Attempting to retrieve stale cache data...")
+                stale_metrics = await self._get_cached_metrics(user_id, metric_type, params)
+                if stale_metrics:
+                    logger.info(f"[PortfolioMetricsManager] Returning stale cache data from {stale_metrics.calculated_at}")
+                    stale_metrics.cache_status = MetricsCacheStatus.STALE
+                    return stale_metrics
+            raise HTTPException(status_code=500, detail=f"Failed to get portfolio metrics: {str(e)}")
+    
+    def get_content_hash(self, metrics: PortfolioMetrics) -> str:
+        """
+        Content hash of the portfolio data carried by metrics.
+        
+        Timing and cache bookkeeping fields are ignored, so recalculating an
+        unchanged portfolio yields the same hash. Memoized on the instance.
+        """
+        if metrics.content_hash is None:
+            payload = metrics.model_dump_json(exclude=_CONTENT_HASH_EXCLUDE)
+            metrics.content_hash = hashlib.sha256(payload.encode()).hexdigest()
+        return metrics.content_hash
+    
+    # ========================================================================
+    # Computation Hub
+    # ========================================================================
+    
+    @staticmethod
+    def _computation_key(user_id: str, params: Dict[str, Any]) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+        """Inputs that decide what _calculate_metrics produces (metric_type does not)"""
+        return user_id, tuple(sorted((str(k), str(v)) for k, v in params.items()))
+    
+    async def _get_shared_metrics(
+        self,
+        user_id: str,
+        user_token: str,
+        metric_type: str,
+        params: Dict[str, Any],
+        force_refresh: bool = False
+    ) -> Tuple[PortfolioMetrics, int]:
+        """
+        Join the in-flight calculation for this user and inputs, or start one.
+        
+        The dashboard requests portfolio, allocation and analytics metrics at
+        the same time; all of them await the same calculation. The calculation
+        is shielded, so one client disconnecting does not cancel it for the rest.
+        A forced refresh always starts a new calculation, which later requests
+        then join.
+        
+        Returns:
+            (metrics, the user's invalidation generation when the run started)
+        """
+        key = self._computation_key(user_id, params)
+        inflight = None if force_refresh else self._inflight.get(key)
+        if inflight is None:
+            generation = self._generations.get(user_id, 0)
+            task = asyncio.create_task(
+                self._run_shared_calculation(user_id, user_token, metric_type, params),
+                name=f"portfolio_metrics:{user_id}"
+            )
+            self._inflight[key] = (task, generation)
+            task.add_done_callback(lambda done, key=key: self._finish_inflight(key, done))
+            self._hub_stats["computations"] += 1
+        else:
+            task, generation = inflight
+            self._hub_stats["coalesced"] += 1
+            logger.info(f"[PortfolioMetricsManager] Joining in-flight calculation for user {user_id}, type {metric_type}")
+        return await asyncio.shield(task), generation
+    
+    async def _run_shared_calculation(
+        self,
+        user_id: str,
+        user_token: str,
+        metric_type: str,
+        params: Dict[str, Any]
+    ) -> PortfolioMetrics:
+        start_time = datetime.now()
+        metrics = await self._calculate_metrics(user_id, user_token, metric_type, params)
+        
+        # Add computation time
+        computation_time = datetime.now() - start_time
+        metrics.computation_time_ms = int(Decimal(str(computation_time.total_seconds())) * Decimal('1000'))
+        logger.info(f"[PortfolioMetricsManager] Metrics calculation completed in {metrics.computation_time_ms}ms")
+        
+        # Hash once here so every projection carries it
+        self.get_content_hash(metrics)
+        return metrics
+    
+    def _finish_inflight(self, key: Tuple[str, Tuple[Tuple[str, str], ...]], task: asyncio.Task) -> None:
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight[0] is task:
+            del self._inflight[key]
+        # Mark the error retrieved even if every requester went away
+        if not task.cancelled():
+            task.exception()
+    
+    def _forget_inflight(self, user_id: str) -> None:
+        """
+        Detach the user's running calculations so new requests start fresh.
+        
+        Also bumps the user's generation: runs that started before this still
+        answer their requesters, but their results are not cached.
+        """
+        self._generations[user_id] = self._generations.get(user_id, 0) + 1
+        for key in [key for key in self._inflight if key[0] == user_id]:
+            del self._inflight[key]
+    
+    @staticmethod
+    def _project_metrics(metrics: PortfolioMetrics, metric_type: str) -> PortfolioMetrics:
+        """
+        Per-request view of a shared calculation.
+        
+        A shallow copy: requests can set their own cache status without
+        affecting the others, and nothing is recomputed per metric type.
+        """
+        return metrics.model_copy()
+    
+    def get_hub_stats(self) -> Dict[str, Any]:
+        """Calculations started vs requests that joined one in flight"""
+        return {**self._hub_stats, "in_flight": len(self._inflight)}
     
     # ========================================================================
     # Core Calculation Logic
     # ========================================================================
     
+    @request_profiler.profiled("metrics.calculate")
     async def _calculate_metrics(
         self, 
         user_id: str, 
@@ -562,7 +695,7 @@ class PortfolioMetricsManager:
             results: Tuple[
                 Union[List[PortfolioHolding], BaseException],
                 Union[DividendSummary, BaseException],
-                Union[List[TimeSeriesDataPoint], BaseException]
+                Union[Tuple[List[TimeSeriesDataPoint], Dict[str, Dict[str, Any]]], BaseException]
             ] = await asyncio.gather(
                 self._get_holdings_data(user_id, user_token, transactions),
                 self._get_dividend_summary(user_id, user_token, transactions),
@@ -579,6 +712,7 @@ class PortfolioMetricsManager:
         holdings: List[PortfolioHolding] = []
         dividend_summary: DividendSummary = DividendSummary()
         time_series: List[TimeSeriesDataPoint] = []
+        range_returns: Dict[str, Dict[str, Any]] = {}
         
         # Process holdings result
         if isinstance(holdings_result, list):
@@ -597,8 +731,8 @@ class PortfolioMetricsManager:
             logger.warning(f"[PortfolioMetricsManager] Dividend fetch failed: {dividend_result}")
         
         # Process time series result
-        if isinstance(time_series_result, list):
-            time_series = time_series_result
+        if isinstance(time_series_result, tuple):
+            time_series, range_returns = time_series_result
             data_completeness["time_series"] = True
             logger.info(f"[PortfolioMetricsManager] Time series fetched successfully: {len(time_series)} data points")
         elif isinstance(time_series_result, BaseException):
@@ -611,9 +745,10 @@ class PortfolioMetricsManager:
         # Stage 3: Calculate derived metrics
         logger.info(f"[PortfolioMetricsManager] Stage 3: Calculating derived metrics...")
         logger.info(f"[PortfolioMetricsManager] User base currency: {base_currency}")
-        performance = self._calculate_performance(holdings, dividend_summary)
-        sector_allocation = self._calculate_sector_allocation(holdings)
-        top_performers = self._get_top_performers(holdings)
+        with request_profiler.stage("metrics.derived"):
+            performance = self._calculate_performance(holdings, dividend_summary)
+            sector_allocation = self._calculate_sector_allocation(holdings)
+            top_performers = self._get_top_performers(holdings)
         
         # Determine cache status
         cache_status = MetricsCacheStatus.MISS
@@ -632,17 +767,20 @@ class PortfolioMetricsManager:
             holdings=holdings,
             performance=performance,
             time_series=time_series,
+            range_returns=range_returns,
             market_status=market_status,
             dividend_summary=dividend_summary,
             sector_allocation=sector_allocation,
             top_performers=top_performers,
-            data_completeness=data_completeness
+            data_completeness=data_completeness,
+            transactions=transactions
         )
     
     # ========================================================================
     # Service Integration Methods
     # ========================================================================
     
+    @request_profiler.profiled("metrics.holdings")
     async def _get_holdings_data(self, user_id: str, user_token: str, transactions: List[Dict[str, Any]]) -> List[PortfolioHolding]:
         """Fetch and transform holdings data from PortfolioCalculator"""
         # Type assertions
@@ -724,6 +862,7 @@ class PortfolioMetricsManager:
             self._record_service_failure("holdings")
             raise e
     
+    @request_profiler.profiled("metrics.dividends")
     async def _get_dividend_summary(self, user_id: str, user_token: str, transactions: List[Dict[str, Any]]) -> DividendSummary:
         """Fetch dividend summary from DividendService"""
         # Type assertion
@@ -742,6 +881,7 @@ class PortfolioMetricsManager:
             summary_result = await dividend_service.get_dividend_summary(user_id, user_token, transactions)
             
             if not summary_result.get('success', False):
+                self._record_service_failure("dividends")
                 logger.warning(f"[PortfolioMetricsManager] Failed to get dividend summary: {summary_result.get('error')}")
                 return DividendSummary()
             
@@ -761,36 +901,41 @@ class PortfolioMetricsManager:
             logger.warning(f"[PortfolioMetricsManager] Dividend service error: {e}, returning empty summary")
             return DividendSummary()
     
+    @request_profiler.profiled("metrics.time_series")
     async def _get_time_series_data(
         self, 
         user_id: str, 
         user_token: str,
         params: Dict[str, Any],
         transactions: List[Dict[str, Any]]
-    ) -> List[TimeSeriesDataPoint]:
-        """Get portfolio time series data"""
+    ) -> Tuple[List[TimeSeriesDataPoint], Dict[str, Dict[str, Any]]]:
+        """
+        Get the portfolio time series for the requested range plus returns for every range.
+
+        Both come from one full-history daily valuation (returns_engine), so the
+        requested range, the 7D/1M/1Y/YTD/MAX returns and the annualized figures
+        are slices of the same array instead of separate recomputations.
+        """
         # Type assertion
         if not isinstance(transactions, list):
             raise TypeError(f"transactions must be a list, got {type(transactions)}")
             
         if not self._is_service_available("time_series"):
-            return []
+            return [], {}
         
         try:
             # Get time range from params
             range_key = params.get('range', '1M')
             
-            # Get time series from portfolio calculator
-            time_series, metadata = await portfolio_calculator.calculate_portfolio_time_series(
-                user_id=user_id,
-                user_token=user_token,
-                range_key=range_key,
-                transactions=transactions
-            )
+            series = await returns_engine.get_series(user_id, user_token, transactions)
+            if range_key == "MAX":
+                start_date, end_date = None, None
+            else:
+                start_date, end_date = portfolio_calculator._compute_date_range(range_key)
             
             # Convert to TimeSeriesDataPoint objects
             result = []
-            for date_val, value in time_series:
+            for date_val, value in series.value_series(start_date, end_date):
                 result.append(TimeSeriesDataPoint(
                     date=date_val,
                     value=value,
@@ -800,12 +945,13 @@ class PortfolioMetricsManager:
                 ))
             
             self._reset_service_failures("time_series")
-            return result
+            return result, series.range_summaries()
         except Exception as e:
             self._record_service_failure("time_series")
             logger.warning(f"[PortfolioMetricsManager] Time series error: {e}")
-            return []
+            return [], {}
     
+    @request_profiler.profiled("metrics.transactions")
     async def _get_all_transactions(self, user_id: str, user_token: str) -> List[Dict[str, Any]]:
         """Fetch all user transactions once for reuse"""
         if not self._is_service_available("transactions"):
@@ -825,6 +971,7 @@ class PortfolioMetricsManager:
             logger.error(f"[PortfolioMetricsManager] Transaction fetch failed: {e}")
             raise e
     
+    @request_profiler.profiled("metrics.market_status")
     async def _get_market_status(self) -> MarketStatus:
         """Get current market status from PriceManager"""
         try:
@@ -995,13 +1142,13 @@ class PortfolioMetricsManager:
         
         return full_key
     
-    async def _get_cached_metrics(
+    async def _get_persisted_metrics(
         self, 
         user_id: str,
         cache_key: str,
         allow_stale: bool = False
     ) -> Optional[PortfolioMetrics]:
-        """Retrieve metrics from cache"""
+        """Retrieve metrics from the portfolio_caches table"""
         try:
             client = get_supa_service_client()
             
@@ -1013,6 +1160,7 @@ class PortfolioMetricsManager:
             ).single().execute()
             
             if not result.data:
+                cache_access_stats.record_miss("portfolio_caches")
                 return None
             
             cache_data = result.data
@@ -1020,22 +1168,21 @@ class PortfolioMetricsManager:
             
             # Check expiration
             if not allow_stale and datetime.now(timezone.utc) > expires_at:
+                cache_access_stats.record_miss("portfolio_caches")
                 return None
             
             # Deserialize metrics
             metrics_data = json.loads(cache_data["metrics_json"])
             metrics = PortfolioMetrics(**metrics_data)
             
-            # Update hit count
-            client.table("portfolio_caches").update({
-                "hit_count": cache_data["hit_count"] + 1,
-                "last_accessed": datetime.now(timezone.utc).isoformat()
-            }).eq("user_id", user_id).eq("cache_key", cache_key).execute()
+            # Hit count is buffered and flushed in bulk
+            cache_access_stats.record_hit("portfolio_caches", user_id, cache_key)
             
             return metrics
             
         except Exception as e:
             logger.error(f"[PortfolioMetricsManager] Cache read error: {str(e)}")
+            cache_access_stats.record_miss("portfolio_caches")
             return None
     
     async def _cache_metrics(self, user_id: str, cache_key: str, metrics: PortfolioMetrics) -> None:
@@ -1080,6 +1227,10 @@ class PortfolioMetricsManager:
             logger.error(f"[PortfolioMetricsManager] Cache write error: {str(e)}")
             # Don't fail the request if cache write fails
     
+    def get_cache_dependencies(self, metrics: PortfolioMetrics) -> List[Dict[str, Any]]:
+        """Data the metrics were computed from, for caches built on top of them"""
+        return self._extract_dependencies(metrics)
+    
     def _extract_dependencies(self, metrics: PortfolioMetrics) -> List[Dict[str, Any]]:
         """Extract cache dependencies for invalidation tracking"""
         dependencies = []
@@ -1110,64 +1261,35 @@ class PortfolioMetricsManager:
     # Circuit Breaker
     # ========================================================================
     
+    def _breaker(self, service_name: str) -> CircuitBreaker:
+        """In-memory breaker for one of the metrics data sources"""
+        return circuit_breakers.get(
+            service_name,
+            failure_threshold=self._max_failures,
+            recovery_timeout=self._recovery_timeout
+        )
+    
     def _record_service_failure(self, service_name: str) -> None:
         """Record a service failure for circuit breaker"""
-        try:
-            client = get_supa_service_client()
-            client.rpc('record_service_failure', {
-                'p_service_name': service_name,
-                'p_failure_threshold': self._max_failures
-            }).execute()
-            logger.warning(f"[PortfolioMetricsManager] Recorded failure for service {service_name}")
-        except Exception as e:
-            logger.error(f"[PortfolioMetricsManager] Failed to record service failure: {e}")
+        self._breaker(service_name).record_failure()
+        logger.warning(f"[PortfolioMetricsManager] Recorded failure for service {service_name}")
     
     def _is_service_available(self, service_name: str) -> bool:
         """Check if service is available (not circuit broken)"""
-        try:
-            client = get_supa_service_client()
-            result = client.rpc('check_circuit_breaker', {
-                'p_service_name': service_name,
-                'p_failure_threshold': self._max_failures,
-                'p_recovery_timeout': self._recovery_timeout
-            }).execute()
-            
-            if result.data and len(result.data) > 0:
-                is_open = result.data[0]['is_open']
-                state = result.data[0]['state']
-                logger.debug(f"[PortfolioMetricsManager] Circuit breaker for {service_name}: state={state}, is_open={is_open}")
-                return not is_open
-            
-            # Default to available if check fails
-            return True
-        except Exception as e:
-            logger.error(f"[PortfolioMetricsManager] Failed to check circuit breaker: {e}")
-            # Fail open - allow service calls if circuit breaker check fails
-            return True
+        return self._breaker(service_name).allow_request()
     
     def _reset_service_failures(self, service_name: str) -> None:
-        """Reset failure count for a service"""
-        try:
-            client = get_supa_service_client()
-            client.rpc('record_service_success', {
-                'p_service_name': service_name
-            }).execute()
-            logger.info(f"[PortfolioMetricsManager] Reset failures for service {service_name}")
-        except Exception as e:
-            logger.error(f"[PortfolioMetricsManager] Failed to reset service failures: {e}")
+        """Record a successful call (closes a half-open breaker)"""
+        self._breaker(service_name).record_success()
     
     async def reset_all_circuit_breakers(self) -> None:
         """Reset all circuit breakers (e.g., on a schedule)"""
-        try:
-            client = get_supa_service_client()
-            client.rpc('reset_circuit_breaker').execute()
-            logger.info("[PortfolioMetricsManager] All circuit breakers reset")
-        except Exception as e:
-            logger.error(f"[PortfolioMetricsManager] Failed to reset all circuit breakers: {e}")
+        circuit_breakers.reset()
+        logger.info("[PortfolioMetricsManager] All circuit breakers reset")
     
     async def invalidate_user_cache(self, user_id: str, metric_type: Optional[str] = None) -> None:
         """
-        Invalidate cache for a specific user
+        Invalidate cache for a specific user, in this and every other worker
         
         Args:
             user_id: User's UUID
@@ -1177,6 +1299,9 @@ class PortfolioMetricsManager:
         logger.info(f"[PortfolioMetricsManager] User ID: {user_id}")
         logger.info(f"[PortfolioMetricsManager] Metric type: {metric_type if metric_type else 'ALL'}")
         
+        # Every worker drops the user's memory cache, indexed entries and in-flight calculations
+        await invalidation_bus.invalidate_user(user_id)
+        
         try:
             client = get_supa_service_client()
             
@@ -1222,4 +1347,4 @@ class PortfolioMetricsManager:
 # Module-level instance
 # ============================================================================
 
-portfolio_metrics_manager = PortfolioMetricsManager()
\ No newline at end of file
+portfolio_metrics_manager = service_registry.register("portfolio_metrics_manager", PortfolioMetricsManager)
\ No newline at end of file
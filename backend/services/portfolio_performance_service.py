@@ -15,7 +15,9 @@ from supa_api.supa_api_historical_prices import (
 )
 from vantage_api.vantage_api_quotes import vantage_api_get_daily_adjusted
 from services.price_manager import price_manager
+from services.returns_engine import returns_engine
 from utils.auth_helpers import validate_user_id
+from utils.service_registry import service_registry
 from debug_logger import DebugLogger
 
 logger = logging.getLogger(__name__)
@@ -123,8 +125,19 @@ class PortfolioPerformanceService:
                 logger.error(f"Benchmark data failed: {benchmark_data}")
                 benchmark_data = []
             
+            # Time-weighted and Modified Dietz returns net of deposits/withdrawals;
+            # one full-history series serves every period
+            period_returns = None
+            range_returns = {}
+            try:
+                returns_series = await returns_engine.get_series(validated_user_id, user_token, transactions)
+                period_returns = returns_series.period_summary(None if period == "MAX" else start_date, end_date)
+                range_returns = returns_series.range_summaries()
+            except Exception as e:
+                logger.error(f"[portfolio_performance_service.py::get_historical_performance] Returns calculation failed: {e}")
+            
             # Calculate performance metrics
-            metrics = self._calculate_performance_metrics(portfolio_data, benchmark_data)
+            metrics = self._calculate_performance_metrics(portfolio_data, benchmark_data, period_returns)
             
             # Build response
             response = {
@@ -144,7 +157,8 @@ class PortfolioPerformanceService:
                     "reason": "success" if portfolio_data else "no_portfolio_data",
                     "chart_type": "performance_comparison"
                 },
-                "performance_metrics": metrics
+                "performance_metrics": metrics,
+                "returns_by_range": range_returns
             }
             
             logger.info(f"[portfolio_performance_service.py::get_historical_performance] Generated {len(portfolio_data)} portfolio points and {len(benchmark_data)} benchmark points")
@@ -332,9 +346,17 @@ class PortfolioPerformanceService:
     def _calculate_performance_metrics(
         self,
         portfolio_data: List[Dict[str, Any]],
-        benchmark_data: List[Dict[str, Any]]
+        benchmark_data: List[Dict[str, Any]],
+        period_returns: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
-        """Calculate performance comparison metrics."""
+        """
+        Calculate performance comparison metrics.
+        
+        portfolio_return_pct compares raw values, so it includes deposits and
+        withdrawals. The twr/modified_dietz fields come from period_returns
+        (ReturnsSeries.period_summary) and are net of them; the benchmark has
+        no flows, so its price return is already time-weighted.
+        """
         if not portfolio_data or not benchmark_data:
             return {
                 "portfolio_start_value": 0,
@@ -344,7 +366,8 @@ class PortfolioPerformanceService:
                 "index_end_value": 0,
                 "index_return_pct": 0,
                 "outperformance_pct": 0,
-                "absolute_outperformance": 0
+                "absolute_outperformance": 0,
+                **self._returns_metrics(period_returns, None)
             }
         
         # Get start and end values
@@ -369,7 +392,25 @@ class PortfolioPerformanceService:
             "index_end_value": benchmark_end,
             "index_return_pct": round(benchmark_return, 2),
             "outperformance_pct": round(outperformance, 2),
-            "absolute_outperformance": round(absolute_outperformance, 2)
+            "absolute_outperformance": round(absolute_outperformance, 2),
+            **self._returns_metrics(period_returns, benchmark_return)
+        }
+    
+    @staticmethod
+    def _returns_metrics(period_returns: Optional[Dict[str, Any]], benchmark_return_pct: Optional[float]) -> Dict[str, Any]:
+        """Flow-adjusted return fields; None when they could not be calculated."""
+        twr_pct = period_returns.get("twr_pct") if period_returns else None
+        return {
+            "portfolio_twr_pct": round(twr_pct, 2) if twr_pct is not None else None,
+            "portfolio_modified_dietz_pct": (
+                round(period_returns["modified_dietz_pct"], 2)
+                if period_returns and period_returns.get("modified_dietz_pct") is not None else None
+            ),
+            "net_contributions": round(period_returns["net_flows"], 2) if period_returns else 0,
+            "twr_outperformance_pct": (
+                round(twr_pct - benchmark_return_pct, 2)
+                if twr_pct is not None and benchmark_return_pct is not None else None
+            )
         }
     
     def _empty_performance_response(self, period: str, benchmark: str, reason: str) -> Dict[str, Any]:
@@ -399,9 +440,11 @@ class PortfolioPerformanceService:
                 "index_end_value": 0,
                 "index_return_pct": 0,
                 "outperformance_pct": 0,
-                "absolute_outperformance": 0
-            }
+                "absolute_outperformance": 0,
+                **self._returns_metrics(None, None)
+            },
+            "returns_by_range": {}
         }
 
-# Create singleton instance
-portfolio_performance_service = PortfolioPerformanceService()
\ No newline at end of file
+# Singleton instance, created on first use
+portfolio_performance_service = service_registry.register("portfolio_performance_service", PortfolioPerformanceService)
\ No newline at end of file
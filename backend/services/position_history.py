@@ -0,0 +1,123 @@
+"""
+Position History - Shares held per symbol at any date
+======================================================
+
+Dividend paths need "how many shares of X did the user hold on date D" for
+many (symbol, date) pairs. Each used to be a fresh transaction fetch and a
+linear scan. PositionHistory is built once from the user's transaction list.
+It keeps, per symbol, the ascending transaction dates and the cumulative
+quantity after each date, so each question is one bisect.
+
+Build it once per request (``PositionHistory(transactions)``) and pass it
+down. It is a snapshot: build a new one after the transactions change.
+"""
+
+import logging
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+BUY_TYPES = frozenset({'BUY', 'PURCHASE'})
+SELL_TYPES = frozenset({'SELL', 'SALE'})
+
+DateLike = Union[date, datetime, str]
+
+
+def _to_date(value: DateLike) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+
+class PositionHistory:
+    """
+    Per-symbol cumulative quantities over time, built from transactions.
+
+    Buys add shares and sells remove them; dividends and other transaction
+    types do not change the share count. Symbols match exactly, as stored.
+    """
+
+    __slots__ = ("_ordinals", "_cumulative", "_first_dates", "transaction_count")
+
+    def __init__(self, transactions: Optional[Iterable[Dict[str, Any]]] = None) -> None:
+        deltas: Dict[str, Dict[int, Decimal]] = defaultdict(lambda: defaultdict(Decimal))
+        first_dates: Dict[str, date] = {}
+        count = 0
+
+        for txn in transactions or []:
+            symbol = txn.get('symbol')
+            if not symbol or not txn.get('date'):
+                continue
+            count += 1
+            txn_date = _to_date(txn['date'])
+            if symbol not in first_dates or txn_date < first_dates[symbol]:
+                first_dates[symbol] = txn_date
+
+            transaction_type = str(txn.get('transaction_type', '')).upper()
+            if transaction_type in BUY_TYPES:
+                sign = 1
+            elif transaction_type in SELL_TYPES:
+                sign = -1
+            else:
+                continue
+            try:
+                quantity = Decimal(str(txn.get('quantity') or 0))
+            except InvalidOperation:
+                logger.warning(f"[PositionHistory] Skipping {symbol} transaction with invalid quantity: {txn.get('quantity')}")
+                continue
+            deltas[symbol][txn_date.toordinal()] += sign * quantity
+
+        self._ordinals: Dict[str, List[int]] = {}
+        self._cumulative: Dict[str, List[Decimal]] = {}
+        for symbol, by_day in deltas.items():
+            ordinals = sorted(by_day)
+            running = Decimal('0')
+            cumulative = []
+            for ordinal in ordinals:
+                running += by_day[ordinal]
+                cumulative.append(running)
+            self._ordinals[symbol] = ordinals
+            self._cumulative[symbol] = cumulative
+        self._first_dates = first_dates
+        self.transaction_count = count
+
+    @property
+    def symbols(self) -> List[str]:
+        """Every symbol with at least one transaction"""
+        return sorted(self._first_dates)
+
+    def first_date(self, symbol: str) -> Optional[date]:
+        """Date of the first transaction of any type for the symbol"""
+        return self._first_dates.get(symbol)
+
+    def shares_at(self, symbol: str, as_of: DateLike) -> Decimal:
+        """
+        Shares held at the end of a date (transactions on that date count).
+
+        Args:
+            symbol: Ticker as stored on the transactions
+            as_of: Date, datetime or 'YYYY-MM-DD' string
+
+        Returns:
+            Shares held, never negative
+        """
+        ordinals = self._ordinals.get(symbol)
+        if not ordinals:
+            return Decimal('0')
+        index = bisect_right(ordinals, _to_date(as_of).toordinal())
+        if index == 0:
+            return Decimal('0')
+        return max(Decimal('0'), self._cumulative[symbol][index - 1])
+
+    def current_shares(self, symbol: str) -> Decimal:
+        """Shares held after the last transaction"""
+        cumulative = self._cumulative.get(symbol)
+        if not cumulative:
+            return Decimal('0')
+        return max(Decimal('0'), cumulative[-1])
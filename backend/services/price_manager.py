@@ -17,18 +17,25 @@ import pytz
 import json
 import hashlib
 from datetime import datetime, date, timedelta, timezone, time
-from typing import Dict, Any, List, Optional, Tuple, Set
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple, Set
 from decimal import Decimal, InvalidOperation
 import time as time_module
 from zoneinfo import ZoneInfo
 from collections import defaultdict
 from dataclasses import dataclass
+from contextlib import asynccontextmanager
 
+from config import MULTI_WORKER
 from debug_logger import DebugLogger
+from utils.request_profiler import request_profiler
 from supa_api.supa_api_historical_prices import supa_api_get_historical_prices, supa_api_store_historical_prices_batch, supa_api_get_historical_prices_batch,supa_api_get_prices_for_date_batch
 from supa_api.supa_api_client import get_supa_service_client
+from services.circuit_breaker import circuit_breakers
+from services.cache_dependency_index import price_dependency
+from services.invalidation_bus import invalidation_bus
 from vantage_api.vantage_api_quotes import vantage_api_get_quote, vantage_api_get_daily_adjusted
 from vantage_api.vantage_api_client import get_vantage_client
+from utils.service_registry import service_registry
 
 logger = logging.getLogger(__name__)
 
@@ -43,67 +50,6 @@ class CacheConfig:
     market_status_timeout: int = 300  # 5 minutes for market status
     
 
-class CircuitBreaker:
-    """Circuit breaker pattern for external service failures - uses database for distributed state"""
-    
-    def __init__(self, failure_threshold: int = 5, recovery_timeout: int = 60):
-        self.failure_threshold = failure_threshold
-        self.recovery_timeout = recovery_timeout
-        self.db_client = get_supa_service_client()
-    
-    def is_open(self, service: str) -> bool:
-        """Check if circuit is open (blocking calls)"""
-        try:
-            result = self.db_client.rpc('check_circuit_breaker', {
-                'p_service_name': service,
-                'p_failure_threshold': self.failure_threshold,
-                'p_recovery_timeout': self.recovery_timeout
-            }).execute()
-            
-            if result.data and len(result.data) > 0:
-                return result.data[0]['is_open']
-            
-            # Default to closed if check fails
-            return False
-        except Exception as e:
-            logger.error(f"Failed to check circuit breaker: {e}")
-            # Fail open - allow service calls if circuit breaker check fails
-            return False
-    
-    def record_failure(self, service: str) -> None:
-        """Record service failure"""
-        try:
-            self.db_client.rpc('record_service_failure', {
-                'p_service_name': service,
-                'p_failure_threshold': self.failure_threshold
-            }).execute()
-            logger.warning(f"Recorded failure for service {service}")
-        except Exception as e:
-            logger.error(f"Failed to record service failure: {e}")
-    
-    def record_success(self, service: str) -> None:
-        """Record service success"""
-        try:
-            self.db_client.rpc('record_service_success', {
-                'p_service_name': service
-            }).execute()
-        except Exception as e:
-            logger.error(f"Failed to record service success: {e}")
-    
-    def reset(self, service: Optional[str] = None) -> None:
-        """Reset circuit breaker for a service or all services"""
-        try:
-            self.db_client.rpc('reset_circuit_breaker', {
-                'p_service_name': service
-            }).execute()
-            if service:
-                logger.info(f"Circuit breaker RESET for {service}")
-            else:
-                logger.info("Circuit breaker RESET for all services")
-        except Exception as e:
-            logger.error(f"Failed to reset circuit breaker: {e}")
-
-
 class PriceManager:
     """
     Unified price management service consolidating all price-related operations.
@@ -135,12 +81,15 @@ class PriceManager:
         # Session ID for request-level caching
         self._session_id = None
         
-        # Circuit breaker for API failures
-        self._circuit_breaker = CircuitBreaker()
+        # Circuit breakers for API failures (in-memory, shared across workers in the background)
+        self._alpha_vantage_breaker = circuit_breakers.get("alpha_vantage", failure_threshold=5, recovery_timeout=60)
+        self._dividend_api_breaker = circuit_breakers.get("dividend_api", failure_threshold=5, recovery_timeout=60)
         logger.info("PriceManager initialized")
         
-        # Session management
+        # Session management: per-symbol locks serialize updates in this worker,
+        # leases coordinate them across workers
         self._update_locks: Dict[str, asyncio.Lock] = {}
+        self._multi_worker = MULTI_WORKER
         
         # Request-level cache configuration
         self._request_cache_enabled = False
@@ -445,6 +394,7 @@ class PriceManager:
     
     # ========== Real-time Price Operations (from CurrentPriceManager) ==========
     
+    @request_profiler.profiled("prices.quote")
     async def get_current_price_fast(self, symbol: str) -> Dict[str, Any]:
         """
         Get current price quickly without database operations or data filling
@@ -771,6 +721,7 @@ class PriceManager:
                 "errors": [str(e)]
             }
     
+    @request_profiler.profiled("prices.chart_history")
     async def get_portfolio_prices_for_charts(
         self,
         symbols: List[str],
@@ -870,6 +821,7 @@ class PriceManager:
             logger.error(f"[PriceManager] Error getting latest price from DB for {symbol}: {e}")
             return None
     
+    @request_profiler.profiled("prices.db_batch_read")
     async def get_prices_for_symbols_from_db(
         self,
         symbols: List[str],
@@ -1170,8 +1122,10 @@ class PriceManager:
             "symbols_updated": 0,
             "sessions_filled": 0,
             "api_calls": 0,
+            "symbols_in_progress": 0,
             "errors": []
         }
+        updated_symbols: List[str] = []
         
         for symbol in symbols:
             try:
@@ -1179,7 +1133,12 @@ class PriceManager:
                 if symbol not in self._update_locks:
                     self._update_locks[symbol] = asyncio.Lock()
                 
-                async with self._update_locks[symbol]:
+                async with self._update_locks[symbol], self._symbol_update_lease(symbol) as claimed:
+                    if not claimed:
+                        # Another worker is filling this symbol; its invalidation reaches us on the bus
+                        update_results["symbols_in_progress"] += 1
+                        continue
+                    
                     # Check last update time
                     last_update = await self._get_last_price_date(symbol, user_token)
                     
@@ -1201,6 +1160,7 @@ class PriceManager:
                                 update_results["symbols_updated"] += 1
                                 update_results["sessions_filled"] += len(missed_sessions)
                                 update_results["api_calls"] += 1
+                                updated_symbols.append(symbol)
                                 logger.info(f"Successfully updated {symbol} prices")
                             else:
                                 logger.error(f"Failed to update prices for {symbol}")
@@ -1216,6 +1176,9 @@ class PriceManager:
                 logger.error(f"[PriceManager] Error updating {symbol}: {e}")
                 update_results["errors"].append(f"{symbol}: {str(e)}")
         
+        update_results["cache_invalidation"] = await self._invalidate_price_dependents(
+            "price_update", updated_symbols
+        )
         return update_results
     
     async def update_user_portfolio_prices(
@@ -1294,6 +1257,7 @@ class PriceManager:
             "symbols_updated": 0,
             "errors": []
         }
+        updated_symbols: List[str] = []
         
         for symbol in symbols:
             try:
@@ -1315,15 +1279,60 @@ class PriceManager:
                         
                         if success:
                             results["symbols_updated"] += 1
+                            updated_symbols.append(symbol)
                 
             except Exception as e:
                 logger.error(f"[PriceManager] Error ensuring closing price for {symbol}: {e}")
                 results["errors"].append(f"{symbol}: {str(e)}")
         
+        results["cache_invalidation"] = await self._invalidate_price_dependents(
+            "closing_prices", updated_symbols
+        )
         return results
     
     # ========== Private Helper Methods ==========
     
+    @asynccontextmanager
+    async def _symbol_update_lease(self, symbol: str) -> AsyncIterator[bool]:
+        """
+        Claim a symbol's price update across workers.
+        
+        Yields True if this worker should update the symbol. A single worker
+        always does; with several workers, the one holding the
+        price_update:<symbol> lease does and the others skip the symbol
+        instead of fetching the same sessions again. If the lease store
+        itself fails, this worker updates anyway (the caller still holds the
+        local lock): a duplicate fetch is better than prices going stale.
+        """
+        if not self._multi_worker:
+            yield True
+            return
+        
+        from utils.distributed_lock import LeaseStoreError, lease_locks
+        try:
+            lease = await lease_locks.acquire(
+                f"price_update:{symbol}", ttl_seconds=120, max_wait_seconds=0, raise_on_error=True
+            )
+        except LeaseStoreError as e:
+            logger.warning(f"[PriceManager] Updating {symbol} without a cross-worker lease: {e}")
+            yield True
+            return
+        try:
+            yield lease is not None
+        finally:
+            if lease is not None:
+                await lease.release()
+    
+    async def _invalidate_price_dependents(self, event: str, symbols: List[str]) -> Dict[str, Any]:
+        """Invalidate only the cached portfolios that hold one of the updated symbols, in every worker"""
+        try:
+            return await invalidation_bus.invalidate_dependencies(
+                event, [price_dependency(symbol) for symbol in symbols]
+            )
+        except Exception as e:
+            logger.error(f"[PriceManager] Cache invalidation after {event} failed: {e}")
+            return {"event": event, "error": str(e)}
+    
     async def _check_market_hours(self, market_open: str, market_close: str, market_tz: str) -> bool:
         """Check if market is currently open based on hours and timezone"""
         try:
@@ -1462,7 +1471,7 @@ class PriceManager:
         """Get current price data from Alpha Vantage"""
         try:
             # Check circuit breaker
-            if self._circuit_breaker.is_open('alpha_vantage'):
+            if not self._alpha_vantage_breaker.allow_request():
                 logger.warning(f"[PriceManager] Circuit breaker open for Alpha Vantage")
                 return None
             
@@ -1470,7 +1479,7 @@ class PriceManager:
             quote_response = await vantage_api_get_quote(symbol)
             
             if not quote_response or quote_response.get('status') != 'success':
-                self._circuit_breaker.record_failure('alpha_vantage')
+                self._alpha_vantage_breaker.record_failure()
                 return None
             
             quote_data = quote_response.get('data', {})
@@ -1482,12 +1491,13 @@ class PriceManager:
                 logger.warning(f"[PriceManager] Invalid price conversion for {symbol}: {e}")
                 price = Decimal('0')
                 
+            # Alpha Vantage answered; a bad quote is a data problem, not an outage
+            self._alpha_vantage_breaker.record_success()
+            
             if not self._is_valid_price(price):
                 logger.warning(f"[PriceManager] Invalid price for {symbol}: {price}")
                 return None
             
-            self._circuit_breaker.record_success('alpha_vantage')
-            
             return {
                 'symbol': symbol,
                 'price': self._safe_decimal_to_float(price),
@@ -1503,7 +1513,7 @@ class PriceManager:
             
         except Exception as e:
             logger.error(f"[PriceManager] Error getting current price data for {symbol}: {e}")
-            self._circuit_breaker.record_failure('alpha_vantage')
+            self._alpha_vantage_breaker.record_failure()
             return None
     
     async def _get_last_closing_price(self, symbol: str, user_token: str) -> Optional[Dict[str, Any]]:
@@ -1647,6 +1657,7 @@ class PriceManager:
             logger.error(f"[PriceManager] Error getting last price date for {symbol}: {e}")
             return None
     
+    @request_profiler.profiled("prices.gap_fill")
     async def _fill_price_gaps(
         self,
         symbol: str,
@@ -1657,7 +1668,7 @@ class PriceManager:
         """Fill missing price data from Alpha Vantage"""
         try:
             # Check circuit breaker
-            if self._circuit_breaker.is_open('alpha_vantage'):
+            if not self._alpha_vantage_breaker.allow_request():
                 logger.warning(f"Circuit breaker open, skipping gap fill for {symbol}")
                 return False
             
@@ -1667,9 +1678,11 @@ class PriceManager:
             
             if not daily_response or daily_response.get('status') != 'success':
                 logger.error(f"Alpha Vantage API failed for {symbol}")
-                self._circuit_breaker.record_failure('alpha_vantage')
+                self._alpha_vantage_breaker.record_failure()
                 return False
             
+            self._alpha_vantage_breaker.record_success()
+            
             time_series = daily_response.get('data', {})
             if not time_series:
                 logger.error(f"No time series data in response for {symbol}")
@@ -1731,7 +1744,6 @@ class PriceManager:
             if price_records:
                 await supa_api_store_historical_prices_batch(price_records)
                 logger.info(f"Stored {len(price_records)} price records for {symbol}")
-                self._circuit_breaker.record_success('alpha_vantage')
                 return True
             else:
                 logger.warning(f"No valid price records to store for {symbol}")
@@ -1740,7 +1752,7 @@ class PriceManager:
             
         except Exception as e:
             logger.error(f"[PriceManager] Error filling price gaps for {symbol}: {e}")
-            self._circuit_breaker.record_failure('alpha_vantage')
+            self._alpha_vantage_breaker.record_failure()
             return False
     
     async def _update_price_log(
@@ -1935,7 +1947,7 @@ class PriceManager:
         """
         try:
             # Check circuit breaker
-            if self._circuit_breaker.is_open("dividend_api"):
+            if not self._dividend_api_breaker.allow_request():
                 logger.warning(f"[PriceManager] Circuit breaker open for dividend API")
                 return {
                     "success": False,
@@ -1945,16 +1957,17 @@ class PriceManager:
             
             # Skip database lookup since dividend_history table doesn't exist
             # Go directly to API fetch
+            db_dividends: List[Dict[str, Any]] = []
             
             # Fetch from Alpha Vantage
             try:
                 api_dividends = await self._fetch_dividends_from_alpha_vantage(symbol)
+                self._dividend_api_breaker.record_success()
                 
                 if api_dividends:
                     # Filter by date range if specified
                     filtered = self._filter_dividends_by_date(api_dividends, start_date, end_date)
                     
-                    self._circuit_breaker.record_success("dividend_api")
                     return {
                         "success": True,
                         "data": filtered,
@@ -1970,7 +1983,7 @@ class PriceManager:
                     }
                     
             except Exception as api_error:
-                self._circuit_breaker.record_failure("dividend_api")
+                self._dividend_api_breaker.record_failure()
                 logger.error(f"[PriceManager] Alpha Vantage dividend fetch failed: {api_error}")
                 
                 # Return database data as fallback
@@ -2072,6 +2085,7 @@ class PriceManager:
     
     # Removed _has_recent_dividend_data - not needed without dividend_history table
     
+    @request_profiler.profiled("prices.prefetch")
     async def prefetch_user_symbols(self, user_id: str, user_token: str) -> int:
         """Prefetch all prices for user's holdings to warm the cache
         
@@ -2151,12 +2165,12 @@ class PriceManager:
         Args:
             service: Specific service to reset ('alpha_vantage', 'dividend_api') or None for all
         """
-        self._circuit_breaker.reset(service)
+        circuit_breakers.reset(service)
         if service:
             logger.info(f"[PriceManager] Circuit breaker reset for {service}")
         else:
             logger.info("[PriceManager] Circuit breaker reset for all services")
 
 
-# Create singleton instance
-price_manager = PriceManager()
\ No newline at end of file
+# Singleton instance, created on first use
+price_manager = service_registry.register("price_manager", PriceManager)
\ No newline at end of file
@@ -0,0 +1,469 @@
+"""
+Returns Engine - Time-weighted and money-weighted returns net of cash flows
+==========================================================================
+
+Raw value series treat deposits as performance: buying $5,000 of stock
+makes a $10,000 portfolio look up 50%. This engine derives the external
+cash flows from the transaction ledger and removes them:
+
+* Daily sub-period returns with flows at the close, the convention used by
+  risk_engine (trades are valued at the close of the day they execute):
+
+      r_t = (V_t - V_{t-1} - F_t) / V_{t-1}
+
+  When nothing was held the day before (the first buy, or buying back in
+  after a full exit), the day's inflow is the base instead of V_{t-1}.
+* Time-weighted return (TWR): the chained product of (1 + r_t) between two
+  dates. It measures the holdings, not the timing of deposits.
+* Modified Dietz: the money-weighted return of an arbitrary period, with
+  each flow weighted by the share of the period it was invested for.
+
+A user's whole history is built in one pass. The sorted ledger is swept over
+the trading days, prices are forward-filled, and the days x symbols matrix
+is summed in fixed point (``PortfolioCalculator._quantity_rows`` /
+``_price_rows``). Every range key (7D ... MAX) is then a pair of index
+lookups into the cumulative growth array, instead of one recalculation per
+range.
+"""
+
+import logging
+from collections import OrderedDict, defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, DefaultDict, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.cache_dependency_index import (
+    CacheEntry,
+    cache_dependency_index,
+    price_dependency,
+    transactions_dependency,
+)
+from services.portfolio_calculator import PortfolioCalculator
+from services.price_manager import price_manager
+from supa_api.supa_api_transactions import supa_api_get_user_transactions
+from utils.fixed_point import (
+    MONEY_SCALE,
+    PRICE_SCALE,
+    QUANTITY_SCALE,
+    from_fixed,
+    fx_mul,
+    fx_weighted_sum_rows,
+    to_fixed,
+)
+
+logger = logging.getLogger(__name__)
+
+RANGE_KEYS = ("7D", "1M", "3M", "6M", "1Y", "YTD", "MAX")
+DAYS_PER_YEAR = 365
+
+
+# ============================================================================
+# Cash flows
+# ============================================================================
+
+def external_flows(transactions: Sequence[Dict[str, Any]]) -> List[Tuple[date, int]]:
+    """
+    Net external cash flow per date, in fixed-point money units.
+
+    Buys are money put into the portfolio (amount plus commission), sells
+    are money taken out (amount less commission). Dividends are paid out of
+    the holdings, so they are outflows, and the income counts as return.
+    ``amount_invested`` is used when a transaction carries it, as in
+    IndexSimulationService._calculate_cash_flows.
+
+    Args:
+        transactions: Transaction records
+
+    Returns:
+        Sorted (date, net flow units) pairs, one per date with a flow
+    """
+    by_date: DefaultDict[date, int] = defaultdict(int)
+    for txn in transactions:
+        transaction_type = str(txn.get('transaction_type', '')).upper()
+        if transaction_type not in ('BUY', 'SELL', 'DIVIDEND'):
+            continue
+        commission = to_fixed(txn.get('commission') or 0, MONEY_SCALE)
+        if transaction_type == 'DIVIDEND' and txn.get('total_value') is not None:
+            amount = abs(to_fixed(txn['total_value'], MONEY_SCALE))
+        elif transaction_type != 'DIVIDEND' and txn.get('amount_invested') is not None:
+            amount = abs(to_fixed(txn['amount_invested'], MONEY_SCALE))
+            commission = 0
+        else:
+            amount = abs(fx_mul(
+                to_fixed(txn.get('quantity') or 0, QUANTITY_SCALE),
+                to_fixed(txn.get('price') or 0, PRICE_SCALE),
+                QUANTITY_SCALE, PRICE_SCALE, MONEY_SCALE
+            ))
+
+        if transaction_type == 'BUY':
+            flow = amount + commission
+        elif transaction_type == 'SELL':
+            flow = -(amount - commission)
+        else:
+            flow = -amount
+        by_date[datetime.strptime(txn['date'], '%Y-%m-%d').date()] += flow
+    return sorted(by_date.items())
+
+
+def align_flow_units(dates: Sequence[date], flows: Sequence[Tuple[date, int]]) -> List[int]:
+    """
+    Sum flows onto series dates; flows on days without a point (weekends,
+    holidays) count towards the next point, flows after the last are dropped.
+    """
+    aligned = [0] * len(dates)
+    if not dates:
+        return aligned
+    ordinals = np.fromiter((d.toordinal() for d in dates), dtype=np.int64, count=len(dates))
+    for flow_date, units in flows:
+        index = int(np.searchsorted(ordinals, flow_date.toordinal(), side="left"))
+        if index < len(dates):
+            aligned[index] += units
+    return aligned
+
+
+def annualize(rate: Optional[float], days: int) -> Optional[float]:
+    """
+    Compound a period return to a yearly rate. Periods shorter than a year
+    are not annualized (None), so a good week is not reported as a huge
+    yearly figure.
+    """
+    if rate is None or days < DAYS_PER_YEAR or rate <= -1:
+        return None
+    return (1.0 + rate) ** (DAYS_PER_YEAR / days) - 1.0
+
+
+def sub_period_returns(values: Sequence[float], flows: Sequence[float]) -> np.ndarray:
+    """
+    Daily returns net of flows (see module docstring); the first point is
+    measured against a zero opening value. 0 where nothing was invested.
+    """
+    values = np.asarray(values, dtype=float)
+    flows = np.asarray(flows, dtype=float)
+    previous = np.concatenate(([0.0], values[:-1]))
+    invested = np.where(previous > 0, previous, np.maximum(flows, 0.0))
+    gain = values - previous - flows
+    safe_invested = np.where(invested > 0, invested, 1.0)
+    return np.where(invested > 0, gain / safe_invested, 0.0)
+
+
+# ============================================================================
+# Series
+# ============================================================================
+
+class ReturnsSeries:
+    """
+    Daily values, flows and cumulative TWR growth of one portfolio.
+
+    Values and flows are kept in fixed-point money units so period sums are
+    exact; ratios are computed in floating point.
+    """
+
+    __slots__ = ("dates", "value_units", "flow_units", "returns", "growth", "_ordinals")
+
+    def __init__(self, dates: Sequence[date], value_units: Sequence[int], flow_units: Sequence[int]) -> None:
+        self.dates = list(dates)
+        self.value_units = list(value_units)
+        self.flow_units = list(flow_units)
+        self.returns = sub_period_returns(self.value_units, self.flow_units)
+        # growth[i] is the value of 1 invested before the first point, after day i
+        self.growth = np.cumprod(1.0 + self.returns)
+        self._ordinals = np.fromiter((d.toordinal() for d in self.dates), dtype=np.int64, count=len(self.dates))
+
+    @classmethod
+    def from_values(
+        cls,
+        dates: Sequence[date],
+        values: Sequence[Any],
+        flows: Sequence[Tuple[date, Any]] = ()
+    ) -> "ReturnsSeries":
+        """Build from a (date, value) series and (date, amount) flows in money"""
+        flow_units = [(flow_date, to_fixed(amount, MONEY_SCALE)) for flow_date, amount in flows]
+        return cls._trimmed(dates, [to_fixed(v, MONEY_SCALE) for v in values], align_flow_units(dates, flow_units))
+
+    @classmethod
+    def _trimmed(cls, dates: Sequence[date], value_units: Sequence[int], flow_units: Sequence[int]) -> "ReturnsSeries":
+        """
+        Start at the first valued point. Flows before it (a buy made before
+        the first price is known) are folded into it as the opening investment.
+        """
+        first = next((i for i, units in enumerate(value_units) if units > 0), len(value_units))
+        if first == len(value_units):
+            return cls([], [], [])
+        kept_flows = list(flow_units[first:])
+        kept_flows[0] += sum(flow_units[:first])
+        return cls(dates[first:], value_units[first:], kept_flows)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    # ------------------------------------------------------------------
+    # Period lookups
+    # ------------------------------------------------------------------
+
+    def _base_index(self, start: Optional[date]) -> int:
+        """Index of the opening point for a period starting at `start`; -1 for inception"""
+        if start is None:
+            return -1
+        return int(np.searchsorted(self._ordinals, start.toordinal(), side="right")) - 1
+
+    def _end_index(self, end: Optional[date]) -> int:
+        if end is None:
+            return len(self.dates) - 1
+        return int(np.searchsorted(self._ordinals, end.toordinal(), side="right")) - 1
+
+    def twr(self, start: Optional[date] = None, end: Optional[date] = None) -> Optional[float]:
+        """
+        Time-weighted return from the close on or before `start` to the close
+        on or before `end`; None start means since inception.
+        """
+        base, last = self._base_index(start), self._end_index(end)
+        if last < 0 or last <= base:
+            return None
+        opening = self.growth[base] if base >= 0 else 1.0
+        return float(self.growth[last] / opening - 1.0)
+
+    def value_series(self, start: Optional[date] = None, end: Optional[date] = None) -> List[Tuple[date, Decimal]]:
+        """(date, value) points from start to end inclusive, skipping days with nothing held"""
+        first = 0 if start is None else int(np.searchsorted(self._ordinals, start.toordinal(), side="left"))
+        last = self._end_index(end)
+        return [
+            (self.dates[i], from_fixed(self.value_units[i], MONEY_SCALE))
+            for i in range(first, last + 1)
+            if self.value_units[i] > 0
+        ]
+
+    def twr_series(self, start: Optional[date] = None, end: Optional[date] = None) -> List[Tuple[date, float]]:
+        """Cumulative TWR at each point after the period opening"""
+        base, last = self._base_index(start), self._end_index(end)
+        if last <= base:
+            return []
+        opening = self.growth[base] if base >= 0 else 1.0
+        cumulative = self.growth[base + 1:last + 1] / opening - 1.0
+        return list(zip(self.dates[base + 1:last + 1], cumulative.tolist()))
+
+    def modified_dietz(self, start: Optional[date] = None, end: Optional[date] = None) -> Optional[float]:
+        """
+        Money-weighted return of a period:
+
+            (V_end - V_begin - sum F) / (V_begin + sum w_i F_i)
+
+        Flows happen at the close, so w_i = (end - d_i) / (end - begin). A
+        period from inception begins at the first point and its opening
+        flows have w = 1.
+
+        Returns:
+            The return as a fraction, or None when nothing was invested
+        """
+        base, last = self._base_index(start), self._end_index(end)
+        if last < 0 or last <= base:
+            return None
+        end_ordinal = int(self._ordinals[last])
+        begin_ordinal = int(self._ordinals[max(base, 0)])
+        opening_units = self.value_units[base] if base >= 0 else 0
+        period_days = end_ordinal - begin_ordinal
+
+        flow_units = np.asarray(self.flow_units[base + 1:last + 1], dtype=float)
+        if period_days > 0:
+            weights = (end_ordinal - self._ordinals[base + 1:last + 1]) / period_days
+        else:
+            weights = np.ones(len(flow_units))
+        net_flow_units = sum(self.flow_units[base + 1:last + 1])
+        gain_units = self.value_units[last] - opening_units - net_flow_units
+        average_capital = opening_units + float(np.dot(weights, flow_units))
+        if average_capital <= 0:
+            return None
+        return gain_units / average_capital
+
+    def period_summary(self, start: Optional[date] = None, end: Optional[date] = None) -> Dict[str, Any]:
+        """
+        TWR, Modified Dietz and money figures for one period.
+
+        Returns:
+            Dict with start/end dates and values, net flows, gain, and both
+            returns as fractions and percentages (None when undefined)
+        """
+        base, last = self._base_index(start), self._end_index(end)
+        if last < 0 or last <= base:
+            return {
+                "start_date": start.isoformat() if start else None,
+                "end_date": end.isoformat() if end else None,
+                "start_value": 0.0, "end_value": 0.0, "net_flows": 0.0, "gain": 0.0, "calendar_days": 0,
+                "twr": None, "twr_pct": None, "modified_dietz": None, "modified_dietz_pct": None,
+                "annualized_twr": None, "annualized_modified_dietz": None,
+            }
+        opening_units = self.value_units[base] if base >= 0 else 0
+        net_flow_units = sum(self.flow_units[base + 1:last + 1])
+        twr = self.twr(start, end)
+        dietz = self.modified_dietz(start, end)
+        calendar_days = int(self._ordinals[last] - self._ordinals[max(base, 0)])
+        return {
+            "start_date": (self.dates[base] if base >= 0 else self.dates[0]).isoformat(),
+            "end_date": self.dates[last].isoformat(),
+            "start_value": float(from_fixed(opening_units, MONEY_SCALE)),
+            "end_value": float(from_fixed(self.value_units[last], MONEY_SCALE)),
+            "net_flows": float(from_fixed(net_flow_units, MONEY_SCALE)),
+            "gain": float(from_fixed(self.value_units[last] - opening_units - net_flow_units, MONEY_SCALE)),
+            "calendar_days": calendar_days,
+            "twr": twr,
+            "twr_pct": round(twr * 100, 4) if twr is not None else None,
+            "modified_dietz": dietz,
+            "modified_dietz_pct": round(dietz * 100, 4) if dietz is not None else None,
+            "annualized_twr": annualize(twr, calendar_days),
+            "annualized_modified_dietz": annualize(dietz, calendar_days),
+        }
+
+    def range_summaries(self, range_keys: Sequence[str] = RANGE_KEYS) -> Dict[str, Dict[str, Any]]:
+        """period_summary for every range key, ending at the last point"""
+        summaries = {}
+        for range_key in range_keys:
+            start = None if range_key == "MAX" else PortfolioCalculator._compute_date_range(range_key)[0]
+            summaries[range_key] = self.period_summary(start)
+        return summaries
+
+
+# ============================================================================
+# Engine
+# ============================================================================
+
+class ReturnsEngine:
+    """
+    Builds and caches each user's full-history ReturnsSeries.
+
+    A series is valid for the day it was built on and is dropped when the
+    user's transactions or the prices of a held symbol change.
+    """
+
+    def __init__(self, max_series: int = 2000) -> None:
+        self._max_series = max_series
+        self._series: "OrderedDict[str, Tuple[date, ReturnsSeries]]" = OrderedDict()
+        self._stats = {"builds": 0, "hits": 0}
+        cache_dependency_index.register_invalidator("returns", self._invalidate_entries)
+
+    @staticmethod
+    def build_series(
+        transactions: Sequence[Dict[str, Any]],
+        price_lookup: Dict[str, Dict[date, int]],
+        end_date: date
+    ) -> ReturnsSeries:
+        """
+        One sweep over the ledger from the first transaction to end_date.
+
+        Args:
+            transactions: Transaction records
+            price_lookup: {symbol: {date: price units at PRICE_SCALE}}
+            end_date: Last day of the series
+
+        Returns:
+            The user's ReturnsSeries (empty without valued days)
+        """
+        relevant = [t for t in transactions if datetime.strptime(t['date'], '%Y-%m-%d').date() <= end_date]
+        if not relevant:
+            return ReturnsSeries([], [], [])
+        first_day = min(datetime.strptime(t['date'], '%Y-%m-%d').date() for t in relevant)
+        trading_days = PortfolioCalculator._get_trading_days(first_day, end_date, "MAX")
+        columns = sorted({t['symbol'] for t in relevant})
+
+        quantity_rows = PortfolioCalculator._quantity_rows(relevant, columns, trading_days)
+        price_rows = PortfolioCalculator._price_rows(price_lookup, columns, trading_days)
+        value_units = fx_weighted_sum_rows(quantity_rows, price_rows, QUANTITY_SCALE, PRICE_SCALE, MONEY_SCALE)
+        flow_units = align_flow_units(trading_days, external_flows(relevant))
+        return ReturnsSeries._trimmed(trading_days, value_units, flow_units)
+
+    async def get_series(
+        self,
+        user_id: str,
+        user_token: str,
+        transactions: Optional[List[Dict[str, Any]]] = None
+    ) -> ReturnsSeries:
+        """
+        The user's full-history series, built once per day.
+
+        Args:
+            user_id: User's UUID
+            user_token: JWT token for database access
+            transactions: Optional pre-fetched transactions
+
+        Returns:
+            ReturnsSeries up to today
+        """
+        today = date.today()
+        cached = self._series.get(user_id)
+        if cached is not None and cached[0] == today:
+            self._series.move_to_end(user_id)
+            self._stats["hits"] += 1
+            return cached[1]
+
+        if transactions is None:
+            transactions = await supa_api_get_user_transactions(
+                user_id=user_id,
+                limit=10000,
+                user_token=user_token
+            )
+        transactions = transactions or []
+
+        symbols = sorted({t['symbol'] for t in transactions if t.get('symbol')})
+        price_lookup: DefaultDict[str, Dict[date, int]] = defaultdict(dict)
+        if symbols:
+            first_day = min(datetime.strptime(t['date'], '%Y-%m-%d').date() for t in transactions)
+            price_response = await price_manager.get_portfolio_prices_for_charts(
+                symbols=symbols,
+                start_date=first_day,
+                end_date=today,
+                user_token=user_token
+            )
+            if not price_response.get('success'):
+                logger.warning(f"[ReturnsEngine] Price data unavailable for {user_id}: {price_response.get('error')}")
+            for symbol, price_records in (price_response.get('data') or {}).items():
+                for price_record in price_records:
+                    price_date = datetime.strptime(price_record['date'], '%Y-%m-%d').date()
+                    price_lookup[symbol][price_date] = to_fixed(price_record['close'], PRICE_SCALE)
+
+        series = self.build_series(transactions, price_lookup, today)
+        self._stats["builds"] += 1
+        logger.info(f"[ReturnsEngine] Built {len(series)} points for {user_id} ({len(symbols)} symbols)")
+
+        self._series[user_id] = (today, series)
+        self._series.move_to_end(user_id)
+        cache_dependency_index.register(
+            "returns", user_id, "series",
+            [transactions_dependency(user_id)] + [price_dependency(symbol) for symbol in symbols]
+        )
+        while len(self._series) > self._max_series:
+            old_user, _ = self._series.popitem(last=False)
+            cache_dependency_index.forget(("returns", old_user, "series"))
+        return series
+
+    async def get_range_returns(
+        self,
+        user_id: str,
+        user_token: str,
+        transactions: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """TWR and Modified Dietz for every range key from one computation"""
+        series = await self.get_series(user_id, user_token, transactions)
+        return series.range_summaries()
+
+    def invalidate_user(self, user_id: str) -> bool:
+        """Drop a user's series"""
+        cache_dependency_index.forget(("returns", user_id, "series"))
+        return self._series.pop(user_id, None) is not None
+
+    async def _invalidate_entries(self, entries: List[CacheEntry]) -> int:
+        removed = 0
+        for _, user_id, _ in entries:
+            if self.invalidate_user(user_id):
+                removed += 1
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Engine statistics"""
+        return {"series": len(self._series), **self._stats}
+
+
+# ============================================================================
+# Module-level instance
+# ============================================================================
+
+returns_engine = ReturnsEngine()
@@ -0,0 +1,500 @@
+"""
+Risk Engine - Rolling risk analytics from daily portfolio value series
+=====================================================================
+
+Computes volatility (full period and rolling), drawdowns, beta/correlation
+to a benchmark, Sharpe/Sortino, HHI concentration and per-holding risk
+contributions. Inputs are the daily value series from
+``PortfolioCalculator.calculate_portfolio_time_series`` and the benchmark
+series from ``IndexSimulationService``. Both series move with the user's
+deposits and withdrawals, so daily returns are flow-adjusted:
+
+    r_t = (V_t - F_t) / V_{t-1} - 1
+
+The first computation for a user runs vectorized over the whole series.
+After that, ``RiskEngine`` keeps per-user running state. When the next
+request's series overlaps the previous one, the days that fell out of the
+range are dropped and the new days are appended, one window step each.
+Otherwise the state is rebuilt. States are dropped when the user's
+transactions change, via the cache dependency index.
+"""
+
+import logging
+import math
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.cache_dependency_index import CacheEntry, cache_dependency_index, transactions_dependency
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+@dataclass(frozen=True)
+class RiskConfig:
+    """Risk calculation settings"""
+    window: int = 21                 # rolling window in trading days
+    risk_free_rate: float = 0.0      # annual, as a fraction
+    annualization: int = TRADING_DAYS_PER_YEAR
+
+    @property
+    def daily_risk_free(self) -> float:
+        return self.risk_free_rate / self.annualization
+
+
+# ============================================================================
+# Vectorized kernels
+# ============================================================================
+
+def align_flows(dates: Sequence[date], flows: Sequence[Tuple[date, Any]]) -> np.ndarray:
+    """
+    Sum external cash flows onto series dates.
+
+    Flows on days without a point (weekends, holidays) count towards the next
+    point; flows after the last point are ignored.
+    """
+    aligned = np.zeros(len(dates))
+    if not dates:
+        return aligned
+    ordinals = np.fromiter((d.toordinal() for d in dates), dtype=np.int64, count=len(dates))
+    for flow_date, amount in flows:
+        index = int(np.searchsorted(ordinals, flow_date.toordinal(), side="left"))
+        if index < len(dates):
+            aligned[index] += float(amount)
+    return aligned
+
+
+def flow_adjusted_returns(values: Sequence[float], flows: Optional[Sequence[float]] = None) -> np.ndarray:
+    """Daily returns net of external flows; 0 where the previous value is not positive"""
+    values = np.asarray(values, dtype=float)
+    if values.size < 2:
+        return np.empty(0)
+    previous = values[:-1]
+    current = values[1:] if flows is None else values[1:] - np.asarray(flows, dtype=float)[1:]
+    safe_previous = np.where(previous > 0, previous, 1.0)
+    return np.where(previous > 0, current / safe_previous - 1.0, 0.0)
+
+
+def rolling_volatility(returns: np.ndarray, window: int, annualization: int = TRADING_DAYS_PER_YEAR) -> np.ndarray:
+    """Annualized rolling sample standard deviation; NaN until the first full window"""
+    rolled = np.full(returns.size, np.nan)
+    if window < 2 or returns.size < window:
+        return rolled
+    windows = np.lib.stride_tricks.sliding_window_view(returns, window)
+    rolled[window - 1:] = windows.std(axis=1, ddof=1) * math.sqrt(annualization)
+    return rolled
+
+
+def drawdown_state(returns: np.ndarray) -> Tuple[float, float, float]:
+    """(wealth, peak, max drawdown) of a growth-of-1 index built from returns"""
+    if returns.size == 0:
+        return 1.0, 1.0, 0.0
+    wealth = np.cumprod(1.0 + returns)
+    peaks = np.maximum.accumulate(np.maximum(wealth, 1.0))
+    return float(wealth[-1]), float(peaks[-1]), float(min((wealth / peaks - 1.0).min(), 0.0))
+
+
+def concentration(weights: Sequence[float]) -> Dict[str, Optional[float]]:
+    """Herfindahl-Hirschman index of position weights and its effective number of positions"""
+    w = np.asarray(weights, dtype=float)
+    total = w.sum()
+    if w.size == 0 or total <= 0:
+        return {"hhi": None, "effective_positions": None, "largest_weight": None}
+    w = w / total
+    hhi = float(np.dot(w, w))
+    return {"hhi": hhi, "effective_positions": 1.0 / hhi, "largest_weight": float(w.max())}
+
+
+def risk_contributions(
+    symbols: Sequence[str],
+    weights: Sequence[float],
+    returns_matrix: np.ndarray,
+    annualization: int = TRADING_DAYS_PER_YEAR
+) -> List[Dict[str, Any]]:
+    """
+    Each holding's share of portfolio volatility (Euler decomposition).
+
+    contribution_i = w_i * (Σw)_i / σ_p, and the contributions sum to σ_p.
+
+    Args:
+        symbols: Holding symbols (columns of returns_matrix)
+        weights: Current position weights
+        returns_matrix: Daily returns, one row per day, one column per holding
+        annualization: Periods per year
+
+    Returns:
+        One dict per holding, largest contribution first
+    """
+    w = np.asarray(weights, dtype=float)
+    if w.sum() <= 0 or returns_matrix.shape[0] < 2:
+        return []
+    w = w / w.sum()
+    covariance = np.atleast_2d(np.cov(returns_matrix, rowvar=False, ddof=1)) * annualization
+    portfolio_variance = float(w @ covariance @ w)
+    if portfolio_variance <= 0:
+        return []
+    portfolio_volatility = math.sqrt(portfolio_variance)
+    contributions = w * (covariance @ w) / portfolio_volatility
+    volatilities = np.sqrt(np.clip(np.diag(covariance), 0.0, None))
+    result = [
+        {
+            "symbol": symbol,
+            "weight": float(w[i]),
+            "volatility": float(volatilities[i]),
+            "risk_contribution": float(contributions[i]),
+            "percent_of_risk": float(contributions[i] / portfolio_volatility * 100),
+        }
+        for i, symbol in enumerate(symbols)
+    ]
+    result.sort(key=lambda item: item["risk_contribution"], reverse=True)
+    return result
+
+
+def returns_matrix_from_prices(
+    price_data: Dict[str, List[Dict[str, Any]]],
+    symbols: Sequence[str]
+) -> np.ndarray:
+    """
+    Daily returns per symbol from chart price records ({symbol: [{date, close}]}).
+
+    Prices are forward-filled over the union of dates, and rows start once
+    every symbol has a price.
+    """
+    closes: Dict[str, Dict[str, float]] = {
+        symbol: {record["date"]: float(record["close"]) for record in price_data.get(symbol, [])}
+        for symbol in symbols
+    }
+    all_dates = sorted(set().union(*(c.keys() for c in closes.values()))) if closes else []
+    if not all_dates:
+        return np.empty((0, len(symbols)))
+    prices = np.full((len(all_dates), len(symbols)), np.nan)
+    for column, symbol in enumerate(symbols):
+        history = closes[symbol]
+        last = np.nan
+        for row, day in enumerate(all_dates):
+            last = history.get(day, last)
+            prices[row, column] = last
+    complete = prices[~np.isnan(prices).any(axis=1)]
+    if complete.shape[0] < 2:
+        return np.empty((0, len(symbols)))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = complete[1:] / complete[:-1] - 1.0
+    return np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+# ============================================================================
+# Incremental state
+# ============================================================================
+
+class RiskState:
+    """
+    Running risk statistics for one user's series.
+
+    Sums of returns, squares and cross-products make the full-period stats
+    O(1) to read. The rolling window is recomputed from the last `window`
+    returns when a day is appended.
+    """
+
+    def __init__(self, config: RiskConfig) -> None:
+        self.config = config
+        self.dates: List[date] = []
+        self.values: List[float] = []
+        self.benchmark: Optional[List[float]] = None
+        self.returns: List[float] = []
+        self.benchmark_returns: List[float] = []
+        self.rolling: List[Tuple[date, float]] = []
+        self.sum_r = self.sum_r2 = self.sum_down2 = 0.0
+        self.sum_b = self.sum_b2 = self.sum_rb = 0.0
+        self.wealth = self.peak = 1.0
+        self.max_drawdown = 0.0
+
+    @classmethod
+    def from_series(
+        cls,
+        config: RiskConfig,
+        dates: Sequence[date],
+        values: Sequence[float],
+        benchmark: Optional[Sequence[float]] = None,
+        flows: Optional[Sequence[float]] = None,
+        benchmark_flows: Optional[Sequence[float]] = None
+    ) -> "RiskState":
+        """Build the state with one vectorized pass over the series"""
+        state = cls(config)
+        state.dates = list(dates)
+        state.values = [float(v) for v in values]
+        r = flow_adjusted_returns(state.values, flows)
+        state.returns = r.tolist()
+        downside = np.minimum(r - config.daily_risk_free, 0.0)
+        state.sum_r, state.sum_r2, state.sum_down2 = float(r.sum()), float(r @ r), float(downside @ downside)
+
+        if benchmark is not None:
+            state.benchmark = [float(v) for v in benchmark]
+            b = flow_adjusted_returns(state.benchmark, benchmark_flows)
+            state.benchmark_returns = b.tolist()
+            state.sum_b, state.sum_b2, state.sum_rb = float(b.sum()), float(b @ b), float(r @ b)
+
+        rolled = rolling_volatility(r, config.window, config.annualization)
+        state.rolling = [
+            (state.dates[i + 1], float(vol)) for i, vol in enumerate(rolled) if not math.isnan(vol)
+        ]
+        state.wealth, state.peak, state.max_drawdown = drawdown_state(r)
+        return state
+
+    def overlap_start(
+        self,
+        dates: Sequence[date],
+        values: Sequence[float],
+        benchmark: Optional[Sequence[float]]
+    ) -> Optional[int]:
+        """
+        Where a new series continues this state.
+
+        Returns how many leading points of the state the new series no longer
+        covers, or None when the series does not extend this one unchanged.
+        """
+        if not dates or not self.dates or (benchmark is None) != (self.benchmark is None):
+            return None
+        try:
+            dropped = self.dates.index(dates[0])
+        except ValueError:
+            return None
+        overlap = len(self.dates) - dropped
+        if len(dates) < overlap or list(dates[:overlap]) != self.dates[dropped:]:
+            return None
+        if [float(v) for v in values[:overlap]] != self.values[dropped:]:
+            return None
+        if benchmark is not None and [float(v) for v in benchmark[:overlap]] != self.benchmark[dropped:]:
+            return None
+        return dropped
+
+    def drop_front(self, count: int) -> None:
+        """Forget the oldest `count` points (the range start moved forward)"""
+        if count <= 0:
+            return
+        count = min(count, len(self.dates) - 1)
+        gone = self.returns[:count]
+        gone_b = self.benchmark_returns[:count]
+        rf = self.config.daily_risk_free
+        for i, r in enumerate(gone):
+            self.sum_r -= r
+            self.sum_r2 -= r * r
+            self.sum_down2 -= min(r - rf, 0.0) ** 2
+            if gone_b:
+                self.sum_b -= gone_b[i]
+                self.sum_b2 -= gone_b[i] * gone_b[i]
+                self.sum_rb -= r * gone_b[i]
+        del self.dates[:count]
+        del self.values[:count]
+        del self.returns[:count]
+        if self.benchmark is not None:
+            del self.benchmark[:count]
+            del self.benchmark_returns[:count]
+
+        # Rolling points whose window reached into the dropped days are gone
+        window = self.config.window
+        first_full = self.dates[window] if len(self.dates) > window else None
+        self.rolling = [point for point in self.rolling if first_full is not None and point[0] >= first_full]
+        self.wealth, self.peak, self.max_drawdown = drawdown_state(np.asarray(self.returns))
+
+    def append(
+        self,
+        day: date,
+        value: float,
+        benchmark_value: Optional[float] = None,
+        flow: float = 0.0,
+        benchmark_flow: float = 0.0
+    ) -> None:
+        """Add one day"""
+        value = float(value)
+        previous = self.values[-1]
+        r = (value - flow) / previous - 1.0 if previous > 0 else 0.0
+        self.dates.append(day)
+        self.values.append(value)
+        self.returns.append(r)
+        self.sum_r += r
+        self.sum_r2 += r * r
+        self.sum_down2 += min(r - self.config.daily_risk_free, 0.0) ** 2
+
+        if self.benchmark is not None:
+            benchmark_value = float(benchmark_value)
+            previous_b = self.benchmark[-1]
+            b = (benchmark_value - benchmark_flow) / previous_b - 1.0 if previous_b > 0 else 0.0
+            self.benchmark.append(benchmark_value)
+            self.benchmark_returns.append(b)
+            self.sum_b += b
+            self.sum_b2 += b * b
+            self.sum_rb += r * b
+
+        window = self.config.window
+        if window >= 2 and len(self.returns) >= window:
+            tail = self.returns[-window:]
+            mean = math.fsum(tail) / window
+            variance = math.fsum((x - mean) ** 2 for x in tail) / (window - 1)
+            self.rolling.append((day, math.sqrt(variance * self.config.annualization)))
+
+        self.wealth *= 1.0 + r
+        self.peak = max(self.peak, self.wealth)
+        self.max_drawdown = min(self.max_drawdown, self.wealth / self.peak - 1.0)
+
+    def summary(self) -> Dict[str, Any]:
+        """Current risk metrics (None where there is not enough data)"""
+        config = self.config
+        n = len(self.returns)
+        annualization = config.annualization
+        result: Dict[str, Any] = {
+            "observations": n,
+            "start_date": self.dates[0].isoformat() if self.dates else None,
+            "end_date": self.dates[-1].isoformat() if self.dates else None,
+            "window": config.window,
+            "volatility": None,
+            "rolling_volatility": self.rolling[-1][1] if self.rolling else None,
+            "rolling_volatility_series": [
+                {"date": day.isoformat(), "value": vol} for day, vol in self.rolling
+            ],
+            "total_return": self.wealth - 1.0,
+            "max_drawdown": self.max_drawdown,
+            "current_drawdown": self.wealth / self.peak - 1.0,
+            "sharpe_ratio": None,
+            "sortino_ratio": None,
+            "beta": None,
+            "correlation": None,
+            "rolling_beta": None,
+        }
+        if n < 2:
+            return result
+
+        mean = self.sum_r / n
+        variance = max((self.sum_r2 - n * mean * mean) / (n - 1), 0.0)
+        std = math.sqrt(variance)
+        excess = mean - config.daily_risk_free
+        result["volatility"] = std * math.sqrt(annualization)
+        if std > 0:
+            result["sharpe_ratio"] = excess / std * math.sqrt(annualization)
+        downside = math.sqrt(max(self.sum_down2, 0.0) / n)
+        if downside > 0:
+            result["sortino_ratio"] = excess / downside * math.sqrt(annualization)
+
+        if self.benchmark is not None:
+            mean_b = self.sum_b / n
+            variance_b = max((self.sum_b2 - n * mean_b * mean_b) / (n - 1), 0.0)
+            covariance = (self.sum_rb - n * mean * mean_b) / (n - 1)
+            if variance_b > 0:
+                result["beta"] = covariance / variance_b
+                if std > 0:
+                    result["correlation"] = max(-1.0, min(1.0, covariance / (std * math.sqrt(variance_b))))
+            if n >= config.window >= 2:
+                r_tail = np.asarray(self.returns[-config.window:])
+                b_tail = np.asarray(self.benchmark_returns[-config.window:])
+                window_variance_b = float(np.var(b_tail, ddof=1))
+                if window_variance_b > 0:
+                    result["rolling_beta"] = float(np.cov(r_tail, b_tail, ddof=1)[0, 1] / window_variance_b)
+        return result
+
+
+# ============================================================================
+# Engine
+# ============================================================================
+
+class RiskEngine:
+    """
+    Per-user risk analytics with incrementally maintained state.
+    """
+
+    def __init__(self, config: Optional[RiskConfig] = None, max_states: int = 2000) -> None:
+        self.config = config or RiskConfig()
+        self._max_states = max_states
+        self._states: "OrderedDict[Tuple[str, str], RiskState]" = OrderedDict()
+        self._stats = {"full_computations": 0, "incremental_updates": 0, "appended_days": 0, "dropped_days": 0}
+        cache_dependency_index.register_invalidator("risk", self._invalidate_entries)
+
+    def analyze(
+        self,
+        user_id: str,
+        dates: Sequence[date],
+        values: Sequence[float],
+        benchmark_values: Optional[Sequence[float]] = None,
+        flows: Optional[Sequence[Tuple[date, Any]]] = None,
+        benchmark_flows: Optional[Sequence[Tuple[date, Any]]] = None,
+        benchmark: str = "none"
+    ) -> Dict[str, Any]:
+        """
+        Risk metrics for a daily value series.
+
+        Args:
+            user_id: Owner of the series (state is kept per user and benchmark)
+            dates: Ascending series dates
+            values: Portfolio value per date
+            benchmark_values: Benchmark value per date, aligned with dates
+            flows: External cash flows (date, amount) into the portfolio
+            benchmark_flows: External cash flows into the benchmark series
+            benchmark: Benchmark name, part of the state key
+
+        Returns:
+            RiskState.summary() of the series
+        """
+        key = (user_id, benchmark)
+        portfolio_flows = align_flows(dates, flows or [])
+        index_flows = align_flows(dates, benchmark_flows or []) if benchmark_values is not None else None
+
+        state = self._states.get(key)
+        dropped = state.overlap_start(dates, values, benchmark_values) if state is not None else None
+        if dropped is None:
+            state = RiskState.from_series(
+                self.config, dates, values, benchmark_values, portfolio_flows, index_flows
+            )
+            self._stats["full_computations"] += 1
+            cache_dependency_index.register("risk", user_id, benchmark, [transactions_dependency(user_id)])
+        else:
+            state.drop_front(dropped)
+            # The state now holds dates[:first_new]; append the rest
+            first_new = len(state.dates)
+            for i in range(first_new, len(dates)):
+                state.append(
+                    dates[i],
+                    values[i],
+                    benchmark_values[i] if benchmark_values is not None else None,
+                    float(portfolio_flows[i]),
+                    float(index_flows[i]) if index_flows is not None else 0.0
+                )
+            self._stats["incremental_updates"] += 1
+            self._stats["dropped_days"] += dropped
+            self._stats["appended_days"] += len(dates) - first_new
+
+        self._states[key] = state
+        self._states.move_to_end(key)
+        while len(self._states) > self._max_states:
+            (old_user, old_benchmark), _ = self._states.popitem(last=False)
+            cache_dependency_index.forget(("risk", old_user, old_benchmark))
+        return state.summary()
+
+    def invalidate_user(self, user_id: str) -> int:
+        """Drop every state of a user"""
+        keys = [key for key in self._states if key[0] == user_id]
+        for key in keys:
+            del self._states[key]
+            cache_dependency_index.forget(("risk", key[0], key[1]))
+        return len(keys)
+
+    async def _invalidate_entries(self, entries: List[CacheEntry]) -> int:
+        removed = 0
+        for _, user_id, benchmark in entries:
+            if self._states.pop((user_id, benchmark), None) is not None:
+                removed += 1
+            cache_dependency_index.forget(("risk", user_id, benchmark))
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Engine statistics"""
+        return {"states": len(self._states), "window": self.config.window, **self._stats}
+
+
+# ============================================================================
+# Module-level instance
+# ============================================================================
+
+risk_engine = RiskEngine()
@@ -0,0 +1,308 @@
+"""
+Snapshot Store - Compressed, content-addressed storage for portfolio snapshots
+
+Snapshots are split into sections (holdings, time series, dividends, core).
+Each section is encoded once, addressed by the SHA256 of its bytes and stored
+compressed in ``portfolio_snapshot_sections``. A refresh that leaves a section
+unchanged produces the same hash, so the upsert leaves the stored row alone.
+
+Decoded sections, assembled snapshots and pre-encoded API payloads are kept in
+small in-process LRUs keyed by content hash, so repeat hits skip the database,
+decompression and pydantic validation entirely.
+
+The codec comes from SNAPSHOT_CODEC and defaults to gzip, which every worker
+can read. A stored section this worker cannot decode (e.g. zstd written by a
+worker that has zstandard) is treated as missing and overwritten on the next
+save, instead of being skipped as an existing hash.
+"""
+
+import base64
+import gzip
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple
+
+from config import SNAPSHOT_CODEC
+from supa_api.supa_api_user_performance import (
+    calculate_content_hash,
+    calculate_snapshot_hash,
+    supa_api_get_snapshot_sections,
+    supa_api_save_snapshot_sections,
+)
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+CODEC_ZSTD = "zstd"
+CODEC_GZIP = "gzip"
+
+
+class _LRU:
+    """Minimal bounded LRU mapping."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class SnapshotStore:
+    """
+    Content-addressed section store with compression and in-process caches.
+
+    Callers provide the section split (name -> encoded bytes) and an assemble
+    function; the store only deals in bytes and hashes.
+    """
+
+    def __init__(
+        self,
+        max_sections: int = 1024,
+        max_snapshots: int = 256,
+        max_encoded: int = 256,
+        compression_level: int = 6,
+        codec: Optional[str] = None,
+    ) -> None:
+        codec = codec or SNAPSHOT_CODEC
+        if codec not in (CODEC_ZSTD, CODEC_GZIP):
+            raise ValueError(f"Unknown snapshot codec: {codec}")
+        if codec == CODEC_ZSTD and not ZSTD_AVAILABLE:
+            logger.warning("[SnapshotStore] zstd requested but zstandard is not installed, using gzip")
+            codec = CODEC_GZIP
+        self.codec = codec
+        self.compression_level = compression_level
+        # Stored sections that failed to decode here; the next save overwrites them
+        self._unreadable: Set[str] = set()
+        self._sections = _LRU(max_sections)      # content hash -> raw section bytes
+        self._snapshots = _LRU(max_snapshots)    # snapshot hash -> assembled object
+        self._encoded = _LRU(max_encoded)        # (snapshot hash, variant) -> response bytes
+        self._stats = {
+            "sections_written": 0,
+            "sections_reused": 0,
+            "bytes_raw": 0,
+            "bytes_stored": 0,
+            "snapshot_hits": 0,
+            "section_fetches": 0,
+            "encoded_hits": 0,
+            "sections_unreadable": 0,
+            "sections_repaired": 0,
+        }
+        logger.info(f"[SnapshotStore] Initialized with {self.codec} compression")
+
+    # ========================================================================
+    # Compression
+    # ========================================================================
+
+    def compress(self, raw: bytes) -> Tuple[str, bytes]:
+        """Compress raw bytes with the preferred codec."""
+        if self.codec == CODEC_ZSTD:
+            return CODEC_ZSTD, zstandard.ZstdCompressor(level=self.compression_level).compress(raw)
+        return CODEC_GZIP, gzip.compress(raw, compresslevel=self.compression_level)
+
+    @staticmethod
+    def decompress(codec: str, blob: bytes) -> bytes:
+        """Decompress a blob written with any supported codec."""
+        if codec == CODEC_ZSTD:
+            if not ZSTD_AVAILABLE:
+                raise RuntimeError("Snapshot section is zstd-compressed but zstandard is not installed")
+            return zstandard.ZstdDecompressor().decompress(blob)
+        if codec == CODEC_GZIP:
+            return gzip.decompress(blob)
+        raise ValueError(f"Unknown snapshot codec: {codec}")
+
+    # ========================================================================
+    # Save / Load
+    # ========================================================================
+
+    async def save_sections(
+        self,
+        sections: Dict[str, bytes],
+        previous_hashes: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, str]:
+        """
+        Store encoded sections and return their content hashes.
+
+        Sections whose hash matches the snapshot being replaced are still
+        referenced by its row, so they are not uploaded again. Every other
+        section is upserted with ignore_duplicates: a hash this process has
+        seen before may since have been removed by
+        cleanup_orphaned_snapshot_sections, so the memory cache is not proof
+        that the row exists. Sections that failed to decode here are
+        overwritten rather than skipped.
+
+        Args:
+            sections: Section name -> encoded bytes
+            previous_hashes: Section hashes of the snapshot being replaced
+
+        Returns:
+            Section name -> content hash
+        """
+        known_previous = set((previous_hashes or {}).values())
+        section_hashes: Dict[str, str] = {}
+        new_rows = []
+        repair_rows = []
+
+        for name, raw in sections.items():
+            content_hash = calculate_content_hash(raw)
+            section_hashes[name] = content_hash
+
+            unreadable = content_hash in self._unreadable
+            if content_hash in known_previous and not unreadable:
+                self._stats["sections_reused"] += 1
+                continue
+            codec, blob = self.compress(raw)
+            (repair_rows if unreadable else new_rows).append({
+                "content_hash": content_hash,
+                "codec": codec,
+                "payload": base64.b64encode(blob).decode("ascii"),
+                "raw_size": len(raw),
+                "stored_size": len(blob),
+            })
+
+        await supa_api_save_snapshot_sections(new_rows)
+        if repair_rows:
+            await supa_api_save_snapshot_sections(repair_rows, overwrite=True)
+            self._unreadable.difference_update(row["content_hash"] for row in repair_rows)
+            self._stats["sections_repaired"] += len(repair_rows)
+            new_rows.extend(repair_rows)
+
+        # Cache only once the rows are known to be stored
+        for name, raw in sections.items():
+            self._sections.put(section_hashes[name], raw)
+        for row in new_rows:
+            self._stats["sections_written"] += 1
+            self._stats["bytes_raw"] += row["raw_size"]
+            self._stats["bytes_stored"] += row["stored_size"]
+
+        if new_rows:
+            logger.info(
+                f"[SnapshotStore] Stored {len(new_rows)}/{len(sections)} sections "
+                f"({sum(r['raw_size'] for r in new_rows)} -> {sum(r['stored_size'] for r in new_rows)} bytes)"
+            )
+        return section_hashes
+
+    async def load(
+        self,
+        section_hashes: Dict[str, str],
+        assemble: Callable[[Dict[str, bytes]], Any],
+    ) -> Optional[Any]:
+        """
+        Load a snapshot by its section hashes.
+
+        Args:
+            section_hashes: Section name -> content hash
+            assemble: Builds the snapshot object from section name -> bytes
+
+        Returns:
+            Assembled snapshot, or None if a section is missing from storage
+            or cannot be decoded by this worker
+        """
+        snapshot_hash = calculate_snapshot_hash(section_hashes)
+        cached = self._snapshots.get(snapshot_hash)
+        if cached is not None:
+            self._stats["snapshot_hits"] += 1
+            return cached
+
+        raw_sections: Dict[str, bytes] = {}
+        missing = []
+        for name, content_hash in section_hashes.items():
+            raw = self._sections.get(content_hash)
+            if raw is None:
+                missing.append(content_hash)
+            else:
+                raw_sections[name] = raw
+
+        if missing:
+            self._stats["section_fetches"] += 1
+            rows = await supa_api_get_snapshot_sections(missing)
+            for name, content_hash in section_hashes.items():
+                if name in raw_sections:
+                    continue
+                row = rows.get(content_hash)
+                if row is None:
+                    logger.warning(f"[SnapshotStore] Section {name} ({content_hash[:12]}) missing from storage")
+                    return None
+                try:
+                    raw = self.decompress(row["codec"], base64.b64decode(row["payload"]))
+                except Exception as e:
+                    logger.warning(f"[SnapshotStore] Section {name} ({content_hash[:12]}) unreadable, will rewrite: {e}")
+                    self._unreadable.add(content_hash)
+                    self._stats["sections_unreadable"] += 1
+                    return None
+                self._sections.put(content_hash, raw)
+                raw_sections[name] = raw
+
+        snapshot = assemble(raw_sections)
+        self._snapshots.put(snapshot_hash, snapshot)
+        return snapshot
+
+    def remember(self, section_hashes: Dict[str, str], snapshot: Any) -> str:
+        """Register an already-built snapshot so the next load is a memory hit."""
+        snapshot_hash = calculate_snapshot_hash(section_hashes)
+        self._snapshots.put(snapshot_hash, snapshot)
+        return snapshot_hash
+
+    # ========================================================================
+    # Pre-encoded Payloads
+    # ========================================================================
+
+    def get_encoded(self, snapshot_hash: Optional[str], variant: Hashable) -> Optional[bytes]:
+        """Return response bytes previously encoded for this snapshot/variant."""
+        if not snapshot_hash:
+            return None
+        body = self._encoded.get((snapshot_hash, variant))
+        if body is not None:
+            self._stats["encoded_hits"] += 1
+        return body
+
+    def put_encoded(self, snapshot_hash: Optional[str], variant: Hashable, body: bytes) -> None:
+        """Remember response bytes encoded from an immutable snapshot."""
+        if snapshot_hash:
+            self._encoded.put((snapshot_hash, variant), body)
+
+    def clear(self) -> None:
+        """Drop all in-process caches (stored blobs are untouched)."""
+        self._sections.clear()
+        self._snapshots.clear()
+        self._encoded.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return store statistics"""
+        bytes_raw = self._stats["bytes_raw"]
+        return {
+            **self._stats,
+            "codec": self.codec,
+            "compression_ratio": round(self._stats["bytes_stored"] / bytes_raw, 3) if bytes_raw else None,
+            "cached_sections": len(self._sections),
+            "cached_snapshots": len(self._snapshots),
+            "cached_payloads": len(self._encoded),
+        }
+
+
+# Global instance
+snapshot_store = SnapshotStore()
@@ -0,0 +1,318 @@
+"""
+Startup Jobs - Background startup work with leader election, plus readiness
+==========================================================================
+
+Startup used to await the global dividend sync and the dividend assignment
+before the app accepted traffic. Both walk every user and symbol, so a cold
+start or rolling deploy took as long as the whole reconciliation.
+
+StartupJobRunner runs registered jobs in the background once the app is
+serving. Each job is a list of steps that run in order. Before running, a
+worker takes a lease named ``startup_job:<name>`` without waiting. Only the
+worker that gets it runs the job. The others record the job as skipped, so a
+fleet of workers runs it once. If the lease store itself fails, the claim is
+retried with backoff and then the job runs without a lease: running it twice
+is better than no worker running it. Progress is kept per step for the status
+endpoint.
+
+ReadinessState answers "can this worker take traffic". It becomes ready once
+routes are registered and every readiness check passes. A check with a grace
+period stops blocking after that many seconds, for caches that have a
+fallback. It also records startup timings, including time to first request.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from utils.metrics import BACKGROUND_JOB_DURATION
+
+logger = logging.getLogger(__name__)
+
+JobStep = Tuple[str, Callable[[], Awaitable[Any]]]
+
+LEASE_PREFIX = "startup_job:"
+# Lease store failures are retried this many times (1s, 2s, 4s) before running without a lease
+LEASE_RETRIES = 3
+LEASE_RETRY_DELAY = 1.0
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _summarize_result(result: Any) -> Dict[str, Any]:
+    """Keep the status payload small: success flag, error and counters only"""
+    if not isinstance(result, dict):
+        return {"success": True}
+    summary: Dict[str, Any] = {"success": bool(result.get("success", True))}
+    for key, value in result.items():
+        if key == "error" or (isinstance(value, (int, float)) and not isinstance(value, bool)):
+            summary[key] = value
+    return summary
+
+
+# ============================================================================
+# Startup Jobs
+# ============================================================================
+
+class StartupJob:
+    """One registered job and its progress"""
+
+    def __init__(self, name: str, steps: List[JobStep], lease_ttl_seconds: int) -> None:
+        self.name = name
+        self.steps = steps
+        self.lease_ttl_seconds = lease_ttl_seconds
+        self.state = "pending"  # pending | running | succeeded | failed | skipped | cancelled
+        self.leader = False
+        self.reason: Optional[str] = None
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.duration_ms: Optional[float] = None
+        self.step_status: List[Dict[str, Any]] = [{"name": step_name, "state": "pending"} for step_name, _ in steps]
+        self.task: Optional[asyncio.Task] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        completed = sum(1 for step in self.step_status if step["state"] in ("succeeded", "failed"))
+        return {
+            "name": self.name,
+            "state": self.state,
+            "leader": self.leader,
+            "reason": self.reason,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration_ms": self.duration_ms,
+            "progress": f"{completed}/{len(self.step_status)}",
+            "steps": [dict(step) for step in self.step_status],
+        }
+
+
+class StartupJobRunner:
+    """
+    Runs registered startup jobs in the background, one worker per job.
+
+    Args:
+        lease_service: LeaseLockService used for leader election (defaults to
+            the module-level lease_locks)
+    """
+
+    def __init__(self, lease_service: Any = None) -> None:
+        self._lease_service = lease_service
+        self._jobs: Dict[str, StartupJob] = {}
+
+    @property
+    def lease_service(self) -> Any:
+        if self._lease_service is None:
+            # Lazy import to keep this module free of the Supabase client at import time
+            from utils.distributed_lock import lease_locks
+            self._lease_service = lease_locks
+        return self._lease_service
+
+    def register(self, name: str, steps: List[JobStep], lease_ttl_seconds: int = 900) -> None:
+        """
+        Register a job to run when start() is called.
+
+        Args:
+            name: Job name, also the leader-election lease name
+            steps: (step name, async callable) pairs run in order; a step
+                returning a dict with success False fails the step and the
+                job, but later steps still run
+            lease_ttl_seconds: Lease duration, renewed while the job runs
+        """
+        if name in self._jobs and self._jobs[name].state == "running":
+            raise ValueError(f"Startup job {name} is running")
+        self._jobs[name] = StartupJob(name, steps, lease_ttl_seconds)
+
+    async def start(self) -> None:
+        """Start every pending job in the background (does not wait for them)"""
+        for job in self._jobs.values():
+            if job.state == "pending" and job.task is None:
+                job.task = asyncio.create_task(self._run(job), name=f"startup_job:{job.name}")
+
+    async def wait(self, name: str) -> Dict[str, Any]:
+        """Wait for a started job to finish and return its status"""
+        job = self._jobs[name]
+        if job.task is not None:
+            await asyncio.shield(job.task)
+        return job.to_dict()
+
+    async def stop(self) -> None:
+        """Cancel jobs that are still running; their leases are released"""
+        for job in self._jobs.values():
+            if job.task is not None and not job.task.done():
+                job.task.cancel()
+                try:
+                    await job.task
+                except asyncio.CancelledError:
+                    pass
+
+    async def _claim(self, job: StartupJob) -> Tuple[bool, Any]:
+        """
+        Take the job's lease without waiting.
+
+        Returns:
+            (run the job here, lease or None); the lease is None when the
+            store stayed unavailable and the job runs without one
+        """
+        from utils.distributed_lock import LeaseStoreError
+
+        attempt = 0
+        while True:
+            try:
+                lease = await self.lease_service.acquire(
+                    LEASE_PREFIX + job.name, job.lease_ttl_seconds, max_wait_seconds=0, raise_on_error=True
+                )
+                return lease is not None, lease
+            except LeaseStoreError as e:
+                if attempt == LEASE_RETRIES:
+                    logger.warning(f"[StartupJobRunner] Running {job.name} without a lease: {e}")
+                    job.reason = "lease store unavailable; ran without a lease"
+                    return True, None
+                await asyncio.sleep(LEASE_RETRY_DELAY * 2 ** attempt)
+                attempt += 1
+
+    async def _run(self, job: StartupJob) -> None:
+        run, lease = await self._claim(job)
+        if not run:
+            job.state = "skipped"
+            job.reason = "another worker holds the lease"
+            job.finished_at = _now_iso()
+            logger.info(f"[StartupJobRunner] Skipping {job.name}: another worker is running it")
+            return
+
+        job.leader = True
+        job.state = "running"
+        job.started_at = _now_iso()
+        started = time.perf_counter()
+        logger.info(f"[StartupJobRunner] Running {job.name} ({len(job.steps)} steps)")
+        failed = False
+        try:
+            for (step_name, step), status in zip(job.steps, job.step_status):
+                status["state"] = "running"
+                step_started = time.perf_counter()
+                try:
+                    result = await step()
+                    status.update(_summarize_result(result))
+                    status["state"] = "succeeded" if status["success"] else "failed"
+                except Exception as e:
+                    logger.error(f"[StartupJobRunner] {job.name}/{step_name} raised: {e}", exc_info=True)
+                    status.update({"success": False, "error": str(e), "state": "failed"})
+                status["duration_ms"] = round((time.perf_counter() - step_started) * 1000, 1)
+                BACKGROUND_JOB_DURATION.labels(f"{job.name}.{step_name}", status["state"]).observe(
+                    status["duration_ms"] / 1000
+                )
+                if status["state"] == "failed":
+                    failed = True
+                    logger.warning(f"[StartupJobRunner] {job.name}/{step_name} failed: {status.get('error', 'unknown error')}")
+            job.state = "failed" if failed else "succeeded"
+        except asyncio.CancelledError:
+            job.state = "cancelled"
+            raise
+        finally:
+            job.duration_ms = round((time.perf_counter() - started) * 1000, 1)
+            job.finished_at = _now_iso()
+            if lease is not None:
+                await lease.release()
+            logger.info(f"[StartupJobRunner] {job.name} {job.state} in {job.duration_ms:.0f}ms")
+
+    def get_status(self) -> Dict[str, Any]:
+        """State and per-step progress of every registered job"""
+        return {
+            "holder": getattr(self.lease_service, "holder_id", None),
+            "jobs": {name: job.to_dict() for name, job in self._jobs.items()},
+        }
+
+
+# ============================================================================
+# Readiness
+# ============================================================================
+
+class ReadinessState:
+    """
+    Readiness of this worker plus startup timings.
+
+    Timings are measured from when this object is created, which is at
+    import of this module, early in process start.
+    """
+
+    def __init__(self) -> None:
+        self._created = time.monotonic()
+        self._checks: Dict[str, Tuple[Callable[[], bool], Optional[float]]] = {}
+        self._routes_at: Optional[float] = None
+        self._ready_at: Optional[float] = None
+        self._first_request_at: Optional[float] = None
+
+    def add_check(self, name: str, check: Callable[[], bool], grace_seconds: Optional[float] = None) -> None:
+        """
+        Add a readiness check.
+
+        Args:
+            name: Check name shown in the status
+            check: Returns True when this part is warm
+            grace_seconds: Seconds after routes are registered when the check
+                stops blocking readiness (None: always required)
+        """
+        self._checks[name] = (check, grace_seconds)
+
+    def mark_routes_ready(self) -> None:
+        """Called once the app is about to serve (end of lifespan startup)"""
+        if self._routes_at is None:
+            self._routes_at = time.monotonic()
+            logger.info(f"[ReadinessState] Routes registered after {self._ms(self._routes_at):.0f}ms")
+
+    def _ms(self, moment: Optional[float]) -> Optional[float]:
+        return round((moment - self._created) * 1000, 1) if moment is not None else None
+
+    def _check_results(self) -> Dict[str, str]:
+        results: Dict[str, str] = {}
+        now = time.monotonic()
+        for name, (check, grace_seconds) in self._checks.items():
+            try:
+                passed = bool(check())
+            except Exception as e:
+                logger.warning(f"[ReadinessState] Check {name} raised: {e}")
+                passed = False
+            if passed:
+                results[name] = "ok"
+            elif (grace_seconds is not None and self._routes_at is not None
+                  and now - self._routes_at >= grace_seconds):
+                results[name] = "waived"
+            else:
+                results[name] = "waiting"
+        return results
+
+    def is_ready(self) -> bool:
+        """True once routes are registered and no check is still waiting"""
+        if self._ready_at is not None:
+            return True
+        if self._routes_at is None:
+            return False
+        if any(result == "waiting" for result in self._check_results().values()):
+            return False
+        self._ready_at = time.monotonic()
+        logger.info(f"[ReadinessState] Ready after {self._ms(self._ready_at):.0f}ms")
+        return True
+
+    def record_request(self) -> None:
+        """Record the first request served; later calls are a single comparison"""
+        if self._first_request_at is None:
+            self._first_request_at = time.monotonic()
+            logger.info(f"[ReadinessState] First request after {self._ms(self._first_request_at):.0f}ms")
+
+    def get_status(self) -> Dict[str, Any]:
+        """Readiness, check results and startup timings (ms since process start)"""
+        ready = self.is_ready()
+        return {
+            "ready": ready,
+            "checks": self._check_results(),
+            "routes_ready_ms": self._ms(self._routes_at),
+            "time_to_ready_ms": self._ms(self._ready_at),
+            "time_to_first_request_ms": self._ms(self._first_request_at),
+        }
+
+
+# Module-level instances
+startup_jobs = StartupJobRunner()
+readiness = ReadinessState()
@@ -0,0 +1,412 @@
+"""
+Symbol Search Index - In-Memory Typeahead Search
+=================================================
+
+Serves symbol search from process memory instead of running an
+``ilike '%q%'`` query against ``stock_symbols`` on every keystroke.
+
+The index is an immutable snapshot made of:
+- Sorted prefix arrays for tickers and company names (bisect lookups)
+- An n-gram (bigram/trigram) inverted index for substring matches
+- A padded trigram index over tickers for fuzzy (typo) candidates
+
+Candidates are ranked with the same ``calculate_relevance_score`` used by the
+database and Alpha Vantage paths, so results are ordered identically.
+Rebuilds happen in the background and swap the snapshot atomically, so
+readers never take a lock.
+"""
+
+import asyncio
+import logging
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from vantage_api.vantage_api_search import (
+    COMMON_SYMBOL_TYPOS,
+    bounded_levenshtein_distance,
+    calculate_relevance_score,
+)
+from utils.metrics import timed_job
+from utils.service_registry import service_registry
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of rows scored per query (matches the old database LIMIT 100)
+CANDIDATE_BUDGET = 100
+
+# Page size used when loading stock_symbols from Supabase
+LOAD_PAGE_SIZE = 1000
+
+# Padding character for fuzzy trigrams (never appears in tickers)
+_PAD = "\x00"
+
+
+def _ngrams(text: str, n: int) -> Set[str]:
+    """Return the set of n-grams of a string"""
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def _padded_trigrams(text: str) -> Set[str]:
+    """Trigrams of a string padded on both sides (used for fuzzy matching)"""
+    return _ngrams(f"{_PAD}{_PAD}{text}{_PAD}{_PAD}", 3)
+
+
+@dataclass(frozen=True)
+class _IndexSnapshot:
+    """Immutable view of the index; replaced wholesale on every rebuild"""
+    records: List[Dict[str, Any]] = field(default_factory=list)
+    symbols: List[str] = field(default_factory=list)
+    names: List[str] = field(default_factory=list)
+    symbol_positions: Dict[str, int] = field(default_factory=dict)
+    ticker_keys: List[str] = field(default_factory=list)
+    ticker_ids: List[int] = field(default_factory=list)
+    name_keys: List[str] = field(default_factory=list)
+    name_ids: List[int] = field(default_factory=list)
+    ticker_grams: Dict[str, List[int]] = field(default_factory=dict)
+    name_grams: Dict[str, List[int]] = field(default_factory=dict)
+    fuzzy_grams: Dict[str, List[int]] = field(default_factory=dict)
+    built_at: float = 0.0
+
+    @classmethod
+    def build(cls, records: Iterable[Dict[str, Any]]) -> "_IndexSnapshot":
+        """Build a snapshot from symbol records (last record per symbol wins)"""
+        by_symbol: Dict[str, Dict[str, Any]] = {}
+        for record in records:
+            symbol = str(record.get("symbol") or "").strip().upper()
+            if not symbol:
+                continue
+            by_symbol[symbol] = {
+                "symbol": symbol,
+                "name": str(record.get("name") or ""),
+                "type": record.get("type") or "Equity",
+                "region": record.get("region") or "United States",
+                "currency": record.get("currency") or "USD",
+                "exchange": record.get("exchange") or "",
+                "source": "cache",
+            }
+
+        snapshot_records = list(by_symbol.values())
+        symbols = [r["symbol"] for r in snapshot_records]
+        names = [r["name"].lower() for r in snapshot_records]
+
+        ticker_order = sorted(range(len(symbols)), key=symbols.__getitem__)
+        name_order = sorted(range(len(names)), key=names.__getitem__)
+
+        ticker_grams: Dict[str, List[int]] = {}
+        name_grams: Dict[str, List[int]] = {}
+        fuzzy_grams: Dict[str, List[int]] = {}
+        for idx, (symbol, name) in enumerate(zip(symbols, names)):
+            for gram in _ngrams(symbol, 2) | _ngrams(symbol, 3):
+                ticker_grams.setdefault(gram, []).append(idx)
+            for gram in _ngrams(name, 2) | _ngrams(name, 3):
+                name_grams.setdefault(gram, []).append(idx)
+            for gram in _padded_trigrams(symbol):
+                fuzzy_grams.setdefault(gram, []).append(idx)
+
+        return cls(
+            records=snapshot_records,
+            symbols=symbols,
+            names=names,
+            symbol_positions={symbol: idx for idx, symbol in enumerate(symbols)},
+            ticker_keys=[symbols[i] for i in ticker_order],
+            ticker_ids=ticker_order,
+            name_keys=[names[i] for i in name_order],
+            name_ids=name_order,
+            ticker_grams=ticker_grams,
+            name_grams=name_grams,
+            fuzzy_grams=fuzzy_grams,
+            built_at=time.time(),
+        )
+
+
+class SymbolSearchIndex:
+    """
+    In-memory symbol search index with background refresh.
+
+    Readers call ``search()`` against the current snapshot without locking.
+    Writers (``add_symbols`` / ``load_from_database``) build a new snapshot
+    off the event loop and swap it in.
+    """
+
+    def __init__(self, refresh_interval_seconds: int = 3600, debounce_seconds: float = 1.0) -> None:
+        self._snapshot = _IndexSnapshot()
+        self._loaded = False
+        self._refresh_interval = refresh_interval_seconds
+        self._debounce_seconds = debounce_seconds
+        self._pending: List[Dict[str, Any]] = []
+        self._rebuild_task: Optional[asyncio.Task[None]] = None
+        self._refresh_task: Optional[asyncio.Task[None]] = None
+
+    # ========== Read Path ==========
+
+    @property
+    def is_ready(self) -> bool:
+        """True once the index has been populated at least once"""
+        return self._loaded
+
+    def __len__(self) -> int:
+        return len(self._snapshot.records)
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Search the index for symbols matching the query.
+
+        Args:
+            query: Raw user query (ticker or company name fragment)
+            limit: Maximum number of results
+
+        Returns:
+            Relevance-sorted result dicts (same shape as the cached-symbol search)
+        """
+        query = query.strip() if query else ""
+        if not query:
+            return []
+
+        snapshot = self._snapshot
+        query_upper = query.upper()
+        query_lower = query.lower()
+        budget = max(limit, CANDIDATE_BUDGET)
+
+        # dict keeps insertion order and de-duplicates candidate ids
+        candidates: Dict[int, None] = {}
+
+        exact = snapshot.symbol_positions.get(query_upper)
+        if exact is not None:
+            candidates[exact] = None
+
+        typo_target = COMMON_SYMBOL_TYPOS.get(query_upper)
+        if typo_target is not None and typo_target in snapshot.symbol_positions:
+            candidates[snapshot.symbol_positions[typo_target]] = None
+
+        self._collect_prefix(snapshot.ticker_keys, snapshot.ticker_ids, query_upper, candidates, budget)
+        self._collect_prefix(snapshot.name_keys, snapshot.name_ids, query_lower, candidates, budget)
+
+        if len(query) >= 2:
+            self._collect_substring(snapshot.ticker_grams, snapshot.symbols, query_upper, candidates, budget)
+            self._collect_substring(snapshot.name_grams, snapshot.names, query_lower, candidates, budget)
+
+        if len(query_upper) >= 4:
+            self._collect_fuzzy(snapshot, query_upper, candidates, budget)
+
+        scored = []
+        for idx in candidates:
+            record = snapshot.records[idx]
+            score = calculate_relevance_score(
+                symbol=record["symbol"],
+                name=record["name"],
+                query_upper=query_upper,
+                query_lower=query_lower,
+            )
+            if score > 0:
+                scored.append((score, idx))
+
+        # Stable sort keeps candidate order for ties (same as list.sort in the DB path)
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [dict(snapshot.records[idx]) for _, idx in scored[:limit]]
+
+    @staticmethod
+    def _collect_prefix(
+        keys: List[str],
+        ids: List[int],
+        prefix: str,
+        candidates: Dict[int, None],
+        budget: int
+    ) -> None:
+        """Add ids whose key starts with prefix (bisect over the sorted key array)"""
+        position = bisect_left(keys, prefix)
+        while position < len(keys) and len(candidates) < budget:
+            if not keys[position].startswith(prefix):
+                break
+            candidates[ids[position]] = None
+            position += 1
+
+    @staticmethod
+    def _collect_substring(
+        grams: Dict[str, List[int]],
+        texts: List[str],
+        needle: str,
+        candidates: Dict[int, None],
+        budget: int
+    ) -> None:
+        """Add ids whose text contains needle, narrowed by the rarest n-gram posting list"""
+        n = 2 if len(needle) == 2 else 3
+        postings = []
+        for gram in _ngrams(needle, n):
+            posting = grams.get(gram)
+            if not posting:
+                return
+            postings.append(posting)
+
+        # Walk the shortest posting list; the substring test itself is the exact filter
+        shortest = min(postings, key=len)
+        for idx in shortest:
+            if len(candidates) >= budget:
+                return
+            if idx not in candidates and needle in texts[idx]:
+                candidates[idx] = None
+
+    @staticmethod
+    def _collect_fuzzy(
+        snapshot: _IndexSnapshot,
+        query_upper: str,
+        candidates: Dict[int, None],
+        budget: int
+    ) -> None:
+        """Add tickers within the fuzzy-bonus edit distance of the query"""
+        query_grams = _padded_trigrams(query_upper)
+        overlap: Dict[int, int] = {}
+        for gram in query_grams:
+            for idx in snapshot.fuzzy_grams.get(gram, ()):
+                overlap[idx] = overlap.get(idx, 0) + 1
+
+        query_length = len(query_upper)
+        for idx, shared in overlap.items():
+            if len(candidates) >= budget:
+                return
+            if idx in candidates:
+                continue
+            symbol = snapshot.symbols[idx]
+            max_length = max(len(symbol), query_length)
+            # calculate_relevance_score only rewards similarity > 0.75
+            max_distance = -(-max_length // 4) - 1
+            if max_distance < 1 or abs(len(symbol) - query_length) > max_distance:
+                continue
+            # q-gram lemma: each edit destroys at most 3 padded trigrams
+            if shared < len(query_grams) - 3 * max_distance:
+                continue
+            if bounded_levenshtein_distance(symbol, query_upper, max_distance) <= max_distance:
+                candidates[idx] = None
+
+    # ========== Write Path ==========
+
+    def rebuild(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Synchronously replace the index contents with a complete symbol list"""
+        start = time.perf_counter()
+        self._snapshot = _IndexSnapshot.build(records)
+        self._loaded = True
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"[SymbolSearchIndex] Indexed {len(self._snapshot.records)} symbols in {elapsed_ms:.1f}ms")
+
+    def add_symbols(self, records: Iterable[Dict[str, Any]]) -> None:
+        """
+        Merge newly cached symbols into the index.
+
+        Inside an event loop the merge is debounced and rebuilt in the
+        background; otherwise it is applied immediately.
+        """
+        new_records = [r for r in records if r.get("symbol")]
+        if not new_records:
+            return
+
+        self._pending.extend(new_records)
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._apply_pending()
+            return
+
+        if self._rebuild_task is None or self._rebuild_task.done():
+            self._rebuild_task = asyncio.create_task(self._debounced_rebuild())
+
+    def _apply_pending(self) -> None:
+        pending, self._pending = self._pending, []
+        if pending:
+            # A merge alone does not make the index ready; only a full load does
+            self._snapshot = _IndexSnapshot.build([*self._snapshot.records, *pending])
+
+    async def _debounced_rebuild(self) -> None:
+        await asyncio.sleep(self._debounce_seconds)
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        records = [*self._snapshot.records, *pending]
+        snapshot = await asyncio.to_thread(_IndexSnapshot.build, records)
+        self._snapshot = snapshot
+        logger.info(f"[SymbolSearchIndex] Merged {len(pending)} new symbols ({len(snapshot.records)} total)")
+
+    @staticmethod
+    def _fetch_rows() -> List[Dict[str, Any]]:
+        """Page through stock_symbols (blocking; run in a worker thread)"""
+        from supa_api.supa_api_client import get_supa_service_client
+
+        client = get_supa_service_client()
+        rows: List[Dict[str, Any]] = []
+        offset = 0
+        while True:
+            result = (
+                client.table('stock_symbols')
+                .select('symbol, name, type, currency, exchange')
+                .range(offset, offset + LOAD_PAGE_SIZE - 1)
+                .execute()
+            )
+            page = result.data or []
+            rows.extend(page)
+            if len(page) < LOAD_PAGE_SIZE:
+                break
+            offset += LOAD_PAGE_SIZE
+        return rows
+
+    async def load_from_database(self) -> int:
+        """Load every row of stock_symbols and rebuild the index off the event loop"""
+        # The supabase client is synchronous; keep its round trips off the event loop
+        rows = await asyncio.to_thread(self._fetch_rows)
+
+        # Keep symbols discovered via Alpha Vantage that are not in the table yet
+        known = {str(r.get("symbol", "")).upper() for r in rows}
+        extras = [r for r in self._snapshot.records if r["symbol"] not in known]
+
+        snapshot = await asyncio.to_thread(_IndexSnapshot.build, [*rows, *extras])
+        self._snapshot = snapshot
+        self._loaded = True
+        logger.info(f"[SymbolSearchIndex] Loaded {len(snapshot.records)} symbols from stock_symbols")
+        return len(snapshot.records)
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                with timed_job("symbol_search_index_refresh"):
+                    await self.load_from_database()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[SymbolSearchIndex] Background refresh failed: {e}")
+            await asyncio.sleep(self._refresh_interval)
+
+    async def start(self) -> None:
+        """Start background loading and periodic refresh (does not wait for the load)"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop(), name="symbol_search_index_refresh")
+
+    async def stop(self) -> None:
+        """Cancel background refresh tasks"""
+        for task in (self._refresh_task, self._rebuild_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._refresh_task = None
+        self._rebuild_task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Index size and freshness information"""
+        snapshot = self._snapshot
+        return {
+            "ready": self._loaded,
+            "symbols": len(snapshot.records),
+            "ticker_grams": len(snapshot.ticker_grams),
+            "name_grams": len(snapshot.name_grams),
+            "built_at": snapshot.built_at,
+            "pending": len(self._pending),
+        }
+
+
+# Module-level instance; loads and refreshes in the background from app startup to shutdown
+symbol_search_index = service_registry.register(
+    "symbol_search_index", SymbolSearchIndex,
+    init=lambda index: index.start(), close=lambda index: index.stop()
+)
@@ -23,8 +23,8 @@ This service is the SINGLE SOURCE OF TRUTH for complete portfolio data.
 
 import asyncio
 import hashlib
-import json
 import logging
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone, date
 from typing import Dict, Any, List, Optional, Tuple, Set, Union
 from decimal import Decimal, InvalidOperation
@@ -39,15 +39,35 @@ from services.portfolio_metrics_manager import portfolio_metrics_manager, Portfo
 from services.dividend_service import DividendService
 from services.price_manager import price_manager
 from services.forex_manager import ForexManager
+from services.snapshot_store import snapshot_store
+from services.cache_access_stats import cache_access_stats
+from services.cache_dependency_index import CacheEntry, cache_dependency_index, price_dependency, transactions_dependency
+from services.index_sim_service import IndexSimulationService
+from services.risk_engine import concentration, returns_matrix_from_prices, risk_contributions, risk_engine
 from supa_api.supa_api_client import get_supa_service_client
+from supa_api.supa_api_user_performance import calculate_snapshot_hash
 from supa_api.supa_api_jwt_helpers import create_authenticated_client
 from supa_api.supa_api_user_profile import get_user_base_currency
+from supa_api.supa_api_transactions import supa_api_get_user_transactions
 from utils.auth_helpers import extract_user_credentials, validate_user_id
+from utils import fast_json
+from utils.service_registry import service_registry
 from debug_logger import DebugLogger
+from utils.metrics import MetricFamily, cache_families, metrics
+from utils.request_profiler import request_profiler
 import os
 
 logger = logging.getLogger(__name__)
 
+# Risk metrics: benchmark for beta/correlation, and annualized volatility bands
+RISK_BENCHMARK = "SPY"
+RISK_LEVEL_MEDIUM_VOLATILITY = 0.15
+RISK_LEVEL_HIGH_VOLATILITY = 0.25
+RISK_SCORE_FULL_VOLATILITY = 0.40  # volatility that maps to a risk score of 1.0
+VOLATILE_HOLDING_GAIN_LOSS_PERCENT = 20  # |gain/loss %| that counts a holding as volatile
+RISK_BENCHMARK_LOOKBACK_DAYS = 30  # benchmark prices before the series start, to price the seed
+RISK_INPUTS_MAX_USERS = 2000
+
 
 # ============================================================================
 # Data Models for Complete Portfolio Data
@@ -109,6 +129,9 @@ class CompletePortfolioData(BaseModel):
     cache_key: str
     metadata: PerformanceMetadata
     
+    # Content hash of the stored snapshot (set by the cache layer, never serialized)
+    snapshot_hash: Optional[str] = Field(default=None, exclude=True)
+    
     class Config:
         json_encoders = {
             Decimal: lambda v: float(v),
@@ -116,6 +139,38 @@ class CompletePortfolioData(BaseModel):
         }
 
 
+# ============================================================================
+# Snapshot Sections
+# ============================================================================
+
+def _split_snapshot_sections(complete_data: CompletePortfolioData) -> Dict[str, bytes]:
+    """
+    Encode a snapshot as independently hashed sections.
+    
+    Holdings, time series and dividends change at different rates, so storing
+    them separately lets an unchanged section be reused across refreshes.
+    """
+    metrics = complete_data.portfolio_metrics
+    core = complete_data.model_dump(
+        exclude={"portfolio_metrics": {"holdings", "time_series"}, "detailed_dividends": True}
+    )
+    return {
+        "core": fast_json.dumps(core),
+        "holdings": fast_json.dumps([holding.model_dump() for holding in metrics.holdings]),
+        "time_series": fast_json.dumps([point.model_dump() for point in metrics.time_series]),
+        "dividends": fast_json.dumps(complete_data.detailed_dividends),
+    }
+
+
+def _assemble_snapshot(sections: Dict[str, bytes]) -> CompletePortfolioData:
+    """Rebuild a CompletePortfolioData from its encoded sections."""
+    data = fast_json.loads(sections["core"])
+    data["portfolio_metrics"]["holdings"] = fast_json.loads(sections["holdings"])
+    data["portfolio_metrics"]["time_series"] = fast_json.loads(sections["time_series"])
+    data["detailed_dividends"] = fast_json.loads(sections["dividends"])
+    return CompletePortfolioData.model_validate(data)
+
+
 # ============================================================================
 # Cache Configuration
 # ============================================================================
@@ -215,6 +270,12 @@ class UserPerformanceManager:
             "invalidations": 0,
             "errors": 0
         }
+        cache_dependency_index.register_invalidator("complete", self.invalidate_cache_keys)
+        
+        # Flows, benchmark series and holding returns behind risk_metrics, per user and day
+        self._risk_inputs: "OrderedDict[str, Tuple[date, Tuple[Any, ...], Dict[str, Any]]]" = OrderedDict()
+        self._risk_input_stats = {"builds": 0, "hits": 0}
+        cache_dependency_index.register_invalidator("risk_inputs", self._invalidate_risk_inputs)
         
         logger.info("[UserPerformanceManager] Initialized with all required services")
     
@@ -349,13 +410,16 @@ class UserPerformanceManager:
             client = get_supa_service_client()
             
             # Query the complete portfolio cache table
-            result = client.table("user_performance").select("*").eq(
+            result = client.table("user_performance").select(
+                "section_hashes, data_json, expires_at"
+            ).eq(
                 "user_id", user_id
             ).eq(
                 "cache_key", cache_key
             ).single().execute()
             
             if not result.data:
+                cache_access_stats.record_miss("user_performance")
                 return None
             
             cache_data = result.data
@@ -364,22 +428,36 @@ class UserPerformanceManager:
             # Check expiration
             if not allow_stale and datetime.now(timezone.utc) > expires_at:
                 logger.debug(f"[UserPerformanceManager] Cached data expired for user {user_id}")
+                cache_access_stats.record_miss("user_performance")
                 return None
             
-            # Deserialize and validate data
-            complete_data_json = json.loads(cache_data["data_json"])
-            complete_data = CompletePortfolioData(**complete_data_json)
-            
-            # Update access statistics
-            client.table("user_performance").update({
-                "access_count": cache_data["access_count"] + 1,
-                "last_accessed": datetime.now(timezone.utc).isoformat()
-            }).eq("user_id", user_id).eq("cache_key", cache_key).execute()
+            section_hashes = cache_data.get("section_hashes")
+            if section_hashes:
+                # Content-addressed snapshot; repeat hits come straight from memory
+                complete_data = await snapshot_store.load(section_hashes, _assemble_snapshot)
+                if complete_data is None:
+                    cache_access_stats.record_miss("user_performance")
+                    return None
+                complete_data.snapshot_hash = calculate_snapshot_hash(section_hashes)
+            else:
+                # Legacy rows that still carry the whole snapshot as a JSON string
+                data_json = cache_data.get("data_json")
+                if not data_json:
+                    cache_access_stats.record_miss("user_performance")
+                    return None
+                if isinstance(data_json, (str, bytes)):
+                    complete_data = CompletePortfolioData.model_validate_json(data_json)
+                else:
+                    complete_data = CompletePortfolioData.model_validate(data_json)
+            
+            # Access statistics are buffered and flushed in bulk
+            cache_access_stats.record_hit("user_performance", user_id, cache_key)
             
             return complete_data
             
         except Exception as e:
             logger.error(f"[UserPerformanceManager] Error retrieving cached data: {e}")
+            cache_access_stats.record_miss("user_performance")
             return None
     
     async def cache_data(
@@ -409,14 +487,17 @@ class UserPerformanceManager:
             )
             expires_at = datetime.now(timezone.utc) + ttl
             
-            # Serialize data
-            data_json = complete_data.json()
+            # Store sections as compressed content-addressed blobs (existing hashes are skipped by the upsert)
+            section_hashes = await snapshot_store.save_sections(_split_snapshot_sections(complete_data))
+            complete_data.snapshot_hash = snapshot_store.remember(section_hashes, complete_data)
             
             # Store in cache
             cache_record = {
                 "user_id": user_id,
                 "cache_key": cache_key,
-                "data_json": data_json,
+                "section_hashes": section_hashes,
+                "data_hash": complete_data.snapshot_hash,
+                "data_json": None,
                 "created_at": datetime.now(timezone.utc).isoformat(),
                 "expires_at": expires_at.isoformat(),
                 "last_accessed": datetime.now(timezone.utc).isoformat(),
@@ -428,6 +509,11 @@ class UserPerformanceManager:
             
             # Upsert to handle concurrent operations
             client.table("user_performance").upsert(cache_record).execute()
+            cache_dependency_index.register(
+                "complete", user_id, cache_key,
+                portfolio_metrics_manager.get_cache_dependencies(complete_data.portfolio_metrics),
+                ttl_seconds=ttl.total_seconds()
+            )
             
             logger.info(f"[UserPerformanceManager] Cached data for user {user_id} with TTL {ttl}")
             
@@ -470,6 +556,45 @@ class UserPerformanceManager:
             logger.error(f"[UserPerformanceManager] Error invalidating cache: {e}")
             return 0
     
+    async def invalidate_cache_keys(self, entries: List[CacheEntry]) -> int:
+        """
+        Delete the cached snapshots matched by the dependency index.
+        
+        Args:
+            entries: (namespace, user_id, cache_key) entries to drop
+            
+        Returns:
+            Number of cache entries invalidated
+        """
+        keys_by_user: Dict[str, List[str]] = {}
+        for _, user_id, cache_key in entries:
+            keys_by_user.setdefault(user_id, []).append(cache_key)
+        
+        client = get_supa_service_client()
+        invalidated_count = 0
+        for user_id, keys in keys_by_user.items():
+            result = client.table("user_performance").delete().eq(
+                "user_id", user_id
+            ).in_("cache_key", keys).execute()
+            invalidated_count += len(result.data) if result.data else 0
+        
+        self._cache_stats["invalidations"] += invalidated_count
+        return invalidated_count
+    
+    def get_encoded_payload(self, complete_data: CompletePortfolioData, variant: Any) -> Optional[bytes]:
+        """
+        Return an API payload previously encoded from this exact snapshot.
+        
+        Args:
+            complete_data: Snapshot the payload was built from
+            variant: Hashable description of the response options
+        """
+        return snapshot_store.get_encoded(complete_data.snapshot_hash, variant)
+    
+    def put_encoded_payload(self, complete_data: CompletePortfolioData, variant: Any, payload: bytes) -> None:
+        """Remember an API payload encoded from a stored snapshot."""
+        snapshot_store.put_encoded(complete_data.snapshot_hash, variant, payload)
+    
     # ========================================================================
     # Private Helper Methods
     # ========================================================================
@@ -534,6 +659,7 @@ class UserPerformanceManager:
             # Fallback to conservative strategy
             return timedelta(hours=1), CacheStrategy.CONSERVATIVE
     
+    @request_profiler.profiled("complete.aggregate")
     async def _aggregate_portfolio_data(
         self,
         user_id: str,
@@ -561,11 +687,15 @@ class UserPerformanceManager:
             if not portfolio_metrics:
                 raise ValueError("Failed to obtain core portfolio metrics")
             
+            # The ledger is only needed by the risk metrics below; don't keep it in the snapshot
+            if portfolio_metrics.transactions is not None:
+                aggregated_data["portfolio_metrics"] = portfolio_metrics.model_copy(update={"transactions": None})
+            
             # Step 2: Get detailed dividend data in parallel with other operations
             tasks = [
                 self._get_detailed_dividend_data(user_id, user_token),
                 self._get_currency_conversion_data(user_id, portfolio_metrics),
-                self._get_market_analysis_data(portfolio_metrics)
+                self._get_market_analysis_data(user_id, user_token, portfolio_metrics)
             ]
             
             results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -591,6 +721,7 @@ class UserPerformanceManager:
             aggregated_data["error"] = str(e)
             return aggregated_data
     
+    @request_profiler.profiled("complete.dividends")
     async def _get_detailed_dividend_data(
         self,
         user_id: str,
@@ -613,6 +744,7 @@ class UserPerformanceManager:
             logger.error(f"[UserPerformanceManager] Error getting dividend data: {e}")
             return []
     
+    @request_profiler.profiled("complete.fx")
     async def _get_currency_conversion_data(
         self,
         user_id: str,
@@ -650,8 +782,11 @@ class UserPerformanceManager:
             logger.error(f"[UserPerformanceManager] Error getting currency conversions: {e}")
             return {}
     
+    @request_profiler.profiled("complete.market_analysis")
     async def _get_market_analysis_data(
         self,
+        user_id: str,
+        user_token: str,
         portfolio_metrics: PortfolioMetrics
     ) -> Dict[str, Any]:
         """Get additional market analysis data"""
@@ -663,7 +798,7 @@ class UserPerformanceManager:
                     "timezone": portfolio_metrics.market_status.timezone
                 },
                 "portfolio_diversification": self._calculate_diversification_metrics(portfolio_metrics),
-                "risk_metrics": self._calculate_risk_metrics(portfolio_metrics)
+                "risk_metrics": await self._calculate_risk_metrics(user_id, user_token, portfolio_metrics)
             }
             
             return analysis
@@ -676,29 +811,26 @@ class UserPerformanceManager:
         self,
         portfolio_metrics: PortfolioMetrics
     ) -> Dict[str, Any]:
-        """Calculate portfolio diversification metrics"""
+        """Calculate portfolio diversification metrics from HHI concentration"""
         try:
             holdings = portfolio_metrics.holdings
             if not holdings:
                 return {"diversification_score": 0.0, "concentration_risk": "high"}
             
-            # Calculate concentration - ensure all values are Decimal
-            from decimal import Decimal
-            total_value = sum(Decimal(str(h.current_value)) for h in holdings)
-            if total_value <= 0:
+            values = [float(h.current_value) for h in holdings]
+            if sum(values) <= 0:
                 return {"diversification_score": 0.0, "concentration_risk": "high"}
             
-            # Calculate weights and concentration - convert to float for calculations
-            weights = [float(Decimal(str(h.current_value)) / total_value) for h in holdings]
-            max_weight = max(weights) if weights else 0
+            stats = concentration(values)
+            hhi = stats["hhi"]
             
-            # Simple diversification score (inverted concentration)
-            diversification_score = 1.0 - max_weight
+            # 1 - HHI: the chance two random dollars sit in different positions
+            diversification_score = 1.0 - hhi
             
-            # Concentration risk assessment
-            if max_weight > 0.5:
+            # Concentration bands on HHI (0.15 / 0.25, as in antitrust practice)
+            if hhi > 0.25:
                 concentration_risk = "high"
-            elif max_weight > 0.3:
+            elif hhi > 0.15:
                 concentration_risk = "medium"
             else:
                 concentration_risk = "low"
@@ -706,7 +838,9 @@ class UserPerformanceManager:
             return {
                 "diversification_score": float(diversification_score),
                 "concentration_risk": concentration_risk,
-                "largest_position_weight": float(max_weight),
+                "hhi": hhi,
+                "effective_positions": stats["effective_positions"],
+                "largest_position_weight": stats["largest_weight"],
                 "number_of_positions": len(holdings)
             }
             
@@ -714,33 +848,227 @@ class UserPerformanceManager:
             logger.warning(f"[UserPerformanceManager] Error calculating diversification: {e}")
             return {"diversification_score": 0.0, "concentration_risk": "unknown"}
     
-    def _calculate_risk_metrics(
+    async def _calculate_risk_metrics(
         self,
+        user_id: str,
+        user_token: str,
         portfolio_metrics: PortfolioMetrics
     ) -> Dict[str, Any]:
-        """Calculate basic risk metrics"""
+        """
+        Calculate risk metrics from the daily portfolio value series.
+        
+        Volatility, drawdown, Sharpe/Sortino and beta/correlation to the
+        benchmark come from services.risk_engine, which keeps per-user state
+        so a new day only appends one window step. Per-holding contributions
+        use the holdings' own price history over the same range. The inputs
+        beyond the value series are built by _get_risk_inputs.
+        """
+        # Kept for API compatibility: holdings with a large gain/loss
+        volatile_holdings = sum(
+            1 for holding in portfolio_metrics.holdings
+            if abs(holding.gain_loss_percent) > VOLATILE_HOLDING_GAIN_LOSS_PERCENT
+        )
         try:
-            # Basic risk assessment based on volatility of holdings
-            risk_score = 0.0
-            volatile_holdings = 0
-            
-            for holding in portfolio_metrics.holdings:
-                # Simple volatility proxy using gain/loss percentage
-                if abs(holding.gain_loss_percent) > 20:  # More than 20% gain/loss
-                    volatile_holdings += 1
-            
-            if portfolio_metrics.holdings:
-                risk_score = volatile_holdings / len(portfolio_metrics.holdings)
+            series = [point for point in portfolio_metrics.time_series if point.value > 0]
+            if len(series) < 2:
+                return {
+                    "portfolio_risk_score": 0.0,
+                    "volatile_holdings_count": volatile_holdings,
+                    "risk_level": "unknown",
+                    "observations": max(len(series) - 1, 0)
+                }
+            
+            dates = [point.date for point in series]
+            values = [point.value for point in series]
+            holdings = [h for h in portfolio_metrics.holdings if h.current_value > 0]
+            symbols = [h.symbol for h in holdings]
+            
+            inputs = await self._get_risk_inputs(
+                user_id, user_token, dates, values[0], symbols, portfolio_metrics.transactions
+            )
             
-            return {
-                "portfolio_risk_score": float(risk_score),
-                "volatile_holdings_count": volatile_holdings,
-                "risk_level": "high" if risk_score > 0.5 else "medium" if risk_score > 0.2 else "low"
-            }
+            benchmark_values = None
+            if inputs["benchmark_series"]:
+                benchmark_values = self._align_series(inputs["benchmark_series"], dates)
+            else:
+                logger.warning(f"[UserPerformanceManager] Benchmark series unavailable for {user_id}")
+            
+            risk = risk_engine.analyze(
+                user_id,
+                dates,
+                values,
+                benchmark_values=benchmark_values,
+                flows=inputs["flows"],
+                benchmark_flows=inputs["benchmark_flows"] if benchmark_values is not None else None,
+                benchmark=RISK_BENCHMARK if benchmark_values is not None else "none"
+            )
+            risk["benchmark"] = RISK_BENCHMARK if benchmark_values is not None else None
+            risk["holding_contributions"] = (
+                risk_contributions(symbols, [float(h.current_value) for h in holdings], inputs["returns"])
+                if symbols else []
+            )
+            risk["volatile_holdings_count"] = volatile_holdings
+            
+            volatility = risk["volatility"] or 0.0
+            risk["portfolio_risk_score"] = min(volatility / RISK_SCORE_FULL_VOLATILITY, 1.0)
+            risk["risk_level"] = (
+                "high" if volatility > RISK_LEVEL_HIGH_VOLATILITY
+                else "medium" if volatility > RISK_LEVEL_MEDIUM_VOLATILITY
+                else "low"
+            )
+            return risk
             
         except Exception as e:
             logger.warning(f"[UserPerformanceManager] Error calculating risk metrics: {e}")
-            return {"portfolio_risk_score": 0.0, "risk_level": "unknown"}
+            return {"portfolio_risk_score": 0.0, "volatile_holdings_count": volatile_holdings, "risk_level": "unknown"}
+    
+    async def _get_risk_inputs(
+        self,
+        user_id: str,
+        user_token: str,
+        dates: List[date],
+        start_value: Decimal,
+        symbols: List[str],
+        transactions: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Cash flows, benchmark series and holding returns for risk_metrics.
+        
+        Built once per user and day from the ledger the metrics run loaded
+        and a single price fetch, then served from memory until the dependency
+        index drops them (the user's transactions, a held symbol's prices or
+        the benchmark's prices changed), as ReturnsEngine does for its series.
+        
+        Args:
+            user_id: User's UUID
+            user_token: JWT token for database access
+            dates: Dates of the value series
+            start_value: Portfolio value on the first date (seeds the benchmark)
+            symbols: Held symbols
+            transactions: Ledger from the metrics calculation; fetched only
+                when the metrics were read from a cache without it
+        
+        Returns:
+            Dict with flows, benchmark_flows, benchmark_series and returns
+        """
+        today = date.today()
+        signature = (dates[0], dates[-1], str(start_value), tuple(symbols))
+        cached = self._risk_inputs.get(user_id)
+        if cached is not None and cached[0] == today and cached[1] == signature:
+            self._risk_inputs.move_to_end(user_id)
+            self._risk_input_stats["hits"] += 1
+            return cached[2]
+        
+        if transactions is None:
+            transactions = await supa_api_get_user_transactions(
+                user_id=user_id,
+                limit=10000,
+                user_token=user_token
+            )
+        transactions = transactions or []
+        start_date, end_date = dates[0], dates[-1]
+        
+        # The value series only moves with buys and sells; the index
+        # simulation also reinvests dividends
+        trades = [
+            tx for tx in transactions
+            if str(tx.get('transaction_type', '')).upper() in ('BUY', 'SELL')
+        ]
+        
+        # One fetch for the benchmark and every holding
+        price_response = await price_manager.get_portfolio_prices_for_charts(
+            symbols=list(dict.fromkeys([RISK_BENCHMARK, *symbols])),
+            start_date=start_date - timedelta(days=RISK_BENCHMARK_LOOKBACK_DAYS),
+            end_date=end_date,
+            user_token=user_token
+        )
+        price_data = (price_response.get('data') or {}) if price_response.get('success') else {}
+        
+        start_iso = start_date.isoformat()
+        holding_prices = {
+            symbol: [record for record in price_data.get(symbol, []) if record['date'] >= start_iso]
+            for symbol in symbols
+        }
+        
+        inputs = {
+            "flows": IndexSimulationService._calculate_cash_flows(trades, {}),
+            "benchmark_flows": IndexSimulationService._calculate_cash_flows(transactions, {}),
+            "benchmark_series": await self._simulate_benchmark(
+                transactions, price_data.get(RISK_BENCHMARK, []), start_date, end_date, start_value
+            ),
+            "returns": returns_matrix_from_prices(holding_prices, symbols),
+        }
+        self._risk_input_stats["builds"] += 1
+        
+        self._risk_inputs[user_id] = (today, signature, inputs)
+        self._risk_inputs.move_to_end(user_id)
+        cache_dependency_index.register(
+            "risk_inputs", user_id, "inputs",
+            [transactions_dependency(user_id)]
+            + [price_dependency(symbol) for symbol in dict.fromkeys([RISK_BENCHMARK, *symbols])]
+        )
+        while len(self._risk_inputs) > RISK_INPUTS_MAX_USERS:
+            old_user, _ = self._risk_inputs.popitem(last=False)
+            cache_dependency_index.forget(("risk_inputs", old_user, "inputs"))
+        return inputs
+    
+    @staticmethod
+    async def _simulate_benchmark(
+        transactions: List[Dict[str, Any]],
+        price_records: List[Dict[str, Any]],
+        start_date: date,
+        end_date: date,
+        start_value: Decimal
+    ) -> List[Tuple[date, Decimal]]:
+        """
+        The user's cash flows invested in the benchmark, as in
+        IndexSimulationService.get_index_sim_series: seeded with the portfolio
+        value on start_date, then every later transaction up to end_date bought
+        or sold in the index. The seed comes from the value series, so no
+        separate portfolio valuation is needed.
+        """
+        benchmark_prices = {
+            datetime.strptime(record['date'], '%Y-%m-%d').date(): Decimal(str(record['close']))
+            for record in price_records
+        }
+        if not benchmark_prices:
+            return []
+        later = [
+            tx for tx in transactions
+            if start_date < datetime.strptime(tx['date'], '%Y-%m-%d').date() <= end_date
+        ]
+        cash_flows = [(start_date, Decimal(str(start_value)))] + IndexSimulationService._calculate_cash_flows(later, {})
+        cash_flows.sort(key=lambda flow: flow[0])
+        positions = await IndexSimulationService._simulate_index_transactions(
+            cash_flows, RISK_BENCHMARK, benchmark_prices
+        )
+        return await IndexSimulationService._calculate_daily_values(
+            start_date, end_date, positions, benchmark_prices
+        )
+    
+    async def _invalidate_risk_inputs(self, entries: List[CacheEntry]) -> int:
+        removed = 0
+        for _, user_id, _ in entries:
+            if self._risk_inputs.pop(user_id, None) is not None:
+                removed += 1
+            cache_dependency_index.forget(("risk_inputs", user_id, "inputs"))
+        return removed
+    
+    @staticmethod
+    def _align_series(series: List[Tuple[date, Decimal]], dates: List[date]) -> Optional[List[float]]:
+        """Values of a (date, value) series on the given dates, forward-filled"""
+        ordered = sorted(series)
+        aligned: List[float] = []
+        position = 0
+        last: Optional[float] = None
+        for day in dates:
+            while position < len(ordered) and ordered[position][0] <= day:
+                last = float(ordered[position][1])
+                position += 1
+            if last is None:
+                return None
+            aligned.append(last)
+        return aligned
     
     async def _validate_data_integrity(
         self,
@@ -844,17 +1172,40 @@ class UserPerformanceManager:
             
             cleaned_count = len(result.data) if result.data else 0
             logger.info(f"[UserPerformanceManager] Cleaned up {cleaned_count} expired cache entries")
+            
+            # Drop snapshot sections no cache entry references any more
+            try:
+                orphaned = client.rpc("cleanup_orphaned_snapshot_sections", {}).execute()
+                logger.info(f"[UserPerformanceManager] Removed {orphaned.data or 0} orphaned snapshot sections")
+            except Exception as e:
+                logger.warning(f"[UserPerformanceManager] Snapshot section cleanup failed: {e}")
+            
             return cleaned_count
             
         except Exception as e:
             logger.error(f"[UserPerformanceManager] Error cleaning up cache: {e}")
             return 0
     
+    def collect_metrics(self) -> List[MetricFamily]:
+        """Complete-data cache counters, reported at /metrics scrape time"""
+        return cache_families(
+            "complete",
+            hits=self._cache_stats["hits"],
+            misses=self._cache_stats["misses"],
+            invalidations=self._cache_stats["invalidations"],
+        )
+    
     def get_cache_statistics(self) -> Dict[str, Any]:
         """Get cache performance statistics"""
         return {
             "cache_stats": self._cache_stats.copy(),
             "cache_hit_ratio": self._calculate_cache_hit_ratio(),
+            "snapshot_store": snapshot_store.get_stats(),
+            "access_stats": cache_access_stats.get_stats(),
+            "dependency_index": cache_dependency_index.get_stats(),
+            "metrics_hub": portfolio_metrics_manager.get_hub_stats(),
+            "risk_engine": risk_engine.get_stats(),
+            "risk_inputs": {"users": len(self._risk_inputs), **self._risk_input_stats},
             "service_status": "active"
         }
 
@@ -863,4 +1214,7 @@ class UserPerformanceManager:
 # Module-level instance
 # ============================================================================
 
-user_performance_manager = UserPerformanceManager()
\ No newline at end of file
+user_performance_manager = service_registry.register("user_performance_manager", UserPerformanceManager)
+metrics.register_collector(
+    lambda: user_performance_manager.collect_metrics() if service_registry.is_built("user_performance_manager") else []
+)
\ No newline at end of file
@@ -7,8 +7,10 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional, Dict, Any
 import logging
 
+from config import ADMIN_USER_IDS
 from .supa_api_client import supa_api_client
 from debug_logger import DebugLogger
+from utils.request_profiler import request_profiler
 
 logger = logging.getLogger(__name__)
 
@@ -53,11 +55,15 @@ async def require_authenticated_user(credentials: Optional[HTTPAuthorizationCred
         
         # Validate the token with Supabase
     
-        user_response = supa_api_client.client.auth.get_user(token)
+        with request_profiler.stage("auth"):
+            user_response = supa_api_client.client.auth.get_user(token)
         
         if user_response and user_response.user:
             user_data = user_response.user.dict()
             user_data["access_token"] = token
+            profile = request_profiler.current()
+            if profile is not None:
+                profile.user_id = user_data.get("id")
             return user_data
         else:
             logger.warning("[supa_api_auth.py::require_authenticated_user] ❌ Token validation failed.")
@@ -75,6 +81,18 @@ async def require_authenticated_user(credentials: Optional[HTTPAuthorizationCred
         )
         raise HTTPException(status_code=401, detail=f"Authentication error: {e}")
 
+async def require_admin_user(user: Dict[str, Any] = Depends(require_authenticated_user)) -> Dict[str, Any]:
+    """
+    FastAPI dependency for process-wide debug controls.
+    The user must be listed in ADMIN_USER_IDS or carry the "admin" role in
+    app_metadata (which only the service role can set).
+    """
+    app_metadata = user.get("app_metadata") or {}
+    if user.get("id") in ADMIN_USER_IDS or app_metadata.get("role") == "admin":
+        return user
+    logger.warning(f"[supa_api_auth.py::require_admin_user] User {user.get('id')} is not an admin")
+    raise HTTPException(status_code=403, detail="Admin access required")
+
 # Helper functions for checking user permissions
 # UNUSED FUNCTION - TO BE DELETED
 # def check_user_owns_resource(user_id: str, resource_user_id: str) -> bool:
@@ -0,0 +1,68 @@
+"""
+Supabase API functions for shared circuit breaker state.
+Breakers live in process memory; these calls run from the periodic
+background sync only, never on a request path.
+"""
+
+from typing import Any, Dict, List
+import logging
+
+from .supa_api_client import get_supa_service_client
+from debug_logger import DebugLogger
+
+logger = logging.getLogger(__name__)
+
+
+def supa_api_get_circuit_states(service_names: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch shared breaker rows for the given services.
+
+    Args:
+        service_names: Breaker names to fetch
+
+    Returns:
+        Mapping of service_name -> circuit_breaker_state row
+    """
+    if not service_names:
+        return {}
+
+    try:
+        client = get_supa_service_client()
+        result = client.table('circuit_breaker_state') \
+            .select('service_name, failure_count, circuit_state, last_failure_time, last_success_time, updated_at') \
+            .in_('service_name', service_names) \
+            .execute()
+        return {row['service_name']: row for row in (result.data or [])}
+    except Exception as e:
+        DebugLogger.log_error(
+            file_name="supa_api_circuit_breaker.py",
+            function_name="supa_api_get_circuit_states",
+            error=e
+        )
+        raise
+
+
+def supa_api_save_circuit_states(rows: List[Dict[str, Any]]) -> None:
+    """
+    Upsert breaker state rows in a single request.
+
+    Args:
+        rows: Dicts with service_name, failure_count, circuit_state,
+            last_failure_time, last_success_time, updated_at
+    """
+    if not rows:
+        return
+
+    try:
+        client = get_supa_service_client()
+        client.table('circuit_breaker_state') \
+            .upsert(rows, on_conflict='service_name') \
+            .execute()
+        logger.debug(f"[supa_api_circuit_breaker.py::supa_api_save_circuit_states] Synced {len(rows)} breaker states")
+    except Exception as e:
+        DebugLogger.log_error(
+            file_name="supa_api_circuit_breaker.py",
+            function_name="supa_api_save_circuit_states",
+            error=e
+        )
+        raise
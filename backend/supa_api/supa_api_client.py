@@ -10,6 +10,7 @@ import httpx
 
 from config import SUPA_API_URL, SUPA_API_ANON_KEY, SUPA_API_SERVICE_KEY
 from debug_logger import DebugLogger
+from utils.service_registry import service_registry
 
 logger = logging.getLogger(__name__)
 
@@ -154,8 +155,8 @@ PARAMS: {params}
             )
             raise
 
-# Create singleton instance
-supa_api_client = SupaApiClient()
+# Singleton instance, created on first use
+supa_api_client = service_registry.register("supabase", SupaApiClient)
 
 # Export convenience functions
 def get_supa_client() -> Client:
@@ -0,0 +1,110 @@
+"""
+Supabase API functions for lease-based distributed locks.
+Thin wrappers over the lease RPCs from migration 013; waiting, renewal and
+release notification live in utils.distributed_lock.
+"""
+
+from typing import Optional, Tuple
+import logging
+
+from .supa_api_client import get_supa_service_client
+from debug_logger import DebugLogger
+
+logger = logging.getLogger(__name__)
+
+
+def _first_row(data):
+    if isinstance(data, list):
+        return data[0] if data else None
+    return data
+
+
+def supa_api_acquire_lease(lock_name: str, holder: str, ttl_seconds: int) -> Tuple[Optional[int], float]:
+    """
+    Try to take a lease.
+
+    Args:
+        lock_name: Lock to acquire
+        holder: Identity of this worker
+        ttl_seconds: Lease duration
+
+    Returns:
+        (fencing token, lease seconds left); the token is None if another
+        holder has the lease, and the seconds are then what is left of theirs
+    """
+    try:
+        client = get_supa_service_client()
+        result = client.rpc('acquire_lease_lock', {
+            'p_lock_name': lock_name,
+            'p_holder': holder,
+            'p_ttl_seconds': ttl_seconds
+        }).execute()
+        row = _first_row(result.data) or {}
+        token = row.get('fencing_token')
+        return (int(token) if token is not None else None), float(row.get('expires_in_seconds') or 0.0)
+    except Exception as e:
+        DebugLogger.log_error(
+            file_name="supa_api_lease_locks.py",
+            function_name="supa_api_acquire_lease",
+            error=e,
+            lock_name=lock_name
+        )
+        raise
+
+
+def supa_api_renew_lease(lock_name: str, holder: str, fencing_token: int, ttl_seconds: int) -> bool:
+    """Extend a lease; False if it expired or was taken over"""
+    try:
+        client = get_supa_service_client()
+        result = client.rpc('renew_lease_lock', {
+            'p_lock_name': lock_name,
+            'p_holder': holder,
+            'p_fencing_token': fencing_token,
+            'p_ttl_seconds': ttl_seconds
+        }).execute()
+        return bool(_first_row(result.data))
+    except Exception as e:
+        DebugLogger.log_error(
+            file_name="supa_api_lease_locks.py",
+            function_name="supa_api_renew_lease",
+            error=e,
+            lock_name=lock_name
+        )
+        raise
+
+
+def supa_api_release_lease(lock_name: str, holder: str, fencing_token: int) -> bool:
+    """Release a lease (notifies 'lock_released'); False if it was no longer ours"""
+    try:
+        client = get_supa_service_client()
+        result = client.rpc('release_lease_lock', {
+            'p_lock_name': lock_name,
+            'p_holder': holder,
+            'p_fencing_token': fencing_token
+        }).execute()
+        return bool(_first_row(result.data))
+    except Exception as e:
+        DebugLogger.log_error(
+            file_name="supa_api_lease_locks.py",
+            function_name="supa_api_release_lease",
+            error=e,
+            lock_name=lock_name
+        )
+        raise
+
+
+def supa_api_check_lease(lock_name: str) -> Optional[float]:
+    """Seconds left on the lease, or None if the lock is free"""
+    try:
+        client = get_supa_service_client()
+        result = client.rpc('check_lease_lock', {'p_lock_name': lock_name}).execute()
+        remaining = _first_row(result.data)
+        return float(remaining) if remaining is not None else None
+    except Exception as e:
+        DebugLogger.log_error(
+            file_name="supa_api_lease_locks.py",
+            function_name="supa_api_check_lease",
+            error=e,
+            lock_name=lock_name
+        )
+        raise
@@ -216,13 +216,22 @@ class CacheStats(BaseModel):
 # HELPER FUNCTIONS
 # ============================================================================
 
+def calculate_content_hash(payload: bytes) -> str:
+    """SHA256 content address of an encoded payload."""
+    return hashlib.sha256(payload).hexdigest()
+
+def calculate_snapshot_hash(section_hashes: Dict[str, str]) -> str:
+    """Combine per-section content hashes into a single snapshot hash."""
+    combined = "|".join(f"{name}:{section_hashes[name]}" for name in sorted(section_hashes))
+    return calculate_content_hash(combined.encode())
+
 def _calculate_data_hash(data: CompletePortfolioData) -> str:
     """Calculate SHA256 hash of portfolio data for change detection."""
     try:
         # Convert to JSON string with sorted keys for consistent hashing
         data_dict = data.dict()
         json_str = json.dumps(data_dict, sort_keys=True, default=str)
-        return hashlib.sha256(json_str.encode()).hexdigest()
+        return calculate_content_hash(json_str.encode())
     except Exception as e:
         logger.warning(f"Failed to calculate data hash: {e}")
         return f"hash_error_{int(time.time())}"
@@ -689,28 +698,107 @@ async def supa_api_get_cache_performance_stats() -> CacheStats:
         raise
 
 # ============================================================================
-# PRIVATE HELPER FUNCTIONS
+# CONTENT-ADDRESSED SNAPSHOT SECTIONS
 # ============================================================================
 
-async def _update_cache_access_stats(user_id: str, user_token: Optional[str] = None) -> None:
-    """Update cache access statistics (internal function)."""
-    try:
-        if user_token:
-            from .supa_api_client import create_client
-            from config import SUPA_API_URL, SUPA_API_ANON_KEY
-            client = create_client(SUPA_API_URL, SUPA_API_ANON_KEY)
-            client.auth.set_session(access_token=user_token, refresh_token="")
-        else:
-            client = get_supa_service_client()
+async def supa_api_get_snapshot_sections(content_hashes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch stored snapshot section blobs by content hash.
+    
+    Args:
+        content_hashes: Content hashes to fetch
         
-        # Update access statistics
-        client.table('user_performance') \
-            .update({
-                'access_count': 'access_count + 1',  # Increment counter
-                'last_accessed': datetime.utcnow().isoformat()
-            }) \
-            .eq('user_id', user_id) \
+    Returns:
+        Mapping of content hash to row (codec, payload, raw_size, stored_size).
+        Hashes that are not stored are simply absent.
+    """
+    if not content_hashes:
+        return {}
+    
+    try:
+        client = get_supa_service_client()
+        result = client.table('portfolio_snapshot_sections') \
+            .select('content_hash, codec, payload, raw_size, stored_size') \
+            .in_('content_hash', list(content_hashes)) \
             .execute()
-            
+        return {row['content_hash']: row for row in (result.data or [])}
     except Exception as e:
-        logger.warning(f"Failed to update access stats for user {user_id}: {e}")
\ No newline at end of file
+        DebugLogger.log_error(
+            file_name="supa_api_user_performance.py",
+            function_name="supa_api_get_snapshot_sections",
+            error=e
+        )
+        raise
+
+async def supa_api_save_snapshot_sections(rows: List[Dict[str, Any]], overwrite: bool = False) -> None:
+    """
+    Store snapshot section blobs. Rows are immutable once written, so
+    existing hashes are left untouched unless overwrite is set.
+    
+    Args:
+        rows: Dicts with content_hash, codec, payload (base64), raw_size, stored_size
+        overwrite: Replace existing rows (used to rewrite sections that could
+            not be decoded, e.g. written with a codec this worker lacks)
+    """
+    if not rows:
+        return
+    
+    try:
+        client = get_supa_service_client()
+        client.table('portfolio_snapshot_sections') \
+            .upsert(rows, on_conflict='content_hash', ignore_duplicates=not overwrite) \
+            .execute()
+        logger.info(f"[supa_api_user_performance.py::supa_api_save_snapshot_sections] Stored {len(rows)} new snapshot sections")
+    except Exception as e:
+        DebugLogger.log_error(
+            file_name="supa_api_user_performance.py",
+            function_name="supa_api_save_snapshot_sections",
+            error=e
+        )
+        raise
+
+# ============================================================================
+# BATCHED ACCESS STATISTICS
+# ============================================================================
+
+async def supa_api_flush_cache_access_stats(table: str, entries: List[Dict[str, Any]]) -> int:
+    """
+    Apply buffered cache hits to a cache table in one statement.
+    
+    Args:
+        table: 'user_performance' or 'portfolio_caches'
+        entries: Dicts with user_id, cache_key (None for all of the user's
+            entries), hits and last_accessed; entries matching the same row
+            are summed
+        
+    Returns:
+        Number of cache rows updated
+    """
+    if not entries:
+        return 0
+    
+    try:
+        client = get_supa_service_client()
+        result = client.rpc('flush_cache_access_stats', {
+            'p_table': table,
+            'p_entries': entries
+        }).execute()
+        return int(result.data or 0)
+    except Exception as e:
+        DebugLogger.log_error(
+            file_name="supa_api_user_performance.py",
+            function_name="supa_api_flush_cache_access_stats",
+            error=e,
+            table=table,
+            entries=len(entries)
+        )
+        raise
+
+# ============================================================================
+# PRIVATE HELPER FUNCTIONS
+# ============================================================================
+
+async def _update_cache_access_stats(user_id: str, user_token: Optional[str] = None) -> None:
+    """Count a cache access (buffered; flushed in bulk by the access stats writer)."""
+    from services.cache_access_stats import cache_access_stats
+    cache_access_stats.record_hit('user_performance', user_id)
\ No newline at end of file
@@ -0,0 +1,75 @@
+"""
+Shared fixtures for backend tests
+"""
+
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Callable
+
+import pytest
+
+from services.portfolio_metrics_manager import (
+    DividendSummary,
+    MarketStatus,
+    MetricsCacheStatus,
+    PortfolioHolding,
+    PortfolioMetrics,
+    PortfolioPerformance,
+    TimeSeriesDataPoint,
+)
+from services.user_performance_manager import (
+    CacheStrategy,
+    CompletePortfolioData,
+    DataCompleteness,
+    PerformanceMetadata,
+)
+
+
+@pytest.fixture
+def make_portfolio_metrics() -> Callable[..., PortfolioMetrics]:
+    """Factory for a one-holding PortfolioMetrics"""
+    def _make(price: str = "175.10", series_days: int = 1) -> PortfolioMetrics:
+        holding = PortfolioHolding(
+            symbol="AAPL", quantity=Decimal("10.123456"), avg_cost=Decimal("150"), total_cost=Decimal("1518.52"),
+            current_price=Decimal(price), current_value=Decimal("1772.62"), gain_loss=Decimal("254.10"),
+            gain_loss_percent=16.7, allocation_percent=100.0,
+        )
+        return PortfolioMetrics(
+            user_id="user-1",
+            calculated_at=datetime(2024, 6, 1, 12, tzinfo=timezone.utc),
+            cache_status=MetricsCacheStatus.MISS,
+            holdings=[holding],
+            performance=PortfolioPerformance(
+                total_value=Decimal("1772.62"), total_cost=Decimal("1518.52"), total_gain_loss=Decimal("254.10"),
+                total_gain_loss_percent=16.7, unrealized_gains=Decimal("254.10"),
+            ),
+            time_series=[
+                TimeSeriesDataPoint(date=date(2024, 5, 31) - timedelta(days=series_days - 1 - i), value=Decimal("1700.01") + i)
+                for i in range(series_days)
+            ],
+            market_status=MarketStatus(is_open=False),
+            dividend_summary=DividendSummary(),
+        )
+    return _make
+
+
+@pytest.fixture
+def make_complete_data(make_portfolio_metrics: Callable) -> Callable[..., CompletePortfolioData]:
+    """Factory for CompletePortfolioData wrapping make_portfolio_metrics"""
+    def _make(price: str = "175.10", computation_ms: int = 12, series_days: int = 1) -> CompletePortfolioData:
+        return CompletePortfolioData(
+            portfolio_metrics=make_portfolio_metrics(price=price, series_days=series_days),
+            detailed_dividends=[{"symbol": "AAPL", "amount": "2.40", "ex_date": "2024-05-10"}],
+            currency_conversions={"USD_AUD": Decimal("1.5")},
+            market_analysis={"portfolio_diversification": {"diversification_score": 0.0}},
+            generated_at=datetime(2024, 6, 1, 12, tzinfo=timezone.utc),
+            user_id="user-1",
+            cache_key="complete_portfolio:v1:user-1",
+            metadata=PerformanceMetadata(
+                total_computation_time_ms=computation_ms,
+                cache_strategy_used=CacheStrategy.MARKET_AWARE,
+                data_sources=["portfolio_metrics"],
+                data_completeness=DataCompleteness(),
+            ),
+        )
+    return _make
@@ -0,0 +1,132 @@
+"""
+Tests for the buffered cache access statistics writer
+"""
+
+import asyncio
+
+import pytest
+
+import services.cache_access_stats as cache_access_stats_module
+from services.cache_access_stats import CacheAccessStatsWriter
+
+
+@pytest.fixture
+def flushed(monkeypatch):
+    """Capture bulk flush calls instead of hitting Supabase"""
+    calls = []
+
+    async def fake_flush(table, entries):
+        calls.append((table, entries))
+        return len(entries)
+
+    monkeypatch.setattr(cache_access_stats_module, "supa_api_flush_cache_access_stats", fake_flush)
+    return calls
+
+
+class TestCacheAccessStatsWriter:
+    @pytest.mark.asyncio
+    async def test_hits_are_coalesced_per_entry(self, flushed):
+        writer = CacheAccessStatsWriter()
+        for _ in range(5):
+            writer.record_hit("user_performance", "user-1", "complete")
+        writer.record_hit("user_performance", "user-2", "complete")
+        writer.record_hit("portfolio_caches", "user-1", "portfolio:abc")
+
+        assert await writer.flush() == 3
+        assert len(flushed) == 2
+        by_table = dict(flushed)
+        hits = {e["user_id"]: e["hits"] for e in by_table["user_performance"]}
+        assert hits == {"user-1": 5, "user-2": 1}
+        assert by_table["portfolio_caches"][0]["cache_key"] == "portfolio:abc"
+
+        # Buffer is empty afterwards; nothing to write
+        assert await writer.flush() == 0
+        assert len(flushed) == 2
+
+    @pytest.mark.asyncio
+    async def test_live_counters_need_no_database(self, flushed):
+        writer = CacheAccessStatsWriter()
+        writer.record_hit("user_performance", "user-1")
+        writer.record_hit("user_performance", "user-1")
+        writer.record_miss("user_performance")
+
+        stats = writer.get_stats()
+        assert stats["tables"]["user_performance"] == {"hits": 2, "misses": 1, "hit_ratio": 0.6667}
+        assert stats["pending_entries"] == 1
+        assert stats["pending_events"] == 2
+        assert flushed == []
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_requeues_entries(self, monkeypatch):
+        async def failing_flush(table, entries):
+            raise RuntimeError("db down")
+
+        monkeypatch.setattr(cache_access_stats_module, "supa_api_flush_cache_access_stats", failing_flush)
+        writer = CacheAccessStatsWriter()
+        writer.record_hit("user_performance", "user-1", "complete")
+        writer.record_hit("user_performance", "user-1", "complete")
+
+        assert await writer.flush() == 0
+        stats = writer.get_stats()
+        assert stats["flush_failures"] == 1
+        assert stats["pending_events"] == 2
+        assert writer._pending[("user_performance", "user-1", "complete")][0] == 2
+
+    @pytest.mark.asyncio
+    async def test_event_threshold_wakes_background_flush(self, flushed):
+        writer = CacheAccessStatsWriter(flush_interval=60, max_pending=3)
+        await writer.start()
+        try:
+            for _ in range(3):
+                writer.record_hit("user_performance", "user-1", "complete")
+            for _ in range(50):
+                if flushed:
+                    break
+                await asyncio.sleep(0.01)
+            assert flushed and flushed[0][1][0]["hits"] == 3
+        finally:
+            await writer.stop()
+
+    @pytest.mark.asyncio
+    async def test_stop_flushes_pending_hits(self, flushed):
+        writer = CacheAccessStatsWriter(flush_interval=60)
+        await writer.start()
+        writer.record_hit("portfolio_caches", "user-1", "portfolio:abc")
+        await writer.stop()
+        assert len(flushed) == 1
+        table, entries = flushed[0]
+        assert table == "portfolio_caches" and entries[0]["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failures_back_off_and_cap_the_buffer(self, monkeypatch):
+        async def failing_flush(table, entries):
+            raise RuntimeError("db down")
+
+        monkeypatch.setattr(cache_access_stats_module, "supa_api_flush_cache_access_stats", failing_flush)
+        writer = CacheAccessStatsWriter(flush_interval=10, max_pending=2, max_entries=2, max_backoff=30)
+        writer.record_hit("user_performance", "user-1", "complete")
+        writer.record_hit("user_performance", "user-2", "complete")
+        writer._wake.clear()
+
+        await writer.flush()
+        assert writer._retry_delay() == 20
+        await writer.flush()
+        assert writer._retry_delay() == 30
+
+        # Requeued events no longer wake the flush loop on every hit
+        writer.record_hit("user_performance", "user-1", "complete")
+        assert not writer._wake.is_set()
+        # Buffered entries still aggregate; new entries past the cap are dropped
+        writer.record_hit("user_performance", "user-3", "complete")
+        stats = writer.get_stats()
+        assert stats["pending_entries"] == 2 and stats["events_dropped"] == 1
+        assert writer._pending[("user_performance", "user-1", "complete")][0] == 2
+
+    @pytest.mark.asyncio
+    async def test_success_resets_backoff(self, flushed):
+        writer = CacheAccessStatsWriter(flush_interval=10)
+        writer._consecutive_failures = 3
+        writer.record_hit("user_performance", "user-1")
+        await writer.flush()
+        assert writer.get_stats()["consecutive_failures"] == 0
+        assert writer._retry_delay() == 10
@@ -0,0 +1,116 @@
+"""
+Tests for dependency-indexed cache invalidation
+"""
+
+import pytest
+
+from services.cache_dependency_index import (
+    CacheDependencyIndex,
+    dependency_key,
+    dividends_dependency,
+    price_dependency,
+    transactions_dependency,
+)
+
+
+def _deps(user_id, symbols):
+    """Dependencies in the shape written by PortfolioMetricsManager._extract_dependencies"""
+    return (
+        [{"type": "transactions", "user_id": user_id}]
+        + [{"type": "prices", "symbol": symbol} for symbol in symbols]
+        + [{"type": "dividends", "user_id": user_id}]
+    )
+
+
+@pytest.fixture
+def index():
+    index = CacheDependencyIndex()
+    dropped = []
+
+    async def drop(entries):
+        dropped.extend(entries)
+        return len(entries)
+
+    index.register_invalidator("metrics", drop)
+    index.register_invalidator("complete", drop)
+    index.dropped = dropped
+    return index
+
+
+def test_dependency_keys_accept_extracted_dicts():
+    assert dependency_key({"type": "prices", "symbol": "aapl"}) == price_dependency("AAPL") == "prices:AAPL"
+    assert dependency_key({"type": "transactions", "user_id": "u1"}) == transactions_dependency("u1")
+    assert dependency_key(dividends_dependency("u1")) == "dividends:u1"
+    with pytest.raises(ValueError):
+        dependency_key({"type": "weather"})
+
+
+class TestCacheDependencyIndex:
+    @pytest.mark.asyncio
+    async def test_price_update_only_hits_holders(self, index):
+        index.register("metrics", "u1", "portfolio:a", _deps("u1", ["AAPL", "MSFT"]))
+        index.register("complete", "u1", "complete:a", _deps("u1", ["AAPL", "MSFT"]))
+        index.register("metrics", "u2", "portfolio:b", _deps("u2", ["TSLA"]))
+        index.register("metrics", "u3", "portfolio:c", _deps("u3", ["MSFT", "NVDA"]))
+
+        report = await index.invalidate("price_update", [price_dependency(s) for s in ("MSFT", "GOOG")])
+
+        assert report["matched_entries"] == 3
+        assert report["users_affected"] == 2
+        assert report["invalidated"] == {"metrics": 2, "complete": 1}
+        assert {entry[1] for entry in index.dropped} == {"u1", "u3"}
+        # Dropped entries leave the index; the untouched one stays
+        assert index.get_stats()["indexed_entries"] == 1
+        assert index.lookup([price_dependency("MSFT")]) == set()
+
+    @pytest.mark.asyncio
+    async def test_user_events_stay_within_the_user(self, index):
+        index.register("metrics", "u1", "portfolio:a", _deps("u1", ["AAPL"]))
+        index.register("metrics", "u2", "portfolio:b", _deps("u2", ["AAPL"]))
+
+        report = await index.invalidate("dividend_assignment", [dividends_dependency("u2")])
+        assert report["invalidated"] == {"metrics": 1}
+        assert index.dropped == [("metrics", "u2", "portfolio:b")]
+
+    def test_reregister_replaces_dependencies(self, index):
+        index.register("metrics", "u1", "portfolio:a", _deps("u1", ["AAPL"]))
+        index.register("metrics", "u1", "portfolio:a", _deps("u1", ["MSFT"]))
+
+        assert index.lookup([price_dependency("AAPL")]) == set()
+        assert index.lookup([price_dependency("MSFT")]) == {("metrics", "u1", "portfolio:a")}
+
+    @pytest.mark.asyncio
+    async def test_failed_invalidator_keeps_entries_and_reports(self, index):
+        async def fail(entries):
+            raise RuntimeError("db down")
+
+        index.register_invalidator("complete", fail)
+        index.register("complete", "u1", "complete:a", _deps("u1", ["AAPL"]))
+
+        report = await index.invalidate("price_update", [price_dependency("AAPL")])
+        assert report["invalidated"] == {}
+        assert report["errors"] == {"complete": "db down"}
+        assert index.lookup([price_dependency("AAPL")]) == {("complete", "u1", "complete:a")}
+        assert index.get_stats()["recent_events"][-1]["event"] == "price_update"
+
+    def test_entries_are_pruned_when_their_ttl_passes(self, index, monkeypatch):
+        import services.cache_dependency_index as module
+
+        now = [1000.0]
+        monkeypatch.setattr(module.time, "monotonic", lambda: now[0])
+        index.register("complete", "u1", "complete:2024-01-01", _deps("u1", ["AAPL"]), ttl_seconds=60)
+        index.register("complete", "u1", "complete:2024-01-02", _deps("u1", ["AAPL"]), ttl_seconds=600)
+        index.register("metrics", "u2", "portfolio:b", _deps("u2", ["AAPL"]))
+
+        now[0] = 1061.0
+        assert index.lookup([price_dependency("AAPL")]) != set()
+        stats = index.get_stats()
+        assert stats["indexed_entries"] == 2 and stats["expired_pruned"] == 1
+
+        # Re-registering extends the lifetime instead of keeping the old expiry
+        index.register("complete", "u1", "complete:2024-01-02", _deps("u1", ["AAPL"]), ttl_seconds=600)
+        now[0] = 1601.0
+        assert index.get_stats()["indexed_entries"] == 2
+        now[0] = 1662.0
+        assert index.get_stats()["indexed_entries"] == 1
+        assert index.lookup([price_dependency("AAPL")]) == {("metrics", "u2", "portfolio:b")}
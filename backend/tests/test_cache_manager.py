@@ -0,0 +1,113 @@
+"""
+Tests for the sharded, memory-bounded in-memory cache
+"""
+
+import asyncio
+
+import pytest
+
+import services.cache_manager as cache_manager_module
+from services.cache_manager import ThreadSafeCacheManager, UserCacheManager, symbol_tag, user_tag
+
+
+class TestThreadSafeCacheManager:
+    @pytest.mark.asyncio
+    async def test_set_get_and_expiry(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(cache_manager_module.time, "monotonic", lambda: now[0])
+        cache = ThreadSafeCacheManager(default_ttl_seconds=60)
+
+        await cache.set("k", {"v": 1}, ttl_seconds=30)
+        assert await cache.get("k") == {"v": 1}
+
+        now[0] += 31
+        assert await cache.get("k") is None
+        metrics = cache.get_metrics()
+        assert metrics["cache_hits"] == 1 and metrics["cache_misses"] == 1
+        assert metrics["total_entries"] == 0
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction_under_entry_budget(self):
+        cache = ThreadSafeCacheManager(max_entries=3, num_shards=1)
+        for key in ("a", "b", "c"):
+            await cache.set(key, key)
+        await cache.get("a")  # "b" is now least recently used
+        await cache.set("d", "d")
+
+        assert await cache.get("b") is None
+        assert await cache.get("a") == "a"
+        assert cache.get_metrics()["evictions"] == 1
+
+    @pytest.mark.asyncio
+    async def test_lfu_eviction_keeps_hot_entries(self):
+        cache = ThreadSafeCacheManager(max_entries=3, num_shards=1, eviction_policy="lfu")
+        for key in ("a", "b", "c"):
+            await cache.set(key, key)
+        for _ in range(5):
+            await cache.get("a")
+            await cache.get("c")
+        await cache.set("d", "d")
+
+        assert await cache.get("b") is None
+        assert await cache.get("a") == "a" and await cache.get("c") == "c"
+
+    @pytest.mark.asyncio
+    async def test_byte_budget_is_enforced(self):
+        cache = ThreadSafeCacheManager(max_bytes=20_000, num_shards=1)
+        for i in range(20):
+            await cache.set(f"k{i}", "x" * 2_000)
+
+        metrics = cache.get_metrics()
+        assert metrics["approximate_bytes"] <= 20_000
+        assert 0 < metrics["total_entries"] < 20
+        assert await cache.get("k19") is not None
+
+    @pytest.mark.asyncio
+    async def test_tag_invalidation_by_user_and_symbol(self):
+        cache = ThreadSafeCacheManager()
+        users = UserCacheManager(cache)
+        await users.set_user_cache("u1", "portfolio:a", 1, tags=[symbol_tag("AAPL")])
+        await users.set_user_cache("u1", "portfolio:b", 2, tags=[symbol_tag("MSFT")])
+        await users.set_user_cache("u2", "portfolio:a", 3, tags=[symbol_tag("aapl")])
+        await cache.set("global", 4)
+
+        assert await cache.invalidate_tags([symbol_tag("AAPL")]) == 2
+        assert await users.get_user_cache("u1", "portfolio:b") == 2
+
+        assert await users.invalidate_user_cache("u1") == 1
+        assert await cache.get("global") == 4
+        assert cache.get_metrics()["tags"] == 0
+
+    @pytest.mark.asyncio
+    async def test_overwrite_retags_entry(self):
+        cache = ThreadSafeCacheManager()
+        await cache.set("k", 1, tags=[symbol_tag("AAPL")])
+        await cache.set("k", 2, tags=[symbol_tag("MSFT")])
+
+        assert await cache.invalidate_tags([symbol_tag("AAPL")]) == 0
+        assert await cache.invalidate_tags([symbol_tag("MSFT")]) == 1
+
+    @pytest.mark.asyncio
+    async def test_pattern_invalidation_and_clear(self):
+        cache = ThreadSafeCacheManager()
+        await cache.set("test_key", 1)
+        await cache.set("other", 2)
+        assert await cache.invalidate(pattern="test_") == 1
+        assert await cache.clear_all() == 1
+        assert cache.get_metrics()["total_entries"] == 0
+
+    @pytest.mark.asyncio
+    async def test_concurrent_tasks(self):
+        cache = ThreadSafeCacheManager(max_entries=500, num_shards=8)
+
+        async def worker(i):
+            await cache.set(f"user_{i % 50}:k{i}", i)
+            return await cache.get(f"user_{i % 50}:k{i}")
+
+        results = await asyncio.gather(*(worker(i) for i in range(1000)))
+        assert sum(r is not None for r in results) == 1000
+        assert cache.get_metrics()["total_entries"] <= 500
+
+        remaining = len(cache._tag_index.get(user_tag("7"), ()))
+        assert await cache.invalidate(user_id="7") == remaining
+        assert user_tag("7") not in cache._tag_index
@@ -0,0 +1,172 @@
+"""
+Tests for the local-first circuit breaker and its background state sync
+"""
+
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+import services.circuit_breaker as circuit_breaker_module
+from services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakerRegistry
+
+
+class FakeClock:
+    """Drives time.monotonic/time.time inside the breaker module"""
+
+    def __init__(self, monkeypatch):
+        self.now = 1_000_000.0
+        monkeypatch.setattr(circuit_breaker_module.time, "monotonic", lambda: self.now)
+        monkeypatch.setattr(circuit_breaker_module.time, "time", lambda: self.now)
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    return FakeClock(monkeypatch)
+
+
+def _iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat()
+
+
+class TestCircuitBreaker:
+    def test_trips_on_failure_threshold_and_rate(self, clock):
+        breaker = CircuitBreaker("svc", failure_threshold=3, recovery_timeout=30)
+        for _ in range(10):
+            breaker.record_success()
+        for _ in range(3):
+            breaker.record_failure()
+        # 3 failures out of 13 calls is below the 50% rate
+        assert breaker.state == CLOSED
+
+        for _ in range(7):
+            breaker.record_failure()
+        assert breaker.state == OPEN
+        assert breaker.allow_request() is False
+
+    def test_old_failures_leave_the_window(self, clock):
+        breaker = CircuitBreaker("svc", failure_threshold=3, window_seconds=60)
+        breaker.record_failure()
+        breaker.record_failure()
+        clock.advance(61)
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+
+    def test_half_open_probe_closes_on_success(self, clock):
+        breaker = CircuitBreaker("svc", failure_threshold=1, recovery_timeout=30)
+        breaker.record_failure()
+        assert breaker.state == OPEN
+
+        clock.advance(31)
+        assert breaker.allow_request() is True
+        assert breaker.state == HALF_OPEN
+        # Only one probe at a time
+        assert breaker.allow_request() is False
+
+        breaker.record_success()
+        assert breaker.state == CLOSED
+        assert breaker.allow_request() is True
+
+    def test_half_open_probe_failure_reopens(self, clock):
+        breaker = CircuitBreaker("svc", failure_threshold=1, recovery_timeout=30)
+        breaker.record_failure()
+        clock.advance(31)
+        assert breaker.allow_request() is True
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert breaker.allow_request() is False
+
+    def test_unrecorded_probe_expires(self, clock):
+        breaker = CircuitBreaker("svc", failure_threshold=1, recovery_timeout=30, probe_timeout=10)
+        breaker.record_failure()
+        clock.advance(31)
+        assert breaker.allow_request() is True
+        # The probe returns without recording an outcome
+        clock.advance(5)
+        assert breaker.allow_request() is False
+
+        clock.advance(6)
+        assert breaker.allow_request() is True
+        breaker.record_success()
+        assert breaker.state == CLOSED
+
+    def test_apply_remote_open_and_closed(self, clock):
+        breaker = CircuitBreaker("svc", recovery_timeout=60)
+        clock.advance(5)
+        opened = breaker.apply_remote({
+            "circuit_state": OPEN,
+            "last_failure_time": _iso(clock.now - 10),
+            "updated_at": _iso(clock.now - 1),
+        })
+        assert opened and breaker.state == OPEN
+
+        # Opened 10s ago elsewhere, so half-open after the remaining 50s
+        clock.advance(49)
+        assert breaker.allow_request() is False
+        clock.advance(2)
+        assert breaker.allow_request() is True
+
+        closed = breaker.apply_remote({"circuit_state": CLOSED, "updated_at": _iso(clock.now + 1)})
+        assert closed and breaker.state == CLOSED
+
+    def test_apply_remote_ignores_stale_rows(self, clock):
+        breaker = CircuitBreaker("svc", failure_threshold=1, recovery_timeout=60)
+        breaker.record_failure()
+        assert breaker.apply_remote({"circuit_state": CLOSED, "updated_at": _iso(clock.now - 5)}) is False
+        assert breaker.state == OPEN
+
+
+class TestCircuitBreakerRegistry:
+    @pytest.mark.asyncio
+    async def test_sync_batches_transitions(self, clock, monkeypatch):
+        saved, fetched = [], []
+        remote_rows = {
+            "other": {"circuit_state": OPEN, "last_failure_time": _iso(clock.now), "updated_at": _iso(clock.now + 1)},
+        }
+        monkeypatch.setattr(circuit_breaker_module, "supa_api_save_circuit_states", lambda rows: saved.append(rows))
+        monkeypatch.setattr(
+            circuit_breaker_module, "supa_api_get_circuit_states",
+            lambda names: fetched.append(names) or remote_rows
+        )
+
+        registry = CircuitBreakerRegistry()
+        svc = registry.get("svc", failure_threshold=1)
+        other = registry.get("other")
+        for _ in range(5):
+            assert svc.allow_request() and other.allow_request()
+        svc.record_failure()
+
+        result = await registry.sync()
+        assert result == {"pushed": 1, "applied": 1}
+        assert len(saved) == 1 and saved[0][0]["service_name"] == "svc"
+        assert saved[0][0]["circuit_state"] == OPEN
+        assert sorted(fetched[0]) == ["other", "svc"]
+        assert other.state == OPEN
+
+        # Nothing changed locally: no push, one read
+        assert (await registry.sync())["pushed"] == 0
+        assert len(saved) == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_sync_keeps_pending_transitions(self, clock, monkeypatch):
+        def fail(rows):
+            raise RuntimeError("db down")
+
+        monkeypatch.setattr(circuit_breaker_module, "supa_api_save_circuit_states", fail)
+        registry = CircuitBreakerRegistry()
+        registry.get("svc", failure_threshold=1).record_failure()
+
+        with pytest.raises(RuntimeError):
+            await registry.sync()
+        assert "svc" in registry._dirty
+
+
+def test_closed_check_is_cheap():
+    breaker = CircuitBreaker("svc")
+    started = time.perf_counter()
+    for _ in range(100_000):
+        breaker.allow_request()
+    assert (time.perf_counter() - started) / 100_000 < 5e-6
@@ -0,0 +1,215 @@
+"""
+Tests for lease-based distributed locks (in-process lease store)
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from utils.distributed_lock import DistributedLock, LeaseLockService, LeaseLostError, LocalLeaseStore
+
+
+@pytest.fixture
+def store():
+    return LocalLeaseStore()
+
+
+def _service(store, holder):
+    return LeaseLockService(store, holder_id=holder, recheck_interval=5.0)
+
+
+class TestLeaseLockService:
+    @pytest.mark.asyncio
+    async def test_fencing_tokens_increase(self, store):
+        service = _service(store, "w1")
+        first = await service.acquire("job", ttl_seconds=30, max_wait_seconds=0)
+        await first.release()
+        second = await service.acquire("job", ttl_seconds=30, max_wait_seconds=0)
+        assert second.fencing_token > first.fencing_token
+        await second.release()
+
+    @pytest.mark.asyncio
+    async def test_waiter_wakes_on_release_without_polling(self, store):
+        holder, waiter = _service(store, "w1"), _service(store, "w2")
+        # Share the notifier, as a LISTEN connection would across workers
+        waiter.notifier = holder.notifier
+        lease = await holder.acquire("job", ttl_seconds=60)
+
+        calls = {"n": 0}
+        original = store.try_acquire
+
+        async def counting(*args):
+            calls["n"] += 1
+            return await original(*args)
+
+        store.try_acquire = counting
+        pending = asyncio.create_task(waiter.acquire("job", ttl_seconds=60, max_wait_seconds=10))
+        await asyncio.sleep(0.05)
+        started = time.monotonic()
+        await lease.release()
+        acquired = await pending
+
+        assert acquired is not None
+        assert time.monotonic() - started < 0.5
+        # One failed attempt, one successful attempt after the wake-up
+        assert calls["n"] == 2
+        stats = waiter.get_stats()
+        assert stats["contended"] == 1 and stats["wait_ms"]["count"] == 1
+        await acquired.release()
+
+    @pytest.mark.asyncio
+    async def test_release_during_attempt_is_not_missed(self, store):
+        holder, waiter = _service(store, "w1"), _service(store, "w2")
+        waiter.notifier = holder.notifier
+        lease = await holder.acquire("job", ttl_seconds=60)
+
+        original = store.try_acquire
+        attempts = []
+
+        async def release_mid_attempt(*args):
+            result = await original(*args)
+            attempts.append(result)
+            if len(attempts) == 1:
+                # The holder releases while the waiter's failed attempt is still in flight
+                await lease.release()
+            return result
+
+        store.try_acquire = release_mid_attempt
+        started = time.monotonic()
+        acquired = await waiter.acquire("job", ttl_seconds=60, max_wait_seconds=10)
+
+        assert acquired is not None
+        assert time.monotonic() - started < 0.5
+        await acquired.release()
+
+    @pytest.mark.asyncio
+    async def test_waits_are_capped_by_recheck_interval(self, store):
+        holder = _service(store, "w1")
+        waiter = LeaseLockService(store, holder_id="w2", recheck_interval=0.05)
+        lease = await holder.acquire("job", ttl_seconds=60)
+        # Released without a notification reaching the waiter
+        lease._renew_task.cancel()
+        store._leases.pop("job")
+
+        started = time.monotonic()
+        acquired = await waiter.acquire("job", ttl_seconds=60, max_wait_seconds=10)
+        assert acquired is not None
+        assert time.monotonic() - started < 0.5
+        await acquired.release()
+
+    @pytest.mark.asyncio
+    async def test_timeout_returns_none(self, store):
+        holder, waiter = _service(store, "w1"), _service(store, "w2")
+        lease = await holder.acquire("job", ttl_seconds=60)
+        assert await waiter.acquire("job", max_wait_seconds=0.05) is None
+        assert waiter.get_stats()["timeouts"] == 1
+        await lease.release()
+
+    @pytest.mark.asyncio
+    async def test_expired_lease_is_taken_over_and_old_token_rejected(self, store):
+        holder, other = _service(store, "w1"), _service(store, "w2")
+        lease = await holder.acquire("job", ttl_seconds=1)
+        lease._renew_task.cancel()  # holder stalls and stops renewing
+
+        takeover = await other.acquire("job", ttl_seconds=30, max_wait_seconds=3)
+        assert takeover is not None and takeover.fencing_token > lease.fencing_token
+
+        # The stale holder can neither write, renew nor release the new lease
+        assert lease.lost
+        with pytest.raises(LeaseLostError):
+            lease.ensure_held()
+        assert await store.renew("job", "w1", lease.fencing_token, 30) is False
+        assert await lease.release() is False
+        assert await other.is_locked("job")
+        await takeover.release()
+
+    @pytest.mark.asyncio
+    async def test_lease_is_renewed_while_held(self, store):
+        service = _service(store, "w1")
+        lease = await service.acquire("job", ttl_seconds=0.3)
+        await asyncio.sleep(0.5)
+        assert not lease.lost
+        assert service.get_stats()["renewals"] >= 1
+        assert await service.is_locked("job")
+        await lease.release()
+        assert not await service.is_locked("job")
+
+
+@pytest.mark.asyncio
+async def test_distributed_lock_handle(store):
+    service = _service(store, "w1")
+    lock = DistributedLock("dividend_sync_user_1", timeout_seconds=30, service=service)
+    assert await lock.acquire(max_wait_seconds=0)
+    assert lock.fencing_token is not None
+    lock.ensure_held()
+    assert await lock.is_locked()
+    assert await lock.release()
+    assert await lock.release() is False
+    with pytest.raises(LeaseLostError):
+        lock.ensure_held()
+
+
+class _FakeTable:
+    """Chainable stand-in for supabase table queries on user_dividends"""
+
+    def __init__(self, inserted):
+        self._inserted = inserted
+        self._row = None
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def insert(self, row):
+        self._row = row
+        return self
+
+    def execute(self):
+        class Result:
+            data = []
+        if self._row is not None:
+            self._inserted.append(self._row)
+            Result.data = [self._row]
+        return Result()
+
+
+@pytest.mark.asyncio
+async def test_dividend_writes_are_fenced(store, monkeypatch):
+    from services.dividend_service import dividend_service
+
+    inserted = []
+
+    class FakeClient:
+        def table(self, name):
+            return _FakeTable(inserted)
+
+    monkeypatch.setattr(dividend_service, "supa_client", FakeClient())
+    lock = DistributedLock("dividend_sync_global", timeout_seconds=30, service=_service(store, "w1"))
+    await lock.acquire(max_wait_seconds=0)
+    dividend = {"ex_date": "2024-03-15", "amount": "0.46"}
+
+    assert await dividend_service._upsert_global_dividend_fixed("KO", dividend, lock=lock)
+    assert inserted[0]["sync_fencing_token"] == lock.fencing_token
+
+    lock._lease._lost = True
+    with pytest.raises(LeaseLostError):
+        await dividend_service._upsert_global_dividend_fixed("KO", {**dividend, "ex_date": "2024-06-14"}, lock=lock)
+    assert len(inserted) == 1
+    await lock.release()
+
+
+def test_lock_stats_endpoint_requires_admin(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    import supa_api.supa_api_auth as auth
+    from backend_api_routes.backend_api_dashboard import dashboard_router
+
+    app = FastAPI()
+    app.include_router(dashboard_router)
+    app.dependency_overrides[auth.require_authenticated_user] = lambda: {"id": "user-1", "app_metadata": {}}
+    client = TestClient(app)
+
+    assert client.get("/api/debug/locks").status_code == 403
+    monkeypatch.setattr(auth, "ADMIN_USER_IDS", frozenset({"user-1"}))
+    assert client.get("/api/debug/locks").status_code == 200
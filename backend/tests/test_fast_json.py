@@ -0,0 +1,75 @@
+"""
+Tests for the fast JSON serializer and schema-driven row encoders
+"""
+
+import json
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from services.portfolio_metrics_manager import PortfolioHolding, TimeSeriesDataPoint
+from utils import fast_json
+from utils.decimal_json_encoder import DecimalSafeJSONEncoder
+from utils.fast_json import columnar_series, compile_row_encoder
+
+
+def _holding(**overrides) -> PortfolioHolding:
+    fields = dict(
+        symbol="AAPL", quantity=Decimal("10.5"), avg_cost=Decimal("150.25"), total_cost=Decimal("1577.625"),
+        current_price=Decimal("175"), current_value=Decimal("1837.5"), gain_loss=Decimal("259.875"),
+        gain_loss_percent=16.47, allocation_percent=42.0,
+    )
+    fields.update(overrides)
+    return PortfolioHolding(**fields)
+
+
+class TestDumps:
+    def test_decimal_as_string_matches_stdlib_encoder(self) -> None:
+        data = {"price": Decimal("123.456789"), "items": [Decimal("1"), "x", None], "ok": True}
+        expected = json.loads(json.dumps(data, cls=DecimalSafeJSONEncoder))
+        assert json.loads(fast_json.dumps(data)) == expected
+
+    def test_decimal_as_float(self) -> None:
+        assert json.loads(fast_json.dumps({"v": Decimal("1.25")}, decimal_as="float")) == {"v": 1.25}
+
+    def test_dates_and_models(self) -> None:
+        stamp = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        point = TimeSeriesDataPoint(date=date(2024, 1, 2), value=Decimal("10"))
+        decoded = json.loads(fast_json.dumps({"at": stamp, "point": point}))
+        assert decoded["at"] == stamp.isoformat()
+        assert decoded["point"]["date"] == "2024-01-02"
+        assert decoded["point"]["value"] == "10"
+
+    def test_loads_round_trip(self) -> None:
+        assert fast_json.loads(fast_json.dumps({"a": [1, 2]})) == {"a": [1, 2]}
+
+
+class TestRowEncoder:
+    def test_projects_fields_and_converts_decimals(self) -> None:
+        encoder = compile_row_encoder(PortfolioHolding, ("symbol", "quantity", "gain_loss_percent", "price_date"))
+        assert encoder.encode(_holding()) == {
+            "symbol": "AAPL", "quantity": 10.5, "gain_loss_percent": 16.47, "price_date": None,
+        }
+
+    def test_optional_decimal_keeps_none(self) -> None:
+        encoder = compile_row_encoder(PortfolioHolding, ("base_currency_value",), decimal_as="str")
+        assert encoder.encode(_holding()) == {"base_currency_value": None}
+        assert encoder.encode(_holding(base_currency_value=Decimal("5.10"))) == {"base_currency_value": "5.10"}
+
+    def test_unknown_field_rejected(self) -> None:
+        with pytest.raises(ValueError):
+            compile_row_encoder(PortfolioHolding, ("nope",))
+
+
+class TestColumnarSeries:
+    def test_parallel_arrays(self) -> None:
+        points = [
+            TimeSeriesDataPoint(date=date(2024, 1, 1), value=Decimal("100.5")),
+            TimeSeriesDataPoint(date=date(2024, 1, 2), value=Decimal("101")),
+        ]
+        assert columnar_series(points) == {"dates": ["2024-01-01", "2024-01-02"], "values": [100.5, 101.0]}
+
+    def test_dict_points_and_empty(self) -> None:
+        assert columnar_series([{"date": "2024-01-01", "value": 3}]) == {"dates": ["2024-01-01"], "values": [3.0]}
+        assert columnar_series([]) == {"dates": [], "values": []}
@@ -0,0 +1,119 @@
+"""
+Tests for compiled feature flag evaluation and per-user decision caching
+"""
+
+import pytest
+
+from models.feature_flag_models import (
+    FeatureFlagConfig,
+    FeatureFlagStatus,
+    RolloutStrategy,
+)
+from services.feature_flag_service import FeatureFlagService, FeatureFlagSnapshot
+
+
+def _flag(name, **overrides):
+    return FeatureFlagConfig(
+        flag_name=name,
+        display_name=name,
+        description=name,
+        created_by="tests",
+        **overrides
+    )
+
+
+@pytest.fixture
+def service():
+    service = FeatureFlagService(environment="test")
+    service.update_flag(_flag(
+        "rollout_half",
+        status=FeatureFlagStatus.PERCENTAGE,
+        rollout_strategy=RolloutStrategy.PERCENTAGE_BASED,
+        enabled_percentage=50,
+    ))
+    service.update_flag(_flag(
+        "needs_decimal",
+        status=FeatureFlagStatus.ENABLED,
+        depends_on=["decimal_migration"],
+    ))
+    service.update_flag(_flag(
+        "prod_only",
+        status=FeatureFlagStatus.ENABLED,
+        environment_filter=["production"],
+    ))
+    return service
+
+
+class TestCompiledFlags:
+    def test_decisions_match_evaluation_reasons(self, service):
+        assert service.evaluate_flag("decimal_migration", "qa_lead").reason == "canary_user"
+        assert service.evaluate_flag("decimal_migration", "someone").reason == "not_in_rollout"
+        assert service.evaluate_flag("type_strict_mode").reason == "globally_enabled"
+        assert service.evaluate_flag("rls_policies").reason == "flag_disabled"
+        assert service.evaluate_flag("prod_only").reason == "environment_not_allowed: test"
+        assert service.evaluate_flag("needs_decimal", "someone").reason == "dependency_not_met: decimal_migration"
+        assert service.is_enabled("needs_decimal", "qa_lead")
+
+    def test_unknown_flag_fails_closed(self, service):
+        evaluation = service.evaluate_flag("no_such_flag", "u1")
+        assert not evaluation.is_enabled
+        assert evaluation.reason.startswith("evaluation_error")
+
+    def test_percentage_rollout_is_stable_per_user(self, service):
+        users = [f"user-{i}" for i in range(200)]
+        first = [service.is_enabled("rollout_half", u) for u in users]
+        assert first == [service.is_enabled("rollout_half", u) for u in users]
+        assert 50 < sum(first) < 150
+
+    def test_dependency_cycle_fails_closed(self, service):
+        service.update_flag(_flag("cycle_a", status=FeatureFlagStatus.ENABLED, depends_on=["cycle_b"]))
+        service.update_flag(_flag("cycle_b", status=FeatureFlagStatus.ENABLED, depends_on=["cycle_a"]))
+        assert not service.is_enabled("cycle_a", "u1")
+
+
+class TestDecisionCache:
+    def test_repeat_checks_hit_the_cache(self, service, monkeypatch):
+        calls = []
+        original = service._hash_user_id
+
+        def counting(user_id, flag_name):
+            calls.append(user_id)
+            return original(user_id, flag_name)
+
+        monkeypatch.setattr(service, "_hash_user_id", counting)
+        service.update_flag(service._flags_cache["rollout_half"])  # recompile with the counting hash
+
+        for _ in range(100):
+            service.is_enabled("rollout_half", "u1")
+        assert calls == ["u1"]
+        assert service.get_stats()["hits"] >= 99
+
+    def test_config_change_invalidates_decisions(self, service):
+        version = service.config_version
+        assert service.is_enabled("decimal_migration", "qa_lead")
+
+        killed = service._flags_cache["decimal_migration"].model_copy(update={"kill_switch": True})
+        service.update_flag(killed)
+
+        assert service.config_version > version
+        assert not service.is_enabled("decimal_migration", "qa_lead")
+        assert service.evaluate_flag("decimal_migration", "qa_lead").reason == "kill_switch_active"
+        # Dependents are re-evaluated too
+        assert not service.is_enabled("needs_decimal", "qa_lead")
+
+
+class TestSnapshot:
+    def test_snapshot_is_frozen_and_versioned(self, service):
+        snapshot = service.evaluate_flags("qa_lead")
+        assert isinstance(snapshot, FeatureFlagSnapshot)
+        assert snapshot.version == service.config_version
+        assert snapshot.is_enabled("decimal_migration") and snapshot["type_strict_mode"]
+        assert not snapshot.is_enabled("no_such_flag")
+        with pytest.raises(TypeError):
+            snapshot._decisions["decimal_migration"] = False
+
+    def test_snapshot_is_not_affected_by_later_changes(self, service):
+        snapshot = service.evaluate_flags("qa_lead", ["decimal_migration"])
+        service.update_flag(_flag("decimal_migration", status=FeatureFlagStatus.DISABLED))
+        assert snapshot.to_dict() == {"decimal_migration": True}
+        assert not service.evaluate_flags("qa_lead").is_enabled("decimal_migration")
@@ -0,0 +1,200 @@
+"""
+Equivalence tests for the fixed-point money kernel against the Decimal path
+"""
+
+import random
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+import pytest
+
+from utils import fixed_point
+from utils.financial_math import (
+    safe_decimal,
+    safe_divide,
+    safe_gain_loss_percent,
+    safe_multiply,
+    safe_percentage,
+)
+from utils.fixed_point import (
+    MONEY_SCALE,
+    PRICE_SCALE,
+    QUANTITY_SCALE,
+    ROUNDING_MODES,
+    div_round,
+    from_fixed,
+    fx_div,
+    fx_gain_loss_percent,
+    fx_mul,
+    fx_percentage,
+    fx_weighted_sum_rows,
+    to_fixed,
+)
+
+SIX_PLACES = Decimal("0.000001")
+
+
+def _random_amounts(count, seed=7):
+    """Money-like strings with up to 6 decimals, both signs, including zero"""
+    rng = random.Random(seed)
+    values = ["0", "0.000001", "-0.000001", "0.5", "-0.5", "1000000", "0.1", "2.675"]
+    while len(values) < count:
+        whole = rng.choice([0, rng.randrange(10), rng.randrange(1000), rng.randrange(10 ** 7)])
+        places = rng.randrange(7)
+        frac = str(rng.randrange(10 ** places)).zfill(places) if places else ""
+        sign = "-" if rng.random() < 0.3 else ""
+        values.append(f"{sign}{whole}.{frac}" if frac else f"{sign}{whole}")
+    return values
+
+
+AMOUNTS = _random_amounts(120)
+PAIRS = list(zip(AMOUNTS, reversed(AMOUNTS)))
+
+
+class TestConversion:
+    @pytest.mark.parametrize("value", AMOUNTS + [1.1, 0.1 + 0.2, 42, Decimal("1E+3"), "  12.5 ", "1e-7"])
+    def test_round_trip_matches_quantized_decimal(self, value):
+        expected = safe_decimal(value).quantize(SIX_PLACES, rounding=ROUND_HALF_UP)
+        assert from_fixed(to_fixed(value)) == expected
+
+    def test_invalid_values_are_zero_like_safe_decimal(self):
+        for value in (None, "", "abc", "NaN", "Infinity"):
+            assert to_fixed(value) == 0
+
+    def test_from_fixed_keeps_scale_and_large_values(self):
+        assert str(from_fixed(1502500000)) == "1502.500000"
+        huge = 10 ** 40 + 1
+        assert from_fixed(huge, 6) == Decimal(f"{huge}E-6")  # scaleb would round to 28 digits
+        assert to_fixed(Decimal("12345678901234567890123456789.1234565")) == 12345678901234567890123456789123457
+
+
+class TestRounding:
+    @pytest.mark.parametrize("rounding", ROUNDING_MODES)
+    def test_div_round_matches_decimal_quantize(self, rounding):
+        rng = random.Random(3)
+        for _ in range(500):
+            numerator = rng.randrange(-10 ** 9, 10 ** 9)
+            denominator = rng.choice([1, 2, 4, 10, 1000, rng.randrange(1, 10 ** 5)]) * rng.choice([1, -1])
+            expected = (Decimal(numerator) / Decimal(denominator)).quantize(Decimal(1), rounding=rounding)
+            assert div_round(numerator, denominator, rounding) == int(expected), (numerator, denominator)
+
+    def test_half_way_cases(self):
+        assert div_round(5, 2) == 3 and div_round(-5, 2) == -3
+        assert div_round(5, 2, "ROUND_HALF_EVEN") == 2 and div_round(7, 2, "ROUND_HALF_EVEN") == 4
+        assert div_round(-5, 2, "ROUND_DOWN") == -2 and div_round(-5, 2, "ROUND_FLOOR") == -3
+
+
+class TestScalarEquivalence:
+    @pytest.mark.parametrize("a,b", PAIRS)
+    def test_multiply(self, a, b):
+        assert from_fixed(fx_mul(to_fixed(a), to_fixed(b))) == safe_multiply(a, b)
+
+    @pytest.mark.parametrize("a,b", PAIRS)
+    def test_divide(self, a, b):
+        assert from_fixed(fx_div(to_fixed(a), to_fixed(b))) == safe_divide(a, b)
+
+    @pytest.mark.parametrize("a,b", PAIRS)
+    def test_percentages(self, a, b):
+        assert from_fixed(fx_percentage(to_fixed(a), to_fixed(b))) == safe_percentage(a, b)
+        assert from_fixed(fx_gain_loss_percent(to_fixed(a), to_fixed(b))) == safe_gain_loss_percent(a, b)
+
+    def test_mixed_scales(self):
+        quantity = to_fixed("0.12345678", QUANTITY_SCALE)
+        price = to_fixed("43250.125", PRICE_SCALE)
+        expected = (Decimal("0.12345678") * Decimal("43250.125")).quantize(SIX_PLACES, rounding=ROUND_HALF_UP)
+        assert from_fixed(fx_mul(quantity, price, QUANTITY_SCALE, PRICE_SCALE, MONEY_SCALE)) == expected
+
+
+class TestSeries:
+    @staticmethod
+    def _matrices(days, symbols, seed, max_shares=500, max_price=900):
+        rng = random.Random(seed)
+        quantities = [
+            [to_fixed(f"{rng.randrange(max_shares)}.{rng.randrange(10 ** 4):04d}", QUANTITY_SCALE) for _ in range(symbols)]
+            for _ in range(days)
+        ]
+        prices = [
+            [to_fixed(f"{rng.randrange(max_price)}.{rng.randrange(100):02d}", PRICE_SCALE) for _ in range(symbols)]
+            for _ in range(days)
+        ]
+        return quantities, prices
+
+    @staticmethod
+    def _reference(quantities, prices):
+        return [
+            sum(
+                from_fixed(q, QUANTITY_SCALE) * from_fixed(p, PRICE_SCALE)
+                for q, p in zip(q_row, p_row)
+            ).quantize(SIX_PLACES, rounding=ROUND_HALF_UP)
+            for q_row, p_row in zip(quantities, prices)
+        ]
+
+    def test_row_sums_match_decimal(self):
+        quantities, prices = self._matrices(60, 12, seed=1)
+        totals = fx_weighted_sum_rows(quantities, prices)
+        assert [from_fixed(t) for t in totals] == self._reference(quantities, prices)
+
+    def test_large_positions_fall_back_to_python_ints(self):
+        quantities, prices = self._matrices(10, 4, seed=2, max_shares=10 ** 9, max_price=10 ** 6)
+        quantities[0][0] = to_fixed("123456789.12345678", QUANTITY_SCALE)
+        totals = fx_weighted_sum_rows(quantities, prices)
+        assert [from_fixed(t) for t in totals] == self._reference(quantities, prices)
+
+    def test_pure_python_path_matches(self, monkeypatch):
+        quantities, prices = self._matrices(20, 5, seed=4)
+        vectorized = fx_weighted_sum_rows(quantities, prices)
+        monkeypatch.setattr(fixed_point, "NUMPY_AVAILABLE", False)
+        assert fx_weighted_sum_rows(quantities, prices) == vectorized
+
+    def test_negative_totals_round_half_up_away_from_zero(self):
+        # -0.5 micro-dollars rounds to -1, like Decimal ROUND_HALF_UP
+        totals = fx_weighted_sum_rows([[-5]], [[1]], quantity_scale=7, price_scale=0, out_scale=6)
+        assert totals == [-1]
+
+
+@pytest.mark.asyncio
+async def test_portfolio_time_series_matches_decimal_loop(monkeypatch):
+    from services import portfolio_calculator as module
+    from services.portfolio_calculator import PortfolioCalculator
+
+    end = date.today()
+    start, _ = PortfolioCalculator._compute_date_range("1M")
+    transactions = [
+        {"date": (start - timedelta(days=10)).isoformat(), "symbol": "AAPL", "transaction_type": "BUY", "quantity": "10.5"},
+        {"date": (start + timedelta(days=5)).isoformat(), "symbol": "MSFT", "transaction_type": "Buy", "quantity": 3},
+        {"date": (start + timedelta(days=12)).isoformat(), "symbol": "AAPL", "transaction_type": "SELL", "quantity": "4.25"},
+        {"date": (start + timedelta(days=15)).isoformat(), "symbol": "MSFT", "transaction_type": "DIVIDEND", "quantity": 0},
+    ]
+    prices = {
+        "AAPL": [{"date": (start + timedelta(days=i)).isoformat(), "close": 150 + i * 0.37} for i in range(0, 40, 2)],
+        "MSFT": [{"date": (start + timedelta(days=i)).isoformat(), "close": f"{300 + i}.125"} for i in range(3, 40, 3)],
+    }
+
+    async def fake_prices(**kwargs):
+        return {"success": True, "data": prices}
+
+    monkeypatch.setattr(module.price_manager, "get_portfolio_prices_for_charts", fake_prices)
+    series, metadata = await PortfolioCalculator.calculate_portfolio_time_series(
+        "user-1", "token", "1M", transactions=transactions
+    )
+
+    # The previous per-day Decimal loop, quantized to the money scale
+    expected = []
+    for day in PortfolioCalculator._get_trading_days(start, end, "1M"):
+        value = Decimal("0")
+        for symbol in ("AAPL", "MSFT"):
+            held = sum(
+                (Decimal(str(t["quantity"])) * (1 if t["transaction_type"] in ("BUY", "Buy") else -1)
+                 for t in transactions
+                 if t["symbol"] == symbol and t["transaction_type"] in ("BUY", "Buy", "SELL", "Sell")
+                 and date.fromisoformat(t["date"]) <= day),
+                Decimal("0"),
+            )
+            known = [p for p in prices[symbol] if date.fromisoformat(p["date"]) <= day]
+            if held > 0 and known:
+                value += held * Decimal(str(known[-1]["close"]))
+        if value > 0:
+            expected.append((day, value.quantize(SIX_PLACES, rounding=ROUND_HALF_UP)))
+
+    assert series == expected
+    assert metadata["data_points"] == len(expected) > 0
@@ -0,0 +1,105 @@
+"""
+Tests for ETag / If-None-Match handling on the dashboard endpoints
+"""
+
+from typing import Any, Callable, Dict
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend_api_routes.backend_api_portfolio import portfolio_router
+from services.portfolio_metrics_manager import portfolio_metrics_manager
+from services.user_performance_manager import user_performance_manager
+from supa_api.supa_api_auth import require_authenticated_user
+from utils.http_cache import etag_matches, make_etag
+
+
+class TestEtagHelpers:
+    def test_variant_changes_etag(self) -> None:
+        assert make_etag("abc", "v1") != make_etag("abc", "v2")
+        assert make_etag("abc", "v1") == make_etag("abc", "v1")
+
+    def test_etags_are_weak(self) -> None:
+        # Bodies carry per-response fields (computation time, cache status), so never strong
+        assert make_etag("abc").startswith('W/"')
+        assert etag_matches(make_etag("abc"), make_etag("abc"))
+        assert etag_matches(make_etag("abc")[2:], make_etag("abc"))
+
+    @pytest.mark.parametrize("header,expected", [
+        (None, False),
+        ('"other"', False),
+        ('"other", "tag"', True),
+        ('W/"tag"', True),
+        ("*", True),
+    ])
+    def test_if_none_match(self, header: Any, expected: bool) -> None:
+        assert etag_matches(header, '"tag"') is expected
+
+
+@pytest.fixture
+def client(monkeypatch: pytest.MonkeyPatch, make_portfolio_metrics: Callable, make_complete_data: Callable) -> TestClient:
+    state: Dict[str, Any] = {"metrics": make_portfolio_metrics(), "complete": make_complete_data(series_days=5)}
+    state["complete"].snapshot_hash = "snapshot-1"
+
+    async def get_metrics(**kwargs: Any) -> Any:
+        return state["metrics"]
+
+    async def generate_complete_data(**kwargs: Any) -> Any:
+        return state["complete"]
+
+    monkeypatch.setattr(portfolio_metrics_manager, "get_portfolio_metrics", get_metrics)
+    monkeypatch.setattr(user_performance_manager, "generate_complete_data", generate_complete_data)
+
+    app = FastAPI()
+    app.include_router(portfolio_router, prefix="/api")
+    app.dependency_overrides[require_authenticated_user] = lambda: {"id": "user-1", "access_token": "token"}
+    test_client = TestClient(app)
+    test_client.state = state
+    return test_client
+
+
+class TestConditionalGet:
+    def test_portfolio_304_until_content_changes(self, client: TestClient, make_portfolio_metrics: Callable) -> None:
+        first = client.get("/api/portfolio")
+        etag = first.headers["ETag"]
+        assert first.status_code == 200
+
+        cached = client.get("/api/portfolio", headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.content == b""
+
+        # Recalculated metrics with identical content keep the same ETag
+        client.state["metrics"] = make_portfolio_metrics()
+        assert client.get("/api/portfolio", headers={"If-None-Match": etag}).status_code == 304
+
+        client.state["metrics"] = make_portfolio_metrics(price="180.00")
+        changed = client.get("/api/portfolio", headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["ETag"] != etag
+
+    def test_allocation_etag_differs_from_portfolio(self, client: TestClient) -> None:
+        assert client.get("/api/allocation").headers["ETag"] != client.get("/api/portfolio").headers["ETag"]
+
+    def test_complete_304_from_snapshot_hash(self, client: TestClient) -> None:
+        etag = client.get("/api/complete").headers["ETag"]
+        assert client.get("/api/complete", headers={"If-None-Match": etag}).status_code == 304
+
+        client.state["complete"].snapshot_hash = "snapshot-2"
+        assert client.get("/api/complete", headers={"If-None-Match": etag}).status_code == 200
+
+    def test_complete_since_returns_appended_points(self, client: TestClient) -> None:
+        full = client.get("/api/complete").json()
+        assert len(full["time_series"]) == 5
+        assert full["time_series_cursor"] == "2024-05-31"
+
+        delta = client.get("/api/complete", params={"since": "2024-05-29", "time_series_format": "columnar"}).json()
+        assert delta["time_series"]["dates"] == ["2024-05-30", "2024-05-31"]
+        assert delta["time_series_cursor"] == "2024-05-31"
+
+        client.state["complete"].snapshot_hash = None
+        caught_up = client.get("/api/complete", params={"since": "2024-05-31"})
+        assert caught_up.json()["time_series"] == []
+        assert client.get(
+            "/api/complete", params={"since": "2024-05-31"}, headers={"If-None-Match": caught_up.headers["ETag"]}
+        ).status_code == 304
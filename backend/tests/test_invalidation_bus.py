@@ -0,0 +1,249 @@
+"""
+Tests for cross-worker cache invalidation over the invalidation bus
+"""
+
+import json
+
+import pytest
+
+from services.cache_dependency_index import CacheDependencyIndex, price_dependency, transactions_dependency
+from services.invalidation_bus import (
+    DEPENDENCIES,
+    MAX_PAYLOAD_BYTES,
+    USER,
+    InvalidationBus,
+    LocalBusHub,
+)
+
+
+class Worker:
+    """One simulated worker: its own index, L1 cache and bus"""
+
+    def __init__(self, name, hub=None):
+        self.cache = {}
+        self.index = CacheDependencyIndex()
+        self.index.register_invalidator("metrics", self._drop)
+        self.bus = InvalidationBus(hub.connect() if hub else None, worker_id=name, dependency_index=self.index)
+
+    async def _drop(self, entries):
+        for _, user_id, key in entries:
+            self.cache.pop((user_id, key), None)
+        return len(entries)
+
+    def put(self, user_id, key, symbols):
+        self.cache[(user_id, key)] = "metrics"
+        self.index.register("metrics", user_id, key, [transactions_dependency(user_id)] + [price_dependency(s) for s in symbols])
+
+
+async def _workers(count):
+    hub = LocalBusHub()
+    workers = [Worker(f"worker-{i}", hub) for i in range(count)]
+    for worker in workers:
+        await worker.bus.start()
+    return workers
+
+
+async def _drain(workers):
+    for worker in workers:
+        await worker.bus.wait_idle()
+
+
+class TestCrossWorkerInvalidation:
+    @pytest.mark.asyncio
+    async def test_price_update_reaches_every_worker(self):
+        workers = await _workers(3)
+        for worker in workers:
+            worker.put("u1", "portfolio:a", ["AAPL"])
+            worker.put("u2", "portfolio:b", ["TSLA"])
+
+        report = await workers[0].bus.invalidate_dependencies("price_update", [price_dependency("AAPL")])
+        # The publisher is invalidated before the call returns
+        assert report["invalidated"] == {"metrics": 1}
+        assert ("u1", "portfolio:a") not in workers[0].cache
+
+        await _drain(workers)
+        for worker in workers:
+            assert set(worker.cache) == {("u2", "portfolio:b")}
+        assert workers[0].bus.get_stats()["skipped_own"] == 1
+        assert workers[1].bus.get_stats()["applied"] == 1
+        assert workers[1].bus.get_stats()["delivery_lag_ms"]["count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_user_invalidation_runs_every_workers_subscribers(self):
+        workers = await _workers(2)
+        dropped = []
+        for worker in workers:
+            worker.put("u1", "portfolio:a", ["AAPL"])
+            worker.put("u2", "portfolio:b", ["AAPL"])
+
+            async def forget(payload, name=worker.bus.worker_id):
+                dropped.append((name, payload["user_id"]))
+            worker.bus.subscribe(USER, "metrics", forget)
+
+        await workers[1].bus.invalidate_user("u1")
+        await _drain(workers)
+
+        assert sorted(dropped) == [("worker-0", "u1"), ("worker-1", "u1")]
+        for worker in workers:
+            assert set(worker.cache) == {("u2", "portfolio:b")}
+
+    @pytest.mark.asyncio
+    async def test_large_invalidations_are_split_into_notification_sized_messages(self):
+        workers = await _workers(2)
+        symbols = [f"SYM{i:04d}" for i in range(2000)]
+        for i, symbol in enumerate(symbols):
+            workers[1].put(f"u{i}", "portfolio", [symbol])
+
+        sent = []
+        transport = workers[0].bus.transport
+        original_send = transport.send
+
+        async def record(payload):
+            sent.append(payload)
+            await original_send(payload)
+        transport.send = record
+
+        await workers[0].bus.invalidate_dependencies("price_update", [price_dependency(s) for s in symbols])
+        await _drain(workers)
+
+        assert len(sent) > 1
+        assert all(len(message.encode()) <= MAX_PAYLOAD_BYTES for message in sent)
+        assert sum(len(json.loads(m)["payload"]["dependencies"]) for m in sent) == len(symbols)
+        assert workers[1].cache == {}
+        assert workers[0].bus.get_stats()["published"] == 1
+
+    @pytest.mark.asyncio
+    async def test_without_transport_invalidation_stays_local(self):
+        worker = Worker("solo")
+        await worker.bus.start()
+        worker.put("u1", "portfolio:a", ["AAPL"])
+
+        report = await worker.bus.invalidate_dependencies("price_update", [price_dependency("AAPL")])
+        assert report["matched_entries"] == 1 and worker.cache == {}
+        stats = worker.bus.get_stats()
+        assert stats["connected"] is False and stats["sent"] == 0
+
+    @pytest.mark.asyncio
+    async def test_failing_subscriber_does_not_block_the_others(self):
+        workers = await _workers(2)
+        calls = []
+
+        async def broken(payload):
+            raise RuntimeError("boom")
+
+        async def ok(payload):
+            calls.append(payload["user_id"])
+
+        workers[1].bus.subscribe(USER, "broken", broken)
+        workers[1].bus.subscribe(USER, "ok", ok)
+        await workers[0].bus.invalidate_user("u1")
+        await _drain(workers)
+
+        assert calls == ["u1"]
+        assert workers[1].bus.get_stats()["handler_errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_stopped_worker_no_longer_receives(self):
+        workers = await _workers(2)
+        workers[1].put("u1", "portfolio:a", ["AAPL"])
+        await workers[1].bus.stop()
+
+        await workers[0].bus.invalidate_dependencies("price_update", [price_dependency("AAPL")])
+        await _drain(workers)
+        assert ("u1", "portfolio:a") in workers[1].cache
+        assert DEPENDENCIES in workers[0].bus.get_stats()["subscribers"]
+
+
+# ============================================================================
+# Service wiring
+# ============================================================================
+
+@pytest.mark.asyncio
+async def test_metrics_manager_drops_user_state_on_remote_invalidation(make_portfolio_metrics):
+    from services.invalidation_bus import invalidation_bus
+    from services.portfolio_metrics_manager import PortfolioMetricsManager
+
+    manager = PortfolioMetricsManager()
+    metrics = make_portfolio_metrics()
+    await manager._set_cached_metrics(metrics.user_id, "portfolio", {}, metrics)
+    assert await manager._get_cached_metrics(metrics.user_id, "portfolio", {}) is not None
+
+    # A transaction edit on another worker
+    message = json.dumps({"origin": "other-worker", "kind": USER, "sent_at": 0, "payload": {"user_id": metrics.user_id}})
+    await invalidation_bus._receive(message)
+
+    assert await manager._get_cached_metrics(metrics.user_id, "portfolio", {}) is None
+
+
+@pytest.mark.asyncio
+async def test_price_update_skips_symbols_another_worker_is_filling(monkeypatch):
+    import utils.distributed_lock as distributed_lock
+    from services.price_manager import PriceManager
+    from utils.distributed_lock import LeaseLockService, LocalLeaseStore
+
+    store = LocalLeaseStore()
+    monkeypatch.setattr(distributed_lock, "lease_locks", LeaseLockService(store, holder_id="worker-1"))
+    other_worker = LeaseLockService(store, holder_id="worker-2")
+    lease = await other_worker.acquire("price_update:AAPL", ttl_seconds=60, max_wait_seconds=0)
+
+    manager = PriceManager()
+    manager._multi_worker = True
+    checked = []
+
+    async def last_price_date(symbol, user_token):
+        checked.append(symbol)
+        return None
+
+    monkeypatch.setattr(manager, "_get_last_price_date", last_price_date)
+    results = await manager.update_prices_with_session_check(["AAPL", "MSFT"], user_token="token")
+
+    assert checked == ["MSFT"]
+    assert results["symbols_in_progress"] == 1
+    await lease.release()
+    assert not await distributed_lock.lease_locks.is_locked("price_update:MSFT")
+
+
+@pytest.mark.asyncio
+async def test_price_update_proceeds_when_the_lease_store_fails(monkeypatch):
+    import utils.distributed_lock as distributed_lock
+    from services.price_manager import PriceManager
+    from utils.distributed_lock import LeaseLockService, LocalLeaseStore
+
+    store = LocalLeaseStore()
+
+    async def unavailable(*args):
+        raise RuntimeError("function acquire_lease_lock does not exist")
+
+    store.try_acquire = unavailable
+    monkeypatch.setattr(distributed_lock, "lease_locks", LeaseLockService(store, holder_id="worker-1"))
+
+    manager = PriceManager()
+    manager._multi_worker = True
+    checked = []
+
+    async def last_price_date(symbol, user_token):
+        checked.append(symbol)
+        return None
+
+    monkeypatch.setattr(manager, "_get_last_price_date", last_price_date)
+    results = await manager.update_prices_with_session_check(["AAPL", "MSFT"], user_token="token")
+
+    assert checked == ["AAPL", "MSFT"]
+    assert results["symbols_in_progress"] == 0
+
+
+def test_invalidation_stats_endpoint_requires_admin(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    import supa_api.supa_api_auth as auth
+    from backend_api_routes.backend_api_dashboard import dashboard_router
+
+    app = FastAPI()
+    app.include_router(dashboard_router)
+    app.dependency_overrides[auth.require_authenticated_user] = lambda: {"id": "user-1", "app_metadata": {}}
+    client = TestClient(app)
+
+    assert client.get("/api/debug/invalidation").status_code == 403
+    monkeypatch.setattr(auth, "ADMIN_USER_IDS", frozenset({"user-1"}))
+    assert client.get("/api/debug/invalidation").status_code == 200
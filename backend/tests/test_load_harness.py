@@ -0,0 +1,105 @@
+"""
+Tests for the load-test fakes, driven through the real supabase client
+"""
+
+import json
+from datetime import date
+from urllib.request import urlopen
+
+import pytest
+from postgrest.exceptions import APIError
+from supabase import create_client
+
+from benchmarks.loadtest.fake_alpha_vantage import FakeAlphaVantage
+from benchmarks.loadtest.fake_postgrest import FakePostgrest
+from benchmarks.loadtest.synthetic import SyntheticUser, make_token, price_history
+
+
+@pytest.fixture
+def backend():
+    store = FakePostgrest()
+    url = store.start()
+    yield store, create_client(url, make_token("service", "service@example.com"))
+    store.stop()
+
+
+def test_select_filters_order_and_range(backend):
+    store, client = backend
+    store.seed("historical_prices", [
+        {"symbol": symbol, "date": f"2024-01-0{day}", "close": day * 10.0}
+        for symbol in ("AAPL", "MSFT") for day in range(1, 6)
+    ])
+
+    rows = (
+        client.table("historical_prices").select("date, close")
+        .eq("symbol", "AAPL").gte("date", "2024-01-02").order("date", desc=True).limit(2).execute().data
+    )
+    assert rows == [{"date": "2024-01-05", "close": 50.0}, {"date": "2024-01-04", "close": 40.0}]
+
+    symbols = client.table("historical_prices").select("symbol").in_("symbol", ["MSFT", "TSLA"]).execute().data
+    assert len(symbols) == 5 and {row["symbol"] for row in symbols} == {"MSFT"}
+
+
+def test_upsert_on_conflict_and_single(backend):
+    store, client = backend
+    client.table("user_profiles").upsert({"user_id": "u1", "base_currency": "USD"}, on_conflict="user_id").execute()
+    client.table("user_profiles").upsert({"user_id": "u1", "base_currency": "EUR"}, on_conflict="user_id").execute()
+
+    row = client.table("user_profiles").select("*").eq("user_id", "u1").single().execute().data
+    assert row["base_currency"] == "EUR"
+    assert len(store.tables["user_profiles"]) == 1
+
+    with pytest.raises(APIError):
+        client.table("user_profiles").select("*").eq("user_id", "missing").single().execute()
+
+
+def test_index_sees_rows_written_after_a_read(backend):
+    store, client = backend
+    store.seed("transactions", [{"user_id": "u1", "symbol": "AAPL"}])
+    assert len(client.table("transactions").select("*").eq("user_id", "u1").execute().data) == 1
+
+    client.table("transactions").insert({"user_id": "u1", "symbol": "MSFT"}).execute()
+    client.table("transactions").delete().eq("symbol", "AAPL").execute()
+
+    rows = client.table("transactions").select("symbol").eq("user_id", "u1").execute().data
+    assert rows == [{"symbol": "MSFT"}]
+
+
+def test_lease_lock_rpcs(backend):
+    _, client = backend
+    first = client.rpc("acquire_lease_lock", {"p_lock_name": "job", "p_holder": "a", "p_ttl_seconds": 60}).execute().data
+    second = client.rpc("acquire_lease_lock", {"p_lock_name": "job", "p_holder": "b", "p_ttl_seconds": 60}).execute().data
+    assert first[0]["fencing_token"] is not None
+    assert second[0]["fencing_token"] is None
+
+    released = client.rpc("release_lease_lock", {
+        "p_lock_name": "job", "p_holder": "a", "p_fencing_token": first[0]["fencing_token"],
+    }).execute().data
+    assert released is True
+
+
+def test_auth_user_resolves_synthetic_token(backend):
+    store, client = backend
+    user = SyntheticUser(0, 10, date(2024, 6, 3))
+    store.add_user(user.id, user.email)
+
+    response = client.auth.get_user(user.token)
+    assert response.user.id == user.id
+
+
+def test_alpha_vantage_quote_matches_price_model_and_quota():
+    end = date(2024, 6, 3)
+    vantage = FakeAlphaVantage(calls_per_day=1, end=end)
+    url = vantage.start()
+    try:
+        with urlopen(f"{url}?function=GLOBAL_QUOTE&symbol=AAPL&apikey=x") as response:
+            quote = json.loads(response.read())["Global Quote"]
+        with urlopen(f"{url}?function=GLOBAL_QUOTE&symbol=AAPL&apikey=x") as response:
+            throttled = json.loads(response.read())
+    finally:
+        vantage.stop()
+
+    assert float(quote["05. price"]) == pytest.approx(price_history("AAPL", end)[-1][1])
+    assert quote["07. latest trading day"] == "2024-06-03"
+    assert "Note" in throttled
+    assert vantage.get_stats()["throttled"] == 1
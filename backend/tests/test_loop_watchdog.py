@@ -0,0 +1,122 @@
+"""
+Tests for the event loop blocking detector
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from utils.loop_watchdog import LoopWatchdog
+
+# A "library" function whose frames live outside the backend tree
+_library = {"__name__": "fakelib"}
+exec(compile(
+    "import time\n"
+    "def execute(seconds):\n"
+    "    deadline = time.monotonic() + seconds\n"
+    "    while time.monotonic() < deadline:\n"
+    "        pass\n",
+    "/usr/lib/python3/fakelib.py", "exec",
+), _library)
+
+
+def blocking_sleep(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+def sync_query(seconds: float) -> None:
+    _library["execute"](seconds)
+
+
+async def run_watched(watchdog: LoopWatchdog, *blocks) -> None:
+    await watchdog.start()
+    try:
+        await asyncio.sleep(0.05)
+        for block, seconds in blocks:
+            block(seconds)
+            await asyncio.sleep(0.1)
+    finally:
+        await watchdog.stop()
+
+
+@pytest.mark.asyncio
+async def test_stall_is_attributed_to_the_blocking_function():
+    watchdog = LoopWatchdog(threshold_ms=50)
+    await run_watched(watchdog, (blocking_sleep, 0.3))
+
+    report = watchdog.get_report()
+    assert report["blocks"] == 1
+    site = report["sites"][0]
+    assert site["site"].endswith("blocking_sleep")
+    assert site["count"] == 1
+    assert 250 <= site["max_blocked_ms"] < 1000
+    assert report["recent"][0]["site"] == site["site"]
+
+
+@pytest.mark.asyncio
+async def test_library_frames_are_skipped_but_reported():
+    watchdog = LoopWatchdog(threshold_ms=50)
+    await run_watched(watchdog, (sync_query, 0.3))
+
+    site = watchdog.get_report()["sites"][0]
+    assert site["site"].endswith("sync_query")
+    assert "fakelib.execute" in site["blocked_in"]
+    assert any("fakelib.execute" in line for line in site["stack"])
+
+
+@pytest.mark.asyncio
+async def test_sites_are_ranked_by_total_blocked_time():
+    watchdog = LoopWatchdog(threshold_ms=50)
+    await run_watched(watchdog, (blocking_sleep, 0.15), (sync_query, 0.4), (blocking_sleep, 0.15))
+
+    report = watchdog.get_report()
+    assert report["blocks"] == 3
+    sites = report["sites"]
+    assert [s["site"].rsplit(".", 1)[-1] for s in sites] == ["sync_query", "blocking_sleep"]
+    assert sites[1]["count"] == 2
+
+    families = {family.name: family for family in watchdog.collect_metrics()}
+    assert families["event_loop_blocks_total"].samples == [({}, 3)]
+
+    watchdog.reset()
+    assert watchdog.get_report()["sites"] == []
+
+
+@pytest.mark.asyncio
+async def test_awaiting_does_not_count_as_blocking():
+    watchdog = LoopWatchdog(threshold_ms=50)
+    await watchdog.start()
+    try:
+        await asyncio.sleep(0.3)
+        await asyncio.to_thread(time.sleep, 0.2)
+    finally:
+        await watchdog.stop()
+
+    report = watchdog.get_report()
+    assert report["blocks"] == 0 and report["sites"] == []
+
+
+@pytest.mark.asyncio
+async def test_disabled_watchdog_does_not_start():
+    watchdog = LoopWatchdog(enabled=False)
+    await watchdog.start()
+    assert watchdog.get_report()["running"] is False
+    await watchdog.stop()
+
+
+def test_event_loop_report_requires_admin(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    import supa_api.supa_api_auth as auth
+    from backend_api_routes.backend_api_dashboard import dashboard_router
+
+    app = FastAPI()
+    app.include_router(dashboard_router)
+    app.dependency_overrides[auth.require_authenticated_user] = lambda: {"id": "user-1", "app_metadata": {}}
+    client = TestClient(app)
+
+    assert client.get("/api/debug/event-loop").status_code == 403
+    monkeypatch.setattr(auth, "ADMIN_USER_IDS", frozenset({"user-1"}))
+    assert client.get("/api/debug/event-loop").status_code == 200
@@ -0,0 +1,155 @@
+"""
+Tests for the in-process metrics registry and /metrics endpoint
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from utils.metrics import (
+    ALPHA_VANTAGE_REQUESTS,
+    BACKGROUND_JOB_DURATION,
+    EVENT_LOOP_LAG,
+    HTTP_REQUEST_DB_ROUND_TRIPS,
+    EventLoopLagProbe,
+    MetricFamily,
+    MetricsRegistry,
+    begin_request_metrics,
+    cache_families,
+    finish_request_metrics,
+    record_alpha_vantage_call,
+    record_outbound_call,
+    route_template,
+    timed_job,
+)
+
+
+def test_render_uses_prometheus_text_format():
+    registry = MetricsRegistry()
+    registry.counter("jobs_total", "Jobs run", ("queue",)).labels(queue='a"b').inc(2)
+    registry.gauge("queue_depth", "Items waiting").set(3.5)
+    histogram = registry.histogram("duration_seconds", "Duration", buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value)
+
+    text = registry.render()
+
+    assert "# TYPE jobs_total counter" in text
+    assert 'jobs_total{queue="a\\"b"} 2' in text
+    assert "queue_depth 3.5" in text
+    assert 'duration_seconds_bucket{le="0.1"} 1' in text
+    assert 'duration_seconds_bucket{le="1"} 2' in text
+    assert 'duration_seconds_bucket{le="+Inf"} 3' in text
+    assert "duration_seconds_count 3" in text
+
+
+def test_metrics_are_get_or_create_and_reject_conflicts():
+    registry = MetricsRegistry()
+    counter = registry.counter("calls_total", "Calls", ("target",))
+    assert registry.counter("calls_total", "Calls", ("target",)) is counter
+
+    with pytest.raises(ValueError):
+        registry.gauge("calls_total", "Calls", ("target",))
+    with pytest.raises(ValueError):
+        counter.inc()
+
+
+def test_collectors_are_merged_and_failures_skipped():
+    registry = MetricsRegistry()
+    registry.register_collector(lambda: cache_families("memory", hits=3, misses=1, evictions=2))
+    registry.register_collector(lambda: cache_families("complete", hits=5, misses=0))
+    registry.register_collector(lambda: 1 / 0)
+    registry.register_collector(lambda: [MetricFamily("up", "gauge", "Up", [({}, 1)])])
+
+    text = registry.render()
+
+    assert text.count("# TYPE cache_requests_total counter") == 1
+    assert 'cache_requests_total{tier="memory",result="hit"} 3' in text
+    assert 'cache_requests_total{tier="complete",result="hit"} 5' in text
+    assert 'cache_evictions_total{tier="memory"} 2' in text
+    assert "up 1" in text
+
+
+def test_alpha_vantage_outcomes():
+    before = {
+        outcome: ALPHA_VANTAGE_REQUESTS.labels("TEST_FUNCTION", outcome).value
+        for outcome in ("ok", "throttled", "error")
+    }
+    record_alpha_vantage_call("TEST_FUNCTION", {"Global Quote": {}})
+    record_alpha_vantage_call("TEST_FUNCTION", {"Note": "5 calls per minute"})
+    record_alpha_vantage_call("TEST_FUNCTION", {"Information": "daily limit"})
+    record_alpha_vantage_call("TEST_FUNCTION", {"Error Message": "Invalid API call"})
+    record_alpha_vantage_call("TEST_FUNCTION", None)
+
+    after = {outcome: ALPHA_VANTAGE_REQUESTS.labels("TEST_FUNCTION", outcome).value for outcome in before}
+    assert {outcome: after[outcome] - before[outcome] for outcome in before} == {"ok": 1, "throttled": 2, "error": 2}
+
+
+@pytest.mark.asyncio
+async def test_db_round_trips_count_against_the_current_request():
+    route = "/api/test-round-trips"
+    record_outbound_call("supabase.db", True)  # outside any request
+
+    counter, token = begin_request_metrics()
+    record_outbound_call("supabase.db", True)
+    await asyncio.to_thread(record_outbound_call, "supabase.rpc", True)
+    record_outbound_call("supabase.auth", False)
+    finish_request_metrics(counter, token, "GET", route, 200, 0.01)
+
+    assert counter == [2]
+    histogram = HTTP_REQUEST_DB_ROUND_TRIPS.labels(route)
+    assert histogram.count == 1 and histogram.sum == 2
+
+
+@pytest.mark.asyncio
+async def test_timed_job_records_status():
+    with timed_job("test_job"):
+        await asyncio.sleep(0)
+    with pytest.raises(RuntimeError):
+        with timed_job("test_job"):
+            raise RuntimeError("boom")
+
+    assert BACKGROUND_JOB_DURATION.labels("test_job", "ok").count == 1
+    assert BACKGROUND_JOB_DURATION.labels("test_job", "error").count == 1
+
+
+def test_route_template_falls_back_to_unmatched():
+    class Route:
+        path = "/api/quote/{symbol}"
+
+    assert route_template({"route": Route()}) == "/api/quote/{symbol}"
+    assert route_template({}) == "unmatched"
+
+
+@pytest.mark.asyncio
+async def test_lag_probe_sees_a_blocked_loop():
+    probe = EventLoopLagProbe(interval=0.01)
+    samples_before = EVENT_LOOP_LAG.labels().count
+    await probe.start()
+    try:
+        await asyncio.sleep(0.02)
+        time.sleep(0.1)  # block the loop
+        await asyncio.sleep(0.03)
+    finally:
+        await probe.stop()
+
+    assert probe.max_lag >= 0.05
+    assert EVENT_LOOP_LAG.labels().count > samples_before
+
+
+def test_metrics_endpoint(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+
+    client = TestClient(main.app)
+    client.get("/")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'http_request_duration_seconds_count{method="GET",route="/",status="2xx"}' in response.text
+
+    monkeypatch.setattr(main, "METRICS_AUTH_TOKEN", "secret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer secret"}).status_code == 200
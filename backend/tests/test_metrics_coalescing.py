@@ -0,0 +1,139 @@
+"""
+Tests for per-user coalescing of concurrent portfolio metrics requests
+"""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from services.portfolio_metrics_manager import MetricsCacheStatus, PortfolioMetricsManager
+
+
+@pytest.fixture
+def manager(monkeypatch, make_portfolio_metrics):
+    """Manager whose calculation is a slow fake and whose caches always miss"""
+    manager = PortfolioMetricsManager()
+    manager.calculations = []
+    manager.stored = []
+    manager.release = asyncio.Event()
+
+    async def fake_calculate(user_id, user_token, metric_type, params):
+        manager.calculations.append((user_id, metric_type, dict(params)))
+        await manager.release.wait()
+        if params.get("fail"):
+            raise RuntimeError("price feed down")
+        return make_portfolio_metrics()
+
+    async def miss(*args, **kwargs):
+        return None
+
+    async def no_store(user_id, metric_type, params, metrics):
+        manager.stored.append((user_id, metric_type))
+
+    monkeypatch.setattr(manager, "_calculate_metrics", fake_calculate)
+    monkeypatch.setattr(manager, "_get_cached_metrics", miss)
+    monkeypatch.setattr(manager, "_set_cached_metrics", no_store)
+    return manager
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class TestMetricsCoalescing:
+    @pytest.mark.asyncio
+    async def test_dashboard_burst_shares_one_calculation(self, manager):
+        requests = [
+            asyncio.create_task(manager.get_portfolio_metrics("user-1", "token", metric_type=metric_type))
+            for metric_type in ("portfolio", "allocation", "analytics_summary")
+        ]
+        await _settle()
+        manager.release.set()
+        results = await asyncio.gather(*requests)
+
+        assert len(manager.calculations) == 1
+        assert manager.get_hub_stats() == {"computations": 1, "coalesced": 2, "stale_discarded": 0, "in_flight": 0}
+        # Projections are separate objects over the same data
+        assert len({id(r) for r in results}) == 3
+        assert {r.content_hash for r in results} == {results[0].content_hash}
+        results[0].cache_status = MetricsCacheStatus.STALE
+        assert results[1].cache_status == MetricsCacheStatus.MISS
+
+    @pytest.mark.asyncio
+    async def test_different_users_and_inputs_are_not_shared(self, manager):
+        requests = [
+            asyncio.create_task(manager.get_portfolio_metrics("user-1", "t")),
+            asyncio.create_task(manager.get_portfolio_metrics("user-2", "t")),
+            asyncio.create_task(manager.get_portfolio_metrics("user-1", "t", params={"range": "1Y"})),
+        ]
+        await _settle()
+        manager.release.set()
+        await asyncio.gather(*requests)
+        assert len(manager.calculations) == 3
+
+    @pytest.mark.asyncio
+    async def test_cancelled_requester_does_not_cancel_others(self, manager):
+        first = asyncio.create_task(manager.get_portfolio_metrics("user-1", "t", metric_type="portfolio"))
+        second = asyncio.create_task(manager.get_portfolio_metrics("user-1", "t", metric_type="allocation"))
+        await _settle()
+        first.cancel()
+        await _settle()
+        manager.release.set()
+
+        assert (await second).user_id == "user-1"
+        assert len(manager.calculations) == 1
+
+    @pytest.mark.asyncio
+    async def test_failure_reaches_every_requester(self, manager):
+        requests = [
+            asyncio.create_task(manager.get_portfolio_metrics("user-1", "t", params={"fail": True}))
+            for _ in range(2)
+        ]
+        await _settle()
+        manager.release.set()
+        results = await asyncio.gather(*requests, return_exceptions=True)
+        assert all(isinstance(r, HTTPException) for r in results)
+        assert len(manager.calculations) == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidation_detaches_running_calculation(self, manager):
+        before = asyncio.create_task(manager.get_portfolio_metrics("user-1", "t"))
+        await _settle()
+        manager._forget_inflight("user-1")
+        after = asyncio.create_task(manager.get_portfolio_metrics("user-1", "t"))
+        await _settle()
+        manager.release.set()
+        await asyncio.gather(before, after)
+        assert len(manager.calculations) == 2
+
+    @pytest.mark.asyncio
+    async def test_results_invalidated_during_calculation_are_not_cached(self, manager):
+        before = asyncio.create_task(manager.get_portfolio_metrics("user-1", "t", metric_type="portfolio"))
+        joined = asyncio.create_task(manager.get_portfolio_metrics("user-1", "t", metric_type="allocation"))
+        await _settle()
+        manager._forget_inflight("user-1")
+        after = asyncio.create_task(manager.get_portfolio_metrics("user-1", "t", metric_type="analytics"))
+        await _settle()
+        manager.release.set()
+        await asyncio.gather(before, joined, after)
+
+        # The requesters still get an answer, but only the post-invalidation run is cached
+        assert manager.stored == [("user-1", "analytics")]
+        assert manager.get_hub_stats()["stale_discarded"] == 2
+
+    @pytest.mark.asyncio
+    async def test_force_refresh_does_not_join_in_flight_run(self, manager):
+        first = asyncio.create_task(manager.get_portfolio_metrics("user-1", "t"))
+        await _settle()
+        forced = asyncio.create_task(manager.get_portfolio_metrics("user-1", "t", force_refresh=True))
+        await _settle()
+        # Later requests join the forced run rather than the older one
+        joined = asyncio.create_task(manager.get_portfolio_metrics("user-1", "t"))
+        await _settle()
+        manager.release.set()
+        await asyncio.gather(first, forced, joined)
+
+        assert len(manager.calculations) == 2
+        assert manager.get_hub_stats()["coalesced"] == 1
@@ -0,0 +1,110 @@
+"""
+Tests for the shares-at-date position index and its dividend callers
+"""
+
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+from services.position_history import PositionHistory
+
+
+def _ledger(count=300, seed=11):
+    rng = random.Random(seed)
+    start = date(2022, 1, 3)
+    transactions = []
+    for _ in range(count):
+        transactions.append({
+            "symbol": rng.choice(["AAPL", "MSFT", "VTI"]),
+            "date": (start + timedelta(days=rng.randrange(700))).isoformat(),
+            "transaction_type": rng.choice(["BUY", "Buy", "BUY", "SELL", "Sell", "DIVIDEND"]),
+            "quantity": f"{rng.randrange(1, 50)}.{rng.randrange(100):02d}",
+        })
+    return transactions
+
+
+def _brute_force(transactions, symbol, as_of):
+    total = Decimal("0")
+    for txn in transactions:
+        if txn["symbol"] != symbol or date.fromisoformat(txn["date"]) > as_of:
+            continue
+        if txn["transaction_type"].upper() == "BUY":
+            total += Decimal(txn["quantity"])
+        elif txn["transaction_type"].upper() == "SELL":
+            total -= Decimal(txn["quantity"])
+    return max(Decimal("0"), total)
+
+
+def test_shares_at_matches_linear_scan():
+    transactions = _ledger()
+    positions = PositionHistory(transactions)
+    day = date(2021, 12, 25)
+    while day <= date(2024, 1, 10):
+        for symbol in ("AAPL", "MSFT", "VTI", "NONE"):
+            assert positions.shares_at(symbol, day) == _brute_force(transactions, symbol, day), (symbol, day)
+        day += timedelta(days=3)
+
+
+def test_same_day_transactions_and_input_types():
+    positions = PositionHistory([
+        {"symbol": "X", "date": "2024-01-02", "transaction_type": "BUY", "quantity": 10},
+        {"symbol": "X", "date": "2024-01-02", "transaction_type": "SELL", "quantity": 4},
+        {"symbol": "X", "date": "2024-01-01", "transaction_type": "DIVIDEND", "quantity": 99},
+    ])
+    assert positions.shares_at("X", "2024-01-01") == 0
+    assert positions.shares_at("X", date(2024, 1, 2)) == 6
+    assert positions.current_shares("X") == 6
+    assert positions.first_date("X") == date(2024, 1, 1)
+    assert positions.first_date("Y") is None
+    assert positions.symbols == ["X"]
+
+
+def test_oversold_positions_are_clamped_to_zero():
+    positions = PositionHistory([
+        {"symbol": "X", "date": "2024-01-01", "transaction_type": "SELL", "quantity": 5},
+        {"symbol": "X", "date": "2024-01-03", "transaction_type": "BUY", "quantity": 8},
+    ])
+    assert positions.shares_at("X", "2024-01-02") == 0
+    assert positions.current_shares("X") == 3
+
+
+@pytest.mark.asyncio
+async def test_symbol_sync_fetches_transactions_once(monkeypatch):
+    from services.dividend_service import dividend_service
+    import supa_api.supa_api_transactions as transactions_api
+
+    transactions = [
+        {"symbol": "KO", "date": "2023-01-05", "transaction_type": "BUY", "quantity": 10},
+        {"symbol": "KO", "date": "2023-06-01", "transaction_type": "SELL", "quantity": 4},
+    ]
+    fetches = []
+
+    async def fake_transactions(user_id, limit=1000, user_token=None, **kwargs):
+        fetches.append(user_id)
+        return transactions
+
+    async def fake_dividends(symbol):
+        return [{"ex_date": f"2023-{month:02d}-15", "amount": "0.46"} for month in range(1, 13)]
+
+    async def fake_upsert(**kwargs):
+        return True
+
+    assigned = []
+
+    async def fake_create(user_id, dividend, shares_held, total_amount):
+        assigned.append((dividend["ex_date"], shares_held, total_amount))
+        return True
+
+    monkeypatch.setattr(transactions_api, "supa_api_get_user_transactions", fake_transactions)
+    monkeypatch.setattr(dividend_service, "_fetch_dividends_from_alpha_vantage", fake_dividends)
+    monkeypatch.setattr(dividend_service, "_upsert_global_dividend_fixed", fake_upsert)
+    monkeypatch.setattr(dividend_service, "_create_user_dividend_record", fake_create)
+
+    result = await dividend_service.sync_dividends_for_symbol("user-1", "KO", "token")
+
+    assert result["success"] and result["dividends_assigned"] == 12
+    assert fetches == ["user-1"]
+    shares = {ex_date: held for ex_date, held, _ in assigned}
+    assert shares["2023-01-15"] == 10 and shares["2023-06-15"] == 6
@@ -0,0 +1,154 @@
+"""
+Tests for opt-in per-request profiling
+"""
+
+import asyncio
+
+import pytest
+
+import utils.request_profiler as request_profiler_module
+from benchmarks.loadtest.server import StubServer, json_response
+from utils.request_profiler import RequestProfiler, aiohttp_trace_configs
+
+
+@pytest.fixture
+def profiler():
+    return RequestProfiler(enabled=True)
+
+
+def test_should_profile_requires_enabled_and_opt_in():
+    assert RequestProfiler(enabled=False).should_profile("1") == (False, None)
+
+    profiler = RequestProfiler(enabled=True)
+    assert profiler.should_profile(None) == (False, None)
+    assert profiler.should_profile("1") == (True, None)
+    assert profiler.should_profile("cprofile") == (True, "cprofile")
+    assert RequestProfiler(enabled=True, sample_rate=1.0).should_profile(None) == (True, None)
+
+
+def test_stage_is_a_noop_outside_a_profiled_request(profiler):
+    with profiler.stage("anything"):
+        pass
+    with profiler.call("alpha_vantage"):
+        pass
+    assert profiler.current() is None
+    assert profiler.get_recent() == []
+
+
+@pytest.mark.asyncio
+async def test_stages_from_concurrent_tasks_land_in_one_profile(profiler):
+    @profiler.profiled("prices.read")
+    async def read_prices():
+        await asyncio.sleep(0.01)
+
+    @profiler.profiled("dividends")
+    def dividends():
+        return 1
+
+    profile, token = profiler.begin("GET", "/api/portfolio")
+    profile.user_id = "user-1"
+    with profiler.stage("metrics.calculate"):
+        await asyncio.gather(read_prices(), read_prices(), asyncio.to_thread(dividends))
+    with profiler.call("alpha_vantage"):
+        pass
+    profiler.finish(profile, token, 200)
+
+    summary = profile.summary()
+    assert summary["stages"]["prices.read"]["count"] == 2
+    assert summary["stages"]["dividends"]["count"] == 1
+    assert summary["stages"]["metrics.calculate"]["total_ms"] >= 10
+    assert summary["external_api_calls"] == 1
+    assert profiler.current() is None
+
+    header = profile.server_timing()
+    assert header.startswith("total;dur=")
+    assert 'alpha_vantage;desc="1 calls"' in header and 'prices.read;desc="x2"' in header
+
+    assert [p["id"] for p in profiler.get_recent(user_id="user-1")] == [profile.id]
+    assert profiler.get_recent(user_id="someone-else") == []
+    timeline = profiler.get(profile.id, user_id="user-1")["timeline"]
+    assert sorted(stage["name"] for stage in timeline) == [
+        "dividends", "metrics.calculate", "prices.read", "prices.read",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_code_profile_is_attached(profiler):
+    async def handler():
+        return sum(range(1000))
+
+    profile, token = profiler.begin("GET", "/api/complete", "cprofile")
+    assert await profiler.run(profile, handler) == sum(range(1000))
+    profiler.finish(profile, token, 200)
+
+    assert "function calls" in profile.code_profile
+
+
+def test_supabase_round_trips_are_counted_at_the_transport(profiler, monkeypatch):
+    import httpx
+
+    server = StubServer(lambda method, path, query, headers, body: json_response(200, [])).start()
+    monkeypatch.setattr(request_profiler_module, "_SUPABASE_HOST", server.url.removeprefix("http://"))
+    try:
+        profile, token = profiler.begin("GET", "/api/allocation")
+        with httpx.Client(base_url=server.url) as client:
+            client.get("/rest/v1/transactions")
+            client.post("/rest/v1/rpc/acquire_lease_lock")
+            client.get("/auth/v1/user")
+        profiler.finish(profile, token, 200)
+
+        with httpx.Client(base_url=server.url) as client:
+            client.get("/rest/v1/transactions")
+    finally:
+        server.stop()
+
+    summary = profile.summary()
+    assert summary["db_round_trips"] == 2
+    assert summary["calls"]["supabase.auth"]["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_aiohttp_trace_config_counts_external_calls(profiler):
+    import aiohttp
+
+    server = StubServer(lambda method, path, query, headers, body: json_response(200, {})).start()
+    try:
+        async with aiohttp.ClientSession(trace_configs=aiohttp_trace_configs()) as session:
+            profile, token = profiler.begin("GET", "/api/analytics/summary")
+            for _ in range(2):
+                async with session.get(f"{server.url}/query") as response:
+                    await response.read()
+            profiler.finish(profile, token, 200)
+
+            async with session.get(f"{server.url}/query") as response:
+                await response.read()
+    finally:
+        server.stop()
+
+    assert profile.summary()["calls"]["alpha_vantage"]["count"] == 2
+    assert profile.summary()["external_api_calls"] == 2
+
+
+def test_toggle_profiling_is_admin_only_and_explicit(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    import backend_api_routes.backend_api_dashboard as dashboard
+    import supa_api.supa_api_auth as auth
+
+    local = RequestProfiler(enabled=False)
+    monkeypatch.setattr(dashboard, "request_profiler", local)
+    app = FastAPI()
+    app.include_router(dashboard.dashboard_router)
+    app.dependency_overrides[auth.require_authenticated_user] = lambda: {"id": "user-1", "app_metadata": {}}
+    client = TestClient(app)
+
+    assert client.post("/api/debug/toggle-profiling", params={"enabled": True}).status_code == 403
+    assert local.enabled is False
+
+    monkeypatch.setattr(auth, "ADMIN_USER_IDS", frozenset({"user-1"}))
+    assert client.post("/api/debug/toggle-profiling", params={"enabled": True}).json()["profiling_enabled"]
+    # Changing only the rates leaves profiling on
+    response = client.post("/api/debug/toggle-profiling", params={"sample_rate": 0.5}).json()
+    assert response["profiling_enabled"] and response["sample_rate"] == 0.5
+    assert not client.post("/api/debug/toggle-profiling", params={"enabled": False}).json()["profiling_enabled"]
@@ -0,0 +1,214 @@
+"""
+Tests for the TWR / Modified Dietz returns engine
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+from services.cache_dependency_index import cache_dependency_index, transactions_dependency
+from services.returns_engine import (
+    RANGE_KEYS,
+    ReturnsEngine,
+    ReturnsSeries,
+    annualize,
+    external_flows,
+    sub_period_returns,
+)
+from utils.fixed_point import PRICE_SCALE, to_fixed
+
+D = [date(2024, 1, 1) + timedelta(days=i) for i in range(10)]
+
+
+def _txn(day, symbol, transaction_type, quantity, price, **extra):
+    return {"date": day.isoformat(), "symbol": symbol, "transaction_type": transaction_type,
+            "quantity": quantity, "price": price, **extra}
+
+
+class TestFlows:
+    def test_buys_sells_dividends_and_commission(self):
+        flows = external_flows([
+            _txn(D[0], "AAPL", "BUY", 10, "100", commission="1.5"),
+            _txn(D[0], "MSFT", "Buy", 1, "50"),
+            _txn(D[2], "AAPL", "SELL", 4, "110", commission=1),
+            _txn(D[3], "AAPL", "DIVIDEND", 0, "0", total_value="3.20"),
+            _txn(D[4], "AAPL", "SPLIT", 2, "0"),
+        ])
+        assert flows == [
+            (D[0], to_fixed("1051.5")),
+            (D[2], to_fixed("-439")),
+            (D[3], to_fixed("-3.2")),
+        ]
+
+    def test_amount_invested_takes_precedence(self):
+        assert external_flows([_txn(D[0], "X", "BUY", 3, "10", amount_invested="31.25")]) == [(D[0], to_fixed("31.25"))]
+
+
+class TestSeries:
+    def test_deposit_is_not_performance(self):
+        # 1000 grows 10%, then 5000 more is bought at the close
+        series = ReturnsSeries.from_values(D[:3], [1000, 1100, 6100], [(D[0], 1000), (D[2], 5000)])
+        assert series.twr() == pytest.approx(0.10)
+        raw = 6100 / 1000 - 1
+        assert raw == pytest.approx(5.1)
+
+    def test_twr_chains_sub_periods_and_ignores_timing(self):
+        # +10%, -10%, then a 9000 deposit at the close, then -10% on 9990
+        values = [1000, 1100, 990 + 9000, 8991]
+        series = ReturnsSeries.from_values(D[:4], values, [(D[0], 1000), (D[2], 9000)])
+        assert series.returns.tolist() == pytest.approx([0.0, 0.1, -0.1, -0.1])
+        assert series.twr() == pytest.approx(1.1 * 0.9 * 0.9 - 1)
+        # Modified Dietz is money-weighted: the loss on the big deposit dominates
+        dietz = series.modified_dietz()
+        assert dietz < series.twr()
+        gain = 8991 - 10000
+        assert dietz == pytest.approx(gain / (1000 * 1.0 + 9000 * 1 / 3))
+
+    def test_full_exit_and_reentry(self):
+        values = [1000, 1200, 0, 0, 500, 550]
+        flows = [(D[0], 1000), (D[2], -1250), (D[4], 500)]
+        series = ReturnsSeries.from_values(D[:6], values, flows)
+        expected = [0.0, 0.2, 1250 / 1200 - 1, 0.0, 0.0, 0.1]
+        assert series.returns.tolist() == pytest.approx(expected)
+
+    def test_flows_before_first_price_fold_into_opening(self):
+        series = ReturnsSeries.from_values(D[:4], [0, 0, 1000, 1010], [(D[0], 990)])
+        assert series.dates == D[2:4]
+        assert series.flow_units[0] == to_fixed(990)
+        assert series.twr() == pytest.approx(1010 / 990 - 1)
+
+    def test_period_uses_close_on_or_before_start(self):
+        values = [100, 110, 121, 133.1]
+        series = ReturnsSeries.from_values(D[:4], values, [(D[0], 100)])
+        assert series.twr(D[1], D[3]) == pytest.approx(0.21)
+        assert series.modified_dietz(D[1], D[3]) == pytest.approx(0.21)
+        summary = series.period_summary(D[1])
+        assert summary["start_date"] == D[1].isoformat()
+        assert summary["start_value"] == 110 and summary["end_value"] == pytest.approx(133.1)
+        assert summary["twr_pct"] == pytest.approx(21.0)
+        assert [d for d, _ in series.twr_series(D[1])] == D[2:4]
+
+    def test_empty_periods(self):
+        series = ReturnsSeries.from_values(D[:2], [100, 101], [(D[0], 100)])
+        assert series.twr(D[5]) is None and series.modified_dietz(D[5]) is None
+        assert series.period_summary(D[5])["twr"] is None
+        assert len(ReturnsSeries.from_values(D[:2], [0, 0])) == 0
+
+    def test_value_series_slices_and_skips_empty_days(self):
+        series = ReturnsSeries.from_values(D[:5], [100, 0, 0, 120, 130], [(D[0], 100), (D[1], -100), (D[3], 120)])
+        assert series.value_series() == [(D[0], Decimal("100")), (D[3], Decimal("120")), (D[4], Decimal("130"))]
+        assert series.value_series(D[1], D[3]) == [(D[3], Decimal("120"))]
+
+    def test_annualize_only_full_years(self):
+        assert annualize(0.21, 730) == pytest.approx(0.1)
+        assert annualize(0.05, 30) is None and annualize(None, 400) is None
+        series = ReturnsSeries.from_values([D[0], D[0] + timedelta(days=730)], [100, 121], [(D[0], 100)])
+        summary = series.period_summary()
+        assert summary["calendar_days"] == 730
+        assert summary["annualized_twr"] == pytest.approx(0.1)
+
+    def test_sub_period_returns_without_flows(self):
+        assert sub_period_returns([100, 105], [0, 0]).tolist() == pytest.approx([0.0, 0.05])
+
+
+class TestEngine:
+    def _ledger(self):
+        # Trades on weekdays at that day's close, so each flow meets its own price
+        start = date.today() - timedelta(days=400)
+        start -= timedelta(days=start.weekday())
+        transactions = [
+            _txn(start, "AAA", "BUY", 10, "100"),
+            _txn(start + timedelta(days=196), "AAA", "BUY", 10, "119.6"),
+            _txn(start + timedelta(days=301), "AAA", "SELL", 5, "130.1"),
+        ]
+        prices = {"AAA": {}}
+        day, price = start, Decimal("100")
+        while day <= date.today():
+            prices["AAA"][day] = to_fixed(price, PRICE_SCALE)
+            price += Decimal("0.1")
+            day += timedelta(days=1)
+        return transactions, prices
+
+    def test_all_ranges_from_one_series(self):
+        transactions, prices = self._ledger()
+        series = ReturnsEngine.build_series(transactions, prices, date.today())
+        summaries = series.range_summaries()
+        assert list(summaries) == list(RANGE_KEYS)
+        # A single holding: TWR is the price return over the range, whatever the flows
+        first_price = prices["AAA"][series.dates[0]]
+        last_price = prices["AAA"][series.dates[-1]]
+        assert summaries["MAX"]["twr"] == pytest.approx(last_price / first_price - 1)
+        for key in ("1M", "1Y"):
+            start = date.fromisoformat(summaries[key]["start_date"])
+            assert summaries[key]["twr"] == pytest.approx(last_price / prices["AAA"][start] - 1)
+
+    @pytest.mark.asyncio
+    async def test_series_is_cached_and_invalidated(self, monkeypatch):
+        from services import returns_engine as module
+
+        transactions, prices = self._ledger()
+        calls = []
+
+        async def fake_prices(**kwargs):
+            calls.append(kwargs)
+            return {"success": True, "data": {
+                "AAA": [{"date": d.isoformat(), "close": str(units / 10 ** PRICE_SCALE)} for d, units in prices["AAA"].items()]
+            }}
+
+        monkeypatch.setattr(module.price_manager, "get_portfolio_prices_for_charts", fake_prices)
+        engine = ReturnsEngine()
+        first = await engine.get_range_returns("user-twr", "token", transactions)
+        await engine.get_range_returns("user-twr", "token", transactions)
+        assert len(calls) == 1 and engine.get_stats()["hits"] == 1
+        assert first["MAX"]["net_flows"] == pytest.approx(1000 + 1196 - 650.5)
+
+        report = await cache_dependency_index.invalidate("transactions_changed", [transactions_dependency("user-twr")])
+        assert report["invalidated"]["returns"] == 1
+        await engine.get_range_returns("user-twr", "token", transactions)
+        assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_metrics_ranges_and_summary_irr_share_one_valuation(monkeypatch):
+    from backend_api_routes.backend_api_analytics import _irr_percent_from_ranges
+    from services.portfolio_metrics_manager import PortfolioMetricsManager
+    from services import portfolio_metrics_manager as module
+
+    transactions, prices = TestEngine()._ledger()
+    series = ReturnsEngine.build_series(transactions, prices, date.today())
+    builds = []
+
+    async def fake_series(user_id, user_token, transactions=None):
+        builds.append(user_id)
+        return series
+
+    monkeypatch.setattr(module.returns_engine, "get_series", fake_series)
+    manager = PortfolioMetricsManager()
+    points_1m, ranges = await manager._get_time_series_data("user-ts", "token", {"range": "1M"}, transactions)
+    points_max, _ = await manager._get_time_series_data("user-ts", "token", {"range": "MAX"}, transactions)
+
+    assert len(builds) == 2 and len(points_max) == len(series)
+    assert points_1m == points_max[-len(points_1m):]
+    assert points_1m[0].date >= date.today() - timedelta(days=31)
+    assert list(ranges) == list(RANGE_KEYS)
+    assert ranges["1Y"]["calendar_days"] >= 360
+    assert _irr_percent_from_ranges(ranges) == pytest.approx(ranges["1Y"]["modified_dietz"] * 100)
+    assert ranges["MAX"]["annualized_modified_dietz"] is not None
+    assert _irr_percent_from_ranges({}) == 0.0
+
+
+def test_index_sim_metrics_add_twr_when_flows_are_given():
+    from services.index_sim_service import IndexSimulationUtils
+
+    portfolio = [(D[0], Decimal("1000")), (D[1], Decimal("1100")), (D[2], Decimal("6100"))]
+    index = [(D[0], Decimal("1000")), (D[1], Decimal("1050")), (D[2], Decimal("6050"))]
+    flows = [(D[0], Decimal("1000")), (D[2], Decimal("5000"))]
+
+    plain = IndexSimulationUtils.calculate_performance_metrics(portfolio, index)
+    assert "portfolio_twr_pct" not in plain and plain["portfolio_return_pct"] == Decimal("510")
+
+    metrics = IndexSimulationUtils.calculate_performance_metrics(portfolio, index, flows, flows)
+    assert float(metrics["portfolio_twr_pct"]) == pytest.approx(10.0)
+    assert float(metrics["index_twr_pct"]) == pytest.approx(5.0)
+    assert float(metrics["twr_outperformance_pct"]) == pytest.approx(5.0)
@@ -0,0 +1,189 @@
+"""
+Tests for the rolling risk engine
+"""
+
+import math
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from services.cache_dependency_index import cache_dependency_index, transactions_dependency
+from services.risk_engine import (
+    RiskConfig,
+    RiskEngine,
+    RiskState,
+    align_flows,
+    concentration,
+    flow_adjusted_returns,
+    returns_matrix_from_prices,
+    risk_contributions,
+)
+
+
+def _series(days=120, seed=5, start=date(2024, 1, 1)):
+    rng = random.Random(seed)
+    dates, values, benchmark = [], [], []
+    value, index = 10_000.0, 10_000.0
+    day = start
+    while len(dates) < days:
+        if day.weekday() < 5:
+            market = rng.gauss(0.0004, 0.01)
+            value *= 1 + 1.2 * market + rng.gauss(0, 0.005)
+            index *= 1 + market
+            dates.append(day)
+            values.append(round(value, 2))
+            benchmark.append(round(index, 2))
+        day += timedelta(days=1)
+    return dates, values, benchmark
+
+
+def _assert_summaries_close(left, right):
+    for key in ("volatility", "rolling_volatility", "sharpe_ratio", "sortino_ratio", "beta",
+                "correlation", "rolling_beta", "max_drawdown", "current_drawdown", "total_return"):
+        assert left[key] == pytest.approx(right[key], rel=1e-9, abs=1e-12), key
+    assert left["observations"] == right["observations"]
+    assert [p["date"] for p in left["rolling_volatility_series"]] == [p["date"] for p in right["rolling_volatility_series"]]
+
+
+class TestKernels:
+    def test_deposit_is_not_a_return(self):
+        dates = [date(2024, 1, 1) + timedelta(days=i) for i in range(3)]
+        flows = align_flows(dates, [(dates[1], 5000)])
+        returns = flow_adjusted_returns([10_000, 15_100, 15_100], flows)
+        assert returns.tolist() == pytest.approx([0.01, 0.0])
+
+    def test_weekend_flow_lands_on_next_point(self):
+        friday, monday = date(2024, 1, 5), date(2024, 1, 8)
+        assert align_flows([friday, monday], [(date(2024, 1, 6), 100)]).tolist() == [0.0, 100.0]
+
+    def test_summary_matches_numpy_reference(self):
+        dates, values, benchmark = _series()
+        config = RiskConfig(window=21)
+        summary = RiskState.from_series(config, dates, values, benchmark).summary()
+
+        r = np.diff(values) / np.array(values[:-1])
+        b = np.diff(benchmark) / np.array(benchmark[:-1])
+        assert summary["volatility"] == pytest.approx(r.std(ddof=1) * math.sqrt(252))
+        assert summary["sharpe_ratio"] == pytest.approx(r.mean() / r.std(ddof=1) * math.sqrt(252))
+        assert summary["beta"] == pytest.approx(np.cov(r, b)[0, 1] / b.var(ddof=1))
+        assert summary["correlation"] == pytest.approx(np.corrcoef(r, b)[0, 1])
+        assert summary["rolling_volatility"] == pytest.approx(r[-21:].std(ddof=1) * math.sqrt(252))
+        wealth = np.cumprod(1 + r)
+        assert summary["max_drawdown"] == pytest.approx(min((wealth / np.maximum.accumulate(np.maximum(wealth, 1)) - 1).min(), 0))
+        assert len(summary["rolling_volatility_series"]) == len(r) - 20
+
+    def test_concentration_and_contributions(self):
+        assert concentration([50, 50])["hhi"] == pytest.approx(0.5)
+        assert concentration([25] * 4)["effective_positions"] == pytest.approx(4)
+
+        rng = np.random.default_rng(1)
+        returns = rng.normal(0, [0.01, 0.02, 0.03], size=(250, 3))
+        weights = [0.5, 0.3, 0.2]
+        contributions = risk_contributions(["A", "B", "C"], weights, returns)
+        w = np.array(weights)
+        portfolio_vol = math.sqrt(w @ np.cov(returns, rowvar=False) @ w * 252)
+        assert sum(c["risk_contribution"] for c in contributions) == pytest.approx(portfolio_vol)
+        assert sum(c["percent_of_risk"] for c in contributions) == pytest.approx(100)
+
+    def test_returns_matrix_forward_fills_and_waits_for_all_symbols(self):
+        prices = {
+            "A": [{"date": "2024-01-01", "close": 10}, {"date": "2024-01-02", "close": 11}, {"date": "2024-01-04", "close": 12.1}],
+            "B": [{"date": "2024-01-02", "close": 20}, {"date": "2024-01-03", "close": 22}],
+        }
+        matrix = returns_matrix_from_prices(prices, ["A", "B"])
+        assert matrix.shape == (2, 2)
+        assert matrix.ravel().tolist() == pytest.approx([0.0, 0.1, 0.1, 0.0])
+
+
+class TestIncrementalState:
+    def test_next_day_appends_instead_of_recomputing(self):
+        dates, values, benchmark = _series(days=80)
+        engine = RiskEngine(RiskConfig(window=10))
+
+        engine.analyze("u1", dates[:60], values[:60], benchmark[:60], benchmark="SPY")
+        # The range moved forward by one day: one point drops, one is appended
+        incremental = engine.analyze("u1", dates[1:61], values[1:61], benchmark[1:61], benchmark="SPY")
+
+        stats = engine.get_stats()
+        assert stats["full_computations"] == 1 and stats["incremental_updates"] == 1
+        assert stats["appended_days"] == 1 and stats["dropped_days"] == 1
+
+        fresh = RiskEngine(RiskConfig(window=10)).analyze("u1", dates[1:61], values[1:61], benchmark[1:61], benchmark="SPY")
+        _assert_summaries_close(incremental, fresh)
+
+    def test_flows_on_appended_days(self):
+        dates, values, _ = _series(days=40)
+        values = values[:30] + [v + 5000 for v in values[30:]]
+        flows = [(dates[30], 5000)]
+        engine = RiskEngine(RiskConfig(window=5))
+        engine.analyze("u1", dates[:25], values[:25], flows=flows)
+        incremental = engine.analyze("u1", dates, values, flows=flows)
+        fresh = RiskEngine(RiskConfig(window=5)).analyze("u1", dates, values, flows=flows)
+        assert engine.get_stats()["appended_days"] == 15
+        _assert_summaries_close(incremental, fresh)
+
+    def test_changed_history_is_recomputed(self):
+        dates, values, _ = _series(days=50)
+        engine = RiskEngine(RiskConfig(window=10))
+        engine.analyze("u1", dates[:40], values[:40])
+        edited = list(values)
+        edited[20] += 100  # a back-dated transaction changed an old value
+        engine.analyze("u1", dates, edited)
+        assert engine.get_stats()["full_computations"] == 2
+
+    @pytest.mark.asyncio
+    async def test_transaction_change_drops_state(self):
+        dates, values, _ = _series(days=30)
+        engine = RiskEngine(RiskConfig(window=10))
+        engine.analyze("user-risk", dates, values)
+        assert engine.get_stats()["states"] == 1
+
+        report = await cache_dependency_index.invalidate("transactions_changed", [transactions_dependency("user-risk")])
+        assert report["invalidated"]["risk"] == 1
+        assert engine.get_stats()["states"] == 0
+
+
+@pytest.mark.asyncio
+async def test_risk_inputs_reuse_the_ledger_and_are_cached(monkeypatch, make_portfolio_metrics):
+    import services.user_performance_manager as module
+    from services.cache_dependency_index import price_dependency
+
+    manager = module.UserPerformanceManager()
+    metrics = make_portfolio_metrics(series_days=20)
+    first_day = metrics.time_series[0].date
+    metrics.transactions = [
+        {"symbol": "AAPL", "quantity": 10, "price": 150, "date": first_day.isoformat(), "transaction_type": "BUY"}
+    ]
+    price_fetches = []
+
+    async def fetch_prices(symbols, start_date, end_date, user_token):
+        price_fetches.append(symbols)
+        days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+        return {"success": True, "data": {
+            symbol: [{"date": d.isoformat(), "close": 100 + i + (i % 3)} for i, d in enumerate(days)]
+            for symbol in symbols
+        }}
+
+    async def no_ledger_fetch(**kwargs):
+        raise AssertionError("the ledger from the metrics run should be used")
+
+    monkeypatch.setattr(module.price_manager, "get_portfolio_prices_for_charts", fetch_prices)
+    monkeypatch.setattr(module, "supa_api_get_user_transactions", no_ledger_fetch)
+
+    first = await manager._calculate_risk_metrics("user-risk-inputs", "token", metrics)
+    assert first["benchmark"] == module.RISK_BENCHMARK
+    assert first["holding_contributions"][0]["symbol"] == "AAPL"
+    assert price_fetches == [[module.RISK_BENCHMARK, "AAPL"]]
+
+    second = await manager._calculate_risk_metrics("user-risk-inputs", "token", metrics)
+    assert second["beta"] == first["beta"]
+    assert len(price_fetches) == 1
+    assert manager.get_cache_statistics()["risk_inputs"] == {"users": 1, "builds": 1, "hits": 1}
+
+    # A benchmark price update drops the inputs
+    report = await cache_dependency_index.invalidate("price_update", [price_dependency(module.RISK_BENCHMARK)])
+    assert report["invalidated"]["risk_inputs"] == 1
+    await manager._calculate_risk_metrics("user-risk-inputs", "token", metrics)
+    assert len(price_fetches) == 2
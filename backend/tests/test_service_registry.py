@@ -0,0 +1,142 @@
+"""
+Tests for the lazy service registry and import-time regressions
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from utils.service_registry import ServiceRegistry
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+
+class Widget:
+    built = 0
+
+    def __init__(self):
+        Widget.built += 1
+        self.items = [1, 2]
+
+    def ping(self):
+        return "pong"
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+class TestRegistry:
+    def test_instance_is_built_on_first_use_only(self):
+        Widget.built = 0
+        registry = ServiceRegistry()
+        widget = registry.register("widget", Widget)
+
+        assert Widget.built == 0 and not registry.is_built("widget")
+        assert "not built" in repr(widget)
+        assert widget.ping() == "pong" and widget.ping() == "pong"
+        assert Widget.built == 1
+        assert registry.get("widget") is registry.get("widget")
+        assert registry.get_stats()["built"] == ["widget"]
+
+    def test_proxy_behaves_like_the_instance(self, monkeypatch):
+        registry = ServiceRegistry()
+        widget = registry.register("widget", Widget)
+
+        assert isinstance(widget, Widget)
+        assert len(widget) == 2 and 1 in widget and list(widget) == [1, 2]
+        widget.flag = True
+        assert registry.get("widget").flag is True
+        monkeypatch.setattr(widget, "ping", lambda: "patched")
+        assert registry.get("widget").ping() == "patched"
+
+    def test_duplicate_names_are_rejected(self):
+        registry = ServiceRegistry()
+        registry.register("widget", Widget)
+        with pytest.raises(ValueError):
+            registry.register("widget", Widget)
+
+    @pytest.mark.asyncio
+    async def test_start_and_close_run_hooks_in_order(self):
+        order = []
+        registry = ServiceRegistry()
+
+        def hooks(name):
+            async def init(service):
+                order.append(f"init:{name}")
+
+            async def close(service):
+                order.append(f"close:{name}")
+            return init, close
+
+        for name in ("locks", "index"):
+            init, close = hooks(name)
+            registry.register(name, Widget, init=init, close=close)
+        registry.register("lazy_client", Widget, close=hooks("lazy_client")[1])
+        registry.register("unused_client", Widget, close=hooks("unused_client")[1])
+
+        await registry.start()
+        registry.get("lazy_client").ping()
+        await registry.close()
+
+        # Services with init hooks are built at start; unused services are never built or closed
+        assert order == ["init:locks", "init:index", "close:lazy_client", "close:index", "close:locks"]
+        assert not registry.is_built("unused_client")
+
+    @pytest.mark.asyncio
+    async def test_close_errors_do_not_stop_other_services(self):
+        registry = ServiceRegistry()
+        closed = []
+
+        async def broken(service):
+            raise RuntimeError("boom")
+
+        async def ok(service):
+            closed.append(service)
+
+        registry.register("first", Widget, close=ok).ping()
+        registry.register("second", Widget, close=broken).ping()
+        await registry.close()
+        assert len(closed) == 1
+
+
+# ============================================================================
+# Import-time profile (python -X importtime)
+# ============================================================================
+
+def _imported_modules(statement: str):
+    """Modules imported by a fresh interpreter running statement, from -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=BACKEND_DIR, capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "imported package" not in line:
+            modules.add(line.rsplit("|", 1)[-1].strip())
+    return modules, result.stdout
+
+
+def test_importing_main_builds_no_services_and_skips_heavy_deps():
+    modules, stdout = _imported_modules(
+        "import main\n"
+        "from utils.service_registry import service_registry\n"
+        "print(service_registry.get_stats()['built'])"
+    )
+    assert stdout.strip().splitlines()[-1] == "[]"
+    assert "main" in modules
+    for heavy in ("apscheduler", "aiohttp"):
+        assert heavy not in modules, f"{heavy} is imported by main"
+
+
+def test_scripts_do_not_import_the_web_stack():
+    modules, _ = _imported_modules(
+        "import vantage_api.vantage_api_quotes, supa_api.supa_api_historical_prices, debug_logger"
+    )
+    for web in ("fastapi", "starlette", "aiohttp", "apscheduler"):
+        assert web not in modules, f"{web} is imported by the seed script's dependencies"
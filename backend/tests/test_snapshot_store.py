@@ -0,0 +1,155 @@
+"""
+Tests for content-addressed snapshot storage
+Covers section round trips, reuse of unchanged sections and in-memory hits
+"""
+
+from decimal import Decimal
+from typing import Any, Callable, Dict, List
+
+import pytest
+
+import services.snapshot_store as snapshot_module
+from services.snapshot_store import CODEC_GZIP, CODEC_ZSTD, SnapshotStore
+from services.user_performance_manager import _assemble_snapshot, _split_snapshot_sections
+
+
+@pytest.fixture
+def fake_storage(monkeypatch: pytest.MonkeyPatch) -> Dict[str, Any]:
+    """Replace the Supabase section table with a dict"""
+    storage: Dict[str, Any] = {"rows": {}, "saves": [], "fetches": []}
+
+    async def save(rows: List[Dict[str, Any]], overwrite: bool = False) -> None:
+        storage["saves"].append([row["content_hash"] for row in rows])
+        for row in rows:
+            if overwrite:
+                storage["rows"][row["content_hash"]] = row
+            else:
+                storage["rows"].setdefault(row["content_hash"], row)
+
+    async def fetch(hashes: List[str]) -> Dict[str, Dict[str, Any]]:
+        storage["fetches"].append(list(hashes))
+        return {h: storage["rows"][h] for h in hashes if h in storage["rows"]}
+
+    monkeypatch.setattr(snapshot_module, "supa_api_save_snapshot_sections", save)
+    monkeypatch.setattr(snapshot_module, "supa_api_get_snapshot_sections", fetch)
+    return storage
+
+
+class TestSections:
+    def test_round_trip_preserves_decimals(self, make_complete_data: Callable) -> None:
+        original = make_complete_data()
+        rebuilt = _assemble_snapshot(_split_snapshot_sections(original))
+        assert rebuilt == original
+        assert rebuilt.portfolio_metrics.holdings[0].quantity == Decimal("10.123456")
+
+    def test_snapshot_hash_not_serialized(self, make_complete_data: Callable) -> None:
+        data = make_complete_data()
+        data.snapshot_hash = "abc"
+        assert "snapshot_hash" not in data.model_dump()
+
+
+class TestSnapshotStore:
+    def test_compression_round_trip(self) -> None:
+        store = SnapshotStore()
+        raw = b'{"holdings": []}' * 100
+        codec, blob = store.compress(raw)
+        assert len(blob) < len(raw)
+        assert store.decompress(codec, blob) == raw
+
+    def test_codec_defaults_to_gzip(self) -> None:
+        assert SnapshotStore().codec == CODEC_GZIP
+        with pytest.raises(ValueError):
+            SnapshotStore(codec="lz4")
+
+    @pytest.mark.asyncio
+    async def test_zstd_section_read_without_zstandard_is_rewritten(
+        self, fake_storage: Dict[str, Any], make_complete_data: Callable, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        sections = _split_snapshot_sections(make_complete_data())
+        hashes = await SnapshotStore().save_sections(sections)
+        # A worker with zstandard wrote the holdings section
+        fake_storage["rows"][hashes["holdings"]] = {
+            **fake_storage["rows"][hashes["holdings"]], "codec": CODEC_ZSTD, "payload": "KLUv/QBYAQAA"
+        }
+
+        monkeypatch.setattr(snapshot_module, "ZSTD_AVAILABLE", False)
+        reader = SnapshotStore(codec=CODEC_ZSTD)
+        assert reader.codec == CODEC_GZIP
+        assert await reader.load(hashes, _assemble_snapshot) is None
+        assert reader.get_stats()["sections_unreadable"] == 1
+
+        # The next save rewrites the section even though its hash is already stored
+        await reader.save_sections(sections, previous_hashes=hashes)
+        assert fake_storage["rows"][hashes["holdings"]]["codec"] == CODEC_GZIP
+        assert reader.get_stats()["sections_repaired"] == 1
+        reader.clear()
+        assert await reader.load(hashes, _assemble_snapshot) == make_complete_data()
+
+    def test_gzip_blobs_always_readable(self) -> None:
+        import gzip
+        assert SnapshotStore.decompress(CODEC_GZIP, gzip.compress(b"abc")) == b"abc"
+
+    @pytest.mark.asyncio
+    async def test_unchanged_sections_are_not_uploaded_again(self, fake_storage: Dict[str, Any], make_complete_data: Callable) -> None:
+        store = SnapshotStore()
+        first = await store.save_sections(_split_snapshot_sections(make_complete_data()))
+        second = await store.save_sections(
+            _split_snapshot_sections(make_complete_data(computation_ms=99)), previous_hashes=first
+        )
+
+        assert len(fake_storage["saves"][0]) == 4
+        # Only the core section (which carries the metadata) changed
+        assert fake_storage["saves"][1] == [second["core"]]
+        assert {k: v for k, v in first.items() if k != "core"} == {k: v for k, v in second.items() if k != "core"}
+
+    @pytest.mark.asyncio
+    async def test_sections_known_only_in_memory_are_uploaded_again(self, fake_storage: Dict[str, Any], make_complete_data: Callable) -> None:
+        store = SnapshotStore()
+        hashes = await store.save_sections(_split_snapshot_sections(make_complete_data()))
+        # Orphan cleanup removed a row this process still has cached
+        fake_storage["rows"].pop(hashes["holdings"])
+
+        await store.save_sections(_split_snapshot_sections(make_complete_data()))
+        assert hashes["holdings"] in fake_storage["saves"][1]
+        assert hashes["holdings"] in fake_storage["rows"]
+
+    @pytest.mark.asyncio
+    async def test_failed_upload_is_not_cached(self, monkeypatch: pytest.MonkeyPatch, make_complete_data: Callable) -> None:
+        async def failing_save(rows: List[Dict[str, Any]]) -> None:
+            raise ConnectionError("supabase unavailable")
+
+        monkeypatch.setattr(snapshot_module, "supa_api_save_snapshot_sections", failing_save)
+        store = SnapshotStore()
+        with pytest.raises(ConnectionError):
+            await store.save_sections(_split_snapshot_sections(make_complete_data()))
+        stats = store.get_stats()
+        assert stats["cached_sections"] == 0 and stats["sections_written"] == 0
+
+    @pytest.mark.asyncio
+    async def test_load_from_storage_then_memory(self, fake_storage: Dict[str, Any], make_complete_data: Callable) -> None:
+        writer = SnapshotStore()
+        original = make_complete_data()
+        hashes = await writer.save_sections(_split_snapshot_sections(original))
+
+        reader = SnapshotStore()
+        loaded = await reader.load(hashes, _assemble_snapshot)
+        assert loaded == original
+        assert len(fake_storage["fetches"]) == 1
+
+        again = await reader.load(hashes, _assemble_snapshot)
+        assert again is loaded
+        assert len(fake_storage["fetches"]) == 1
+        assert reader.get_stats()["snapshot_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_missing_section_returns_none(self, fake_storage: Dict[str, Any], make_complete_data: Callable) -> None:
+        hashes = await SnapshotStore().save_sections(_split_snapshot_sections(make_complete_data()))
+        fake_storage["rows"].pop(hashes["holdings"])
+        assert await SnapshotStore().load(hashes, _assemble_snapshot) is None
+
+    def test_encoded_payload_cache(self) -> None:
+        store = SnapshotStore()
+        assert store.get_encoded(None, "v") is None
+        store.put_encoded("hash", ("rows", True), b"{}")
+        assert store.get_encoded("hash", ("rows", True)) == b"{}"
+        assert store.get_encoded("hash", ("columnar", True)) is None
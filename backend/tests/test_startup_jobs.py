@@ -0,0 +1,211 @@
+"""
+Tests for background startup jobs with leader election, and readiness
+"""
+
+import asyncio
+
+import pytest
+
+from services.startup_jobs import ReadinessState, StartupJobRunner
+from utils.distributed_lock import LeaseLockService, LocalLeaseStore
+
+
+def _runners(count=2):
+    store = LocalLeaseStore()
+    return [StartupJobRunner(LeaseLockService(store, holder_id=f"worker-{i}")) for i in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_start_does_not_wait_for_jobs():
+    runner, = _runners(1)
+    release = asyncio.Event()
+    calls = []
+
+    async def sync():
+        calls.append("sync")
+        await release.wait()
+        return {"success": True, "total_assigned": 7}
+
+    async def assign():
+        calls.append("assign")
+        return {"success": True, "total_assigned": 3}
+
+    runner.register("dividend_reconciliation", [("sync", sync), ("assign", assign)])
+    await asyncio.wait_for(runner.start(), timeout=1)
+    await asyncio.sleep(0)
+
+    status = runner.get_status()["jobs"]["dividend_reconciliation"]
+    assert status["state"] == "running" and status["progress"] == "0/2"
+    assert status["steps"][0]["state"] == "running"
+
+    release.set()
+    status = await runner.wait("dividend_reconciliation")
+    assert calls == ["sync", "assign"]
+    assert status["state"] == "succeeded" and status["leader"] and status["progress"] == "2/2"
+    assert status["steps"][0]["total_assigned"] == 7
+    # The lease is released when the job ends
+    assert not await runner.lease_service.is_locked("startup_job:dividend_reconciliation")
+
+
+@pytest.mark.asyncio
+async def test_only_one_worker_runs_a_job():
+    runners = _runners(3)
+    release = asyncio.Event()
+    runs = []
+
+    async def sync():
+        runs.append(1)
+        await release.wait()
+        return {"success": True}
+
+    for runner in runners:
+        runner.register("dividend_reconciliation", [("sync", sync)])
+    for runner in runners:
+        await runner.start()
+    await asyncio.sleep(0.01)
+    release.set()
+
+    states = [await runner.wait("dividend_reconciliation") for runner in runners]
+    assert len(runs) == 1
+    assert sorted(state["state"] for state in states) == ["skipped", "skipped", "succeeded"]
+    assert sum(state["leader"] for state in states) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_steps_are_reported_and_later_steps_still_run():
+    runner, = _runners(1)
+
+    async def sync():
+        return {"success": False, "error": "rate limited"}
+
+    async def assign():
+        raise RuntimeError("db down")
+
+    async def cleanup():
+        return None
+
+    runner.register("job", [("sync", sync), ("assign", assign), ("cleanup", cleanup)])
+    await runner.start()
+    status = await runner.wait("job")
+
+    assert status["state"] == "failed"
+    assert [step["state"] for step in status["steps"]] == ["failed", "failed", "succeeded"]
+    assert status["steps"][0]["error"] == "rate limited"
+    assert status["steps"][1]["error"] == "db down"
+
+
+@pytest.mark.asyncio
+async def test_stop_cancels_and_releases():
+    runner, = _runners(1)
+
+    async def forever():
+        await asyncio.Event().wait()
+
+    runner.register("job", [("forever", forever)])
+    await runner.start()
+    await asyncio.sleep(0)
+    await runner.stop()
+
+    assert runner.get_status()["jobs"]["job"]["state"] == "cancelled"
+    assert not await runner.lease_service.is_locked("startup_job:job")
+
+
+def test_readiness_waits_for_routes_and_checks(monkeypatch):
+    import services.startup_jobs as module
+
+    now = [100.0]
+    monkeypatch.setattr(module.time, "monotonic", lambda: now[0])
+    state = ReadinessState()
+    warm = {"cache": False}
+    state.add_check("cache", lambda: warm["cache"])
+    state.add_check("search_index", lambda: False, grace_seconds=30)
+
+    assert not state.is_ready()
+    now[0] = 101.0
+    state.mark_routes_ready()
+    assert not state.is_ready()
+    assert state.get_status()["checks"] == {"cache": "waiting", "search_index": "waiting"}
+
+    warm["cache"] = True
+    assert not state.is_ready()
+    now[0] = 131.5
+    assert state.is_ready()
+
+    now[0] = 132.0
+    state.record_request()
+    now[0] = 140.0
+    state.record_request()
+    status = state.get_status()
+    assert status["checks"] == {"cache": "ok", "search_index": "waived"}
+    assert status["routes_ready_ms"] == 1000.0
+    assert status["time_to_ready_ms"] == 31500.0
+    assert status["time_to_first_request_ms"] == 32000.0
+
+
+def test_ready_endpoint_reports_503_until_ready(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+
+    state = ReadinessState()
+    monkeypatch.setattr(main, "readiness", state)
+    client = TestClient(main.app)
+
+    response = client.get("/health/ready")
+    assert response.status_code == 503 and response.json()["ready"] is False
+
+    state.mark_routes_ready()
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    # Probes are not the first request served
+    assert response.json()["time_to_first_request_ms"] is None
+
+    client.get("/")
+    assert client.get("/health/ready").json()["time_to_first_request_ms"] is not None
+
+
+@pytest.mark.asyncio
+async def test_lease_store_outage_runs_the_job_without_a_lease(monkeypatch):
+    import services.startup_jobs as module
+
+    monkeypatch.setattr(module, "LEASE_RETRY_DELAY", 0.001)
+    store = LocalLeaseStore()
+    attempts = []
+
+    async def unavailable(*args):
+        attempts.append(1)
+        raise RuntimeError("connection refused")
+
+    store.try_acquire = unavailable
+    runner = StartupJobRunner(LeaseLockService(store, holder_id="worker-0"))
+    runs = []
+
+    async def sync():
+        runs.append(1)
+        return {"success": True}
+
+    runner.register("job", [("sync", sync)])
+    await runner.start()
+    status = await runner.wait("job")
+
+    assert len(attempts) == module.LEASE_RETRIES + 1
+    assert runs == [1]
+    assert status["state"] == "succeeded" and status["leader"]
+    assert "lease store unavailable" in status["reason"]
+
+
+def test_startup_status_endpoint_requires_admin(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    import supa_api.supa_api_auth as auth
+    from backend_api_routes.backend_api_dashboard import dashboard_router
+
+    app = FastAPI()
+    app.include_router(dashboard_router)
+    app.dependency_overrides[auth.require_authenticated_user] = lambda: {"id": "user-1", "app_metadata": {}}
+    client = TestClient(app)
+
+    assert client.get("/api/debug/startup").status_code == 403
+    monkeypatch.setattr(auth, "ADMIN_USER_IDS", frozenset({"user-1"}))
+    assert client.get("/api/debug/startup").status_code == 200
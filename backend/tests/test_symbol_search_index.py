@@ -0,0 +1,133 @@
+"""
+Tests for the in-memory symbol search index
+Verifies prefix, substring and fuzzy lookups rank like the database search
+"""
+
+import pytest
+
+from services.symbol_search_index import SymbolSearchIndex
+from vantage_api.vantage_api_search import (
+    bounded_levenshtein_distance,
+    calculate_relevance_score,
+    levenshtein_distance,
+)
+
+
+SYMBOLS = [
+    {"symbol": "AAPL", "name": "Apple Inc", "type": "Equity", "currency": "USD", "exchange": "NASDAQ"},
+    {"symbol": "AMZN", "name": "Amazon.com Inc", "type": "Equity", "currency": "USD", "exchange": "NASDAQ"},
+    {"symbol": "MSFT", "name": "Microsoft Corporation", "type": "Equity", "currency": "USD", "exchange": "NASDAQ"},
+    {"symbol": "GOOGL", "name": "Alphabet Inc Class A", "type": "Equity", "currency": "USD", "exchange": "NASDAQ"},
+    {"symbol": "APLE", "name": "Apple Hospitality REIT", "type": "Equity", "currency": "USD", "exchange": "NYSE"},
+    {"symbol": "F", "name": "Ford Motor Company", "type": "Equity", "currency": "USD", "exchange": "NYSE"},
+    {"symbol": "NVDA", "name": "NVIDIA Corporation", "type": "Equity", "currency": "USD", "exchange": "NASDAQ"},
+    {"symbol": "VTI", "name": "Vanguard Total Stock Market ETF", "type": "ETF", "currency": "USD", "exchange": "NYSE"},
+]
+
+
+def _brute_force(query: str, limit: int = 20) -> list:
+    """Reference ranking: score every symbol like the database path does"""
+    scored = []
+    for row in SYMBOLS:
+        score = calculate_relevance_score(row["symbol"], row["name"], query.upper(), query.lower())
+        if score > 0:
+            scored.append((score, row["symbol"]))
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return [symbol for _, symbol in scored[:limit]]
+
+
+@pytest.fixture
+def index() -> SymbolSearchIndex:
+    idx = SymbolSearchIndex()
+    idx.rebuild(SYMBOLS)
+    return idx
+
+
+class TestBoundedLevenshtein:
+    """Bounded edit distance must agree with the full algorithm inside the bound"""
+
+    @pytest.mark.parametrize("a,b", [("AAPL", "APPL"), ("GOOGL", "GOOLG"), ("MSFT", "NVDA"), ("", "ABC"), ("TSLA", "TSLA")])
+    def test_matches_full_distance_within_bound(self, a: str, b: str) -> None:
+        full = levenshtein_distance(a, b)
+        assert bounded_levenshtein_distance(a, b, 10) == full
+        assert bounded_levenshtein_distance(a, b, max(full - 1, 0)) > max(full - 1, 0) or full == 0
+
+    def test_early_exit_on_length_gap(self) -> None:
+        assert bounded_levenshtein_distance("A", "ABCDEFGH", 2) == 3
+
+
+class TestSymbolSearchIndex:
+    """Index lookups"""
+
+    def test_not_ready_until_built(self) -> None:
+        assert not SymbolSearchIndex().is_ready
+
+    @pytest.mark.parametrize("query", ["AP", "apple", "corp", "MSFT", "inc", "GOOLG", "APPL", "vanguard"])
+    def test_ranking_matches_brute_force(self, index: SymbolSearchIndex, query: str) -> None:
+        results = [r["symbol"] for r in index.search(query)]
+        assert results == _brute_force(query)
+
+    def test_single_character_uses_prefixes_only(self, index: SymbolSearchIndex) -> None:
+        results = [r["symbol"] for r in index.search("A")]
+        names = {row["symbol"]: row["name"].lower() for row in SYMBOLS}
+        expected = [s for s in _brute_force("A") if s.startswith("A") or names[s].startswith("a")]
+        assert results == expected
+
+    def test_exact_ticker_first(self, index: SymbolSearchIndex) -> None:
+        assert index.search("aapl")[0]["symbol"] == "AAPL"
+
+    def test_result_shape(self, index: SymbolSearchIndex) -> None:
+        result = index.search("NVDA")[0]
+        assert result == {
+            "symbol": "NVDA",
+            "name": "NVIDIA Corporation",
+            "type": "Equity",
+            "region": "United States",
+            "currency": "USD",
+            "exchange": "NASDAQ",
+            "source": "cache",
+        }
+
+    def test_results_are_copies(self, index: SymbolSearchIndex) -> None:
+        index.search("AAPL")[0]["name"] = "mutated"
+        assert index.search("AAPL")[0]["name"] == "Apple Inc"
+
+    def test_limit(self, index: SymbolSearchIndex) -> None:
+        assert len(index.search("A", limit=2)) == 2
+
+    def test_empty_query(self, index: SymbolSearchIndex) -> None:
+        assert index.search("   ") == []
+
+    def test_add_symbols_outside_event_loop(self, index: SymbolSearchIndex) -> None:
+        index.add_symbols([{"symbol": "tsla", "name": "Tesla Inc"}])
+        assert index.search("TSLA")[0]["symbol"] == "TSLA"
+        assert len(index) == len(SYMBOLS) + 1
+
+    @pytest.mark.asyncio
+    async def test_add_symbols_rebuilds_in_background(self) -> None:
+        idx = SymbolSearchIndex(debounce_seconds=0)
+        idx.rebuild(SYMBOLS)
+        idx.add_symbols([{"symbol": "PLTR", "name": "Palantir Technologies"}])
+        assert idx.search("PLTR") == []
+        await idx._rebuild_task
+        assert idx.search("PLTR")[0]["symbol"] == "PLTR"
+
+    @pytest.mark.asyncio
+    async def test_merges_do_not_mark_the_index_ready(self, monkeypatch) -> None:
+        idx = SymbolSearchIndex(debounce_seconds=0)
+
+        def unavailable():
+            raise RuntimeError("db down")
+
+        monkeypatch.setattr(idx, "_fetch_rows", unavailable)
+        with pytest.raises(RuntimeError):
+            await idx.load_from_database()
+
+        idx.add_symbols([{"symbol": "PLTR", "name": "Palantir Technologies"}])
+        await idx._rebuild_task
+        assert idx.search("PLTR")[0]["symbol"] == "PLTR"
+        assert not idx.is_ready
+
+        monkeypatch.setattr(idx, "_fetch_rows", lambda: list(SYMBOLS))
+        assert await idx.load_from_database() == len(SYMBOLS) + 1
+        assert idx.is_ready
@@ -0,0 +1,141 @@
+"""
+Tests for the tracer and the DebugLogger.log_api_call decorator built on it
+"""
+
+import pytest
+
+from debug_logger import DebugLogger
+from utils.tracing import NOOP_SPAN, LatencyHistogram, Tracer, tracer
+
+
+@pytest.fixture
+def global_tracer():
+    """Enable the global tracer for one test and restore it afterwards"""
+    enabled, sample_rate = tracer.enabled, tracer.sample_rate
+    tracer.reset()
+    tracer.configure(enabled=True, sample_rate=1.0)
+    yield tracer
+    tracer.configure(enabled=enabled, sample_rate=sample_rate)
+    tracer.reset()
+
+
+class TestTracer:
+    def test_disabled_tracer_records_nothing(self):
+        local = Tracer(enabled=False)
+        with local.span("work", key="value") as span:
+            assert span is NOOP_SPAN
+            span.set_attribute("ignored", True)
+        assert local.get_histograms() == {}
+        assert local.get_recent_spans() == []
+
+    def test_nested_spans_share_trace(self):
+        local = Tracer(enabled=True, sample_rate=1.0)
+        with local.span("outer") as outer:
+            with local.span("inner", step=1) as inner:
+                assert local.current_span() is inner
+            assert local.current_span() is outer
+
+        outer_dict, inner_dict = local.get_recent_spans()
+        assert inner_dict["trace_id"] == outer_dict["trace_id"]
+        assert inner_dict["parent_id"] == outer_dict["span_id"]
+        assert inner_dict["attributes"] == {"step": 1}
+        assert local.current_span() is NOOP_SPAN
+
+    def test_unsampled_spans_feed_histograms_only(self):
+        local = Tracer(enabled=True, sample_rate=0.0)
+        for _ in range(3):
+            with local.span("op"):
+                pass
+        assert local.get_recent_spans() == []
+        assert local.get_histograms()["op"]["count"] == 3
+
+    def test_errors_are_always_buffered(self):
+        local = Tracer(enabled=True, sample_rate=0.0)
+        with pytest.raises(ValueError):
+            with local.span("op"):
+                raise ValueError("boom")
+        (span,) = local.get_recent_spans()
+        assert span["status"] == "error"
+        assert span["error"] == "ValueError: boom"
+        assert local.get_histograms()["op"]["errors"] == 1
+
+    def test_ring_buffer_is_bounded(self):
+        local = Tracer(enabled=True, sample_rate=1.0, buffer_size=5)
+        for i in range(20):
+            with local.span(f"op{i}"):
+                pass
+        spans = local.get_recent_spans()
+        assert [s["name"] for s in spans] == [f"op{i}" for i in range(19, 14, -1)]
+
+
+class TestLatencyHistogram:
+    def test_buckets_and_percentiles(self):
+        histogram = LatencyHistogram()
+        for duration in (0.5, 3, 3, 3, 40, 20000):
+            histogram.observe(duration)
+        summary = histogram.to_dict()
+        assert summary["count"] == 6
+        assert summary["buckets"]["le_1"] == 1
+        assert summary["buckets"]["le_5"] == 3
+        assert summary["buckets"]["le_inf"] == 1
+        assert summary["p50_ms"] == 5
+        assert summary["p99_ms"] == 20000
+
+
+class TestLogApiCall:
+    @pytest.mark.asyncio
+    async def test_async_call_records_span(self, global_tracer):
+        @DebugLogger.log_api_call(api_name="TEST_API", sender="A", receiver="B", operation="GET_THING")
+        async def handler(value):
+            global_tracer.current_span().set_attribute("value", value)
+            return value * 2
+
+        assert await handler(21) == 42
+        (span,) = global_tracer.get_recent_spans(name="TEST_API.GET_THING")
+        assert span["attributes"]["sender"] == "A"
+        assert span["attributes"]["value"] == 21
+        assert global_tracer.get_histograms()["TEST_API.GET_THING"]["count"] == 1
+
+    def test_sync_error_is_recorded_and_reraised(self, global_tracer):
+        @DebugLogger.log_api_call(api_name="TEST_API", sender="A", receiver="B")
+        def failing():
+            raise RuntimeError("nope")
+
+        with pytest.raises(RuntimeError):
+            failing()
+        (span,) = global_tracer.get_recent_spans(name="TEST_API.failing")
+        assert span["status"] == "error"
+
+    @pytest.mark.asyncio
+    async def test_disabled_tracing_passes_through(self):
+        assert not tracer.enabled
+
+        @DebugLogger.log_api_call(api_name="TEST_API", sender="A", receiver="B", operation="PASS")
+        async def handler():
+            return "ok"
+
+        assert await handler() == "ok"
+        assert "TEST_API.PASS" not in tracer.get_histograms()
+
+
+def test_tracing_debug_endpoints_require_admin(monkeypatch, global_tracer):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    import supa_api.supa_api_auth as auth
+    from backend_api_routes.backend_api_dashboard import dashboard_router
+
+    app = FastAPI()
+    app.include_router(dashboard_router)
+    user = {"id": "user-1", "access_token": "token", "app_metadata": {}}
+    app.dependency_overrides[auth.require_authenticated_user] = lambda: user
+    client = TestClient(app)
+
+    assert client.get("/api/debug/traces").status_code == 403
+    assert client.post("/api/debug/toggle-tracing").status_code == 403
+    assert tracer.enabled
+
+    monkeypatch.setattr(auth, "ADMIN_USER_IDS", frozenset({"user-1"}))
+    assert client.get("/api/debug/traces").status_code == 200
+    user.update(id="user-2", app_metadata={"role": "admin"})
+    assert client.get("/api/debug/traces").status_code == 200
@@ -5,61 +5,52 @@ This package contains utility modules for:
 - response_factory: Factory for creating standardized API responses
 - error_handlers: Custom exception classes
 - exceptions: Additional exception types
+
+The re-exports below are resolved on first access, so importing a light
+submodule (utils.tracing, utils.fixed_point, ...) does not pull in FastAPI
+and the response models.
 """
 
-from .response_factory import ResponseFactory
-from .error_handlers import (
-    ServiceUnavailableError,
-    InvalidInputError,
-    RateLimitError,
-    DataNotFoundError,
-)
+import importlib
+from typing import Any, Dict
 
-# Try to import from exceptions.py if it exists
-try:
-    from .exceptions import (
-        APIException,
-        ValidationException,
-        AuthenticationException,
-        AuthorizationException,
-        ResourceNotFoundException,
-        ConflictException,
-        RateLimitException as RateLimitExceptionNew,  # Avoid name conflict
-        ExternalServiceException,
-        DataIntegrityException,
-        BusinessLogicException,
-    )
-except ImportError:
-    # If exceptions.py doesn't exist, these will be None
-    APIException = None
-    ValidationException = None
-    AuthenticationException = None
-    AuthorizationException = None
-    ResourceNotFoundException = None
-    ConflictException = None
-    RateLimitExceptionNew = None
-    ExternalServiceException = None
-    DataIntegrityException = None
-    BusinessLogicException = None
+_EXPORTS: Dict[str, str] = {
+    "ResponseFactory": ".response_factory",
+    "ServiceUnavailableError": ".error_handlers",
+    "InvalidInputError": ".error_handlers",
+    "RateLimitError": ".error_handlers",
+    "DataNotFoundError": ".error_handlers",
+}
+
+_EXCEPTION_EXPORTS = (
+    "APIException",
+    "ValidationException",
+    "AuthenticationException",
+    "AuthorizationException",
+    "ResourceNotFoundException",
+    "ConflictException",
+    "ExternalServiceException",
+    "DataIntegrityException",
+    "BusinessLogicException",
+)
+_EXPORTS.update({name: ".exceptions" for name in _EXCEPTION_EXPORTS})
+_EXPORTS["RateLimitExceptionNew"] = ".exceptions"  # Avoid name conflict
 
 __all__ = [
     "ResponseFactory",
     "ServiceUnavailableError",
-    "InvalidInputError", 
+    "InvalidInputError",
     "RateLimitError",
     "DataNotFoundError",
+    *_EXCEPTION_EXPORTS,
 ]
 
-# Add exception classes to __all__ if they were imported
-if APIException is not None:
-    __all__.extend([
-        "APIException",
-        "ValidationException",
-        "AuthenticationException",
-        "AuthorizationException",
-        "ResourceNotFoundException",
-        "ConflictException",
-        "ExternalServiceException",
-        "DataIntegrityException",
-        "BusinessLogicException",
-    ])
\ No newline at end of file
+
+def __getattr__(name: str) -> Any:
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(module_name, __name__)
+    value = getattr(module, "RateLimitException" if name == "RateLimitExceptionNew" else name)
+    globals()[name] = value
+    return value
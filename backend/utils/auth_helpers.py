@@ -1,8 +1,17 @@
 """
 Authentication helper utilities for consistent user data extraction and validation
 """
-from typing import Dict, Any, Tuple
-from fastapi import HTTPException
+from typing import TYPE_CHECKING, Dict, Any, Tuple
+
+if TYPE_CHECKING:
+    from fastapi import HTTPException
+
+
+def _http_exception(status_code: int, detail: str) -> "HTTPException":
+    """HTTPException, imported on use so scripts validating IDs skip loading FastAPI"""
+    from fastapi import HTTPException
+    return HTTPException(status_code=status_code, detail=detail)
+
 
 def extract_user_credentials(user_data: Dict[str, Any]) -> Tuple[str, str]:
     """
@@ -21,20 +30,20 @@ def extract_user_credentials(user_data: Dict[str, Any]) -> Tuple[str, str]:
     user_token = user_data.get("access_token")
     
     if not user_id:
-        raise HTTPException(
+        raise _http_exception(
             status_code=401, 
             detail="User ID not found in authentication data. Please log in again."
         )
     
     if not user_token:
-        raise HTTPException(
+        raise _http_exception(
             status_code=401,
             detail="Access token not found in authentication data. Please log in again."
         )
     
     # Ensure they are strings (type assertion for type checker)
     if not isinstance(user_id, str) or not isinstance(user_token, str):
-        raise HTTPException(
+        raise _http_exception(
             status_code=401,
             detail="Invalid authentication data format"
         )
@@ -56,13 +65,13 @@ def validate_user_id(user_id: Any) -> str:
         HTTPException: If user_id is None, empty, not a string, or invalid format
     """
     if not user_id:
-        raise HTTPException(
+        raise _http_exception(
             status_code=401,
             detail="User ID is required but was not provided"
         )
     
     if not isinstance(user_id, str):
-        raise HTTPException(
+        raise _http_exception(
             status_code=400,
             detail=f"User ID must be a string, got {type(user_id).__name__}"
         )
@@ -71,7 +80,7 @@ def validate_user_id(user_id: Any) -> str:
     import re
     uuid_pattern = r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$'
     if not re.match(uuid_pattern, user_id, re.IGNORECASE):
-        raise HTTPException(
+        raise _http_exception(
             status_code=400,
             detail="User ID must be a valid UUID format"
         )
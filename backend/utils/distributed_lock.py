@@ -1,159 +1,534 @@
 """
 Distributed locking utilities for portfolio tracker services
-Provides database-based locking to prevent race conditions across multiple server instances
+Provides lease-based locks with fencing tokens to prevent race conditions
+across multiple server instances
+
+A lock is a lease row (see migration 013): acquiring returns a strictly
+increasing fencing token, the holder renews the lease in the background
+while it works, and releasing it NOTIFYs 'lock_released'. Waiters sleep until
+they are notified or the current lease runs out instead of polling the
+database every second, and re-check every few seconds in case a notification
+was missed. Without a LISTEN connection, releases in this process still wake
+waiters immediately.
+
+A holder must call ensure_held() before each write it protects and pass the
+fencing token along with the write: once renewal fails for longer than the
+TTL, another worker may already hold the lock under a newer token.
 """
 
-import time
 import asyncio
 import logging
-from typing import Optional, Dict, Any, AsyncGenerator
+import os
+import socket
+import time
+import uuid
 from contextlib import asynccontextmanager
-from supa_api.supa_api_client import get_supa_service_client
+from typing import Any, AsyncGenerator, Dict, Optional, Set, Tuple
+
+from supa_api.supa_api_lease_locks import (
+    supa_api_acquire_lease,
+    supa_api_check_lease,
+    supa_api_release_lease,
+    supa_api_renew_lease,
+)
+from config import SUPA_DB_URL
+from utils.service_registry import service_registry
+from utils.tracing import LatencyHistogram
 
 logger = logging.getLogger(__name__)
 
+RELEASE_CHANNEL = "lock_released"
+
 
 class DistributedLockError(Exception):
     """Exception raised when distributed lock operations fail"""
     pass
 
 
+class LeaseLostError(DistributedLockError):
+    """Raised by ensure_held() once a lease has expired or been taken over"""
+    pass
+
+
+class LeaseStoreError(DistributedLockError):
+    """Raised by acquire(raise_on_error=True) when the lease store itself fails"""
+    pass
+
+
+# ============================================================================
+# Lease Stores
+# ============================================================================
+
+class SupabaseLeaseStore:
+    """Leases in the lock_leases table, via the RPCs from migration 013"""
+
+    async def try_acquire(self, lock_name: str, holder: str, ttl_seconds: int) -> Tuple[Optional[int], float]:
+        return await asyncio.to_thread(supa_api_acquire_lease, lock_name, holder, ttl_seconds)
+
+    async def renew(self, lock_name: str, holder: str, fencing_token: int, ttl_seconds: int) -> bool:
+        return await asyncio.to_thread(supa_api_renew_lease, lock_name, holder, fencing_token, ttl_seconds)
+
+    async def release(self, lock_name: str, holder: str, fencing_token: int) -> bool:
+        return await asyncio.to_thread(supa_api_release_lease, lock_name, holder, fencing_token)
+
+    async def remaining(self, lock_name: str) -> Optional[float]:
+        return await asyncio.to_thread(supa_api_check_lease, lock_name)
+
+
+class LocalLeaseStore:
+    """
+    In-process stand-in with the same semantics as the lease table.
+
+    Used by tests and single-worker development setups.
+    """
+
+    def __init__(self) -> None:
+        self._leases: Dict[str, Tuple[str, int, float]] = {}  # name -> (holder, token, expires monotonic)
+        self._next_token = 0
+
+    async def try_acquire(self, lock_name: str, holder: str, ttl_seconds: int) -> Tuple[Optional[int], float]:
+        now = time.monotonic()
+        current = self._leases.get(lock_name)
+        if current is not None and current[2] > now:
+            return None, current[2] - now
+        self._next_token += 1
+        self._leases[lock_name] = (holder, self._next_token, now + ttl_seconds)
+        return self._next_token, float(ttl_seconds)
+
+    async def renew(self, lock_name: str, holder: str, fencing_token: int, ttl_seconds: int) -> bool:
+        now = time.monotonic()
+        current = self._leases.get(lock_name)
+        if current is None or current[:2] != (holder, fencing_token) or current[2] <= now:
+            return False
+        self._leases[lock_name] = (holder, fencing_token, now + ttl_seconds)
+        return True
+
+    async def release(self, lock_name: str, holder: str, fencing_token: int) -> bool:
+        current = self._leases.get(lock_name)
+        if current is None or current[:2] != (holder, fencing_token):
+            return False
+        del self._leases[lock_name]
+        return True
+
+    async def remaining(self, lock_name: str) -> Optional[float]:
+        current = self._leases.get(lock_name)
+        if current is None:
+            return None
+        left = current[2] - time.monotonic()
+        return left if left > 0 else None
+
+
+# ============================================================================
+# Release Notification
+# ============================================================================
+
+class ReleaseNotifier:
+    """
+    Wakes waiters when a lock is released.
+
+    Releases made by this process are delivered directly; with a Postgres
+    DSN, a LISTEN connection also delivers releases from other workers.
+    """
+
+    def __init__(self) -> None:
+        self._waiters: Dict[str, Set[asyncio.Future]] = {}
+        self._connection: Any = None
+
+    @property
+    def listening(self) -> bool:
+        return self._connection is not None and not self._connection.is_closed()
+
+    def subscribe(self, lock_name: str) -> asyncio.Future:
+        """Register for the next release of lock_name, before checking the lock"""
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(lock_name, set()).add(future)
+        return future
+
+    def unsubscribe(self, lock_name: str, future: asyncio.Future) -> None:
+        waiters = self._waiters.get(lock_name)
+        if waiters is not None:
+            waiters.discard(future)
+            if not waiters:
+                del self._waiters[lock_name]
+
+    async def wait(self, lock_name: str, timeout: float, future: Optional[asyncio.Future] = None) -> bool:
+        """
+        Wait up to timeout seconds for a release; True if one was notified.
+
+        Pass the future from subscribe() to also catch a release notified
+        between subscribing and waiting.
+        """
+        if future is None:
+            future = self.subscribe(lock_name)
+        try:
+            await asyncio.wait_for(future, timeout=max(timeout, 0))
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.unsubscribe(lock_name, future)
+
+    def notify(self, lock_name: str) -> None:
+        for future in self._waiters.pop(lock_name, ()):
+            if not future.done():
+                future.set_result(None)
+
+    def _on_notification(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        self.notify(payload)
+
+    async def start(self, dsn: str) -> None:
+        """Open the LISTEN connection for cross-worker release notifications"""
+        if self.listening:
+            return
+        import asyncpg
+
+        self._connection = await asyncpg.connect(dsn)
+        await self._connection.add_listener(RELEASE_CHANNEL, self._on_notification)
+        logger.info(f"[ReleaseNotifier] Listening on '{RELEASE_CHANNEL}'")
+
+    async def stop(self) -> None:
+        if self._connection is not None:
+            try:
+                await self._connection.remove_listener(RELEASE_CHANNEL, self._on_notification)
+                await self._connection.close()
+            except Exception as e:
+                logger.warning(f"[ReleaseNotifier] Error closing LISTEN connection: {e}")
+            self._connection = None
+
+
+# ============================================================================
+# Lease Lock Service
+# ============================================================================
+
+class Lease:
+    """A held lock: fencing token plus background renewal until released"""
+
+    def __init__(
+        self,
+        service: "LeaseLockService",
+        lock_name: str,
+        fencing_token: int,
+        ttl_seconds: int,
+        requested_at: float,
+    ) -> None:
+        self.lock_name = lock_name
+        self.fencing_token = fencing_token
+        self.ttl_seconds = ttl_seconds
+        self._service = service
+        self._renew_task: Optional[asyncio.Task] = None
+        self._lost = False
+        # Counted from when the grant/renewal was requested, so it never outlives the stored lease
+        self._valid_until = requested_at + ttl_seconds
+
+    @property
+    def lost(self) -> bool:
+        """True once renewal was refused or has not succeeded within the TTL"""
+        return self._lost or time.monotonic() >= self._valid_until
+
+    def ensure_held(self) -> None:
+        """Raise LeaseLostError if the lease can no longer protect a write"""
+        if self.lost:
+            raise LeaseLostError(f"Lease {self.lock_name} (token {self.fencing_token}) is no longer held")
+
+    def _start_renewal(self) -> None:
+        self._renew_task = asyncio.create_task(self._renew_loop(), name=f"lease_renewal:{self.lock_name}")
+
+    async def _renew_loop(self) -> None:
+        store = self._service.store
+        while True:
+            await asyncio.sleep(self.ttl_seconds / 3)
+            requested_at = time.monotonic()
+            try:
+                renewed = await store.renew(self.lock_name, self._service.holder_id, self.fencing_token, self.ttl_seconds)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # The lease is still valid until it expires; try again next round
+                logger.warning(f"[Lease] Renewal of {self.lock_name} failed: {e}")
+                continue
+            if not renewed:
+                self._lost = True
+                self._service._stats["lost"] += 1
+                logger.error(f"[Lease] Lost lease {self.lock_name} (token {self.fencing_token})")
+                return
+            self._valid_until = requested_at + self.ttl_seconds
+            self._service._stats["renewals"] += 1
+
+    async def release(self) -> bool:
+        """Stop renewing and release the lease; waiters wake immediately"""
+        if self._renew_task is not None:
+            self._renew_task.cancel()
+            try:
+                await self._renew_task
+            except asyncio.CancelledError:
+                pass
+            self._renew_task = None
+        return await self._service._release(self)
+
+
+class LeaseLockService:
+    """
+    Acquires, renews and releases leases for this worker.
+
+    Args:
+        store: Lease storage (SupabaseLeaseStore or LocalLeaseStore)
+        notifier: Release notifications
+        holder_id: Identity recorded on leases (defaults to host:pid:random)
+        recheck_interval: Longest sleep between attempts; bounds the wait if a
+            release notification is missed
+    """
+
+    def __init__(
+        self,
+        store: Any,
+        notifier: Optional[ReleaseNotifier] = None,
+        holder_id: Optional[str] = None,
+        recheck_interval: float = 5.0,
+    ) -> None:
+        self.store = store
+        self.notifier = notifier or ReleaseNotifier()
+        self.holder_id = holder_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.recheck_interval = recheck_interval
+        self._held: Dict[str, Lease] = {}
+        self._wait_ms = LatencyHistogram()
+        self._stats = {
+            "acquired": 0,
+            "contended": 0,
+            "timeouts": 0,
+            "errors": 0,
+            "renewals": 0,
+            "lost": 0,
+            "released": 0,
+        }
+
+    async def acquire(
+        self,
+        lock_name: str,
+        ttl_seconds: int = 300,
+        max_wait_seconds: float = 30,
+        raise_on_error: bool = False,
+    ) -> Optional[Lease]:
+        """
+        Acquire a lease, waiting up to max_wait_seconds for the current holder.
+
+        Args:
+            raise_on_error: Raise LeaseStoreError when the store fails instead
+                of returning None, for callers that must tell an outage (or a
+                missing migration) apart from another holder
+
+        Returns:
+            The Lease, or None on timeout (and on store error unless raise_on_error)
+        """
+        started = time.monotonic()
+        deadline = started + max_wait_seconds
+        contended = False
+
+        while True:
+            # Subscribe before the attempt: a release notified while it is in flight still wakes us
+            released = self.notifier.subscribe(lock_name)
+            try:
+                requested_at = time.monotonic()
+                try:
+                    token, expires_in = await self.store.try_acquire(lock_name, self.holder_id, ttl_seconds)
+                except Exception as e:
+                    logger.error(f"[LeaseLockService] Error acquiring lock {lock_name}: {e}")
+                    self._stats["errors"] += 1
+                    self._wait_ms.observe((time.monotonic() - started) * 1000, error=True)
+                    if raise_on_error:
+                        raise LeaseStoreError(f"Lease store unavailable for {lock_name}: {e}") from e
+                    return None
+
+                if token is not None:
+                    lease = Lease(self, lock_name, token, ttl_seconds, requested_at)
+                    lease._start_renewal()
+                    self._held[lock_name] = lease
+                    self._stats["acquired"] += 1
+                    self._wait_ms.observe((time.monotonic() - started) * 1000)
+                    logger.info(f"[LeaseLockService] Acquired lock: {lock_name} (token {token})")
+                    return lease
+
+                if not contended:
+                    contended = True
+                    self._stats["contended"] += 1
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    self._wait_ms.observe((time.monotonic() - started) * 1000, error=True)
+                    logger.warning(f"[LeaseLockService] Failed to acquire lock {lock_name} after {max_wait_seconds}s")
+                    return None
+
+                # Sleep until a release is notified, the holder's lease runs out, the deadline,
+                # or the re-check interval (in case a notification never arrives)
+                wait = min(remaining, max(expires_in, 0.01), self.recheck_interval)
+                await self.notifier.wait(lock_name, wait, released)
+            finally:
+                self.notifier.unsubscribe(lock_name, released)
+
+    async def _release(self, lease: Lease) -> bool:
+        if self._held.get(lease.lock_name) is lease:
+            del self._held[lease.lock_name]
+        try:
+            released = await self.store.release(lease.lock_name, self.holder_id, lease.fencing_token)
+        except Exception as e:
+            logger.error(f"[LeaseLockService] Error releasing lock {lease.lock_name}: {e}")
+            self._stats["errors"] += 1
+            return False
+        finally:
+            self.notifier.notify(lease.lock_name)
+
+        if released:
+            self._stats["released"] += 1
+            logger.info(f"[LeaseLockService] Released lock: {lease.lock_name}")
+        else:
+            logger.warning(f"[LeaseLockService] Lease {lease.lock_name} was no longer held at release")
+        return released
+
+    async def is_locked(self, lock_name: str) -> bool:
+        """True if anyone currently holds an unexpired lease"""
+        try:
+            return await self.store.remaining(lock_name) is not None
+        except Exception as e:
+            logger.error(f"[LeaseLockService] Error checking lock {lock_name}: {e}")
+            return False
+
+    async def start(self, dsn: Optional[str] = None) -> None:
+        """Listen for releases from other workers (local notifications only without a DSN)"""
+        if not dsn:
+            logger.info("[LeaseLockService] No database DSN; cross-worker waits re-check every "
+                        f"{self.recheck_interval}s")
+            return
+        try:
+            await self.notifier.start(dsn)
+        except Exception as e:
+            logger.warning(f"[LeaseLockService] LISTEN unavailable, falling back to re-checks: {e}")
+
+    async def stop(self) -> None:
+        """Release held leases and close the LISTEN connection"""
+        for lease in list(self._held.values()):
+            await lease.release()
+        await self.notifier.stop()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Acquisition counters and wait-time distribution"""
+        return {
+            **self._stats,
+            "holder": self.holder_id,
+            "held": sorted(self._held),
+            "listening": self.notifier.listening,
+            "wait_ms": self._wait_ms.to_dict(),
+        }
+
+
+# Module-level instance; LISTENs for releases from app startup to shutdown
+lease_locks = service_registry.register(
+    "lease_locks", lambda: LeaseLockService(SupabaseLeaseStore()),
+    init=lambda locks: locks.start(SUPA_DB_URL), close=lambda locks: locks.stop()
+)
+
+
+# ============================================================================
+# Lock Handles
+# ============================================================================
+
 class DistributedLock:
     """
-    Database-based distributed lock implementation using PostgreSQL advisory locks
-    
-    This replaces in-memory threading locks with database-based locks that work
-    across multiple server processes and instances.
+    Handle for one named lease-based lock.
+
+    Keeps the acquire/release/is_locked interface the services use; the
+    fencing token of the held lease is available as ``fencing_token``.
     """
-    
-    def __init__(self, lock_name: str, timeout_seconds: int = 300):
+
+    def __init__(self, lock_name: str, timeout_seconds: int = 300, service: Optional[LeaseLockService] = None):
         """
         Initialize distributed lock
-        
+
         Args:
             lock_name: Unique name for the lock
-            timeout_seconds: Lock timeout in seconds (default: 5 minutes)
+            timeout_seconds: Lease duration in seconds, renewed while held (default: 5 minutes)
+            service: Lease service (defaults to the module-level instance)
         """
         self.lock_name = lock_name
         self.timeout_seconds = timeout_seconds
-        self.supa_client = get_supa_service_client()
-        
-    async def acquire(self, max_wait_seconds: int = 30) -> bool:
+        self._service = service or lease_locks
+        self._lease: Optional[Lease] = None
+
+    @property
+    def fencing_token(self) -> Optional[int]:
+        return self._lease.fencing_token if self._lease else None
+
+    def ensure_held(self) -> None:
+        """
+        Check before each protected write that the lease is still ours.
+
+        Raises:
+            LeaseLostError: If the lock was never acquired, or the lease expired
+                or was taken over
+        """
+        if self._lease is None:
+            raise LeaseLostError(f"Lock {self.lock_name} is not held")
+        self._lease.ensure_held()
+
+    async def acquire(self, max_wait_seconds: float = 30) -> bool:
         """
         Attempt to acquire the distributed lock
-        
+
         Args:
             max_wait_seconds: Maximum time to wait for lock acquisition
-            
+
         Returns:
             bool: True if lock was acquired, False otherwise
         """
-        start_time = time.time()
-        
-        while time.time() - start_time < max_wait_seconds:
-            try:
-                # Use PostgreSQL advisory locks for distributed locking
-                result = self.supa_client.rpc(
-                    'acquire_distributed_lock',
-                    {
-                        'p_lock_name': self.lock_name,
-                        'p_timeout_seconds': self.timeout_seconds
-                    }
-                ).execute()
-                
-                if result.data and len(result.data) > 0:
-                    acquired = result.data[0] if isinstance(result.data, list) else result.data
-                    if acquired:
-                        logger.info(f"[DistributedLock] Acquired lock: {self.lock_name}")
-                        return True
-                
-                # Wait a bit before retrying
-                await asyncio.sleep(1)
-                
-            except Exception as e:
-                logger.error(f"[DistributedLock] Error acquiring lock {self.lock_name}: {e}")
-                return False
-        
-        logger.warning(f"[DistributedLock] Failed to acquire lock {self.lock_name} after {max_wait_seconds}s")
-        return False
-    
+        self._lease = await self._service.acquire(self.lock_name, self.timeout_seconds, max_wait_seconds)
+        return self._lease is not None
+
     async def release(self) -> bool:
         """
         Release the distributed lock
-        
+
         Returns:
             bool: True if lock was released successfully, False otherwise
         """
-        try:
-            result = self.supa_client.rpc(
-                'release_distributed_lock',
-                {
-                    'p_lock_name': self.lock_name
-                }
-            ).execute()
-            
-            if result.data and len(result.data) > 0:
-                released = result.data[0] if isinstance(result.data, list) else result.data
-                if released:
-                    logger.info(f"[DistributedLock] Released lock: {self.lock_name}")
-                    return True
-            
-            logger.warning(f"[DistributedLock] Failed to release lock: {self.lock_name}")
-            return False
-            
-        except Exception as e:
-            logger.error(f"[DistributedLock] Error releasing lock {self.lock_name}: {e}")
+        if self._lease is None:
             return False
-    
+        lease, self._lease = self._lease, None
+        return await lease.release()
+
     async def is_locked(self) -> bool:
         """
         Check if the lock is currently held
-        
+
         Returns:
             bool: True if lock is held, False otherwise
         """
-        try:
-            result = self.supa_client.rpc(
-                'check_distributed_lock',
-                {
-                    'p_lock_name': self.lock_name
-                }
-            ).execute()
-            
-            if result.data and len(result.data) > 0:
-                return bool(result.data[0] if isinstance(result.data, list) else result.data)
-            
-            return False
-            
-        except Exception as e:
-            logger.error(f"[DistributedLock] Error checking lock {self.lock_name}: {e}")
-            return False
+        return await self._service.is_locked(self.lock_name)
 
 
 @asynccontextmanager
-async def distributed_lock(lock_name: str, timeout_seconds: int = 300, max_wait_seconds: int = 30) -> AsyncGenerator[bool, None]:
+async def distributed_lock(lock_name: str, timeout_seconds: int = 300, max_wait_seconds: float = 30) -> AsyncGenerator[DistributedLock, None]:
     """
     Context manager for distributed locking
-    
+
     Usage:
-        async with distributed_lock("dividend_sync_global"):
-            # Critical section code here
+        async with distributed_lock("dividend_sync_global") as lock:
+            # Critical section code here; call lock.ensure_held() before each
+            # write and pass lock.fencing_token along with it
             pass
-    
+
     Args:
         lock_name: Unique name for the lock
-        timeout_seconds: Lock timeout in seconds
+        timeout_seconds: Lease duration in seconds
         max_wait_seconds: Maximum time to wait for lock acquisition
-        
+
     Raises:
         DistributedLockError: If lock cannot be acquired
     """
     lock = DistributedLock(lock_name, timeout_seconds)
-    
+
     acquired = await lock.acquire(max_wait_seconds)
     if not acquired:
         raise DistributedLockError(f"Could not acquire distributed lock: {lock_name}")
-    
+
     try:
         yield lock
     finally:
@@ -163,66 +538,58 @@ async def distributed_lock(lock_name: str, timeout_seconds: int = 300, max_wait_
 class DividendSyncLocks:
     """
     Specific distributed locks for dividend synchronization operations
-    Replaces the in-memory threading locks with database-based distributed locks
     """
-    
+
     GLOBAL_SYNC_LOCK = "dividend_sync_global"
     USER_SYNC_LOCK_PREFIX = "dividend_sync_user_"
-    
+
     @classmethod
     def get_user_lock_name(cls, user_id: str) -> str:
         """Get the lock name for a specific user's dividend sync"""
         return f"{cls.USER_SYNC_LOCK_PREFIX}{user_id}"
-    
+
     @classmethod
     async def can_start_global_sync(cls) -> bool:
         """
         Check if global dividend sync can start
-        Returns True if no global or user syncs are in progress
+        Returns True if no global sync is in progress
         """
         try:
-            # Check if global sync is already running
-            global_lock = DistributedLock(cls.GLOBAL_SYNC_LOCK)
-            if await global_lock.is_locked():
+            if await lease_locks.is_locked(cls.GLOBAL_SYNC_LOCK):
                 logger.info("[DividendSyncLocks] Global sync already in progress")
                 return False
-            
-            # Check if any user syncs are running
-            # This would require a more sophisticated check, but for now we'll
-            # rely on the global lock as the primary protection
             return True
-            
+
         except Exception as e:
             logger.error(f"[DividendSyncLocks] Error checking sync status: {e}")
             return False
-    
+
     @classmethod
-    async def acquire_global_sync_lock(cls, max_wait_seconds: int = 5) -> Optional[DistributedLock]:
+    async def acquire_global_sync_lock(cls, max_wait_seconds: float = 5) -> Optional[DistributedLock]:
         """
         Acquire the global dividend sync lock
-        
+
         Returns:
             DistributedLock if acquired, None if failed
         """
-        lock = DistributedLock(cls.GLOBAL_SYNC_LOCK, timeout_seconds=600)  # 10 minute timeout
-        
+        lock = DistributedLock(cls.GLOBAL_SYNC_LOCK, timeout_seconds=600)  # 10 minute lease
+
         if await lock.acquire(max_wait_seconds):
             return lock
-        
+
         return None
-    
+
     @classmethod
-    async def acquire_user_sync_lock(cls, user_id: str, max_wait_seconds: int = 5) -> Optional[DistributedLock]:
+    async def acquire_user_sync_lock(cls, user_id: str, max_wait_seconds: float = 5) -> Optional[DistributedLock]:
         """
         Acquire a user-specific dividend sync lock
-        
+
         Returns:
             DistributedLock if acquired, None if failed
         """
-        lock_name = cls.get_user_lock_name(user_id)
-        lock = DistributedLock(lock_name, timeout_seconds=300)  # 5 minute timeout
-        
+        lock = DistributedLock(cls.get_user_lock_name(user_id), timeout_seconds=300)  # 5 minute lease
+
         if await lock.acquire(max_wait_seconds):
             return lock
-        
-        return None
\ No newline at end of file
+
+        return None
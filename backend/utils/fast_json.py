@@ -0,0 +1,202 @@
+"""
+Fast JSON serialization for API responses.
+Encodes in one C-accelerated pass with orjson when it is installed and falls
+back to the stdlib encoder otherwise. Decimal handling matches
+DecimalSafeJSONEncoder (strings, full precision) unless a schema says float.
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import logging
+
+from pydantic import BaseModel
+
+from utils.decimal_json_encoder import DecimalSafeJSONEncoder
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+    ORJSON_AVAILABLE = False
+    logger.info("[fast_json] orjson not installed, falling back to stdlib json")
+
+if ORJSON_AVAILABLE:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj: Any) -> Any:
+    """Fallback hook for types the encoder does not know natively."""
+    if isinstance(obj, Decimal):
+        return str(obj)
+    return _default_common(obj)
+
+
+def _default_float(obj: Any) -> Any:
+    """Fallback hook that emits Decimal as a JSON number."""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    return _default_common(obj)
+
+
+def _default_common(obj: Any) -> Any:
+    """Shared handling for non-Decimal types."""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class _StdlibEncoder(DecimalSafeJSONEncoder):
+    """Stdlib fallback that understands the same types as the orjson hook."""
+
+    def default(self, obj: Any) -> Any:
+        return _default(obj)
+
+
+class _StdlibFloatEncoder(DecimalSafeJSONEncoder):
+    """Stdlib fallback emitting Decimal as numbers."""
+
+    def default(self, obj: Any) -> Any:
+        return _default_float(obj)
+
+
+def dumps(obj: Any, decimal_as: str = "str") -> bytes:
+    """
+    Serialize obj to UTF-8 JSON bytes.
+
+    Decimal values become strings (or numbers with ``decimal_as="float"``),
+    datetimes/dates ISO 8601 strings and pydantic models their field dict.
+
+    Args:
+        obj: Value to serialize
+        decimal_as: "str" to preserve precision, "float" for numeric output
+
+    Returns:
+        Encoded JSON document
+    """
+    as_float = decimal_as == "float"
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=_default_float if as_float else _default, option=_ORJSON_OPTIONS)
+    encoder = _StdlibFloatEncoder if as_float else _StdlibEncoder
+    return json.dumps(obj, cls=encoder, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    """Parse JSON from bytes or str."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# ============================================================================
+# Schema-driven row encoders
+# ============================================================================
+
+class RowEncoder:
+    """
+    Precompiled encoder that projects objects onto a fixed set of fields.
+
+    Field lookups are done with a single ``attrgetter`` call and the
+    conversion for each output column is resolved once, when the encoder is
+    built, instead of being re-checked per row.
+    """
+
+    __slots__ = ("fields", "_getter", "_converters", "_single")
+
+    def __init__(self, fields: Sequence[Tuple[str, Optional[Callable[[Any], Any]]]]) -> None:
+        self.fields: Tuple[str, ...] = tuple(name for name, _ in fields)
+        self._getter = attrgetter(*self.fields)
+        self._converters = tuple(conv for _, conv in fields)
+        self._single = len(self.fields) == 1
+
+    def encode(self, obj: Any) -> Dict[str, Any]:
+        values = self._getter(obj)
+        if self._single:
+            values = (values,)
+        return {
+            name: (conv(value) if conv is not None and value is not None else value)
+            for name, conv, value in zip(self.fields, self._converters, values)
+        }
+
+    def encode_many(self, objs: Iterable[Any]) -> List[Dict[str, Any]]:
+        encode = self.encode
+        return [encode(obj) for obj in objs]
+
+
+def compile_row_encoder(
+    model: type,
+    fields: Sequence[str],
+    decimal_as: str = "float",
+) -> RowEncoder:
+    """
+    Build a RowEncoder for a pydantic model from its field annotations.
+
+    Decimal fields are converted with ``float`` or ``str`` depending on
+    ``decimal_as``; every other field is passed through untouched.
+
+    Args:
+        model: Pydantic model class the rows are instances of
+        fields: Field names to project, in output order
+        decimal_as: "float" or "str"
+
+    Returns:
+        RowEncoder for the requested projection
+    """
+    if decimal_as not in ("float", "str"):
+        raise ValueError(f"decimal_as must be 'float' or 'str', got {decimal_as!r}")
+    decimal_converter = float if decimal_as == "float" else str
+
+    model_fields = model.model_fields
+    compiled = []
+    for name in fields:
+        if name not in model_fields:
+            raise ValueError(f"{model.__name__} has no field {name!r}")
+        annotation = model_fields[name].annotation
+        is_decimal = annotation is Decimal or Decimal in getattr(annotation, "__args__", ())
+        compiled.append((name, decimal_converter if is_decimal else None))
+    return RowEncoder(compiled)
+
+
+def columnar_series(
+    points: Sequence[Any],
+    date_field: str = "date",
+    value_field: str = "value",
+) -> Dict[str, List[Any]]:
+    """
+    Encode a time series as parallel date/value arrays.
+
+    ``[{"date": d1, "value": v1}, ...]`` becomes
+    ``{"dates": [d1, ...], "values": [v1, ...]}``, which drops the repeated
+    keys from every point. Points may be objects or dicts.
+
+    Args:
+        points: Time series points
+        date_field: Attribute/key holding the date
+        value_field: Attribute/key holding the value
+
+    Returns:
+        Dict with ISO date strings and float values
+    """
+    if not points:
+        return {"dates": [], "values": []}
+    if isinstance(points[0], dict):
+        dates = [p[date_field] for p in points]
+        values = [p[value_field] for p in points]
+    else:
+        dates = [getattr(p, date_field) for p in points]
+        values = [getattr(p, value_field) for p in points]
+    return {
+        "dates": [d.isoformat() if isinstance(d, (date, datetime)) else d for d in dates],
+        "values": [float(v) if v is not None else None for v in values],
+    }
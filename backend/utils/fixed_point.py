@@ -0,0 +1,324 @@
+"""
+Fixed-point integer arithmetic for money, prices and quantities.
+
+Values are held as Python ints scaled by 10**scale (1.25 at scale 6 is
+1250000), so sums are exact and products and quotients round exactly once,
+with an explicit rounding mode. Series math runs on NumPy int64 arrays when
+NumPy is installed and on Python ints otherwise; int64 is only used when the
+result provably fits, so both paths give identical results.
+
+Convert with to_fixed() on the way in and from_fixed() at API boundaries.
+Rounding matches utils.financial_math (6 decimal places, ROUND_HALF_UP), so
+fx_mul/fx_div/fx_percentage/fx_gain_loss_percent agree with safe_multiply,
+safe_divide, safe_percentage and safe_gain_loss_percent.
+"""
+from decimal import (
+    Decimal,
+    InvalidOperation,
+    ROUND_CEILING,
+    ROUND_DOWN,
+    ROUND_FLOOR,
+    ROUND_HALF_DOWN,
+    ROUND_HALF_EVEN,
+    ROUND_HALF_UP,
+    ROUND_UP,
+)
+from typing import Any, List, Optional, Sequence, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:  # pragma: no cover - exercised only without numpy
+    np = None
+    NUMPY_AVAILABLE = False
+    logger.info("[fixed_point] numpy not installed, series math uses Python ints")
+
+# Scales (decimal places) used across the calculators
+MONEY_SCALE = 6      # same precision financial_math quantizes to
+PRICE_SCALE = 6
+QUANTITY_SCALE = 8   # fractional shares and crypto quantities
+
+ROUNDING_MODES = (
+    ROUND_HALF_UP, ROUND_HALF_EVEN, ROUND_HALF_DOWN,
+    ROUND_DOWN, ROUND_UP, ROUND_FLOOR, ROUND_CEILING,
+)
+
+_INT64_MAX = 2 ** 63 - 1
+_DECIMAL_EXACT = 10 ** 28  # default context precision; scaleb is exact below it
+_POW10 = [10 ** i for i in range(40)]
+
+NumericType = Union[Decimal, float, int, str]
+
+
+def _pow10(exponent: int) -> int:
+    return _POW10[exponent] if exponent < len(_POW10) else 10 ** exponent
+
+
+# ============================================================================
+# Rounding
+# ============================================================================
+
+def div_round(numerator: int, denominator: int, rounding: str = ROUND_HALF_UP) -> int:
+    """
+    Integer division with a decimal-module rounding mode.
+
+    Args:
+        numerator: Dividend
+        denominator: Divisor (non-zero)
+        rounding: One of the decimal ROUND_* constants
+
+    Returns:
+        The rounded quotient
+    """
+    if denominator < 0:
+        numerator, denominator = -numerator, -denominator
+    quotient, remainder = divmod(numerator, denominator)  # floor division
+    if remainder == 0 or rounding == ROUND_FLOOR:
+        return quotient
+    # quotient is the floor; decide whether to step up to the ceiling
+    if rounding == ROUND_CEILING:
+        return quotient + 1
+    negative = numerator < 0
+    if rounding == ROUND_DOWN:
+        return quotient + 1 if negative else quotient
+    if rounding == ROUND_UP:
+        return quotient if negative else quotient + 1
+
+    twice = 2 * remainder
+    if twice > denominator:
+        return quotient + 1
+    if twice < denominator:
+        return quotient
+    # Exactly half-way between quotient and quotient + 1
+    if rounding == ROUND_HALF_UP:
+        return quotient if negative else quotient + 1
+    if rounding == ROUND_HALF_DOWN:
+        return quotient + 1 if negative else quotient
+    if rounding == ROUND_HALF_EVEN:
+        return quotient if quotient % 2 == 0 else quotient + 1
+    raise ValueError(f"Unsupported rounding mode: {rounding}")
+
+
+def rescale(units: int, from_scale: int, to_scale: int, rounding: str = ROUND_HALF_UP) -> int:
+    """Move a fixed-point value to another scale, rounding if it loses digits"""
+    if to_scale >= from_scale:
+        return units * _pow10(to_scale - from_scale)
+    return div_round(units, _pow10(from_scale - to_scale), rounding)
+
+
+# ============================================================================
+# Conversion (API boundaries)
+# ============================================================================
+
+def _parse_plain_str(text: str, scale: int) -> Optional[int]:
+    """Parse '-123.45' style strings without Decimal; None if not that simple"""
+    negative = text.startswith('-')
+    body = text[1:] if negative or text.startswith('+') else text
+    whole, dot, frac = body.partition('.')
+    if not whole.isdigit() or (dot and frac and not frac.isdigit()) or len(frac) > scale:
+        return None
+    units = int(whole) * _pow10(scale) + (int(frac) * _pow10(scale - len(frac)) if frac else 0)
+    return -units if negative else units
+
+
+def to_fixed(
+    value: Optional[NumericType],
+    scale: int = MONEY_SCALE,
+    rounding: str = ROUND_HALF_UP
+) -> int:
+    """
+    Convert a number to fixed-point units.
+
+    Floats go through str() like safe_decimal, so 0.1 is exactly 100000 at
+    scale 6. None and unparseable values are 0, as in safe_decimal.
+
+    Args:
+        value: Value to convert
+        scale: Decimal places to keep
+        rounding: Rounding applied to digits beyond the scale
+
+    Returns:
+        Scaled integer
+    """
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return int(value) * _pow10(scale)
+    if isinstance(value, int):
+        return value * _pow10(scale)
+    try:
+        if isinstance(value, str):
+            text = value.strip()
+            units = _parse_plain_str(text, scale)
+            if units is not None:
+                return units
+            decimal_value = Decimal(text)
+        elif isinstance(value, Decimal):
+            decimal_value = value
+        else:
+            decimal_value = Decimal(str(value))
+        if not decimal_value.is_finite():
+            raise InvalidOperation(f"non-finite value {value}")
+        # Work on the exact coefficient; scaleb/quantize would round to the
+        # context precision first
+        sign, digits, exponent = decimal_value.as_tuple()
+        coefficient = int(''.join(map(str, digits))) if digits else 0
+        if sign:
+            coefficient = -coefficient
+        return rescale(coefficient, -exponent, scale, rounding)
+    except (InvalidOperation, ValueError, TypeError) as e:
+        logger.error(f"[fixed_point] Cannot convert '{value}' to fixed point: {e}")
+        return 0
+
+
+def from_fixed(units: int, scale: int = MONEY_SCALE) -> Decimal:
+    """Fixed-point units back to a Decimal with exactly `scale` places"""
+    units = int(units)
+    if -_DECIMAL_EXACT < units < _DECIMAL_EXACT:
+        return Decimal(units).scaleb(-scale)
+    return Decimal((1 if units < 0 else 0, tuple(int(d) for d in str(abs(units))), -scale))
+
+
+# ============================================================================
+# Scalar operations
+# ============================================================================
+
+def fx_mul(
+    a: int,
+    b: int,
+    a_scale: int = MONEY_SCALE,
+    b_scale: int = MONEY_SCALE,
+    out_scale: int = MONEY_SCALE,
+    rounding: str = ROUND_HALF_UP
+) -> int:
+    """Product of two fixed-point values, rounded once to out_scale"""
+    return rescale(a * b, a_scale + b_scale, out_scale, rounding)
+
+
+def fx_div(
+    a: int,
+    b: int,
+    a_scale: int = MONEY_SCALE,
+    b_scale: int = MONEY_SCALE,
+    out_scale: int = MONEY_SCALE,
+    rounding: str = ROUND_HALF_UP,
+    default: int = 0
+) -> int:
+    """Quotient of two fixed-point values at out_scale; default when b is 0"""
+    if b == 0:
+        return default
+    shift = out_scale + b_scale - a_scale
+    if shift >= 0:
+        return div_round(a * _pow10(shift), b, rounding)
+    return div_round(a, b * _pow10(-shift), rounding)
+
+
+def fx_percentage(value: int, total: int, scale: int = MONEY_SCALE, default: int = 0) -> int:
+    """
+    value / total * 100, like safe_percentage: the ratio is rounded to
+    `scale` places before it is multiplied by 100.
+    """
+    if total == 0:
+        return default
+    return fx_div(value, total, scale, scale, scale) * 100
+
+
+def fx_gain_loss_percent(gain_loss: int, cost_basis: int, scale: int = MONEY_SCALE) -> int:
+    """Gain/loss percent with safe_gain_loss_percent's zero-cost rules"""
+    if cost_basis == 0:
+        if gain_loss == 0:
+            return 0
+        return (100 if gain_loss > 0 else -100) * _pow10(scale)
+    return fx_percentage(gain_loss, cost_basis, scale)
+
+
+# ============================================================================
+# Series operations
+# ============================================================================
+
+def _round_array(values: Any, divisor: int, rounding: str) -> Any:
+    """Vectorized div_round over an int64 array"""
+    if rounding != ROUND_HALF_UP:
+        return np.array([div_round(int(v), divisor, rounding) for v in values], dtype=np.int64)
+    magnitude = np.abs(values)
+    quotient, remainder = np.divmod(magnitude, divisor)
+    quotient += (remainder >= divisor - remainder)  # 2r >= d without overflow
+    return np.where(values < 0, -quotient, quotient)
+
+
+def _trim_scale(matrix: Any, scale: int) -> Any:
+    """
+    Drop decimal places no value uses (whole-share quantities, prices quoted
+    to the cent), so products stay within int64 far more often.
+    """
+    divisor_gcd = int(np.gcd.reduce(matrix, axis=None))
+    if divisor_gcd == 0:
+        return matrix, 0
+    trimmed = 0
+    while trimmed < scale and divisor_gcd % 10 == 0:
+        divisor_gcd //= 10
+        trimmed += 1
+    if trimmed:
+        matrix = matrix // _pow10(trimmed)
+    return matrix, scale - trimmed
+
+
+def fx_weighted_sum_rows(
+    quantities: Sequence[Sequence[int]],
+    prices: Sequence[Sequence[int]],
+    quantity_scale: int = QUANTITY_SCALE,
+    price_scale: int = PRICE_SCALE,
+    out_scale: int = MONEY_SCALE,
+    rounding: str = ROUND_HALF_UP
+) -> List[int]:
+    """
+    Row-wise sum(quantity * price), e.g. portfolio value per day.
+
+    Each row total is exact before a single rounding to out_scale. Rows are
+    summed in int64 when the largest possible total fits, in Python ints
+    otherwise.
+
+    Args:
+        quantities: Matrix of quantity units (rows x columns)
+        prices: Matrix of price units with the same shape
+        quantity_scale: Scale of the quantities
+        price_scale: Scale of the prices
+        out_scale: Scale of the returned totals
+        rounding: Rounding mode for the final rescale
+
+    Returns:
+        One fixed-point total per row
+    """
+    if len(quantities) == 0:
+        return []
+
+    if NUMPY_AVAILABLE:
+        try:
+            q_matrix = np.asarray(quantities, dtype=np.int64)
+            p_matrix = np.asarray(prices, dtype=np.int64)
+        except OverflowError:
+            q_matrix = p_matrix = None
+
+        if q_matrix is not None and q_matrix.size:
+            q_matrix, q_scale = _trim_scale(q_matrix, quantity_scale)
+            p_matrix, p_scale = _trim_scale(p_matrix, price_scale)
+            # Largest possible |row total|: sum over columns of max|q| * max|p|
+            bound = sum(
+                int(q) * int(p)
+                for q, p in zip(np.abs(q_matrix).max(axis=0), np.abs(p_matrix).max(axis=0))
+            )
+            product_scale = q_scale + p_scale
+            if bound * _pow10(max(out_scale - product_scale, 0)) <= _INT64_MAX:
+                totals = (q_matrix * p_matrix).sum(axis=1)
+                if out_scale >= product_scale:
+                    return (totals * _pow10(out_scale - product_scale)).tolist()
+                return _round_array(totals, _pow10(product_scale - out_scale), rounding).tolist()
+
+    product_scale = quantity_scale + price_scale
+    return [
+        rescale(sum(q * p for q, p in zip(q_row, p_row)), product_scale, out_scale, rounding)
+        for q_row, p_row in zip(quantities, prices)
+    ]
@@ -0,0 +1,63 @@
+"""
+Conditional GET helpers.
+Weak ETags derived from content hashes, If-None-Match matching and 304
+responses for the dashboard endpoints the frontend polls.
+
+The validators are weak because the hashed content leaves out fields that
+change on every response (computation_time_ms, cache_status, timestamps,
+envelope processing time): two responses with the same tag carry the same
+portfolio data, not the same bytes.
+"""
+import hashlib
+from typing import Any, Dict, Optional
+
+from fastapi.responses import Response
+
+# Clients must revalidate, but may keep the representation for conditional requests
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    Build a weak ETag from a content hash and the request variant.
+
+    Args:
+        parts: Content hash followed by anything that changes the
+            representation (API version, query options, ...)
+
+    Returns:
+        Weak ETag value (W/"...")
+    """
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def content_etag(payload: bytes, *variant: Any) -> str:
+    """ETag for a representation that has no upstream content hash."""
+    return make_etag(hashlib.sha256(payload).hexdigest(), *variant)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag.
+
+    Uses the weak comparison RFC 9110 prescribes for If-None-Match, so a
+    client that strips the ``W/`` prefix still matches.
+    """
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    if "*" in candidates:
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return any((c[2:] if c.startswith("W/") else c) == opaque for c in candidates)
+
+
+def etag_headers(etag: str) -> Dict[str, str]:
+    """Headers sent with every representation carrying an ETag."""
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response for a matching conditional request."""
+    return Response(status_code=304, headers=etag_headers(etag))
@@ -0,0 +1,288 @@
+"""
+Event loop blocking detector.
+A heartbeat task stamps the time on every tick; a watchdog thread notices
+when the stamps stop arriving. Once the loop has been stalled for longer
+than the threshold, the thread samples the loop thread's stack and
+attributes the stall to the innermost frame in backend code (for example
+services.dividend_service.DividendService._get_global_dividends_in_range),
+skipping library frames such as supabase-py's synchronous execute().
+Blocking events are counted per call site for /api/debug/event-loop.
+
+The thread only wakes every half threshold and reads one attribute, so the
+watchdog is cheap enough to leave on. A stall inside C code that holds the
+GIL is still detected, but only sampled once the GIL is released.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from functools import lru_cache
+from types import FrameType
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from config import LOOP_WATCHDOG_ENABLED, LOOP_WATCHDOG_THRESHOLD_MS
+from utils.metrics import MetricFamily, metrics
+from utils.service_registry import service_registry
+
+logger = logging.getLogger(__name__)
+
+# Frames from files under this directory (outside site-packages) are "our" code
+BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Stack lines kept per call site and per recent event
+STACK_DEPTH = 12
+# Call sites tracked; the least-blocking site is dropped when full
+MAX_SITES = 200
+UNKNOWN_SITE = "<unknown>"
+
+# Wrappers that sit between the caller and the blocking call; never the culprit
+_INSTRUMENTATION_FILES = frozenset(
+    os.path.join(BACKEND_ROOT, path)
+    for path in ("debug_logger.py", "utils/loop_watchdog.py", "utils/metrics.py", "utils/request_profiler.py", "utils/tracing.py")
+)
+
+
+@lru_cache(maxsize=4096)
+def _is_backend_frame(filename: str) -> bool:
+    # Code filenames keep the sys.path entry they were imported through ("benchmarks/../utils")
+    filename = os.path.normpath(filename)
+    return (
+        filename.startswith(BACKEND_ROOT)
+        and "site-packages" not in filename
+        and filename not in _INSTRUMENTATION_FILES
+    )
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    qualname = getattr(code, "co_qualname", code.co_name)
+    return f"{frame.f_globals.get('__name__', '?')}.{qualname}"
+
+
+def _describe(frame: Optional[FrameType]) -> Tuple[str, str, List[str]]:
+    """
+    Attribute a stack sample.
+
+    Returns:
+        (call site, innermost function actually running, formatted stack
+        innermost first)
+    """
+    if frame is None:
+        return UNKNOWN_SITE, UNKNOWN_SITE, []
+    running = _frame_name(frame)
+    site = None
+    stack = []
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if site is None and _is_backend_frame(filename):
+            site = _frame_name(frame)
+        if len(stack) < STACK_DEPTH:
+            stack.append(f"{_frame_name(frame)} ({os.path.basename(filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return site or UNKNOWN_SITE, running, stack
+
+
+class _BlockSite:
+    __slots__ = ("site", "count", "total_ms", "max_ms", "last_seen", "running", "stack")
+
+    def __init__(self, site: str) -> None:
+        self.site = site
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_seen: Optional[str] = None
+        self.running: Counter = Counter()
+        self.stack: List[str] = []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "site": self.site,
+            "count": self.count,
+            "total_blocked_ms": round(self.total_ms, 1),
+            "max_blocked_ms": round(self.max_ms, 1),
+            "avg_blocked_ms": round(self.total_ms / self.count, 1) if self.count else None,
+            "last_seen": self.last_seen,
+            "blocked_in": [name for name, _ in self.running.most_common(3)],
+            "stack": self.stack,
+        }
+
+
+class _Stall:
+    """Samples taken while the loop is stalled"""
+
+    __slots__ = ("beat", "samples", "stacks", "running")
+
+    def __init__(self, beat: float) -> None:
+        self.beat = beat
+        self.samples: Counter = Counter()
+        self.stacks: Dict[str, List[str]] = {}
+        self.running: Dict[str, Counter] = {}
+
+    def add(self, site: str, running: str, stack: List[str]) -> None:
+        self.samples[site] += 1
+        self.stacks.setdefault(site, stack)
+        self.running.setdefault(site, Counter())[running] += 1
+
+
+class LoopWatchdog:
+    """
+    Detects event loop stalls longer than a threshold and ranks the call
+    sites responsible.
+
+    start() must run on the event loop it watches.
+    """
+
+    def __init__(self, enabled: bool = True, threshold_ms: float = 100.0, recent_size: int = 50) -> None:
+        self.enabled = enabled
+        self.threshold = threshold_ms / 1000
+        self._interval = self.threshold / 2
+        self._last_beat = time.monotonic()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat: Optional[asyncio.Task[None]] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._sites: Dict[str, _BlockSite] = {}
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=recent_size)
+        self._stats = {"blocks": 0, "blocked_ms": 0.0, "samples": 0, "max_blocked_ms": 0.0}
+        self._started_at: Optional[str] = None
+
+    # ========================================================================
+    # Lifecycle
+    # ========================================================================
+
+    async def start(self) -> None:
+        """Start the heartbeat on the running loop and the watchdog thread"""
+        if not self.enabled or self._heartbeat is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._heartbeat = asyncio.create_task(self._beat(), name="loop_watchdog_heartbeat")
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        self._started_at = datetime.now(timezone.utc).isoformat()
+        logger.info(f"[LoopWatchdog] Watching the event loop (threshold {self.threshold * 1000:.0f}ms)")
+
+    async def stop(self) -> None:
+        """Stop the heartbeat and the watchdog thread"""
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            try:
+                await self._heartbeat
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat = None
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join, 1.0)
+            self._thread = None
+
+    async def _beat(self) -> None:
+        while True:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self._interval)
+
+    # ========================================================================
+    # Watchdog Thread
+    # ========================================================================
+
+    def _watch(self) -> None:
+        stall: Optional[_Stall] = None
+        while not self._stop.wait(self._interval):
+            if self._loop is None or self._loop.is_closed():
+                break
+            beat = self._last_beat
+            if stall is not None and beat != stall.beat:
+                # The loop ran again: the stall lasted from its last beat to this one
+                self._record(stall, (beat - stall.beat - self._interval) * 1000)
+                stall = None
+            if time.monotonic() - beat - self._interval < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if stall is None:
+                stall = _Stall(beat)
+            stall.add(*_describe(frame))
+            del frame
+        if stall is not None:
+            self._record(stall, (time.monotonic() - stall.beat - self._interval) * 1000)
+
+    def _record(self, stall: _Stall, blocked_ms: float) -> None:
+        """Attribute a finished stall to the call site sampled most often"""
+        blocked_ms = max(blocked_ms, self.threshold * 1000)
+        site_name, _ = stall.samples.most_common(1)[0]
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            site = self._sites.get(site_name)
+            if site is None:
+                if len(self._sites) >= MAX_SITES:
+                    least = min(self._sites.values(), key=lambda s: s.total_ms)
+                    del self._sites[least.site]
+                site = self._sites[site_name] = _BlockSite(site_name)
+            site.count += 1
+            site.total_ms += blocked_ms
+            site.max_ms = max(site.max_ms, blocked_ms)
+            site.last_seen = now
+            site.running.update(stall.running[site_name])
+            site.stack = stall.stacks[site_name]
+
+            self._stats["blocks"] += 1
+            self._stats["blocked_ms"] += blocked_ms
+            self._stats["samples"] += sum(stall.samples.values())
+            self._stats["max_blocked_ms"] = max(self._stats["max_blocked_ms"], blocked_ms)
+            self._recent.append({
+                "at": now,
+                "blocked_ms": round(blocked_ms, 1),
+                "site": site_name,
+                "other_sites": [s for s in stall.samples if s != site_name],
+            })
+        logger.warning(f"[LoopWatchdog] Event loop blocked for {blocked_ms:.0f}ms in {site_name}")
+
+    # ========================================================================
+    # Reporting
+    # ========================================================================
+
+    def get_report(self, limit: int = 20) -> Dict[str, Any]:
+        """Call sites ranked by total blocked time, plus the most recent events"""
+        with self._lock:
+            sites = sorted(self._sites.values(), key=lambda s: s.total_ms, reverse=True)
+            return {
+                "enabled": self.enabled,
+                "running": self._heartbeat is not None,
+                "threshold_ms": round(self.threshold * 1000, 1),
+                "started_at": self._started_at,
+                **{key: round(value, 1) for key, value in self._stats.items()},
+                "sites": [site.to_dict() for site in sites[:limit]],
+                "recent": list(reversed(self._recent)),
+            }
+
+    def reset(self) -> None:
+        """Forget recorded blocking events"""
+        with self._lock:
+            self._sites.clear()
+            self._recent.clear()
+            self._stats = {"blocks": 0, "blocked_ms": 0.0, "samples": 0, "max_blocked_ms": 0.0}
+
+    def collect_metrics(self) -> List[MetricFamily]:
+        """Blocking totals, reported at /metrics scrape time"""
+        return [
+            MetricFamily("event_loop_blocks_total", "counter",
+                         "Event loop stalls longer than the watchdog threshold", [({}, self._stats["blocks"])]),
+            MetricFamily("event_loop_blocked_seconds_total", "counter",
+                         "Time the event loop spent in those stalls", [({}, self._stats["blocked_ms"] / 1000)]),
+        ]
+
+
+# Module-level instance; the heartbeat and thread run from app startup to shutdown
+loop_watchdog = service_registry.register(
+    "loop_watchdog", lambda: LoopWatchdog(LOOP_WATCHDOG_ENABLED, LOOP_WATCHDOG_THRESHOLD_MS),
+    init=lambda watchdog: watchdog.start(), close=lambda watchdog: watchdog.stop()
+)
+metrics.register_collector(
+    lambda: loop_watchdog.collect_metrics() if service_registry.is_built("loop_watchdog") else []
+)
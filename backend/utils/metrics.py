@@ -0,0 +1,504 @@
+"""
+In-process metrics registry with a Prometheus text exposition.
+Counters, gauges and histograms are plain in-memory values updated in place:
+recording is a dict lookup, a lock and an addition, cheap enough to leave on
+in production. Subsystems that already keep their own counters (cache hit
+dicts, access stats) register collectors instead, which are only read when
+/metrics is scraped, so their hot paths are unchanged.
+
+Every worker process keeps its own registry. With several workers, scrape each
+one (or label the target by worker) rather than going through a load balancer.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from config import METRICS_ENABLED, METRICS_LOOP_LAG_INTERVAL
+from utils.service_registry import service_registry
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Default histogram buckets, in seconds
+LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+JOB_BUCKETS: Tuple[float, ...] = (0.01, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900)
+COUNT_BUCKETS: Tuple[float, ...] = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+LAG_BUCKETS: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[Any]) -> str:
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return f"{{{pairs}}}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricFamily(NamedTuple):
+    """Samples produced by a collector at scrape time"""
+    name: str
+    kind: str  # "counter" or "gauge"
+    help: str
+    samples: List[Tuple[Dict[str, Any], float]]
+
+
+# ============================================================================
+# Metric Types
+# ============================================================================
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[LabelValues, Any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: Any, **labels: Any) -> Any:
+        """Child metric for one combination of label values"""
+        key = tuple(str(v) for v in values) if values else tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def _unlabelled(self) -> Any:
+        if self.labelnames:
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return self.labels()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, values))
+        return lines
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def render(self, name: str, labelnames: Tuple[str, ...], values: LabelValues) -> List[str]:
+        return [f"{name}{_format_labels(labelnames, values)} {_format_value(self.value)}"]
+
+
+class Counter(_Metric):
+    """Monotonic count; names end in _total"""
+
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1) -> None:
+        self._unlabelled().inc(amount)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def set(self, value: float) -> None:
+        self._unlabelled().set(value)
+
+    def inc(self, amount: float = 1) -> None:
+        self._unlabelled().inc(amount)
+
+    def dec(self, amount: float = 1) -> None:
+        self._unlabelled().dec(amount)
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def render(self, name: str, labelnames: Tuple[str, ...], values: LabelValues) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip((*self.buckets, float("inf")), self.counts):
+            cumulative += bucket_count
+            labels = _format_labels((*labelnames, "le"), (*values, _format_value(bound)))
+            lines.append(f"{name}_bucket{labels} {cumulative}")
+        labels = _format_labels(labelnames, values)
+        lines.append(f"{name}_sum{labels} {_format_value(self.sum)}")
+        lines.append(f"{name}_count{labels} {self.count}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Bucketed distribution with a running sum and count"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._unlabelled().observe(value)
+
+
+# ============================================================================
+# Registry
+# ============================================================================
+
+class MetricsRegistry:
+    """
+    Named metrics plus scrape-time collectors, rendered in the Prometheus
+    text format.
+
+    counter(), gauge() and histogram() return the existing metric when the
+    name is already registered, so modules can declare what they record
+    without coordinating import order.
+    """
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls: type, name: str, help: str, labelnames: Tuple[str, ...], **kwargs: Any) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered with a different type or labels")
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labelnames, buckets=buckets)
+
+    def register_collector(self, collector: Callable[[], Iterable[MetricFamily]]) -> None:
+        """
+        Add a callable that reports existing counters at scrape time.
+
+        Args:
+            collector: Returns MetricFamily values; it must not block or touch the database
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+
+        families: Dict[str, MetricFamily] = {}
+        for collector in self._collectors:
+            try:
+                for family in collector():
+                    existing = families.get(family.name)
+                    if existing is None:
+                        families[family.name] = MetricFamily(family.name, family.kind, family.help, list(family.samples))
+                    else:
+                        existing.samples.extend(family.samples)
+            except Exception as e:
+                logger.warning(f"[MetricsRegistry] Collector {getattr(collector, '__qualname__', collector)} failed: {e}")
+        for family in sorted(families.values(), key=lambda f: f.name):
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for labels, value in family.samples:
+                lines.append(f"{family.name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Drop every metric value (collectors stay registered)"""
+        with self._lock:
+            for metric in self._metrics.values():
+                metric._children.clear()
+
+
+# Global instance
+metrics = MetricsRegistry(enabled=METRICS_ENABLED)
+
+
+# ============================================================================
+# Application Metrics
+# ============================================================================
+
+HTTP_REQUEST_DURATION = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ("method", "route", "status"),
+)
+HTTP_REQUEST_DB_ROUND_TRIPS = metrics.histogram(
+    "http_request_db_round_trips", "Supabase table and RPC round trips made while serving one request",
+    ("route",), buckets=COUNT_BUCKETS,
+)
+OUTBOUND_HTTP_REQUESTS = metrics.counter(
+    "outbound_http_requests_total", "Requests sent through httpx (supabase-py), by target",
+    ("target",),
+)
+ALPHA_VANTAGE_REQUESTS = metrics.counter(
+    "alpha_vantage_requests_total", "Alpha Vantage calls by function and outcome (ok, throttled, error)",
+    ("function", "outcome"),
+)
+BACKGROUND_JOB_DURATION = metrics.histogram(
+    "background_job_duration_seconds", "Duration of background and scheduled jobs",
+    ("job", "status"), buckets=JOB_BUCKETS,
+)
+EVENT_LOOP_LAG = metrics.histogram(
+    "event_loop_lag_seconds", "How late the event loop woke a sleeping probe task",
+    buckets=LAG_BUCKETS,
+)
+
+_request_db_round_trips: ContextVar[Optional[List[int]]] = ContextVar("request_db_round_trips", default=None)
+
+
+def route_template(scope: Dict[str, Any]) -> str:
+    """
+    Path template of the matched route ("/api/quote/{symbol}"), or "unmatched".
+
+    Unmatched paths share one label so scans cannot blow up the series count.
+    """
+    # Newer FastAPI mounts included routers: scope["route"] is then relative
+    # to its router and the full template is on the effective route context
+    effective = (scope.get("fastapi") or {}).get("effective_route_context")
+    path = getattr(effective, "path_format", None) or getattr(scope.get("route"), "path", None)
+    return path or "unmatched"
+
+
+def begin_request_metrics() -> Tuple[List[int], Token]:
+    """Start counting database round trips for the current request"""
+    counter = [0]
+    return counter, _request_db_round_trips.set(counter)
+
+
+def finish_request_metrics(counter: List[int], token: Token, method: str, route: str, status: int, duration_seconds: float) -> None:
+    """Record latency and round trips of a finished request"""
+    _request_db_round_trips.reset(token)
+    HTTP_REQUEST_DURATION.labels(method, route, f"{status // 100}xx").observe(duration_seconds)
+    HTTP_REQUEST_DB_ROUND_TRIPS.labels(route).observe(counter[0])
+
+
+def record_outbound_call(target: str, database: bool) -> None:
+    """Count one httpx request; database calls also count against the current request"""
+    OUTBOUND_HTTP_REQUESTS.labels(target).inc()
+    if database:
+        counter = _request_db_round_trips.get()
+        if counter is not None:
+            counter[0] += 1
+
+
+def record_alpha_vantage_call(function: str, data: Optional[Dict[str, Any]]) -> None:
+    """
+    Count an Alpha Vantage response.
+
+    Args:
+        function: The API function parameter (GLOBAL_QUOTE, FX_DAILY, ...)
+        data: Parsed response body, or None if the call failed
+    """
+    if data is None or "Error Message" in data:
+        outcome = "error"
+    elif "Note" in data or "Information" in data:
+        # Both are used for per-minute and daily quota messages
+        outcome = "throttled"
+    else:
+        outcome = "ok"
+    ALPHA_VANTAGE_REQUESTS.labels(function or "unknown", outcome).inc()
+
+
+def cache_families(
+    tier: str,
+    hits: float,
+    misses: float,
+    evictions: Optional[float] = None,
+    invalidations: Optional[float] = None,
+    entries: Optional[float] = None,
+) -> List[MetricFamily]:
+    """
+    Standard families for one cache tier, built from its existing counters.
+
+    Args:
+        tier: Label value naming the cache (memory, complete, db.<table>)
+        hits: Hit count
+        misses: Miss count
+        evictions: Entries evicted for space, if the tier evicts
+        invalidations: Entries removed by invalidation, if tracked
+        entries: Current entry count, if known
+    """
+    families = [
+        MetricFamily("cache_requests_total", "counter", "Cache lookups by tier and result",
+                     [({"tier": tier, "result": "hit"}, hits), ({"tier": tier, "result": "miss"}, misses)]),
+    ]
+    if evictions is not None:
+        families.append(MetricFamily("cache_evictions_total", "counter", "Entries evicted to stay within the cache budget",
+                                     [({"tier": tier}, evictions)]))
+    if invalidations is not None:
+        families.append(MetricFamily("cache_invalidations_total", "counter", "Entries removed by invalidation",
+                                     [({"tier": tier}, invalidations)]))
+    if entries is not None:
+        families.append(MetricFamily("cache_entries", "gauge", "Entries currently cached", [({"tier": tier}, entries)]))
+    return families
+
+
+@contextmanager
+def timed_job(job: str) -> Iterator[None]:
+    """Record the duration and outcome of one background job run"""
+    started = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except asyncio.CancelledError:
+        status = "cancelled"
+        raise
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        BACKGROUND_JOB_DURATION.labels(job, status).observe(time.perf_counter() - started)
+
+
+# ============================================================================
+# Event Loop Lag
+# ============================================================================
+
+class EventLoopLagProbe:
+    """
+    Background task that sleeps for a fixed interval and records how late it
+    woke up. Lag is time the loop spent running something else: blocking
+    calls, long synchronous loops or too many ready callbacks.
+    """
+
+    def __init__(self, interval: float = 0.5) -> None:
+        self.interval = interval
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task[None]] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - scheduled - self.interval)
+            self.last_lag = lag
+            if lag > self.max_lag:
+                self.max_lag = lag
+            EVENT_LOOP_LAG.observe(lag)
+
+    async def start(self) -> None:
+        if not metrics.enabled or self.interval <= 0:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="event_loop_lag_probe")
+
+    async def stop(self) -> None:
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def collect(self) -> List[MetricFamily]:
+        return [
+            MetricFamily("event_loop_lag_last_seconds", "gauge", "Most recent event loop lag sample", [({}, self.last_lag)]),
+            MetricFamily("event_loop_lag_max_seconds", "gauge", "Worst event loop lag seen by this worker", [({}, self.max_lag)]),
+        ]
+
+
+def _collect_process() -> List[MetricFamily]:
+    return [MetricFamily("backend_worker_info", "gauge", "One series per worker process", [({"pid": os.getpid()}, 1)])]
+
+
+metrics.register_collector(_collect_process)
+
+# Module-level instance; the probe runs from app startup to shutdown
+event_loop_lag_probe = service_registry.register(
+    "event_loop_lag_probe", lambda: EventLoopLagProbe(METRICS_LOOP_LAG_INTERVAL),
+    init=lambda probe: probe.start(), close=lambda probe: probe.stop()
+)
+metrics.register_collector(
+    lambda: event_loop_lag_probe.collect() if service_registry.is_built("event_loop_lag_probe") else []
+)
@@ -0,0 +1,448 @@
+"""
+Opt-in per-request profiling.
+A profiled request collects timed stages from instrumented code, counts the
+Supabase round trips and external API calls made on its behalf and can
+capture a cProfile (or pyinstrument) report. The breakdown is returned in a
+Server-Timing header and kept in a small buffer for /api/debug/profiles.
+
+Profiling has to be switched on (PROFILING_ENABLED or the debug toggle);
+then a request opts in with an "X-Profile: 1" header ("X-Profile: cprofile"
+or "pyinstrument" adds a code profile), or is picked by PROFILING_SAMPLE_RATE.
+Outside a profiled request instrumented code pays one ContextVar lookup.
+"""
+import asyncio
+import cProfile
+import io
+import logging
+import pstats
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import nullcontext
+from contextvars import ContextVar, Token
+from functools import wraps
+from typing import Any, Callable, ContextManager, Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from config import (
+    PROFILING_BUFFER_SIZE,
+    PROFILING_CPROFILE_SAMPLE_RATE,
+    PROFILING_ENABLED,
+    PROFILING_SAMPLE_RATE,
+    SUPA_API_URL,
+)
+from utils.metrics import metrics, record_outbound_call
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+    PYINSTRUMENT_AVAILABLE = True
+except ImportError:
+    PyinstrumentProfiler = None
+    PYINSTRUMENT_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# Stage records kept per request; further stages only feed the summary
+MAX_STAGES = 500
+# Lines of code-profile output kept per request
+CODE_PROFILE_LINES = 60
+
+# Call categories that are database round trips or external API calls
+DB_CATEGORIES = ("supabase.db", "supabase.rpc")
+EXTERNAL_CATEGORIES = ("alpha_vantage", "http")
+
+_NULL_STAGE = nullcontext()
+_httpx_instrumented = False
+_SUPABASE_HOST = urlsplit(SUPA_API_URL).netloc
+
+
+class RequestProfile:
+    """Stages and call counts of one request."""
+
+    def __init__(self, method: str, path: str, code_profiler: Optional[str]) -> None:
+        self.id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.user_id: Optional[str] = None
+        self.code_profiler = code_profiler
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+        self.status_code: Optional[int] = None
+        self.stages: List[Dict[str, Any]] = []
+        self.stage_totals: Dict[str, List[float]] = {}
+        self.calls: Dict[str, List[float]] = {}
+        self.code_profile: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def add_stage(self, name: str, start_ns: int, end_ns: int, error: Optional[BaseException] = None) -> None:
+        duration_ms = (end_ns - start_ns) / 1_000_000
+        with self._lock:
+            totals = self.stage_totals.setdefault(name, [0, 0.0])
+            totals[0] += 1
+            totals[1] += duration_ms
+            if len(self.stages) < MAX_STAGES:
+                self.stages.append({
+                    "name": name,
+                    "start_ms": round((start_ns - self.start_ns) / 1_000_000, 3),
+                    "duration_ms": round(duration_ms, 3),
+                    **({"error": type(error).__name__} if error is not None else {}),
+                })
+
+    def add_call(self, category: str, duration_ms: float) -> None:
+        with self._lock:
+            totals = self.calls.setdefault(category, [0, 0.0])
+            totals[0] += 1
+            totals[1] += duration_ms
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+        return (end_ns - self.start_ns) / 1_000_000
+
+    def _count(self, categories: Tuple[str, ...]) -> int:
+        return sum(int(count) for category, (count, _) in self.calls.items() if category.startswith(categories))
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals per stage name and call category"""
+        return {
+            "total_ms": round(self.duration_ms, 3),
+            "db_round_trips": self._count(DB_CATEGORIES),
+            "external_api_calls": self._count(EXTERNAL_CATEGORIES),
+            "stages": {
+                name: {"count": int(count), "total_ms": round(total, 3)}
+                for name, (count, total) in sorted(self.stage_totals.items(), key=lambda item: -item[1][1])
+            },
+            "calls": {
+                category: {"count": int(count), "total_ms": round(total, 3)}
+                for category, (count, total) in sorted(self.calls.items())
+            },
+        }
+
+    def server_timing(self, max_stages: int = 12) -> str:
+        """Server-Timing header value: total, call categories and the slowest stages"""
+        entries = [f"total;dur={self.duration_ms:.1f}"]
+        for category, (count, total) in sorted(self.calls.items()):
+            entries.append(f'{_metric_name(category)};desc="{int(count)} calls";dur={total:.1f}')
+        slowest = sorted(self.stage_totals.items(), key=lambda item: -item[1][1])[:max_stages]
+        for name, (count, total) in slowest:
+            entries.append(f'{_metric_name(name)};desc="x{int(count)}";dur={total:.1f}')
+        return ", ".join(entries)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            **self.summary(),
+            "timeline": self.stages,
+            "stages_dropped": max(0, sum(int(c) for c, _ in self.stage_totals.values()) - len(self.stages)),
+            "code_profiler": self.code_profiler,
+            "code_profile": self.code_profile,
+        }
+
+
+def _metric_name(name: str) -> str:
+    """Server-Timing metric names are HTTP tokens"""
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+
+
+class _Stage:
+    """Times one block into the active profile."""
+
+    __slots__ = ("profile", "name", "start_ns")
+
+    def __init__(self, profile: RequestProfile, name: str) -> None:
+        self.profile = profile
+        self.name = name
+        self.start_ns = 0
+
+    def __enter__(self) -> "_Stage":
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Optional[BaseException], tb: Any) -> None:
+        self.profile.add_stage(self.name, self.start_ns, time.perf_counter_ns(), exc)
+
+
+class _Call(_Stage):
+    """Times one outbound call into the active profile's call counts."""
+
+    __slots__ = ()
+
+    def __exit__(self, exc_type: Any, exc: Optional[BaseException], tb: Any) -> None:
+        self.profile.add_call(self.name, (time.perf_counter_ns() - self.start_ns) / 1_000_000)
+
+
+class RequestProfiler:
+    """
+    Decides which requests are profiled, hands out stage timers and keeps
+    the most recent finished profiles.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        sample_rate: float = 0.0,
+        code_profile_sample_rate: float = 0.0,
+        buffer_size: int = 50,
+    ) -> None:
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.code_profile_sample_rate = code_profile_sample_rate
+        self._profiles: Deque[RequestProfile] = deque(maxlen=buffer_size)
+
+    def configure(
+        self,
+        enabled: Optional[bool] = None,
+        sample_rate: Optional[float] = None,
+        code_profile_sample_rate: Optional[float] = None,
+    ) -> None:
+        """Change profiling settings at runtime"""
+        if enabled is not None:
+            self.enabled = enabled
+        if sample_rate is not None:
+            self.sample_rate = max(0.0, min(1.0, sample_rate))
+        if code_profile_sample_rate is not None:
+            self.code_profile_sample_rate = max(0.0, min(1.0, code_profile_sample_rate))
+        logger.info(
+            f"[RequestProfiler] enabled={self.enabled} sample_rate={self.sample_rate} "
+            f"code_profile_sample_rate={self.code_profile_sample_rate}"
+        )
+
+    # ========================================================================
+    # Request Lifecycle
+    # ========================================================================
+
+    def should_profile(self, header_value: Optional[str]) -> Tuple[bool, Optional[str]]:
+        """
+        Whether to profile a request, and with which code profiler.
+
+        Args:
+            header_value: The request's X-Profile header, if any
+
+        Returns:
+            (profile, code profiler name or None)
+        """
+        if not self.enabled:
+            return False, None
+        requested = (header_value or "").strip().lower()
+        if not requested and not (self.sample_rate and random.random() < self.sample_rate):
+            return False, None
+        if requested == "pyinstrument" and PYINSTRUMENT_AVAILABLE:
+            return True, "pyinstrument"
+        if requested in ("cprofile", "pyinstrument"):
+            return True, "cprofile"
+        if self.code_profile_sample_rate and random.random() < self.code_profile_sample_rate:
+            return True, "cprofile"
+        return True, None
+
+    def begin(self, method: str, path: str, code_profiler: Optional[str] = None) -> Tuple[RequestProfile, Token]:
+        """Start profiling the current request and make its profile current."""
+        instrument_httpx()
+        profile = RequestProfile(method, path, code_profiler)
+        return profile, _current_profile.set(profile)
+
+    def finish(self, profile: RequestProfile, token: Token, status_code: Optional[int] = None) -> None:
+        """Close a profile, restore the previous one and buffer it."""
+        profile.end_ns = time.perf_counter_ns()
+        profile.status_code = status_code
+        _current_profile.reset(token)
+        self._profiles.append(profile)
+
+    async def run(self, profile: RequestProfile, call: Callable[[], Any]) -> Any:
+        """
+        Await call() under the profile's code profiler, if it has one.
+
+        cProfile sees the whole thread, so concurrent requests show up in
+        its report; pyinstrument's async mode attributes awaits correctly.
+        """
+        if profile.code_profiler == "pyinstrument":
+            profiler = PyinstrumentProfiler(async_mode="enabled")
+            profiler.start()
+            try:
+                return await call()
+            finally:
+                profiler.stop()
+                profile.code_profile = "\n".join(profiler.output_text(unicode=False).splitlines()[:CODE_PROFILE_LINES * 2])
+        if profile.code_profiler == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                return await call()
+            finally:
+                profiler.disable()
+                output = io.StringIO()
+                pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(CODE_PROFILE_LINES)
+                profile.code_profile = output.getvalue()
+        return await call()
+
+    # ========================================================================
+    # Instrumentation
+    # ========================================================================
+
+    def current(self) -> Optional[RequestProfile]:
+        """The active request's profile, or None"""
+        return _current_profile.get()
+
+    def stage(self, name: str) -> ContextManager[Any]:
+        """Time a block as a named stage of the current request's profile."""
+        profile = _current_profile.get()
+        if profile is None:
+            return _NULL_STAGE
+        return _Stage(profile, name)
+
+    def call(self, category: str) -> ContextManager[Any]:
+        """Count and time an outbound call (e.g. "alpha_vantage") for the current request."""
+        profile = _current_profile.get()
+        if profile is None:
+            return _NULL_STAGE
+        return _Call(profile, category)
+
+    def profiled(self, name: Optional[str] = None) -> Callable[[Callable], Callable]:
+        """Decorator timing each call of a sync or async function as a stage."""
+        def decorator(func: Callable) -> Callable:
+            stage_name = name or func.__qualname__
+
+            if asyncio.iscoroutinefunction(func):
+                @wraps(func)
+                async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                    if _current_profile.get() is None:
+                        return await func(*args, **kwargs)
+                    with self.stage(stage_name):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @wraps(func)
+            def sync_wrapper(*args: Any, **kwargs: Any) -> Any:
+                if _current_profile.get() is None:
+                    return func(*args, **kwargs)
+                with self.stage(stage_name):
+                    return func(*args, **kwargs)
+            return sync_wrapper
+
+        return decorator
+
+    # ========================================================================
+    # Export
+    # ========================================================================
+
+    def get_recent(self, limit: int = 20, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Most recent profiles, newest first, without timelines and code profiles"""
+        profiles = [p for p in reversed(self._profiles) if user_id is None or p.user_id == user_id]
+        return [
+            {"id": p.id, "method": p.method, "path": p.path, "status_code": p.status_code, **p.summary()}
+            for p in profiles[:limit]
+        ]
+
+    def get(self, profile_id: str, user_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """A buffered profile in full"""
+        for profile in self._profiles:
+            if profile.id == profile_id and (user_id is None or profile.user_id == user_id):
+                return profile.to_dict()
+        return None
+
+
+def _call_category(url: Any) -> str:
+    netloc = url.netloc.decode() if isinstance(url.netloc, bytes) else url.netloc
+    if netloc == _SUPABASE_HOST:
+        path = url.path
+        if path.startswith("/rest/v1/rpc/"):
+            return "supabase.rpc"
+        if path.startswith("/rest/v1/"):
+            return "supabase.db"
+        if path.startswith("/auth/v1/"):
+            return "supabase.auth"
+        return "supabase.other"
+    return f"http.{url.host}"
+
+
+def aiohttp_trace_configs(category: str = "alpha_vantage") -> List[Any]:
+    """
+    Trace configs for an aiohttp.ClientSession that count its requests
+    against the current profile.
+
+    Args:
+        category: Call category the session's requests are counted under
+
+    Returns:
+        Value for ClientSession(trace_configs=...)
+    """
+    import aiohttp
+
+    async def on_request_start(session: Any, context: Any, params: Any) -> None:
+        context.profile = _current_profile.get()
+        context.start_ns = time.perf_counter_ns()
+
+    async def on_request_done(session: Any, context: Any, params: Any) -> None:
+        if context.profile is not None:
+            context.profile.add_call(category, (time.perf_counter_ns() - context.start_ns) / 1_000_000)
+
+    config = aiohttp.TraceConfig()
+    config.on_request_start.append(on_request_start)
+    config.on_request_end.append(on_request_done)
+    config.on_request_exception.append(on_request_done)
+    return [config]
+
+
+def instrument_httpx() -> None:
+    """
+    Count httpx requests (supabase-py's transport) against the current
+    profile and the request metrics.
+
+    Wraps the transports once, on the first profiled request or at startup
+    when metrics are enabled, so nothing changes while both are off.
+    """
+    global _httpx_instrumented
+    if _httpx_instrumented:
+        return
+    try:
+        import httpx
+    except ImportError:
+        return
+    _httpx_instrumented = True
+
+    handle_request = httpx.HTTPTransport.handle_request
+    handle_async_request = httpx.AsyncHTTPTransport.handle_async_request
+
+    def counted_handle_request(transport: Any, request: Any) -> Any:
+        profile = _current_profile.get()
+        if profile is None and not metrics.enabled:
+            return handle_request(transport, request)
+        category = _call_category(request.url)
+        record_outbound_call(category, category in DB_CATEGORIES)
+        if profile is None:
+            return handle_request(transport, request)
+        with _Call(profile, category):
+            return handle_request(transport, request)
+
+    async def counted_handle_async_request(transport: Any, request: Any) -> Any:
+        profile = _current_profile.get()
+        if profile is None and not metrics.enabled:
+            return await handle_async_request(transport, request)
+        category = _call_category(request.url)
+        record_outbound_call(category, category in DB_CATEGORIES)
+        if profile is None:
+            return await handle_async_request(transport, request)
+        with _Call(profile, category):
+            return await handle_async_request(transport, request)
+
+    httpx.HTTPTransport.handle_request = counted_handle_request  # type: ignore[method-assign]
+    httpx.AsyncHTTPTransport.handle_async_request = counted_handle_async_request  # type: ignore[method-assign]
+
+
+# Global instance
+request_profiler = RequestProfiler(
+    enabled=PROFILING_ENABLED,
+    sample_rate=PROFILING_SAMPLE_RATE,
+    code_profile_sample_rate=PROFILING_CPROFILE_SAMPLE_RATE,
+    buffer_size=PROFILING_BUFFER_SIZE,
+)
@@ -0,0 +1,180 @@
+"""
+Lazy service registry
+Module-level service singletons are registered here instead of being
+constructed at import time
+
+Importing a service module used to construct its singleton, and with it
+Supabase clients, an aiohttp-backed Alpha Vantage client, forex and dividend
+services. Every worker, test collection and script paid for that up front.
+``service_registry.register()`` returns a LazyService proxy instead. The
+proxy is bound to the same module-level name, so ``from services.price_manager
+import price_manager`` keeps working. The instance is built on first
+attribute access.
+
+Services that need async setup or teardown (background tasks, LISTEN
+connections, HTTP sessions) register ``init`` and ``close`` hooks. The app
+lifespan calls ``await service_registry.start()`` and ``await
+service_registry.close()``. close() only tears down services that were
+actually built.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+Hook = Callable[[Any], Awaitable[Any]]
+
+
+class _Registration:
+    __slots__ = ("name", "factory", "init", "close", "instance", "init_ms", "started")
+
+    def __init__(self, name: str, factory: Callable[[], Any], init: Optional[Hook], close: Optional[Hook]) -> None:
+        self.name = name
+        self.factory = factory
+        self.init = init
+        self.close = close
+        self.instance: Any = None
+        self.init_ms: Optional[float] = None
+        self.started = False
+
+
+class LazyService:
+    """
+    Stand-in for a registered singleton; builds it on first use.
+
+    Attribute reads and writes go to the real instance, so callers and
+    tests (monkeypatch.setattr(price_manager, ...)) work unchanged.
+    isinstance() checks see the real class.
+    """
+
+    __slots__ = ("_registry", "_name")
+
+    def __init__(self, registry: "ServiceRegistry", name: str) -> None:
+        object.__setattr__(self, "_registry", registry)
+        object.__setattr__(self, "_name", name)
+
+    def _instance(self) -> Any:
+        return self._registry.get(self._name)
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self._instance(), attribute)
+
+    def __setattr__(self, attribute: str, value: Any) -> None:
+        setattr(self._instance(), attribute, value)
+
+    def __delattr__(self, attribute: str) -> None:
+        delattr(self._instance(), attribute)
+
+    @property  # type: ignore[misc]
+    def __class__(self) -> type:
+        return type(self._instance())
+
+    def __len__(self) -> int:
+        return len(self._instance())
+
+    def __iter__(self) -> Any:
+        return iter(self._instance())
+
+    def __contains__(self, item: Any) -> bool:
+        return item in self._instance()
+
+    def __bool__(self) -> bool:
+        return bool(self._instance())
+
+    def __repr__(self) -> str:
+        registration = self._registry._services[self._name]
+        if registration.instance is None:
+            return f"<LazyService {self._name} (not built)>"
+        return repr(registration.instance)
+
+
+class ServiceRegistry:
+    """Named singletons built on first use, with async init/close hooks"""
+
+    def __init__(self) -> None:
+        self._services: Dict[str, _Registration] = {}
+        self._lock = threading.RLock()
+        self._started = False
+
+    def register(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        init: Optional[Hook] = None,
+        close: Optional[Hook] = None,
+    ) -> Any:
+        """
+        Register a service and return its lazy proxy.
+
+        Args:
+            name: Unique service name
+            factory: Builds the instance (usually the class)
+            init: Async hook run by start(); services with an init hook are
+                built at start()
+            close: Async hook run by close() if the service was built
+
+        Returns:
+            LazyService proxy to bind to the module-level name
+        """
+        with self._lock:
+            if name in self._services:
+                raise ValueError(f"Service {name} is already registered")
+            self._services[name] = _Registration(name, factory, init, close)
+        return LazyService(self, name)
+
+    def get(self, name: str) -> Any:
+        """The built instance, building it now if needed"""
+        registration = self._services[name]
+        instance = registration.instance
+        if instance is not None:
+            return instance
+        with self._lock:
+            if registration.instance is None:
+                started = time.perf_counter()
+                registration.instance = registration.factory()
+                registration.init_ms = round((time.perf_counter() - started) * 1000, 2)
+                logger.info(f"[ServiceRegistry] Built {name} in {registration.init_ms:.1f}ms")
+        return registration.instance
+
+    def is_built(self, name: str) -> bool:
+        return self._services[name].instance is not None
+
+    async def start(self) -> None:
+        """Build every service that has an init hook and run the hooks in registration order"""
+        self._started = True
+        for registration in list(self._services.values()):
+            if registration.init is None or registration.started:
+                continue
+            await registration.init(self.get(registration.name))
+            registration.started = True
+
+    async def close(self) -> None:
+        """Run close hooks of built services in reverse registration order"""
+        for registration in reversed(list(self._services.values())):
+            if registration.instance is None or registration.close is None:
+                continue
+            if registration.init is not None and not registration.started:
+                continue
+            try:
+                await registration.close(registration.instance)
+            except Exception as e:
+                logger.warning(f"[ServiceRegistry] Error closing {registration.name}: {e}")
+            registration.started = False
+        self._started = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Which services are built and how long each took to build"""
+        built: List[str] = [name for name, r in self._services.items() if r.instance is not None]
+        return {
+            "registered": len(self._services),
+            "built": built,
+            "build_ms": {name: self._services[name].init_ms for name in built},
+            "started": self._started,
+        }
+
+
+# Module-level instance
+service_registry = ServiceRegistry()
@@ -8,6 +8,8 @@ import logging
 from typing import Callable, Any, Awaitable
 from functools import wraps
 
+from utils.metrics import timed_job
+
 logger = logging.getLogger(__name__)
 
 
@@ -32,7 +34,8 @@ async def safe_background_task(
         logger.info(f"[TaskUtils] Starting background task: {task_name}" + 
                    (f" for user {user_id}" if user_id else ""))
         
-        result = await task_func(*args, **kwargs)
+        with timed_job(task_name):
+            result = await task_func(*args, **kwargs)
         
         logger.info(f"[TaskUtils] Background task completed successfully: {task_name}" + 
                    (f" for user {user_id}" if user_id else ""))
@@ -0,0 +1,291 @@
+"""
+Lightweight in-process tracing.
+Spans with start/end times, durations and attributes, a ring buffer of
+sampled spans and per-operation latency histograms. When tracing is disabled
+instrumented code pays a single flag check: no span objects are created and
+no arguments are serialized or formatted.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from functools import wraps
+from itertools import count
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from config import TRACING_BUFFER_SIZE, TRACING_ENABLED, TRACING_SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the latency histogram buckets; a final bucket catches the rest
+LATENCY_BUCKETS_MS: Tuple[float, ...] = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_span_ids = count(1)
+
+
+class Span:
+    """A timed operation with attributes."""
+
+    __slots__ = (
+        "name", "attributes", "trace_id", "span_id", "parent_id", "sampled",
+        "start_ns", "end_ns", "status", "error",
+    )
+
+    def __init__(self, name: str, attributes: Dict[str, Any], parent: Optional["Span"], sample_rate: float) -> None:
+        self.name = name
+        self.attributes = attributes
+        self.span_id = next(_span_ids)
+        if parent is None:
+            self.trace_id = f"{random.getrandbits(64):016x}"
+            self.parent_id = None
+            self.sampled = random.random() < sample_rate
+        else:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+            self.sampled = parent.sampled
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+        self.status = "ok"
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+        return (end_ns - self.start_ns) / 1_000_000
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Stand-in returned when tracing is off; every call is a no-op."""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, **attributes: Any) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram for one operation."""
+
+    __slots__ = ("counts", "count", "errors", "sum_ms", "max_ms")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, duration_ms: float, error: bool = False) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS_MS, duration_ms)] += 1
+        self.count += 1
+        self.sum_ms += duration_ms
+        if duration_ms > self.max_ms:
+            self.max_ms = duration_ms
+        if error:
+            self.errors += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket containing the q-th percentile (0-100)."""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.sum_ms / self.count, 3) if self.count else None,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "buckets": {
+                **{f"le_{bound}": n for bound, n in zip(LATENCY_BUCKETS_MS, self.counts)},
+                "le_inf": self.counts[-1],
+            },
+        }
+
+
+class Tracer:
+    """
+    Span recorder with sampling, a bounded span buffer and latency histograms.
+
+    Every finished span feeds its operation's histogram; only sampled spans
+    (and all failed ones) are kept in the ring buffer.
+    """
+
+    def __init__(self, enabled: bool = False, sample_rate: float = 0.1, buffer_size: int = 512) -> None:
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self._spans: Deque[Dict[str, Any]] = deque(maxlen=buffer_size)
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def configure(
+        self,
+        enabled: Optional[bool] = None,
+        sample_rate: Optional[float] = None,
+        buffer_size: Optional[int] = None,
+    ) -> None:
+        """Change tracing settings at runtime"""
+        if enabled is not None:
+            self.enabled = enabled
+        if sample_rate is not None:
+            self.sample_rate = max(0.0, min(1.0, sample_rate))
+        if buffer_size is not None and buffer_size != self._spans.maxlen:
+            self._spans = deque(self._spans, maxlen=buffer_size)
+        logger.info(f"[Tracer] enabled={self.enabled} sample_rate={self.sample_rate} buffer={self._spans.maxlen}")
+
+    # ========================================================================
+    # Span Lifecycle
+    # ========================================================================
+
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> Tuple[Span, Token]:
+        """Start a span as a child of the current one and make it current."""
+        span = Span(name, dict(attributes) if attributes else {}, _current_span.get(), self.sample_rate)
+        return span, _current_span.set(span)
+
+    def end_span(self, span: Span, token: Token, error: Optional[BaseException] = None) -> None:
+        """Finish a span, record its latency and restore the previous span."""
+        span.end_ns = time.perf_counter_ns()
+        _current_span.reset(token)
+        if error is not None:
+            span.status = "error"
+            span.error = f"{type(error).__name__}: {error}"
+
+        duration_ms = (span.end_ns - span.start_ns) / 1_000_000
+        with self._lock:
+            histogram = self._histograms.get(span.name)
+            if histogram is None:
+                histogram = self._histograms[span.name] = LatencyHistogram()
+            histogram.observe(duration_ms, error is not None)
+
+        if span.sampled or error is not None:
+            self._spans.append(span.to_dict())
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Any]:
+        """
+        Trace a block of code.
+
+        Yields the active span (or a no-op span when tracing is off) so the
+        block can attach attributes.
+        """
+        if not self.enabled:
+            yield NOOP_SPAN
+            return
+        span, token = self.start_span(name, attributes)
+        try:
+            yield span
+        except BaseException as e:
+            self.end_span(span, token, e)
+            raise
+        self.end_span(span, token)
+
+    def current_span(self) -> Any:
+        """Return the active span, or a no-op span outside a trace."""
+        span = _current_span.get()
+        return span if span is not None else NOOP_SPAN
+
+    def trace(self, name: Optional[str] = None, **attributes: Any) -> Callable[[Callable], Callable]:
+        """
+        Decorator tracing each call of a sync or async function.
+
+        Span name and attributes are fixed at decoration time; call
+        arguments are never captured.
+        """
+        def decorator(func: Callable) -> Callable:
+            span_name = name or f"{func.__module__}.{func.__qualname__}"
+            static_attributes = {"function": func.__qualname__, **attributes}
+
+            if asyncio.iscoroutinefunction(func):
+                @wraps(func)
+                async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                    if not self.enabled:
+                        return await func(*args, **kwargs)
+                    span, token = self.start_span(span_name, static_attributes)
+                    try:
+                        result = await func(*args, **kwargs)
+                    except BaseException as e:
+                        self.end_span(span, token, e)
+                        raise
+                    self.end_span(span, token)
+                    return result
+                return async_wrapper
+
+            @wraps(func)
+            def sync_wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                span, token = self.start_span(span_name, static_attributes)
+                try:
+                    result = func(*args, **kwargs)
+                except BaseException as e:
+                    self.end_span(span, token, e)
+                    raise
+                self.end_span(span, token)
+                return result
+            return sync_wrapper
+
+        return decorator
+
+    # ========================================================================
+    # Export
+    # ========================================================================
+
+    def get_recent_spans(self, limit: int = 100, name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Most recent buffered spans, newest first"""
+        spans = [s for s in reversed(self._spans) if name is None or s["name"] == name]
+        return spans[:limit]
+
+    def get_histograms(self) -> Dict[str, Dict[str, Any]]:
+        """Per-operation latency histograms"""
+        with self._lock:
+            return {name: histogram.to_dict() for name, histogram in sorted(self._histograms.items())}
+
+    def reset(self) -> None:
+        """Drop buffered spans and histograms"""
+        with self._lock:
+            self._histograms.clear()
+        self._spans.clear()
+
+
+# Global instance
+tracer = Tracer(enabled=TRACING_ENABLED, sample_rate=TRACING_SAMPLE_RATE, buffer_size=TRACING_BUFFER_SIZE)
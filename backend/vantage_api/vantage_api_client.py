@@ -2,16 +2,21 @@
 Alpha Vantage API client with caching and extensive debugging
 Handles all stock market data requests
 """
-import aiohttp
 import asyncio
-from typing import Dict, Any, Optional, List
+from typing import TYPE_CHECKING, Dict, Any, Optional, List
 import logging
 from datetime import datetime, timedelta
 import json
 
 from config import VANTAGE_API_KEY, VANTAGE_API_BASE_URL, CACHE_TTL_SECONDS
 from debug_logger import DebugLogger
+from utils.metrics import record_alpha_vantage_call
+from utils.request_profiler import aiohttp_trace_configs
 from supa_api.supa_api_client import get_supa_service_client
+from utils.service_registry import service_registry
+
+if TYPE_CHECKING:
+    import aiohttp
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +26,7 @@ class VantageApiClient:
     def __init__(self):
         self.api_key = VANTAGE_API_KEY
         self.base_url = VANTAGE_API_BASE_URL
-        self.session: Optional[aiohttp.ClientSession] = None
+        self.session: Optional["aiohttp.ClientSession"] = None
         self.supa_client = get_supa_service_client()
         
         logger.info(f"""
@@ -35,7 +40,9 @@ BASE_URL: {self.base_url}
     async def _ensure_session(self) -> None:
         """Ensure aiohttp session is created"""
         if not self.session or self.session.closed:
-            self.session = aiohttp.ClientSession()
+            # Imported here: aiohttp is only needed once a request is made
+            import aiohttp
+            self.session = aiohttp.ClientSession(trace_configs=aiohttp_trace_configs())
             logger.info("[vantage_api_client.py::_ensure_session] Created new aiohttp session")
     
     async def _make_request(self, params: Dict[str, str]) -> Dict[str, Any]:
@@ -57,6 +64,7 @@ BASE_URL: {self.base_url}
 # PARAMS: {json.dumps({k: v for k, v in params.items() if k != 'apikey'}, indent=2)}
 # =========================================""")
         
+        data = None
         try:
             async with self.session.get(url, params=params) as response:
                 response_text = await response.text()
@@ -65,6 +73,7 @@ BASE_URL: {self.base_url}
                     raise Exception(f"API returned status {response.status}: {response_text}")
                 
                 data = json.loads(response_text)
+                record_alpha_vantage_call(params.get('function', ''), data)
                 
                 # Check for API errors
                 if "Error Message" in data:
@@ -85,6 +94,8 @@ BASE_URL: {self.base_url}
                 return data
                 
         except Exception as e:
+            if data is None:
+                record_alpha_vantage_call(params.get('function', ''), None)
             DebugLogger.log_error(
                 file_name="vantage_api_client.py",
                 function_name="_make_request",
@@ -171,8 +182,10 @@ BASE_URL: {self.base_url}
             await self.session.close()
             logger.info("[vantage_api_client.py::close] Closed aiohttp session")
 
-# Create singleton instance
-vantage_api_client = VantageApiClient()
+# Singleton instance, created on first use; the aiohttp session is closed at shutdown
+vantage_api_client = service_registry.register(
+    "vantage_api_client", VantageApiClient, close=lambda client: client.close()
+)
 
 # Export convenience function
 def get_vantage_client() -> VantageApiClient:
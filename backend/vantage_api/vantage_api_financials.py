@@ -3,12 +3,13 @@ Alpha Vantage Financial Statements API
 Handles income statement, balance sheet, and cash flow data
 """
 import logging
-import aiohttp
 from typing import Dict, Any, List
 from datetime import datetime
 
 from config import VANTAGE_API_KEY
 from debug_logger import DebugLogger
+from utils.metrics import record_alpha_vantage_call
+from utils.request_profiler import aiohttp_trace_configs
 
 logger = logging.getLogger(__name__)
 
@@ -33,11 +34,14 @@ async def vantage_api_get_income_statement(symbol: str) -> Dict[str, Any]:
         "apikey": VANTAGE_API_KEY
     }
     
+    import aiohttp  # Imported on use to keep module import light
+    
     try:
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=aiohttp_trace_configs()) as session:
             async with session.get(ALPHA_VANTAGE_BASE_URL, params=params) as response:
                 if response.status == 200:
                     data = await response.json()
+                    record_alpha_vantage_call(params["function"], data)
                     
                     # Check for API errors
                     if "Error Message" in data:
@@ -53,6 +57,7 @@ async def vantage_api_get_income_statement(symbol: str) -> Dict[str, Any]:
                         "last_updated": datetime.utcnow().isoformat()
                     }
                 else:
+                    record_alpha_vantage_call(params["function"], None)
                     raise ValueError(f"Alpha Vantage API request failed with status {response.status}")
                     
     except Exception as e:
@@ -82,11 +87,14 @@ async def vantage_api_get_balance_sheet(symbol: str) -> Dict[str, Any]:
         "apikey": VANTAGE_API_KEY
     }
     
+    import aiohttp  # Imported on use to keep module import light
+    
     try:
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=aiohttp_trace_configs()) as session:
             async with session.get(ALPHA_VANTAGE_BASE_URL, params=params) as response:
                 if response.status == 200:
                     data = await response.json()
+                    record_alpha_vantage_call(params["function"], data)
                     
                     # Check for API errors
                     if "Error Message" in data:
@@ -102,6 +110,7 @@ async def vantage_api_get_balance_sheet(symbol: str) -> Dict[str, Any]:
                         "last_updated": datetime.utcnow().isoformat()
                     }
                 else:
+                    record_alpha_vantage_call(params["function"], None)
                     raise ValueError(f"Alpha Vantage API request failed with status {response.status}")
                     
     except Exception as e:
@@ -131,11 +140,14 @@ async def vantage_api_get_cash_flow(symbol: str) -> Dict[str, Any]:
         "apikey": VANTAGE_API_KEY
     }
     
+    import aiohttp  # Imported on use to keep module import light
+    
     try:
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(trace_configs=aiohttp_trace_configs()) as session:
             async with session.get(ALPHA_VANTAGE_BASE_URL, params=params) as response:
                 if response.status == 200:
                     data = await response.json()
+                    record_alpha_vantage_call(params["function"], data)
                     
                     # Check for API errors
                     if "Error Message" in data:
@@ -151,6 +163,7 @@ async def vantage_api_get_cash_flow(symbol: str) -> Dict[str, Any]:
                         "last_updated": datetime.utcnow().isoformat()
                     }
                 else:
+                    record_alpha_vantage_call(params["function"], None)
                     raise ValueError(f"Alpha Vantage API request failed with status {response.status}")
                     
     except Exception as e:
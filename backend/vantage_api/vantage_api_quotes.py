@@ -12,12 +12,16 @@ from decimal import Decimal, InvalidOperation
 from .vantage_api_client import get_vantage_client
 from debug_logger import DebugLogger
 try:
-    from services.feature_flag_service import is_feature_enabled
+    from services.feature_flag_service import is_feature_enabled, get_feature_flags
 except ImportError:
     # Fallback for Docker builds - disable feature flags
     def is_feature_enabled(flag_name: str, user_id: str = None) -> bool:
         """Fallback feature flag function that always returns True"""
         return True
+
+    def get_feature_flags(user_id: str = None, flag_names=None):
+        """Fallback - no snapshot, helpers use is_feature_enabled"""
+        return None
 from utils.auth_helpers import validate_user_id
 
 logger = logging.getLogger(__name__)
@@ -36,13 +40,14 @@ def _prepare_for_cache(data: Dict[str, Any]) -> Dict[str, Any]:
             result[key] = value
     return result
 
-def _safe_decimal_conversion(value: Any, user_id: Optional[str] = None) -> Decimal:
+def _safe_decimal_conversion(value: Any, user_id: Optional[str] = None, flags: Any = None) -> Decimal:
     """
     Safely convert Alpha Vantage API values to Decimal with feature flag support.
     
     Args:
         value: Value to convert to Decimal
         user_id: Optional user ID for feature flag evaluation
+        flags: Optional FeatureFlagSnapshot for user_id; skips the flag lookup
         
     Returns:
         Decimal representation of the value
@@ -52,11 +57,15 @@ def _safe_decimal_conversion(value: Any, user_id: Optional[str] = None) -> Decim
         if value is None or value == 'None' or value == '':
             return Decimal('0')
         
-        # Validate user_id if provided
-        if user_id:
-            user_id = validate_user_id(user_id)
+        if flags is not None:
+            decimal_migration = flags.is_enabled("decimal_migration")
+        else:
+            # Validate user_id if provided
+            if user_id:
+                user_id = validate_user_id(user_id)
+            decimal_migration = is_feature_enabled("decimal_migration", user_id)
         
-        if is_feature_enabled("decimal_migration", user_id):
+        if decimal_migration:
             # Precise conversion - maintain original precision
             if isinstance(value, Decimal):
                 return value
@@ -112,17 +121,20 @@ async def vantage_api_get_quote(symbol: str, user_id: Optional[str] = None) -> D
         quote = response['Global Quote']
         
         # Parse and format the data with Decimal precision
+        if user_id:
+            user_id = validate_user_id(user_id)
+        flags = get_feature_flags(user_id, ["decimal_migration"])
         formatted_quote = {
             'symbol': quote.get('01. symbol', symbol),
-            'price': _safe_decimal_conversion(quote.get('05. price', 0), user_id),
-            'change': _safe_decimal_conversion(quote.get('09. change', 0), user_id),
-            'change_percent': _safe_decimal_conversion(quote.get('10. change percent', '0%'), user_id),
+            'price': _safe_decimal_conversion(quote.get('05. price', 0), user_id, flags),
+            'change': _safe_decimal_conversion(quote.get('09. change', 0), user_id, flags),
+            'change_percent': _safe_decimal_conversion(quote.get('10. change percent', '0%'), user_id, flags),
             'volume': Decimal(str(quote.get('06. volume', 0))),
             'latest_trading_day': quote.get('07. latest trading day', ''),
-            'previous_close': _safe_decimal_conversion(quote.get('08. previous close', 0), user_id),
-            'open': _safe_decimal_conversion(quote.get('02. open', 0), user_id),
-            'high': _safe_decimal_conversion(quote.get('03. high', 0), user_id),
-            'low': _safe_decimal_conversion(quote.get('04. low', 0), user_id)
+            'previous_close': _safe_decimal_conversion(quote.get('08. previous close', 0), user_id, flags),
+            'open': _safe_decimal_conversion(quote.get('02. open', 0), user_id, flags),
+            'high': _safe_decimal_conversion(quote.get('03. high', 0), user_id, flags),
+            'low': _safe_decimal_conversion(quote.get('04. low', 0), user_id, flags)
         }
         
         # Cache the result (convert Decimals to floats for JSON serialization)
@@ -31,6 +31,49 @@ def levenshtein_distance(s1: str, s2: str) -> int:
     
     return previous_row[-1]
 
+def bounded_levenshtein_distance(s1: str, s2: str, max_distance: int) -> int:
+    """
+    Levenshtein distance that gives up once the distance exceeds max_distance.
+
+    Returns max_distance + 1 as soon as every cell in the current row is past
+    the bound, so clearly dissimilar strings cost O(max_distance) rows.
+    """
+    if abs(len(s1) - len(s2)) > max_distance:
+        return max_distance + 1
+    if len(s1) < len(s2):
+        s1, s2 = s2, s1
+    if len(s2) == 0:
+        return len(s1)
+    
+    previous_row = list(range(len(s2) + 1))
+    for i, c1 in enumerate(s1):
+        current_row = [i + 1]
+        row_min = i + 1
+        for j, c2 in enumerate(s2):
+            cost = min(previous_row[j + 1] + 1, current_row[j] + 1, previous_row[j] + (c1 != c2))
+            current_row.append(cost)
+            if cost < row_min:
+                row_min = cost
+        if row_min > max_distance:
+            return max_distance + 1
+        previous_row = current_row
+    
+    return previous_row[-1]
+
+# Common ticker typos and the symbol they most likely refer to
+COMMON_SYMBOL_TYPOS: Dict[str, str] = {
+    'APPL': 'AAPL',
+    'AMZM': 'AMZN',
+    'GOOG': 'GOOGL',
+    'MSFT': 'MSFT',  # Keep exact matches
+    'NVDA': 'NVDA',
+    'TSLA': 'TSLA',
+    'MELA': 'META',
+    'NFLX': 'NFLX',
+    'GOOLG': 'GOOGL',
+    'AMAZN': 'AMZN',
+}
+
 @DebugLogger.log_api_call(api_name="ALPHA_VANTAGE", sender="BACKEND", receiver="VANTAGE_API", operation="SYMBOL_SEARCH")
 async def vantage_api_symbol_search(query: str, limit: int = 20) -> List[Dict[str, Any]]:
     """
@@ -130,7 +173,9 @@ async def vantage_api_symbol_search(query: str, limit: int = 20) -> List[Dict[st
         # Cache the results (wrap in a dict so the stored JSON shape is self-describing)
         await client._save_to_cache(cache_key, {"results": final_results})
         
-    
+        # Feed newly discovered symbols into the in-memory typeahead index (rebuilt in the background)
+        from services.symbol_search_index import symbol_search_index
+        symbol_search_index.add_symbols(final_results)
         
         return final_results[:limit]
         
@@ -150,70 +195,71 @@ def calculate_relevance_score(symbol: str, name: str, query_upper: str, query_lo
     ticker_upper = symbol.upper()
     name_lower = name.lower()
     
+    # Scoring runs for every candidate row, so only build debug strings when they will be emitted
+    debug = logger.isEnabledFor(logging.DEBUG)
+    
     # 🔥 DEBUG: Log scoring details
-    logger.debug(f"[SCORING] Query: '{query_upper}', Symbol: '{ticker_upper}', Name: '{name_lower}'")
+    if debug:
+        logger.debug(f"[SCORING] Query: '{query_upper}', Symbol: '{ticker_upper}', Name: '{name_lower}'")
     
     # Exact match of ticker (highest priority)
     if ticker_upper == query_upper:
         score += 100
-        logger.debug(f"[SCORING] Exact match: {symbol} (+100)")
+        if debug:
+            logger.debug(f"[SCORING] Exact match: {symbol} (+100)")
     # Prefix match of ticker
     elif ticker_upper.startswith(query_upper):
         score += 75
-        logger.debug(f"[SCORING] Prefix match: {symbol} (+75)")
+        if debug:
+            logger.debug(f"[SCORING] Prefix match: {symbol} (+75)")
     # Substring match of ticker
     elif query_upper in ticker_upper:
         score += 50
-        logger.debug(f"[SCORING] Substring match: {symbol} (+50)")
+        if debug:
+            logger.debug(f"[SCORING] Substring match: {symbol} (+50)")
     
     # 🔥 FIX: Add fuzzy matching for typos like APPL -> AAPL
     else:
-        # Calculate Levenshtein distance for fuzzy matching
-        distance = levenshtein_distance(ticker_upper, query_upper)
         max_length = max(len(ticker_upper), len(query_upper))
         
         # If distance is small relative to length, give bonus points
         if max_length > 0:
-            similarity_ratio = 1.0 - (distance / max_length)
-            if similarity_ratio > 0.75:  # 75% similar
+            # Similarity must exceed 75%, so anything at or beyond a quarter of the length can stop early
+            max_distance = -(-max_length // 4) - 1
+            distance = bounded_levenshtein_distance(ticker_upper, query_upper, max_distance)
+            if distance <= max_distance:
+                similarity_ratio = 1.0 - (distance / max_length)
                 fuzzy_bonus = int(30 * similarity_ratio)
                 score += fuzzy_bonus
-                logger.debug(f"[SCORING] Fuzzy match: {symbol} distance={distance} similarity={similarity_ratio:.2f} (+{fuzzy_bonus})")
+                if debug:
+                    logger.debug(f"[SCORING] Fuzzy match: {symbol} distance={distance} similarity={similarity_ratio:.2f} (+{fuzzy_bonus})")
     
     # Prefix match of company name
     if name_lower.startswith(query_lower):
         score += 60
-        logger.debug(f"[SCORING] Company name prefix match: {name} (+60)")
+        if debug:
+            logger.debug(f"[SCORING] Company name prefix match: {name} (+60)")
     # Substring match of company name
     elif query_lower in name_lower:
         score += 40
-        logger.debug(f"[SCORING] Company name substring match: {name} (+40)")
+        if debug:
+            logger.debug(f"[SCORING] Company name substring match: {name} (+40)")
     
     # 🔥 FIX: Don't penalize short tickers - many valid tickers are 1-3 chars (F, GM, GE, etc.)
     # Only penalize if it's a partial match
     if len(ticker_upper) < 3 and ticker_upper != query_upper:
         score -= 10
-        logger.debug(f"[SCORING] Short ticker penalty: {symbol} (-10)")
+        if debug:
+            logger.debug(f"[SCORING] Short ticker penalty: {symbol} (-10)")
     
     # 🔥 FIX: Bonus for common typos
-    common_typos = {
-        'APPL': 'AAPL',
-        'AMZM': 'AMZN',
-        'GOOG': 'GOOGL',
-        'MSFT': 'MSFT',  # Keep exact matches
-        'NVDA': 'NVDA',
-        'TSLA': 'TSLA',
-        'MELA': 'META',
-        'NFLX': 'NFLX',
-        'GOOLG': 'GOOGL',
-        'AMAZN': 'AMZN',
-    }
-    
-    if query_upper in common_typos and ticker_upper == common_typos[query_upper]:
+    if COMMON_SYMBOL_TYPOS.get(query_upper) == ticker_upper:
         score += 50  # Significant bonus for common typos
-        logger.debug(f"[SCORING] Common typo match: {query_upper} -> {ticker_upper} (+50)")
+        if debug:
+            logger.debug(f"[SCORING] Common typo match: {query_upper} -> {ticker_upper} (+50)")
     
-    logger.debug(f"[SCORING] Final score for {symbol}: {score}")
+    if debug:
+        logger.debug(f"[SCORING] Final score for {symbol}: {score}")
     return score
 
 # Also search from cached symbols in database
@@ -292,21 +338,29 @@ async def supa_api_search_cached_symbols(query: str, limit: int = 20) -> List[Di
 
 # Combined search function
 async def combined_symbol_search(query: str, limit: int = 20) -> List[Dict[str, Any]]:
-    """Search both cached and live symbols, merge and deduplicate"""
-    logger.info(f"[vantage_api_search.py::combined_symbol_search] Combined search for: {query}")
+    """
+    Search symbols for typeahead.
     
-    # 🔥 DEBUG: Log search request
-    logger.info(f"[SEARCH_DEBUG] Query: '{query}'")
-    logger.info(f"[SEARCH_DEBUG] Query length: {len(query)}")
-    logger.info(f"[SEARCH_DEBUG] Query upper: '{query.upper()}'")
+    Answers from the in-memory symbol index when it is loaded. Falls back to the
+    database + Alpha Vantage path while the index is still warming up, and asks
+    Alpha Vantage only when the index has no match at all (new listings).
+    """
+    from services.symbol_search_index import symbol_search_index
+    
+    if symbol_search_index.is_ready:
+        indexed_results = symbol_search_index.search(query, limit)
+        if indexed_results:
+            return indexed_results
+        
+        # Unknown to the index - discover via Alpha Vantage (results are merged into the index)
+        return await vantage_api_symbol_search(query, limit)
+    
+    logger.info(f"[vantage_api_search.py::combined_symbol_search] Symbol index not ready, using database search for: {query}")
     
     # Search both sources
     cached_results = await supa_api_search_cached_symbols(query, limit)
     vantage_results = await vantage_api_symbol_search(query, limit)
     
-    logger.info(f"[SEARCH_DEBUG] Cached results: {len(cached_results)}")
-    logger.info(f"[SEARCH_DEBUG] Vantage results: {len(vantage_results)}")
-    
     # Merge and deduplicate
     seen_symbols = set()
     combined_results = []
@@ -325,12 +379,7 @@ async def combined_symbol_search(query: str, limit: int = 20) -> List[Dict[str,
     
     logger.info(f"[vantage_api_search.py::combined_symbol_search] Combined results: {len(combined_results)}")
     
-    # 🔥 DEBUG: Log final results
-    if combined_results:
-        logger.info(f"[SEARCH_DEBUG] Top 5 results:")
-        for i, result in enumerate(combined_results[:5]):
-            logger.info(f"[SEARCH_DEBUG]   {i+1}. {result['symbol']} - {result['name']}")
-    else:
+    if not combined_results:
         logger.warning(f"[SEARCH_DEBUG] No results found for query: '{query}'")
     
-    return combined_results[:limit] 
\ No newline at end of file
+    return combined_results[:limit]
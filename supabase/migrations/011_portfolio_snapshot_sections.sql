@@ -0,0 +1,69 @@
+-- ============================================================================
+-- Migration 011: Content-addressed portfolio snapshot sections
+-- ============================================================================
+-- Complete portfolio snapshots are stored as compressed sections (core,
+-- holdings, time_series, dividends) addressed by the SHA256 of their encoded
+-- bytes. user_performance rows reference sections by hash instead of
+-- carrying the whole snapshot as a JSON string, so unchanged sections are
+-- shared across refreshes.
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS public.portfolio_snapshot_sections (
+    content_hash TEXT PRIMARY KEY,
+    codec TEXT NOT NULL CHECK (codec IN ('gzip', 'zstd')),
+    payload TEXT NOT NULL,              -- base64 of the compressed section
+    raw_size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_portfolio_snapshot_sections_created
+ON public.portfolio_snapshot_sections (created_at);
+
+-- Sections are only read and written by the backend service role
+ALTER TABLE public.portfolio_snapshot_sections ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Service role can manage snapshot sections" ON public.portfolio_snapshot_sections
+    FOR ALL TO service_role
+    USING (true);
+
+-- Section references on the cache table; data_json is kept for legacy rows
+ALTER TABLE public.user_performance
+ADD COLUMN IF NOT EXISTS section_hashes JSONB;
+
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = 'user_performance' AND column_name = 'data_json'
+    ) THEN
+        ALTER TABLE public.user_performance ALTER COLUMN data_json DROP NOT NULL;
+    END IF;
+END;
+$$;
+
+-- Remove sections that no cache entry references (grace period covers
+-- sections uploaded just before their user_performance row is written)
+CREATE OR REPLACE FUNCTION cleanup_orphaned_snapshot_sections(
+    p_grace_period INTERVAL DEFAULT INTERVAL '1 hour'
+) RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    deleted_count INTEGER;
+BEGIN
+    DELETE FROM public.portfolio_snapshot_sections s
+    WHERE s.created_at < NOW() - p_grace_period
+      AND NOT EXISTS (
+          SELECT 1
+          FROM public.user_performance up, jsonb_each_text(up.section_hashes) AS ref(section, content_hash)
+          WHERE up.section_hashes IS NOT NULL
+            AND ref.content_hash = s.content_hash
+      );
+    GET DIAGNOSTICS deleted_count = ROW_COUNT;
+    RETURN deleted_count;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION cleanup_orphaned_snapshot_sections TO service_role;
@@ -0,0 +1,63 @@
+-- ============================================================================
+-- Migration 012: Batched cache access statistics
+-- ============================================================================
+-- Cache hits used to issue one UPDATE per read to bump access counters on
+-- user_performance / portfolio_caches. The backend now buffers hits in
+-- memory, coalesces them per cache entry and flushes them periodically
+-- through this function: one statement per table per flush.
+--
+-- p_entries: [{"user_id": uuid, "cache_key": text|null, "hits": int,
+--              "last_accessed": timestamptz}, ...]
+-- A null cache_key applies the hits to every entry of the user. Hits are
+-- summed per target row, so overlapping entries all count.
+-- ============================================================================
+
+CREATE OR REPLACE FUNCTION flush_cache_access_stats(
+    p_table TEXT,
+    p_entries JSONB
+) RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    updated_count INTEGER;
+BEGIN
+    -- Entries are summed per target row first: a null-key entry and a
+    -- specific-key entry can both match one row, and UPDATE ... FROM applies
+    -- only one arbitrary match per row.
+    IF p_table = 'user_performance' THEN
+        UPDATE public.user_performance up
+        SET access_count = COALESCE(up.access_count, 0) + agg.hits,
+            last_accessed = GREATEST(COALESCE(up.last_accessed, agg.last_accessed), agg.last_accessed)
+        FROM (
+            SELECT t.user_id, SUM(e.hits) AS hits, MAX(e.last_accessed) AS last_accessed
+            FROM jsonb_to_recordset(p_entries) AS e(user_id UUID, cache_key TEXT, hits INTEGER, last_accessed TIMESTAMPTZ)
+            JOIN public.user_performance t
+              ON t.user_id = e.user_id
+             AND (e.cache_key IS NULL OR t.cache_key = e.cache_key)
+            GROUP BY t.user_id
+        ) AS agg
+        WHERE up.user_id = agg.user_id;
+    ELSIF p_table = 'portfolio_caches' THEN
+        UPDATE public.portfolio_caches pc
+        SET hit_count = COALESCE(pc.hit_count, 0) + agg.hits,
+            last_accessed = GREATEST(COALESCE(pc.last_accessed, agg.last_accessed), agg.last_accessed)
+        FROM (
+            SELECT t.id, SUM(e.hits) AS hits, MAX(e.last_accessed) AS last_accessed
+            FROM jsonb_to_recordset(p_entries) AS e(user_id UUID, cache_key TEXT, hits INTEGER, last_accessed TIMESTAMPTZ)
+            JOIN public.portfolio_caches t
+              ON t.user_id = e.user_id
+             AND t.cache_key = e.cache_key
+            GROUP BY t.id
+        ) AS agg
+        WHERE pc.id = agg.id;
+    ELSE
+        RAISE EXCEPTION 'Unsupported cache table: %', p_table;
+    END IF;
+
+    GET DIAGNOSTICS updated_count = ROW_COUNT;
+    RETURN updated_count;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION flush_cache_access_stats TO service_role;
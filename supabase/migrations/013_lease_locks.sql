@@ -0,0 +1,141 @@
+-- ============================================================================
+-- Migration 013: Lease-based distributed locks with fencing tokens
+-- ============================================================================
+-- The advisory-lock functions from migration 009 were polled once a second
+-- by waiters, and a session advisory lock taken through a pooled REST
+-- connection is not tied to the caller at all. Locks are now leases:
+--
+--   * acquire_lease_lock grants the lease if it is free or expired and
+--     returns a new, strictly increasing fencing token (NULL if it is held,
+--     together with the seconds left on the current lease)
+--   * renew_lease_lock extends a lease only for the holder of that token
+--   * release_lease_lock deletes the lease and NOTIFYs 'lock_released' with
+--     the lock name, so waiters in other workers wake immediately
+--
+-- Writers that protect external state can pass the fencing token along and
+-- reject writes carrying an older token than the last one they saw.
+-- ============================================================================
+
+CREATE SEQUENCE IF NOT EXISTS lock_fencing_token_seq;
+
+CREATE TABLE IF NOT EXISTS lock_leases (
+    lock_name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    fencing_token BIGINT NOT NULL,
+    acquired_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    renewed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_lock_leases_expires ON lock_leases(expires_at);
+
+ALTER TABLE lock_leases ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Service role can manage lock leases" ON lock_leases
+    FOR ALL TO service_role
+    USING (true);
+
+-- Grant the lease if free or expired; returns the fencing token or NULL
+CREATE OR REPLACE FUNCTION acquire_lease_lock(
+    p_lock_name TEXT,
+    p_holder TEXT,
+    p_ttl_seconds INTEGER DEFAULT 300
+) RETURNS TABLE (fencing_token BIGINT, expires_in_seconds DOUBLE PRECISION)
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    granted BIGINT;
+BEGIN
+    INSERT INTO lock_leases AS l (lock_name, holder, fencing_token, acquired_at, renewed_at, expires_at)
+    VALUES (
+        p_lock_name,
+        p_holder,
+        nextval('lock_fencing_token_seq'),
+        NOW(),
+        NOW(),
+        NOW() + make_interval(secs => p_ttl_seconds)
+    )
+    ON CONFLICT (lock_name) DO UPDATE
+        SET holder = EXCLUDED.holder,
+            fencing_token = EXCLUDED.fencing_token,
+            acquired_at = EXCLUDED.acquired_at,
+            renewed_at = EXCLUDED.renewed_at,
+            expires_at = EXCLUDED.expires_at
+        WHERE l.expires_at <= NOW()
+    RETURNING l.fencing_token INTO granted;
+
+    IF granted IS NOT NULL THEN
+        RETURN QUERY SELECT granted, p_ttl_seconds::DOUBLE PRECISION;
+    ELSE
+        RETURN QUERY
+            SELECT NULL::BIGINT, GREATEST(EXTRACT(EPOCH FROM (l.expires_at - NOW())), 0)::DOUBLE PRECISION
+            FROM lock_leases l
+            WHERE l.lock_name = p_lock_name;
+    END IF;
+END;
+$$;
+
+-- Extend a lease held under the given fencing token
+CREATE OR REPLACE FUNCTION renew_lease_lock(
+    p_lock_name TEXT,
+    p_holder TEXT,
+    p_fencing_token BIGINT,
+    p_ttl_seconds INTEGER DEFAULT 300
+) RETURNS BOOLEAN
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    UPDATE lock_leases
+    SET renewed_at = NOW(),
+        expires_at = NOW() + make_interval(secs => p_ttl_seconds)
+    WHERE lock_name = p_lock_name
+      AND holder = p_holder
+      AND fencing_token = p_fencing_token
+      AND expires_at > NOW();
+
+    RETURN FOUND;
+END;
+$$;
+
+-- Release a lease and wake waiters in every worker
+CREATE OR REPLACE FUNCTION release_lease_lock(
+    p_lock_name TEXT,
+    p_holder TEXT,
+    p_fencing_token BIGINT
+) RETURNS BOOLEAN
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    DELETE FROM lock_leases
+    WHERE lock_name = p_lock_name
+      AND holder = p_holder
+      AND fencing_token = p_fencing_token;
+
+    IF FOUND THEN
+        PERFORM pg_notify('lock_released', p_lock_name);
+        RETURN TRUE;
+    END IF;
+    RETURN FALSE;
+END;
+$$;
+
+-- Seconds left on a lease, or NULL when the lock is free
+CREATE OR REPLACE FUNCTION check_lease_lock(
+    p_lock_name TEXT
+) RETURNS DOUBLE PRECISION
+LANGUAGE sql
+SECURITY DEFINER
+AS $$
+    SELECT EXTRACT(EPOCH FROM (expires_at - NOW()))::DOUBLE PRECISION
+    FROM lock_leases
+    WHERE lock_name = p_lock_name
+      AND expires_at > NOW();
+$$;
+
+GRANT EXECUTE ON FUNCTION acquire_lease_lock TO service_role;
+GRANT EXECUTE ON FUNCTION renew_lease_lock TO service_role;
+GRANT EXECUTE ON FUNCTION release_lease_lock TO service_role;
+GRANT EXECUTE ON FUNCTION check_lease_lock TO service_role;
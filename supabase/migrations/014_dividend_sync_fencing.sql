@@ -0,0 +1,47 @@
+-- ============================================================================
+-- Migration 014: Fence dividend sync writes with lease tokens
+-- ============================================================================
+-- Dividend syncs run under a lease lock (migration 013). A worker that stalls
+-- past its lease can wake up after another worker took the lock over and
+-- keep writing. Sync writes now carry the fencing token of the lease they
+-- were made under, and this trigger rejects a write whose token no longer
+-- belongs to an unexpired lease: a stale holder fails in the same statement
+-- as its write, with no check-then-write gap.
+--
+-- Writes without a token (manual inserts, user-confirmed dividends) are not
+-- affected. The token stays on the row after the lease is released, so an
+-- UPDATE is only checked when it sets a different token: later edits of a
+-- sync-written row (confirmations, maintenance fixes) still go through.
+-- ============================================================================
+
+ALTER TABLE public.user_dividends
+    ADD COLUMN IF NOT EXISTS sync_fencing_token BIGINT;
+
+CREATE OR REPLACE FUNCTION enforce_lease_fencing_token()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW.sync_fencing_token IS NOT DISTINCT FROM OLD.sync_fencing_token THEN
+        RETURN NEW;
+    END IF;
+
+    IF NEW.sync_fencing_token IS NOT NULL AND NOT EXISTS (
+        SELECT 1
+        FROM lock_leases l
+        WHERE l.fencing_token = NEW.sync_fencing_token
+          AND l.expires_at > NOW()
+    ) THEN
+        RAISE EXCEPTION 'Stale fencing token %: lease expired or taken over', NEW.sync_fencing_token
+            USING ERRCODE = 'P0001';
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS user_dividends_fencing ON public.user_dividends;
+CREATE TRIGGER user_dividends_fencing
+    BEFORE INSERT OR UPDATE ON public.user_dividends
+    FOR EACH ROW
+    EXECUTE FUNCTION enforce_lease_fencing_token();
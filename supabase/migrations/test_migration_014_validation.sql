@@ -0,0 +1,140 @@
+-- ============================================================================
+-- Migration 014 Integration Test: Dividend Sync Fencing
+-- ============================================================================
+-- Validates the fencing-token trigger on user_dividends after migration
+-- deployment: sync inserts need an unexpired lease, stale tokens are
+-- rejected, and rows keep accepting edits after their lease is released.
+--
+-- Run this after applying migrations 013 and 014.
+-- ============================================================================
+
+-- Test configuration
+\set test_lock_name 'test_migration_014_dividend_sync'
+\set test_holder 'test-migration-014'
+
+-- ============================================================================
+-- TEST 1: Trigger Installed
+-- ============================================================================
+
+DO $$
+DECLARE
+    test_name TEXT := 'TEST 1: Trigger Installed';
+BEGIN
+    RAISE NOTICE '=== % ===', test_name;
+
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'public'
+        AND table_name = 'user_dividends'
+        AND column_name = 'sync_fencing_token'
+    ) THEN
+        RAISE EXCEPTION 'FAIL: user_dividends.sync_fencing_token column missing';
+    END IF;
+
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_trigger
+        WHERE tgname = 'user_dividends_fencing'
+        AND tgrelid = 'public.user_dividends'::regclass
+    ) THEN
+        RAISE EXCEPTION 'FAIL: user_dividends_fencing trigger missing';
+    END IF;
+
+    RAISE NOTICE 'PASS: Fencing column and trigger exist';
+END
+$$;
+
+-- ============================================================================
+-- TEST 2: Fenced Writes
+-- ============================================================================
+
+DO $$
+DECLARE
+    test_name TEXT := 'TEST 2: Fenced Writes';
+    lease_token BIGINT;
+    dividend_id UUID;
+    rejected BOOLEAN;
+BEGIN
+    RAISE NOTICE '=== % ===', test_name;
+
+    SELECT fencing_token INTO lease_token
+    FROM acquire_lease_lock('test_migration_014_dividend_sync', 'test-migration-014', 60);
+
+    IF lease_token IS NULL THEN
+        RAISE EXCEPTION 'FAIL: Could not acquire test lease';
+    END IF;
+
+    -- Insert under a live lease is accepted
+    INSERT INTO public.user_dividends (symbol, ex_date, amount, sync_fencing_token)
+    VALUES ('TEST014', DATE '2024-03-15', 0.46, lease_token)
+    RETURNING id INTO dividend_id;
+
+    -- Insert with a token that belongs to no lease is rejected
+    rejected := FALSE;
+    BEGIN
+        INSERT INTO public.user_dividends (symbol, ex_date, amount, sync_fencing_token)
+        VALUES ('TEST014', DATE '2024-06-14', 0.46, lease_token - 1000000);
+    EXCEPTION WHEN raise_exception THEN
+        rejected := TRUE;
+    END;
+    IF NOT rejected THEN
+        RAISE EXCEPTION 'FAIL: Insert with a stale fencing token was accepted';
+    END IF;
+
+    -- Release the lease; the token stays on the row
+    PERFORM release_lease_lock('test_migration_014_dividend_sync', 'test-migration-014', lease_token);
+
+    -- Later edits that leave the token alone still go through
+    UPDATE public.user_dividends
+    SET notes = 'maintenance fix', pay_date = DATE '2024-04-01'
+    WHERE id = dividend_id;
+
+    IF NOT EXISTS (SELECT 1 FROM public.user_dividends WHERE id = dividend_id AND notes = 'maintenance fix') THEN
+        RAISE EXCEPTION 'FAIL: Update of a released sync row did not apply';
+    END IF;
+
+    -- Clearing the token is allowed; stamping the released token again is not
+    UPDATE public.user_dividends SET sync_fencing_token = NULL WHERE id = dividend_id;
+    rejected := FALSE;
+    BEGIN
+        UPDATE public.user_dividends
+        SET sync_fencing_token = lease_token
+        WHERE id = dividend_id;
+    EXCEPTION WHEN raise_exception THEN
+        rejected := TRUE;
+    END;
+    IF NOT rejected THEN
+        RAISE EXCEPTION 'FAIL: Update setting a stale fencing token was accepted';
+    END IF;
+
+    DELETE FROM public.user_dividends WHERE symbol = 'TEST014';
+
+    RAISE NOTICE 'PASS: Stale tokens rejected, released rows remain editable';
+END
+$$;
+
+-- ============================================================================
+-- Test Cleanup
+-- ============================================================================
+
+DELETE FROM public.user_dividends WHERE symbol = 'TEST014';
+DELETE FROM lock_leases WHERE lock_name = :'test_lock_name' AND holder = :'test_holder';
+
+-- ============================================================================
+-- Test Summary
+-- ============================================================================
+
+DO $$
+BEGIN
+    RAISE NOTICE '';
+    RAISE NOTICE '============================================================================';
+    RAISE NOTICE 'MIGRATION 014 INTEGRATION TEST COMPLETE';
+    RAISE NOTICE '============================================================================';
+    RAISE NOTICE 'All tests passed successfully!';
+    RAISE NOTICE '';
+    RAISE NOTICE 'Validated components:';
+    RAISE NOTICE '✅ Fencing column and trigger';
+    RAISE NOTICE '✅ Stale tokens rejected on insert and re-stamp';
+    RAISE NOTICE '✅ Released sync rows remain editable';
+    RAISE NOTICE '============================================================================';
+END
+$$;